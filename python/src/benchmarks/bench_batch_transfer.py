@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+""" Benchmark completing TRANSFERS transfers with one spending tx each, against one batch
+    spending tx, signed with a real key and broadcast to a MockInterface that takes
+    BROADCAST_LATENCY per broadcast as WhatsOnChain does.
+
+    Run from this directory: python3 bench_batch_transfer.py
+"""
+import hashlib
+import sys
+import time
+
+sys.path.append("..")
+
+from tx_engine import Tx, TxIn, TxOut, MockInterface
+from tx_engine import Wallet as cg_wallet
+
+from service.broadcast_queue import broadcast_tx
+from service.commitment_service import CommitmentService
+from service.commitment_packet import Cpid
+from service.wallet import Wallet
+
+TRANSFERS = [10, 100, 500]
+BROADCAST_LATENCY = 0.01
+
+
+class SlowInterface(MockInterface):
+    def broadcast_tx(self, transaction: str):
+        time.sleep(BROADCAST_LATENCY)
+        return super().broadcast_tx(transaction)
+
+
+def make_transfers(wallet: Wallet, n: int):
+    """ Return an ownership outpoint, ownership tx and cpid for each transfer
+    """
+    transfers = []
+    for i in range(n):
+        ownership_tx = Tx(
+            version=1,
+            tx_ins=[TxIn(prev_tx=f"{i:064x}", prev_index=0)],
+            tx_outs=[TxOut(amount=100, script_pubkey=wallet.get_locking_script())],
+            locktime=0)
+        cpid = Cpid(hashlib.sha256(i.to_bytes(4, "big")).hexdigest())
+        transfers.append((TxIn(prev_tx=ownership_tx.id(), prev_index=0), ownership_tx, cpid))
+    return transfers
+
+
+def main():
+    service = CommitmentService()
+    wallet = Wallet()
+    wallet.set_wif(cg_wallet.generate_keypair("BSV_Testnet").to_wif())
+    print(f"{'transfers':>10} {'single (ms)':>12} {'batch (ms)':>11} {'merkle (ms)':>12} {'batch bytes':>12} {'merkle bytes':>13}")
+    for n in TRANSFERS:
+        transfers = make_transfers(wallet, n)
+        start = time.perf_counter()
+        for (outpoint, ownership_tx, cpid) in transfers:
+            tx = service._sign_spending_tx(wallet, outpoint, ownership_tx, cpid)
+            assert tx is not None
+            broadcast_tx(SlowInterface(), tx.serialize().hex())
+        single = time.perf_counter() - start
+
+        results = []
+        for merkle in (False, True):
+            service.batch_merkle_root = merkle
+            start = time.perf_counter()
+            tx = service._sign_batch_spending_tx(
+                wallet, [t[0] for t in transfers], [t[1] for t in transfers], [t[2] for t in transfers])
+            assert tx is not None
+            broadcast_tx(SlowInterface(), tx.serialize().hex())
+            results.append((time.perf_counter() - start, len(tx.serialize())))
+        print(f"{n:>10} {single * 1000:>12.1f} {results[0][0] * 1000:>11.1f} {results[1][0] * 1000:>12.1f} {results[0][1]:>12} {results[1][1]:>13}")
+
+
+if __name__ == "__main__":
+    main()
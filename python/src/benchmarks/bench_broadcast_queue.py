@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+""" Benchmark broadcasts per second through the BroadcastQueue for various numbers of
+    workers, against inline broadcasts, with a MockInterface that takes BROADCAST_LATENCY
+    per broadcast as WhatsOnChain does. Also reports the time broadcasts waited in the queue.
+
+    Run from this directory: python3 bench_broadcast_queue.py
+"""
+import sys
+import time
+
+sys.path.append("..")
+
+from tx_engine import Tx, TxIn, TxOut, Script, MockInterface
+
+from service.broadcast_queue import BroadcastQueue, broadcast_tx
+from service.metrics import metrics
+
+TXS = 200
+BROADCAST_LATENCY = 0.01
+WORKERS = [1, 4, 16]
+
+
+class SlowInterface(MockInterface):
+    def broadcast_tx(self, transaction: str):
+        time.sleep(BROADCAST_LATENCY)
+        return super().broadcast_tx(transaction)
+
+
+def make_txs(offset: int):
+    txs = []
+    for i in range(offset, offset + TXS):
+        tx = Tx(
+            version=1,
+            tx_ins=[TxIn(prev_tx=f"{i:064x}", prev_index=0)],
+            tx_outs=[TxOut(amount=100, script_pubkey=Script.parse_string("OP_1"))],
+            locktime=0)
+        txs.append((tx.id(), tx.serialize().hex()))
+    return txs
+
+
+def main():
+    print(f"{'workers':>8} {'tx/s':>8} {'submit (ms)':>12} {'mean wait (ms)':>15} {'p99 wait (ms)':>14}")
+    txs = make_txs(0)
+    start = time.perf_counter()
+    for (_, tx_hex) in txs:
+        broadcast_tx(SlowInterface(), tx_hex)
+    elapsed = time.perf_counter() - start
+    print(f"{'inline':>8} {TXS / elapsed:>8.0f} {elapsed * 1000:>12.1f} {'-':>15} {'-':>14}")
+
+    for (n, workers) in enumerate(WORKERS):
+        metrics.reset()
+        queue = BroadcastQueue()
+        queue.set_config({"broadcast_queue": {"workers": workers, "max_size": TXS}})
+        queue.set_blockchain_interface(SlowInterface())
+        queue.start()
+        txs = make_txs((n + 1) * TXS)
+        start = time.perf_counter()
+        for (txid, tx_hex) in txs:
+            queue.submit(txid, tx_hex)
+        submitted = time.perf_counter() - start
+        queue.wait()
+        elapsed = time.perf_counter() - start
+        queue.stop()
+        wait = metrics.get_status()["latencies"]["broadcast_queue_wait"]
+        print(f"{workers:>8} {TXS / elapsed:>8.0f} {submitted * 1000:>12.1f} {wait['mean'] * 1000:>15.1f} {wait['p99'] * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
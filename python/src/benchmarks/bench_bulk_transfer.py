@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+""" Benchmark moving TRANSFERS BSV commitments from Alice to Bob with a template and a
+    completion for each, as /commitments/template and /commitments/complete, against one
+    bulk transfer, as /commitments/transfer/bulk, and against handover transfers, which are
+    completed by one tx that spends the previous outpoint to Bob. The stand-ins are those of
+    bench_issuance_batch.py, the financing service takes FUNDING_LATENCY per request and
+    the MockInterface BROADCAST_LATENCY per broadcast.
+
+    Run from this directory: python3 bench_bulk_transfer.py
+"""
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+sys.path.append("..")
+
+from bench_issuance_batch import make_service, add_tokens
+
+from service.commitment_service import CommitmentService
+from service.token_wallet import TokenWallet
+
+TRANSFERS = [10, 50, 100]
+# This is a documented test key, do not use in production
+BOB_TOKEN_KEY = "cU4nzixA5cDSXjGX5hcvZ8QjqZBMLGqwNoWCRZ5fwCt2NLJMyyy3"
+
+
+def make_portfolio(directory: str, prefix: str, n: int) -> Tuple[CommitmentService, List[str]]:
+    """ Return a service with n commitments issued to Alice, and their cpids
+    """
+    service = make_service(directory)
+    token_wallet = TokenWallet()
+    token_wallet.set_key(BOB_TOKEN_KEY, "SECP256k1")
+    service.actors_wallets["Bob"] = service.actors_wallets["Alice"]
+    service.actors_token_wallets["Bob"] = token_wallet
+    service.batch_max_size = max(TRANSFERS)
+    add_tokens(prefix, n)
+    results = service.create_issuance_commitments("Alice", [("bench", f"{prefix}_{i}") for i in range(n)], "BSV")
+    assert all(result["error"] is None for result in results)
+    return (service, [result["cpid"] for result in results])
+
+
+def main():
+    print(f"{'transfers':>10} {'single (/s)':>12} {'bulk (/s)':>10} {'handover (/s)':>14} {'single funding':>15} {'bulk funding':>13} {'handover funding':>17}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n in TRANSFERS:
+            (single, cpids) = make_portfolio(directory, f"single_{n}", n)
+            requests = single.finance_service.requests  # type: ignore[attr-defined]
+            start = time.perf_counter()
+            for cpid in cpids:
+                template = single.create_transfer_template(cpid, "Bob", "BSV")
+                assert template is not None
+                assert single.complete_transfer(template[0], "Alice") is not None
+            single_rate = n / (time.perf_counter() - start)
+            single_funding = single.finance_service.requests - requests  # type: ignore[attr-defined]
+
+            (bulk, cpids) = make_portfolio(directory, f"bulk_{n}", n)
+            requests = bulk.finance_service.requests  # type: ignore[attr-defined]
+            start = time.perf_counter()
+            assert bulk.transfer_commitments(cpids, "Alice", "Bob") is not None
+            bulk_rate = n / (time.perf_counter() - start)
+            bulk_funding = bulk.finance_service.requests - requests  # type: ignore[attr-defined]
+
+            (handover, cpids) = make_portfolio(directory, f"handover_{n}", n)
+            handover.handover_transfers = True
+            requests = handover.finance_service.requests  # type: ignore[attr-defined]
+            start = time.perf_counter()
+            for cpid in cpids:
+                template = handover.create_transfer_template(cpid, "Bob", "BSV")
+                assert template is not None
+                assert handover.complete_transfer(template[0], "Alice") is not None
+            handover_rate = n / (time.perf_counter() - start)
+            handover_funding = handover.finance_service.requests - requests  # type: ignore[attr-defined]
+            print(f"{n:>10} {single_rate:>12.1f} {bulk_rate:>10.1f} {handover_rate:>14.1f} {single_funding:>15} {bulk_funding:>13} {handover_funding:>17}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+""" Benchmark the latency that FinancingService.get_funds adds after the financing service
+    has returned the funding tx, for the previous fixed 0.5s sleep and the backoff visibility
+    check against the local MockInterface, with the tx visible after various delays.
+
+    Run from this directory: python3 bench_funding_wait.py
+"""
+import sys
+import time
+import threading
+from typing import Any, Dict, List
+from unittest.mock import patch, MagicMock
+
+sys.path.append("..")
+
+from tx_engine import Tx, TxIn, TxOut, Script, MockInterface
+
+from service.financing_service import FinancingService
+
+REPEAT = 5
+# Delay (seconds) before the funding tx is visible through the interface
+VISIBLE_AFTER = [0.0, 0.02, 0.1]
+# Previous fixed delay in _get_funds
+FIXED_SLEEP = 0.5
+
+
+def make_response(i: int) -> Dict[str, Any]:
+    tx = Tx(
+        version=1,
+        tx_ins=[TxIn(prev_tx=f"{i:064x}", prev_index=0)],
+        tx_outs=[TxOut(amount=100, script_pubkey=Script.parse_string("OP_1"))],
+        locktime=0)
+    return {'status': 'Success', 'outpoints': [{'hash': tx.id(), 'index': 0}], 'tx': tx.serialize().hex()}
+
+
+def get_funds_latency(service: FinancingService, bsv_client: MockInterface, data: Dict[str, Any], visible_after: float, **kwargs) -> float:
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = data
+    broadcast = threading.Timer(visible_after, bsv_client.broadcast_tx, args=[data['tx']])
+    with patch.object(service.session, "request", return_value=response):
+        broadcast.start()
+        start = time.perf_counter()
+        service.get_funds(100, "51", **kwargs)
+        latency = time.perf_counter() - start
+    broadcast.join()
+    return latency
+
+
+def main():
+    bsv_client = MockInterface()
+    service = FinancingService()
+    service.set_config({"finance_service": {"url": "", "client_id": "bench"}})
+    service.set_blockchain_interface(bsv_client)
+
+    print(f"{'visible after (ms)':>18} {'fixed sleep (ms)':>17} {'backoff (ms)':>13} {'unconfirmed (ms)':>17}")
+    i = 0
+    for visible_after in VISIBLE_AFTER:
+        results: List[float] = []
+        for kwargs in [{}, {"accept_unconfirmed": True}]:
+            best = float("inf")
+            for _ in range(REPEAT):
+                i += 1
+                best = min(best, get_funds_latency(service, bsv_client, make_response(i), visible_after, **kwargs))
+            results.append(best)
+        # The previous path always slept, whenever the tx became visible
+        print(f"{visible_after * 1000:>18.0f} {FIXED_SLEEP * 1000:>17.0f} {results[0] * 1000:>13.1f} {results[1] * 1000:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
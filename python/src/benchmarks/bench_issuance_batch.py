@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+""" Benchmark BSV issuances per second when each issuance is funded and stored on its own,
+    against a batch whose outpoints are funded by one request and signed on the thread pool
+    (/commitments/issuance/batch), and against one anchored batch, which is funded once, splits
+    the funds into ownership outputs and broadcasts an anchor tx of the Merkle root.
+    The financing service takes FUNDING_LATENCY per request and the MockInterface
+    BROADCAST_LATENCY per broadcast, as WhatsOnChain does.
+
+    Run from this directory: python3 bench_issuance_batch.py
+"""
+import os
+import sys
+import time
+import tempfile
+from typing import Any, Dict
+
+sys.path.append("..")
+
+from tx_engine import Tx, TxIn, TxOut, MockInterface
+from tx_engine import Wallet as cg_wallet
+
+from service.commitment_service import CommitmentService
+from service.token_description import token_store, token_descriptor
+from service.token_wallet import TokenWallet
+from service.wallet import Wallet
+
+ISSUANCES = [10, 100, 250]
+FUNDING_LATENCY = 0.05
+BROADCAST_LATENCY = 0.01
+# This is a documented test key, do not use in production
+TOKEN_KEY = "92fnTSWFiLbDvDtXNfvHByUhabdmXiv6xfy9a2zEbwqHHNbWY4z"
+
+
+class SlowInterface(MockInterface):
+    def broadcast_tx(self, transaction: str):
+        time.sleep(BROADCAST_LATENCY)
+        return super().broadcast_tx(transaction)
+
+
+class StandInFinancingService:
+    """ Returns a funding tx paying the amount requested to the wallet
+    """
+    def __init__(self, wallet: Wallet):
+        self.wallet = wallet
+        self.requests = 0
+
+    def get_funds(self, amount: int, locking_script: str) -> Dict[str, Any]:
+        return self._get_funds(amount, locking_script, 1, False)
+
+    def _get_funds(self, amount: int, locking_script: str, no_of_outpoints: int, multiple_tx: bool) -> Dict[str, Any]:
+        time.sleep(FUNDING_LATENCY)
+        self.requests += 1
+        tx = Tx(
+            version=1,
+            tx_ins=[TxIn(prev_tx=f"{self.requests:064x}", prev_index=0)],
+            tx_outs=[TxOut(amount=amount, script_pubkey=self.wallet.get_locking_script()) for _ in range(no_of_outpoints)],
+            locktime=0)
+        outpoints = [{'hash': tx.id(), 'index': i} for i in range(no_of_outpoints)]
+        return {'status': 'Success', 'outpoints': outpoints, 'tx': tx.serialize().hex()}
+
+
+def make_service(directory: str) -> CommitmentService:
+    service = CommitmentService()
+    wallet = Wallet()
+    wallet.set_wif(cg_wallet.generate_keypair("BSV_Testnet").to_wif())
+    token_wallet = TokenWallet()
+    token_wallet.set_key(TOKEN_KEY, "NIST256p")
+    service.actors_wallets["Alice"] = wallet
+    service.actors_token_wallets["Alice"] = token_wallet
+    service.finance_service = StandInFinancingService(wallet)  # type: ignore[assignment]
+    service.blockchain_interface = SlowInterface()
+    service.networks = ["BSV"]
+    service.commitment_store.filepath = os.path.join(directory, "commitment_store.json")
+    token_store.filepath = os.path.join(directory, "token_store.json")
+    return service
+
+
+def add_tokens(prefix: str, n: int):
+    for i in range(n):
+        token_id = f"{prefix}_{i}"
+        token_store.tokens[token_id] = token_descriptor(ipfs_cid=token_id, description="bench token", cpid="")
+
+
+def main():
+    print(f"{'issuances':>10} {'direct (/s)':>12} {'batch (/s)':>11} {'anchored (/s)':>14} {'direct funding':>15} {'batch funding':>14} {'anchored funding':>17}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n in ISSUANCES:
+            direct = make_service(directory)
+            add_tokens(f"direct_{n}", n)
+            start = time.perf_counter()
+            for i in range(n):
+                assert direct.create_issuance_commitment("Alice", "bench", f"direct_{n}_{i}", "BSV") is not None
+            direct_rate = n / (time.perf_counter() - start)
+
+            batch = make_service(directory)
+            add_tokens(f"batch_{n}", n)
+            start = time.perf_counter()
+            batch_results = batch.create_issuance_commitments("Alice", [("bench", f"batch_{n}_{i}") for i in range(n)], "BSV")
+            batch_rate = n / (time.perf_counter() - start)
+            assert all(result["error"] is None for result in batch_results)
+
+            anchored = make_service(directory)
+            add_tokens(f"anchored_{n}", n)
+            start = time.perf_counter()
+            results = anchored._anchor_issuances("Alice", [("bench", f"anchored_{n}_{i}") for i in range(n)])
+            anchored_rate = n / (time.perf_counter() - start)
+            assert all(result is not None for result in results)
+            funding = [service.finance_service.requests for service in (direct, batch, anchored)]  # type: ignore[attr-defined]
+            print(f"{n:>10} {direct_rate:>12.1f} {batch_rate:>11.1f} {anchored_rate:>14.1f} {funding[0]:>15} {funding[1]:>14} {funding[2]:>17}")
+
+
+if __name__ == "__main__":
+    main()
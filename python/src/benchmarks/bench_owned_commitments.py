@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+""" Benchmark the owned commitments lookup used by /commitment_detail_by_actor
+    for an actor with thousands of holdings.
+
+    Run from this directory: python3 bench_owned_commitments.py
+"""
+import sys
+import time
+from typing import List, Tuple
+
+sys.path.append("..")
+
+from service.commitment_store import CommitmentStore
+from service.token_description import TokenStore, token_descriptor
+from service.commitment_packet import CommitmentPacket, CommitmentPacketMetadata, CommitmentStatus, CommitmentType, Cpid
+
+HOLDINGS = [1000, 5000, 10000]
+REPEAT = 5
+
+
+def populate(holdings: int) -> Tuple[CommitmentStore, TokenStore]:
+    cs = CommitmentStore()
+    ts = TokenStore()
+    # Benchmark the in-memory structures only
+    cs.save = lambda: True  # type: ignore[method-assign]
+    ts.save = lambda: True  # type: ignore[method-assign]
+    ts.add_owned_view(cs.owned_view)
+    for i in range(holdings):
+        cpid = f"{i:064x}"
+        token_id = f"token_{i}"
+        ts.tokens[token_id] = token_descriptor(ipfs_cid=token_id, description=token_id, cpid="")
+        cp = CommitmentPacket(
+            asset_id="asset_id", data=token_id, previous_packet=None, blockchain_outpoint=f"{cpid}:1",
+            blockchain_id="BSV", signature=None, signature_scheme="NIST256p", public_key="public_key",
+        )  # type: ignore[call-arg]
+        cs.add_commitment(CommitmentPacketMetadata(
+            owner="Alice", type=CommitmentType.Issuance, state=CommitmentStatus.Created, ownership_tx=None,
+            spending_tx=None, commitment_packet_id=Cpid(cpid), commitment_packet=cp,
+        ))
+        ts.assign_to_actor("Alice", token_id, cpid)
+    return (cs, ts)
+
+
+def nested_loop_lookup(cs: CommitmentStore, ts: TokenStore, actor: str) -> List[Tuple[Cpid, CommitmentPacket]]:
+    """ The previous implementation of commitment_packets_owned_by_actor
+    """
+    return_list: List[Tuple[Cpid, CommitmentPacket]] = []
+    tokens_by_actor = ts.token_list_by_actor(actor)
+    for id, packet in cs.get_commitments_by_actor_without_spending_tx(actor):
+        return_list.extend([(Cpid(id), packet) for obj in tokens_by_actor if obj.cpid == id])
+    return return_list
+
+
+def time_it(fn) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT
+
+
+def main():
+    print(f"{'holdings':>10} {'nested loop (s)':>16} {'owned view (s)':>16} {'speedup':>10}")
+    for holdings in HOLDINGS:
+        (cs, ts) = populate(holdings)
+        assert len(nested_loop_lookup(cs, ts, "Alice")) == len(cs.owned_view.owned_by_actor("Alice")) == holdings
+        nested = time_it(lambda: nested_loop_lookup(cs, ts, "Alice"))
+        view = time_it(lambda: cs.owned_view.owned_by_actor("Alice"))
+        print(f"{holdings:>10} {nested:>16.6f} {view:>16.6f} {nested / view:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+""" Benchmark encoding and decoding a commitment store with the binary packet codec
+    against the pretty-printed JSON model_dump path, and compare the on-disk size.
+
+    Run from this directory: python3 bench_packet_codec.py
+"""
+import sys
+import time
+import json
+import hashlib
+from typing import List
+
+sys.path.append("..")
+
+from service.packet_codec import encode_store, decode_store
+from service.commitment_packet import CommitmentPacket, CommitmentPacketMetadata, CommitmentStatus, CommitmentType
+
+RECORDS = [1000, 10000]
+REPEAT = 3
+
+
+def make_commitments(no_of_records: int) -> List[CommitmentPacketMetadata]:
+    """ Chains of an issuance and a transfer, with realistic key, signature and tx sizes
+    """
+    commitments: List[CommitmentPacketMetadata] = []
+    previous: None | str = None
+    for i in range(no_of_records):
+        seed = hashlib.sha256(i.to_bytes(4, 'big')).hexdigest()
+        cp = CommitmentPacket(
+            asset_id=f"asset_{i // 2}", data=f"Qm{seed[:44]}", previous_packet=previous,
+            blockchain_outpoint=f"{seed}:1", blockchain_id="BSV",
+            signature=(seed * 3)[:142], signature_scheme="NIST256p", public_key="02" + seed,
+        )  # type: ignore[call-arg]
+        is_issuance = previous is None
+        commitments.append(CommitmentPacketMetadata(
+            owner="Alice" if is_issuance else "Bob",
+            type=CommitmentType.Issuance if is_issuance else CommitmentType.Transfer,
+            state=CommitmentStatus.Transferred if is_issuance else CommitmentStatus.Created,
+            ownership_tx=(seed * 8)[:450], spending_tx=(seed * 8)[:450] if is_issuance else None,
+            commitment_packet_id=cp.get_cpid(), commitment_packet=cp,
+        ))
+        previous = cp.get_cpid() if is_issuance else None
+    return commitments
+
+
+def json_encode(commitments: List[CommitmentPacketMetadata]) -> bytes:
+    """ What CommitmentStore.save writes in the json format
+    """
+    return json.dumps([c.model_dump() for c in commitments], indent=4).encode('utf-8')
+
+
+def json_decode(data: bytes) -> List[CommitmentPacketMetadata]:
+    return [CommitmentPacketMetadata.model_validate(c) for c in json.loads(data)]
+
+
+def timed(fn, arg):
+    """ Best of REPEAT runs
+    """
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return (result, best)
+
+
+def main():
+    print(f"{'records':>8} {'format':>7} {'size (KB)':>10} {'encode records/s':>17} {'decode records/s':>17}")
+    for no_of_records in RECORDS:
+        commitments = make_commitments(no_of_records)
+        for (name, encode, decode) in [("json", json_encode, json_decode), ("binary", encode_store, decode_store)]:
+            (encoded, encode_s) = timed(encode, commitments)
+            (decoded, decode_s) = timed(decode, encoded)
+            assert decoded == commitments
+            print(f"{no_of_records:>8} {name:>7} {len(encoded) / 1024:>10.0f} {no_of_records / encode_s:>17.0f} {no_of_records / decode_s:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
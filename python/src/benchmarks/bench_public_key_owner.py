@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+""" Benchmark resolving the owner of a packet's public key, as cp_meta_to_status does
+    for every packet it renders, with thousands of configured actors.
+
+    Run from this directory: python3 bench_public_key_owner.py
+"""
+import sys
+import time
+import random
+from unittest.mock import patch
+
+sys.path.append("..")
+
+from tx_engine import bytes_to_wif
+
+from service.commitment_service import CommitmentService
+
+ACTORS = [1000, 5000]
+LOOKUPS_BEFORE = 20
+LOOKUPS_AFTER = 100000
+# Not a secret, the key for private key 1
+BITCOIN_KEY = bytes_to_wif((1).to_bytes(32, 'big'), 'BSV_Testnet')
+
+
+def make_service(no_of_actors: int) -> CommitmentService:
+    config = {
+        'actor': [
+            {'name': f"actor_{i}", 'token_key': bytes_to_wif((i + 1).to_bytes(32, 'big'), 'BSV_Testnet'),
+             'token_key_curve': 'NIST256p', 'bitcoin_key': BITCOIN_KEY, 'eth_key': 'eth_key'}
+            for i in range(no_of_actors)
+        ]
+    }
+    # Only the token wallets are of interest here
+    with patch('service.commitment_service.EthereumService'), patch('service.commitment_service.EthereumWallet'):
+        service = CommitmentService()
+        service.set_actors(config)
+    return service
+
+
+def loop_public_key_to_owner(service: CommitmentService, public_key: str) -> None | str:
+    """ What public_key_to_owner did before, encode each wallet's key in turn
+    """
+    for name, wallet in service.actors_token_wallets.items():
+        if wallet.private_key.get_verifying_key().to_string(encoding="compressed").hex() == public_key:
+            return name
+    return None
+
+
+def per_second(fn, public_keys) -> float:
+    start = time.perf_counter()
+    for public_key in public_keys:
+        fn(public_key)
+    return len(public_keys) / (time.perf_counter() - start)
+
+
+def main():
+    print(f"{'actors':>8} {'lookups/s before':>17} {'lookups/s after':>16} {'speedup':>10}")
+    for no_of_actors in ACTORS:
+        service = make_service(no_of_actors)
+        public_keys = [wallet.get_token_public_key() for wallet in service.actors_token_wallets.values()]
+        for public_key in random.sample(public_keys, 10):
+            assert loop_public_key_to_owner(service, public_key) == service.public_key_to_owner(public_key)
+
+        before = per_second(lambda pk: loop_public_key_to_owner(service, pk), random.choices(public_keys, k=LOOKUPS_BEFORE))
+        after = per_second(service.public_key_to_owner, random.choices(public_keys, k=LOOKUPS_AFTER))
+        print(f"{no_of_actors:>8} {before:>17.0f} {after:>16.0f} {after / before:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
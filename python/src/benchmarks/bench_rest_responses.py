@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+""" Benchmark rendering a 10k item (cpid, packet) listing, as /commitments and
+    /commitment_detail_by_actor return, with the previous model_dump() and JSONResponse path,
+    FastJSONResponse and the binary packet encoding, with and without gzip.
+
+    Run from this directory: python3 bench_rest_responses.py
+"""
+import sys
+import gzip
+import time
+import hashlib
+from typing import List, Tuple
+
+sys.path.append("..")
+
+from fastapi.responses import JSONResponse
+
+from rest_api import packet_list_response, PACKETS_MEDIA_TYPE
+from service.commitment_packet import CommitmentPacket, Cpid
+
+ITEMS = 10000
+REPEAT = 5
+# As main.py configures the GZipMiddleware
+GZIP_LEVEL = 6
+
+
+def make_packets(no_of_items: int) -> List[Tuple[Cpid, CommitmentPacket]]:
+    packets: List[Tuple[Cpid, CommitmentPacket]] = []
+    for i in range(no_of_items):
+        seed = hashlib.sha256(i.to_bytes(4, 'big')).hexdigest()
+        cp = CommitmentPacket(
+            asset_id=f"asset_{i}", data=f"Qm{seed[:44]}", previous_packet=seed,
+            blockchain_outpoint=f"{seed}:1", blockchain_id="BSV",
+            signature=(seed * 3)[:142], signature_scheme="NIST256p", public_key="02" + seed,
+        )  # type: ignore[call-arg]
+        packets.append((cp.get_cpid(), cp))
+    return packets
+
+
+def model_dump_response(packets: List[Tuple[Cpid, CommitmentPacket]]) -> bytes:
+    """ What the listing endpoints did before
+    """
+    serialisable_commitments = [{c[0]: c[1].model_dump()} for c in packets]
+    return bytes(JSONResponse(content={"message": serialisable_commitments}).body)
+
+
+def best_of(fn) -> Tuple[bytes, float]:
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - start)
+    return (body, best)
+
+
+def main():
+    packets = make_packets(ITEMS)
+    renderers = [
+        ("model_dump", lambda: model_dump_response(packets)),
+        ("fast json", lambda: bytes(packet_list_response(packets, None).body)),
+        ("binary", lambda: bytes(packet_list_response(packets, PACKETS_MEDIA_TYPE).body)),
+    ]
+    print(f"{ITEMS} item listing")
+    print(f"{'response':>11} {'render (ms)':>12} {'size (KB)':>10} {'gzip (ms)':>10} {'gzip size (KB)':>15}")
+    for (name, render) in renderers:
+        (body, render_s) = best_of(render)
+        (compressed, gzip_s) = best_of(lambda: gzip.compress(body, GZIP_LEVEL))
+        print(f"{name:>11} {render_s * 1000:>12.1f} {len(body) / 1024:>10.0f} {gzip_s * 1000:>10.1f} {len(compressed) / 1024:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
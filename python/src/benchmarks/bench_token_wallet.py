@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+""" Microbenchmark of TokenWallet signing and signature verification per curve,
+    comparing the per call work the wallet used to do with the precomputed and
+    cached keys it now loads, for each available signature backend.
+
+    Run from this directory: python3 bench_token_wallet.py
+"""
+import sys
+import time
+import hashlib
+import ecdsa
+
+sys.path.append("..")
+
+from service.token_wallet import TokenWallet, SIGNATURE_BACKENDS, verify_signature, clear_verifying_key_cache, make_signature_backend
+
+# These are documented test keys, do not use in production
+KEYS = {
+    "NIST256p": "92fnTSWFiLbDvDtXNfvHByUhabdmXiv6xfy9a2zEbwqHHNbWY4z",
+    "SECP256k1": "cU4nzixA5cDSXjGX5hcvZ8QjqZBMLGqwNoWCRZ5fwCt2NLJMyyy3",
+}
+ITERATIONS = 200
+
+
+def per_second(fn, iterations: int = ITERATIONS) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - start)
+
+
+def uncached_verify(message: bytes, public_key: str, sig: bytes, curve: ecdsa.curves.Curve) -> bool:
+    """ What verify_signature did before, parse a fresh key on every call
+    """
+    vk = ecdsa.VerifyingKey.from_string(bytes.fromhex(public_key), curve=curve)
+    return vk.verify(sig, message, hashfunc=hashlib.sha256)
+
+
+def main():
+    message = "Get away from her, you bitch!".encode()
+    print(f"{'backend':>12} {'curve':>10} {'load (ms)':>10} {'signs/s':>10} {'verifies/s before':>18} {'verifies/s after':>17} {'pubkey/s before':>16} {'pubkey/s after':>15}")
+    for backend_name in SIGNATURE_BACKENDS.keys():
+        backend = make_signature_backend(backend_name)
+        for (curve_name, key) in KEYS.items():
+            clear_verifying_key_cache()
+            start = time.perf_counter()
+            wallet = TokenWallet()
+            wallet.set_key(key, curve_name, backend)
+            load_ms = (time.perf_counter() - start) * 1000
+
+            curve = wallet.get_signature_curve()
+            public_key = wallet.get_token_public_key()
+            sig = wallet.sign_commitment_packet_digest(message, hashlib.sha256)
+            assert verify_signature(message, public_key, sig, curve, hashlib.sha256, backend)
+            assert uncached_verify(message, public_key, sig, curve)
+
+            signs = per_second(lambda: wallet.sign_commitment_packet_digest(message, hashlib.sha256))
+            verifies_before = per_second(lambda: uncached_verify(message, public_key, sig, curve))
+            verifies_after = per_second(lambda: verify_signature(message, public_key, sig, curve, hashlib.sha256, backend))
+            pubkey_before = per_second(lambda: wallet.private_key.get_verifying_key().to_string(encoding="compressed").hex(), 10 * ITERATIONS)
+            pubkey_after = per_second(lambda: wallet.get_token_public_key(), 10 * ITERATIONS)
+            print(f"{backend_name:>12} {curve_name:>10} {load_ms:>10.1f} {signs:>10.0f} {verifies_before:>18.0f} {verifies_after:>17.0f} {pubkey_before:>16.0f} {pubkey_after:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
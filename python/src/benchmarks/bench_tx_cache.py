@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+""" Benchmark CommitmentService._get_tx style lookups of an ownership tx from the TxCache
+    memory LRU and directory against the blockchain interface, with a MockInterface that
+    takes INTERFACE_LATENCY per lookup as WhatsOnChain does.
+
+    Run from this directory: python3 bench_tx_cache.py
+"""
+import sys
+import tempfile
+import time
+
+sys.path.append("..")
+
+from tx_engine import Tx, TxIn, TxOut, Script, MockInterface
+
+from service.tx_cache import TxCache
+
+LOOKUPS = 1000
+INTERFACE_LATENCY = 0.05
+
+
+def make_tx(i: int) -> Tx:
+    return Tx(
+        version=1,
+        tx_ins=[TxIn(prev_tx=f"{i:064x}", prev_index=0)],
+        tx_outs=[TxOut(amount=100, script_pubkey=Script.parse_string("OP_1"))],
+        locktime=0)
+
+
+def main():
+    txs = [make_tx(i) for i in range(LOOKUPS)]
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TxCache()
+        cache.set_config({"tx_cache": {"directory": directory}})
+        cache.add_all(tx.serialize().hex() for tx in txs)
+
+        start = time.perf_counter()
+        for tx in txs:
+            cache.get(tx.id())
+        memory = (time.perf_counter() - start) / LOOKUPS
+
+        cache.reset()
+        start = time.perf_counter()
+        for tx in txs:
+            cache.get(tx.id())
+        disk = (time.perf_counter() - start) / LOOKUPS
+
+    bsv_client = MockInterface()
+    bsv_client.set_transactions({tx.id(): tx.serialize().hex() for tx in txs})
+    start = time.perf_counter()
+    bsv_client.get_raw_transaction(txs[0].id())
+    # The mock is local, so add the round trip to WhatsOnChain
+    interface = time.perf_counter() - start + INTERFACE_LATENCY
+
+    print(f"{'source':>10} {'per lookup (us)':>16}")
+    print(f"{'memory':>10} {memory * 1e6:>16.1f}")
+    print(f"{'disk':>10} {disk * 1e6:>16.1f}")
+    print(f"{'interface':>10} {interface * 1e6:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import sys
 sys.path.append("..")
@@ -20,6 +20,8 @@ class EthereumService:
         self.eth_type: str
         self.eth_interface: Any
         self.web3: Web3
+        # Ownership tx hash -> UTXO id, the receipt of a mined tx does not change
+        self.utxo_ids: Dict[str, Any] = {}
 
     def set_config(self, config: ConfigType):
         """ Given the configuration, configure the service
@@ -84,7 +86,27 @@ class EthereumService:
         """ Given an tx reference return true if it has been spent
             Return None on failure
         """
-        return False
+        return self.get_spent_statuses([txid])[txid]
+
+    def get_block_number(self) -> int:
+        return self.web3.eth.block_number
+
+    def get_spent_statuses(self, tx_hashes: List[str], block_number: None | int = None) -> Dict[str, None | bool]:
+        """ Given ownership tx references return whether each has been spent, all as of the
+            same block, the latest if not given. None for those that could not be checked.
+        """
+        block_identifier = "latest" if block_number is None else block_number
+        results: Dict[str, None | bool] = {}
+        for tx_hash in tx_hashes:
+            try:
+                utxo = self.utxo_ids.get(tx_hash)
+                if utxo is None:
+                    utxo = self.utxo_ids[tx_hash] = self.eth_interface.get_utxo_id(tx_hash)
+                results[tx_hash] = self.eth_interface.is_utxo_spent(utxo, block_identifier)
+            except Exception as e:
+                logger.error(f"Unable to get the spent status of {tx_hash}, {e!r}")
+                results[tx_hash] = None
+        return results
 
     def create_ownership_tx(self, wallet: EthereumWallet) -> str:
         """ Given a wallet create an ownership transaction and return a reference to it
@@ -1,16 +1,48 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Response, status
+from fastapi import FastAPI, Header, Response, status
 from fastapi.responses import JSONResponse
 
-from typing import Any, Dict, Optional
+from typing import Annotated, Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 from pydantic import BaseModel
+from pydantic_core import to_json
 
 from service.commitment_service import commitment_service
+from service.metrics import metrics
+from service.commitment_packet import CommitmentPacket
+from service.packet_codec import encode_metadata, encode_packet_list
 from service.token_description import token_store
 
 CONFIG_FILE = "../data/uba-server.toml" if os.environ.get("APP_ENV") == "docker" else "../../data/uba-server.toml"
 
+# Compact binary responses, see service/packet_codec.py, requested with the Accept header
+PACKETS_MEDIA_TYPE = "application/vnd.uba.packets"
+
+
+class FastJSONResponse(JSONResponse):
+    """ JSONResponse rendered by pydantic-core, which serialises models without a model_dump()
+    """
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+def accepts_packets(accept: None | str) -> bool:
+    """ Return true if the client asked for the binary packet encoding
+    """
+    if accept is None:
+        return False
+    return any(media_range.split(';')[0].strip() == PACKETS_MEDIA_TYPE for media_range in accept.split(','))
+
+
+def packet_list_response(packets: Sequence[Tuple[None | str, CommitmentPacket]], accept: None | str) -> Response:
+    """ Return the (cpid, packet) list as JSON, or encoded if the client accepts it
+    """
+    if accepts_packets(accept):
+        return Response(content=encode_packet_list(packets), media_type=PACKETS_MEDIA_TYPE)
+    return FastJSONResponse(content={"message": [{cpid: cp} for (cpid, cp) in packets]}, status_code=status.HTTP_200_OK)
+
 
 tags_metadata = [
     {
@@ -20,10 +52,20 @@ tags_metadata = [
 ]
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    commitment_service.status_monitor.start()
+    yield
+    commitment_service.status_monitor.stop()
+    await commitment_service.aclose()
+
+
 app = FastAPI(
     title="UBA Token System REST API",
     description="UBA Token System REST API",
     openapi_tags=tags_metadata,
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
 
@@ -33,16 +75,30 @@ def get_status() -> Dict[str, Any]:
     return commitment_service.get_status()
 
 
+@app.get("/healthz", tags=["Status"])
+async def get_health() -> Dict[str, Any]:
+    """ Liveness probe, makes no outbound calls
+    """
+    return {"status": "ok"}
+
+
+@app.get("/metrics", tags=["Status"])
+def get_metrics() -> Dict[str, Any]:
+    """ Metrics - returns the service counters, gauges and latencies. """
+    return metrics.get_status()
+
+
 @app.get("/commitment", tags=["Tokens"])
-def get_commitment_metadata_by_cpid(cpid: str) -> Response:
+def get_commitment_metadata_by_cpid(cpid: str, accept: Annotated[None | str, Header()] = None) -> Response:
     """ Get UBA Metadata (and UBA) associated with this CPID
     """
     commitment = commitment_service.get_commitment_meta_by_cpid(cpid)
     if commitment is None:
-        return JSONResponse(content={"message": "Unable to find any UBA Packets"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": "Unable to find any UBA Packets"}, status_code=status.HTTP_400_BAD_REQUEST)
+    elif accepts_packets(accept):
+        return Response(content=encode_metadata(commitment), media_type=PACKETS_MEDIA_TYPE)
     else:
-        serialisable_commitment = commitment.model_dump()
-        return JSONResponse(content={"message": serialisable_commitment}, status_code=status.HTTP_200_OK)
+        return FastJSONResponse(content={"message": commitment}, status_code=status.HTTP_200_OK)
 
 
 @app.get("/commitment/tx", tags=["Tokens"])
@@ -50,61 +106,55 @@ def get_commitment_transaction(cpid: str) -> Response:
     """ Given the cpid return the transaction ownership_tx in the Commitment
     """
     if not commitment_service.is_known_cpid(cpid):
-        return JSONResponse(content={"message": "Unable to find any UBA Packeta"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": "Unable to find any UBA Packeta"}, status_code=status.HTTP_400_BAD_REQUEST)
     else:
         result = commitment_service.get_commitment_tx_by_cpid(cpid)
         if result is None:
-            return JSONResponse(content={"message": "Unable to find transaction"}, status_code=status.HTTP_400_BAD_REQUEST)
+            return FastJSONResponse(content={"message": "Unable to find transaction"}, status_code=status.HTTP_400_BAD_REQUEST)
         else:
-            return JSONResponse(content={"message": result}, status_code=status.HTTP_200_OK)
+            return FastJSONResponse(content={"message": result}, status_code=status.HTTP_200_OK)
 
 
 @app.get("/commitment/status", tags=["Tokens"])
 def get_commitment_status(cpid: str) -> Response:
     """ Given the cpid return the Commitment status
     """
-    return JSONResponse(content={"message": "Not implemented"}, status_code=status.HTTP_501_NOT_IMPLEMENTED)
+    return FastJSONResponse(content={"message": "Not implemented"}, status_code=status.HTTP_501_NOT_IMPLEMENTED)
 
 
 @app.get("/commitments", tags=["Tokens"])
-def get_commitments_by_actor(actor: str) -> Response:
+def get_commitments_by_actor(actor: str, accept: Annotated[None | str, Header()] = None) -> Response:
     """ Get UBA associated with this actor
     """
     if not commitment_service.is_known_actor(actor):
-        return JSONResponse(content={"message": f"Unknown actor {actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": f"Unknown actor {actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
 
     commitments = commitment_service.get_commitments_by_actor(actor)
     if commitments == []:
-        return JSONResponse(content={"message": "Unable to find any UBAs"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": "Unable to find any UBAs"}, status_code=status.HTTP_400_BAD_REQUEST)
     else:
-        serialisable_commitments = [
-            {c[0]: c[1].model_dump() if hasattr(c[1], 'model_dump') else c[1]} for c in commitments
-        ]
-        return JSONResponse(content={"message": serialisable_commitments}, status_code=status.HTTP_200_OK)
+        return packet_list_response(commitments, accept)
 
 
 @app.get("/commitments/transfers", tags=["Tokens"])
-def get_transfers_by_actor(actor: str) -> Response:
+def get_transfers_by_actor(actor: str, accept: Annotated[None | str, Header()] = None) -> Response:
     """ Get UBA Transfers of this actor's UBAs
     """
     if not commitment_service.is_known_actor(actor):
-        return JSONResponse(content={"message": f"Unknown actor {actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": f"Unknown actor {actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
 
     commitments = commitment_service.get_transfers_by_actor(actor)
     if commitments == []:
-        return JSONResponse(content={"message": "Unable to find any UBAs"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": "Unable to find any UBAs"}, status_code=status.HTTP_400_BAD_REQUEST)
     else:
-        serialisable_commitments = [
-            {c[0]: c[1].model_dump() if hasattr(c[1], 'model_dump') else c[1]} for c in commitments
-        ]
-        return JSONResponse(content={"message": serialisable_commitments}, status_code=status.HTTP_200_OK)
+        return packet_list_response(commitments, accept)
 
 
 @app.get("/token_list", tags=["Tokens"])
 def available_token_list() -> Response:
     """ Get a list of token descriptions and CIDs
     """
-    return JSONResponse(content={"message": token_store.__repr__()})
+    return FastJSONResponse(content={"message": token_store.__repr__()})
 
 
 @app.get("/token_to_actor", tags=["Tokens"])
@@ -112,9 +162,9 @@ def token_to_actor(actor: str, token_id: str, cpid: str) -> Response:
     """ Assigns a token to an actor
     """
     if not token_store.assign_to_actor(actor, token_id, cpid):
-        return JSONResponse(content={"message": {"status": False}})
+        return FastJSONResponse(content={"message": {"status": False}})
     else:
-        return JSONResponse(content={"message": {"status": True}})
+        return FastJSONResponse(content={"message": {"status": True}})
 
 
 @app.get("/return_token_to_list", tags=["Tokens"])
@@ -122,9 +172,9 @@ def return_to_available_token_list(actor: str, token_id: str) -> Response:
     """ Assigns a token to an actor
     """
     if not token_store.return_to_pool(actor, token_id):
-        return JSONResponse(content={"message": {"status": False}})
+        return FastJSONResponse(content={"message": {"status": False}})
     else:
-        return JSONResponse(content={"message": {"status": True}})
+        return FastJSONResponse(content={"message": {"status": True}})
 
 
 @app.get("/tokens_by_actor", tags=["Tokens"])
@@ -133,31 +183,22 @@ def tokens_by_actor(actor: str) -> Response:
     """
     token_list_str: str = token_store.tokens_by_actor(actor)
     # print(token_list_str)
-    return JSONResponse(content={"message": {'tokens': token_list_str}}, status_code=status.HTTP_200_OK)
+    return FastJSONResponse(content={"message": {'tokens': token_list_str}}, status_code=status.HTTP_200_OK)
 
 
 @app.get("/commitment_detail_by_actor", tags=["Tokens"])
-def commitment_detail_by_actor(actor: str) -> Response:
+def commitment_detail_by_actor(actor: str, accept: Annotated[None | str, Header()] = None) -> Response:
     """ Returns a list of UBA packets owned by actor that are available
         for purchase by others
     """
     if not commitment_service.is_known_actor(actor):
-        return JSONResponse(content={"message": f"Unknown actor {actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": f"Unknown actor {actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
 
     commit_packet_list = commitment_service.commitment_packets_owned_by_actor(actor)
     if commit_packet_list is None:
-        return JSONResponse(content={"message": "No commitment packets found"}, status_code=status.HTTP_400_BAD_REQUEST)
-
-    serialisable_commitment_list = []
-    for c in commit_packet_list:
-        key = c[0]
-        value = c[1]
-        if hasattr(value, 'model_dump'):
-            serialisable_commitment_list.append({key: value.model_dump()})
-        else:
-            serialisable_commitment_list.append({key: value.__dict__})
+        return FastJSONResponse(content={"message": "No commitment packets found"}, status_code=status.HTTP_400_BAD_REQUEST)
 
-    return JSONResponse(content={"message": serialisable_commitment_list}, status_code=status.HTTP_200_OK)
+    return packet_list_response(commit_packet_list, accept)
 
 
 @app.get("/commitment_transaction_hash", tags=["Tokens"])
@@ -165,12 +206,12 @@ def commitment_transaction_hash(cpid: str) -> Response:
     """ Returns the UBA transaction hash for the parent of a given CPID
     """
     if not commitment_service.is_known_cpid(cpid):
-        return JSONResponse(content={"message": "Unable to find any UBA Packets"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": "Unable to find any UBA Packets"}, status_code=status.HTTP_400_BAD_REQUEST)
 
     tx_hash: Optional[str] = commitment_service.get_commitment_tx_hash(cpid)
     if tx_hash is None:
-        return JSONResponse(content={"message": f"Unknown cpid {cpid}"}, status_code=status.HTTP_400_BAD_REQUEST)
-    return JSONResponse(content={"message": {'Commitment_TX_Hash': tx_hash}}, status_code=status.HTTP_200_OK)
+        return FastJSONResponse(content={"message": f"Unknown cpid {cpid}"}, status_code=status.HTTP_400_BAD_REQUEST)
+    return FastJSONResponse(content={"message": {'Commitment_TX_Hash': tx_hash}}, status_code=status.HTTP_200_OK)
 
 
 class IssuanceParameters(BaseModel):
@@ -183,26 +224,63 @@ class IssuanceParameters(BaseModel):
 
 
 @app.post("/commitments/issuance", tags=["Tokens"])
-def create_issuance_commitment(commit_param: IssuanceParameters) -> Response:
+async def create_issuance_commitment(commit_param: IssuanceParameters) -> Response:
     """ Create an Issuance UBA Packet
     """
     if not commitment_service.is_known_actor(commit_param.actor):
-        return JSONResponse(content={"message": f"Unknown actor {commit_param.actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": f"Unknown actor {commit_param.actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
 
     if not commitment_service.is_known_network(commit_param.network):
-        return JSONResponse(content={"message": f"Unknown network {commit_param.network}"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": f"Unknown network {commit_param.network}"}, status_code=status.HTTP_400_BAD_REQUEST)
 
     if not commitment_service.is_commitment_unique(commit_param.asset_id, commit_param.asset_data, commit_param.network):
-        return JSONResponse(content={"message": "This UBA already exists"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": "This UBA already exists"}, status_code=status.HTTP_400_BAD_REQUEST)
 
-    cpid_commitment = commitment_service.create_issuance_commitment(
+    cpid_commitment = await commitment_service.async_create_issuance_commitment(
         commit_param.actor, commit_param.asset_id, commit_param.asset_data, commit_param.network)
     if cpid_commitment is not None:
         (cpid, commitment) = cpid_commitment
         serialised_commitment = commitment.model_dump()
-        return JSONResponse(content={"message": {cpid: serialised_commitment}}, status_code=status.HTTP_200_OK)
+        return FastJSONResponse(content={"message": {cpid: serialised_commitment}}, status_code=status.HTTP_200_OK)
     else:
-        return JSONResponse(content={"message": "Unable to create UBA packet"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": "Unable to create UBA packet"}, status_code=status.HTTP_400_BAD_REQUEST)
+
+
+class IssuanceItem(BaseModel):
+    """ One UBA of a batch issuance
+    """
+    asset_id: str
+    asset_data: str
+
+
+class IssuancesParameters(BaseModel):
+    """ The parameters required to create a batch of UBAs
+    """
+    actor: str
+    network: str
+    issuances: List[IssuanceItem]
+
+
+@app.post("/commitments/issuance/batch", tags=["Tokens"])
+async def create_issuance_commitments(issuances_param: IssuancesParameters) -> Response:
+    """ Create a batch of Issuance UBA Packets, funded by one request to the financing service.
+        Returns a result for each issuance, those that fail have an error and the others are created.
+    """
+    if not commitment_service.is_known_actor(issuances_param.actor):
+        return FastJSONResponse(content={"message": f"Unknown actor {issuances_param.actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
+
+    if not commitment_service.is_known_network(issuances_param.network):
+        return FastJSONResponse(content={"message": f"Unknown network {issuances_param.network}"}, status_code=status.HTTP_400_BAD_REQUEST)
+
+    if not 1 <= len(issuances_param.issuances) <= commitment_service.batch_max_size:
+        return FastJSONResponse(
+            content={"message": f"A batch must have between 1 and {commitment_service.batch_max_size} issuances"},
+            status_code=status.HTTP_400_BAD_REQUEST)
+
+    results = await commitment_service.async_create_issuance_commitments(
+        issuances_param.actor, [(item.asset_id, item.asset_data) for item in issuances_param.issuances], issuances_param.network)
+    created = any(result["cpid"] is not None for result in results)
+    return FastJSONResponse(content={"message": results}, status_code=status.HTTP_200_OK if created else status.HTTP_400_BAD_REQUEST)
 
 
 class TemplateParameters(BaseModel):
@@ -214,32 +292,33 @@ class TemplateParameters(BaseModel):
 
 
 @app.post("/commitments/template", tags=["Tokens"])
-def create_transfer_template(commit_transfer_param: TemplateParameters) -> Response:
+async def create_transfer_template(commit_transfer_param: TemplateParameters) -> Response:
     """ Create Transfer Template
     """
     if not commitment_service.is_known_cpid(commit_transfer_param.cpid):
-        return JSONResponse(content={"message": "Unknown cpid"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": "Unknown cpid"}, status_code=status.HTTP_400_BAD_REQUEST)
 
     if not commitment_service.is_known_actor(commit_transfer_param.actor):
-        return JSONResponse(content={"message": f"Unknown actor {commit_transfer_param.actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": f"Unknown actor {commit_transfer_param.actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
 
     if not commitment_service.is_known_network(commit_transfer_param.network):
-        return JSONResponse(content={"message": f"Unknown network {commit_transfer_param.network}"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": f"Unknown network {commit_transfer_param.network}"}, status_code=status.HTTP_400_BAD_REQUEST)
 
-    if not commitment_service.can_transfer(commit_transfer_param.cpid, commit_transfer_param.actor, is_owner=False):
-        return JSONResponse(content={"message": "Unable to Transfer UBA Packet"}, status_code=status.HTTP_400_BAD_REQUEST)
+    # Verifies the packet's signature, so it runs on a worker thread
+    if not await asyncio.to_thread(commitment_service.can_transfer, commit_transfer_param.cpid, commit_transfer_param.actor, is_owner=False):
+        return FastJSONResponse(content={"message": "Unable to Transfer UBA Packet"}, status_code=status.HTTP_400_BAD_REQUEST)
 
     try:
-        cpid_commitment = commitment_service.create_transfer_template(
+        cpid_commitment = await commitment_service.async_create_transfer_template(
             commit_transfer_param.cpid, commit_transfer_param.actor, commit_transfer_param.network)
         if cpid_commitment is not None:
             (cpid, commitment) = cpid_commitment
             serialised_commitment = commitment.model_dump()
-            return JSONResponse(content={"message": {cpid: serialised_commitment}}, status_code=status.HTTP_200_OK)
+            return FastJSONResponse(content={"message": {cpid: serialised_commitment}}, status_code=status.HTTP_200_OK)
         else:
-            return JSONResponse(content={"message": "Unable to create a transfer UBA packet template"}, status_code=status.HTTP_400_BAD_REQUEST)
+            return FastJSONResponse(content={"message": "Unable to create a transfer UBA packet template"}, status_code=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
-        return JSONResponse(content={"message": f"Error: {e}"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": f"Error: {e}"}, status_code=status.HTTP_400_BAD_REQUEST)
 
 
 class CompleteTransferParameters(BaseModel):
@@ -250,22 +329,94 @@ class CompleteTransferParameters(BaseModel):
 
 
 @app.post("/commitments/complete", tags=["Tokens"])
-def complete_transfer(commit_transfer_param: CompleteTransferParameters) -> Response:
+async def complete_transfer(commit_transfer_param: CompleteTransferParameters) -> Response:
     """ Complete Transfer
     """
     if not commitment_service.is_known_cpid(commit_transfer_param.cpid):
-        return JSONResponse(content={"message": "Unknown cpid"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": "Unknown cpid"}, status_code=status.HTTP_400_BAD_REQUEST)
 
     if not commitment_service.is_known_actor(commit_transfer_param.actor):
-        return JSONResponse(content={"message": f"Unknown actor {commit_transfer_param.actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": f"Unknown actor {commit_transfer_param.actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
 
     if not commitment_service.can_complete_transfer(commit_transfer_param.cpid, commit_transfer_param.actor):
-        return JSONResponse(content={"message": "Unable to Complete Transfer UBA Packet"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": "Unable to Complete Transfer UBA Packet"}, status_code=status.HTTP_400_BAD_REQUEST)
 
-    cpid_commitment = commitment_service.complete_transfer(commit_transfer_param.cpid, commit_transfer_param.actor)
+    cpid_commitment = await commitment_service.async_complete_transfer(commit_transfer_param.cpid, commit_transfer_param.actor)
     if cpid_commitment is not None:
         (cpid, commitment) = cpid_commitment
         serialised_commitment = commitment.model_dump()
-        return JSONResponse(content={"message": {cpid: serialised_commitment}}, status_code=status.HTTP_200_OK)
+        return FastJSONResponse(content={"message": {cpid: serialised_commitment}}, status_code=status.HTTP_200_OK)
+    else:
+        return FastJSONResponse(content={"message": "Unable to complete a transfer"}, status_code=status.HTTP_400_BAD_REQUEST)
+
+
+class CompleteTransfersParameters(BaseModel):
+    """ The parameters required to complete a batch of transfers
+    """
+    cpids: List[str]
+    actor: str
+
+
+@app.post("/commitments/complete/batch", tags=["Tokens"])
+async def complete_transfers(complete_param: CompleteTransfersParameters) -> Response:
+    """ Complete a batch of BSV transfers with one transaction, either all are completed or none are
+    """
+    if not commitment_service.is_known_actor(complete_param.actor):
+        return FastJSONResponse(content={"message": f"Unknown actor {complete_param.actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
+
+    for cpid in complete_param.cpids:
+        if not commitment_service.is_known_cpid(cpid):
+            return FastJSONResponse(content={"message": f"Unknown cpid {cpid}"}, status_code=status.HTTP_400_BAD_REQUEST)
+
+    cpid_commitments = await commitment_service.async_complete_transfers(complete_param.cpids, complete_param.actor)
+    if cpid_commitments is not None:
+        return FastJSONResponse(content={"message": {cpid: commitment.model_dump() for (cpid, commitment) in cpid_commitments}}, status_code=status.HTTP_200_OK)
+    else:
+        return FastJSONResponse(content={"message": "Unable to complete the transfers"}, status_code=status.HTTP_400_BAD_REQUEST)
+
+
+class BulkTransferParameters(BaseModel):
+    """ The parameters required to move a batch of UBAs to another actor
+    """
+    cpids: List[str]
+    from_actor: str
+    to_actor: str
+
+
+@app.post("/commitments/transfer/bulk", tags=["Tokens"])
+async def transfer_commitments(transfer_param: BulkTransferParameters) -> Response:
+    """ Move a batch of BSV UBAs from one actor to another, creating and completing each transfer,
+        either all are moved or none are
+    """
+    for actor in (transfer_param.from_actor, transfer_param.to_actor):
+        if not commitment_service.is_known_actor(actor):
+            return FastJSONResponse(content={"message": f"Unknown actor {actor}"}, status_code=status.HTTP_400_BAD_REQUEST)
+
+    for cpid in transfer_param.cpids:
+        if not commitment_service.is_known_cpid(cpid):
+            return FastJSONResponse(content={"message": f"Unknown cpid {cpid}"}, status_code=status.HTTP_400_BAD_REQUEST)
+
+    cpid_commitments = await commitment_service.async_transfer_commitments(transfer_param.cpids, transfer_param.from_actor, transfer_param.to_actor)
+    if cpid_commitments is not None:
+        return FastJSONResponse(content={"message": {cpid: commitment.model_dump() for (cpid, commitment) in cpid_commitments}}, status_code=status.HTTP_200_OK)
     else:
-        return JSONResponse(content={"message": "Unable to complete a transfer"}, status_code=status.HTTP_400_BAD_REQUEST)
+        return FastJSONResponse(content={"message": "Unable to transfer the UBAs"}, status_code=status.HTTP_400_BAD_REQUEST)
+
+
+class VerifyParameters(BaseModel):
+    """ The commitments to verify, by cpid and as packets
+    """
+    cpids: List[str] = []
+    packets: List[CommitmentPacket] = []
+
+
+@app.post("/commitments/verify", tags=["Tokens"])
+def verify_commitments(verify_param: VerifyParameters) -> Response:
+    """ Verify the signature and chain of each commitment in one pass,
+        returns a result for each cpid followed by each packet
+    """
+    if len(verify_param.cpids) == 0 and len(verify_param.packets) == 0:
+        return FastJSONResponse(content={"message": "No cpids or packets to verify"}, status_code=status.HTTP_400_BAD_REQUEST)
+
+    results = commitment_service.verify_commitments(verify_param.cpids, verify_param.packets)
+    return FastJSONResponse(content={"message": results}, status_code=status.HTTP_200_OK)
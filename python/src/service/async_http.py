@@ -0,0 +1,42 @@
+import asyncio
+from typing import Any
+
+import aiohttp
+
+
+class AsyncHttpSession:
+    """ An aiohttp ClientSession with a keep-alive connection pool.
+        The session is created on first use, in the running event loop.
+    """
+    def __init__(self, pool_size: int = 100):
+        self.pool_size = pool_size
+        self.session: None | aiohttp.ClientSession = None
+        self.loop: Any = None
+
+    async def get(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self.loop is not loop:
+            # A session can only be used in the loop it was created in
+            await self.close()
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self.session = aiohttp.ClientSession(connector=connector)
+            self.loop = loop
+        return self.session
+
+    async def close(self):
+        """ Close the session on the loop it was created in, unless that loop is closed
+        """
+        (session, loop) = (self.session, self.loop)
+        self.session = None
+        self.loop = None
+        if session is None or session.closed:
+            return
+        if loop is asyncio.get_running_loop():
+            await session.close()
+        elif not loop.is_closed():
+            try:
+                # Closed when its loop next runs
+                asyncio.run_coroutine_threadsafe(session.close(), loop)
+            except RuntimeError:
+                # The loop closed meanwhile
+                pass
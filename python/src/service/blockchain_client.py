@@ -0,0 +1,94 @@
+import asyncio
+import json
+from typing import Any, Tuple
+
+import aiohttp
+from tx_engine.interface import woc
+from tx_engine.interface.woc_interface import WoCInterface
+
+from service.async_http import AsyncHttpSession
+from service.blockchain_scheduler import ScheduledInterface, THROTTLED_STATUS_CODE
+from service.broadcast_queue import BroadcastResult, broadcast_tx, classify_broadcast_response
+from service.metrics import metrics
+from service.util import get_raw_transaction_uncached, hexstr_to_txid
+
+
+class AsyncBlockchainClient:
+    """ Async get_raw_transaction and broadcast_tx for the configured BSV blockchain interface.
+        WhatsOnChain is called directly with aiohttp, other interfaces are called on a worker thread.
+        A ScheduledInterface's rate limit also applies to the WhatsOnChain calls made here.
+    """
+    def __init__(self):
+        self.blockchain_interface: Any = None
+        # Set for the WhatsOnChain interface
+        self.woc_url: None | str = None
+        self.scheduler: None | ScheduledInterface = None
+        self.timeout = aiohttp.ClientTimeout(sock_connect=3.0, sock_read=30.0)
+        self.http = AsyncHttpSession()
+
+    def set_interface(self, blockchain_interface: Any):
+        self.blockchain_interface = blockchain_interface
+        if isinstance(blockchain_interface, ScheduledInterface):
+            self.scheduler = blockchain_interface
+            # The connection pool is the bulkhead for these calls
+            self.http.pool_size = blockchain_interface.max_concurrent
+            blockchain_interface = blockchain_interface.interface
+        else:
+            self.scheduler = None
+        if isinstance(blockchain_interface, WoCInterface):
+            self.woc_url = woc.get_url(blockchain_interface.is_testnet())
+        else:
+            self.woc_url = None
+
+    async def _woc_request(self, method: str, path: str, **kwargs) -> Tuple[int, str]:
+        """ Make the WhatsOnChain request, returns the status and text of the response
+        """
+        session = await self.http.get()
+        attempts = 1 if self.scheduler is None else self.scheduler.max_throttled_retries + 1
+        for _ in range(attempts):
+            if self.scheduler is not None:
+                await self.scheduler.limiter.async_acquire()
+            async with session.request(method, f"{self.woc_url}{path}", timeout=self.timeout, **kwargs) as response:
+                (status, text) = (response.status, await response.text())
+                if status != THROTTLED_STATUS_CODE or self.scheduler is None:
+                    break
+                self.scheduler.throttled(response.headers.get("Retry-After"))
+        return (status, text)
+
+    async def get_raw_transaction(self, txid: str) -> None | str:
+        """ Return the tx as a hex string, or None if it is not found
+        """
+        with metrics.timer("blockchain.get_raw_transaction"):
+            if self.woc_url is None:
+                try:
+                    return await asyncio.to_thread(get_raw_transaction_uncached, self.blockchain_interface, txid)
+                except KeyError:
+                    # MockInterface does not have the tx
+                    return None
+            try:
+                (status, text) = await self._woc_request("GET", f"/tx/{txid}/hex")
+                return text if status == 200 else None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Unable to get tx {txid}, {e!r}")
+                return None
+
+    async def broadcast_tx(self, tx_as_hexstr: str) -> None | str:
+        """ Broadcast the tx, returns the txid or None unless the broadcast was accepted,
+            a tx that the broadcaster already has is accepted
+        """
+        with metrics.timer("blockchain.broadcast_tx"):
+            if self.woc_url is None:
+                (result, detail) = await asyncio.to_thread(broadcast_tx, self.blockchain_interface, tx_as_hexstr)
+            else:
+                try:
+                    (status, text) = await self._woc_request("POST", "/tx/raw", data=json.dumps({"txhex": tx_as_hexstr}))
+                    (result, detail) = classify_broadcast_response(status, text.strip())
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    (result, detail) = (BroadcastResult.Transient, repr(e))
+            if result != BroadcastResult.Accepted:
+                print(f"Unable to broadcast tx, {result.value} {detail}")
+                return None
+            return hexstr_to_txid(tx_as_hexstr)
+
+    async def close(self):
+        await self.http.close()
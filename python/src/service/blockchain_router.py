@@ -0,0 +1,241 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Tuple
+
+from tx_engine import MockInterface, interface_factory
+
+from config import ConfigType
+from service.broadcast_queue import BroadcastResult, classify_broadcast_result
+from service.metrics import metrics
+from service.spent_watcher import bsv_outpoints_spent
+from service.util import get_raw_transaction_uncached
+
+# Blockchain interface methods that call the backend, other attributes are those of the first backend
+ROUTED_METHODS = (
+    "get_addr_history", "get_utxo", "get_balance", "get_block_count", "get_chain_height", "get_best_block_hash",
+    "get_merkle_proof", "get_transaction", "get_tx_out", "get_block", "get_block_header",
+)
+
+
+class Backend:
+    """ A BSV blockchain interface and its recent latency and errors
+    """
+    def __init__(self, name: str, interface: Any):
+        self.name = name
+        self.interface = interface
+        # Smoothed latency of successful calls in seconds, None until the first
+        self.latency: None | float = None
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        # Not routed to until this time, after consecutive errors
+        self.unhealthy_until: float = 0.0
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency,
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": self.errors / self.calls if self.calls > 0 else None,
+            "healthy": self.is_healthy(time.monotonic()),
+        }
+
+
+class BlockchainRouter:
+    """ Routes each BSV blockchain interface call to the fastest healthy backend,
+        failing over to the next fastest when a backend errors. A backend with
+        max_errors consecutive errors is not used for retry_after seconds.
+        Broadcasts are optionally hedged, sent to every healthy backend at once.
+    """
+    def __init__(self):
+        self.backends: List[Backend] = []
+        self.hedge_broadcasts: bool = False
+        self.max_errors: int = 3
+        # Seconds before an unhealthy backend is tried again
+        self.retry_after: float = 30.0
+        # Weight of the latest call in the smoothed latency
+        self.latency_smoothing: float = 0.3
+        self.lock = threading.Lock()
+        self.executor: None | ThreadPoolExecutor = None
+
+    def set_config(self, config: ConfigType):
+        """ Create a backend for each [[blockchain.backend]], these have the same
+            settings as [blockchain] and default to its network_type
+        """
+        blockchain_config = config["blockchain"]
+        self.hedge_broadcasts = blockchain_config.get("hedge_broadcasts", self.hedge_broadcasts)
+        self.max_errors = blockchain_config.get("max_errors", self.max_errors)
+        self.retry_after = blockchain_config.get("retry_after", self.retry_after)
+        self.latency_smoothing = blockchain_config.get("latency_smoothing", self.latency_smoothing)
+        for (i, backend_config) in enumerate(blockchain_config.get("backend", [])):
+            backend_config = {"network_type": blockchain_config["network_type"], **backend_config}
+            name = backend_config.get("name", f"{backend_config['interface_type']}_{i}")
+            self.add_backend(name, interface_factory.set_config(backend_config))
+
+    def add_backend(self, name: str, interface: Any):
+        if any(backend.name == name for backend in self.backends):
+            raise ValueError(f"Duplicate blockchain backend name '{name}'")
+        self.backends.append(Backend(name, interface))
+
+    def shutdown(self):
+        """ Wait for the hedged broadcasts in progress and stop their threads,
+            the pool is started again by the next hedged broadcast
+        """
+        with self.lock:
+            (executor, self.executor) = (self.executor, None)
+        if executor is not None:
+            executor.shutdown()
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {backend.name: backend.get_status() for backend in self.backends}
+
+    def _ordered(self) -> List[Backend]:
+        """ Healthy backends, fastest first and untried before those, then the unhealthy ones
+        """
+        now = time.monotonic()
+        with self.lock:
+            healthy = [b for b in self.backends if b.is_healthy(now)]
+            unhealthy = [b for b in self.backends if not b.is_healthy(now)]
+        healthy.sort(key=lambda b: -1.0 if b.latency is None else b.latency)
+        unhealthy.sort(key=lambda b: b.unhealthy_until)
+        return healthy + unhealthy
+
+    def _record(self, backend: Backend, method: str, seconds: float, error: bool):
+        metrics.observe(f"blockchain_router.{backend.name}.{method}", seconds)
+        with self.lock:
+            backend.calls += 1
+            if error:
+                metrics.increment(f"blockchain_router.{backend.name}.errors")
+                backend.errors += 1
+                backend.consecutive_errors += 1
+                if backend.consecutive_errors >= self.max_errors:
+                    backend.unhealthy_until = time.monotonic() + self.retry_after
+            else:
+                backend.consecutive_errors = 0
+                backend.unhealthy_until = 0.0
+                if backend.latency is None:
+                    backend.latency = seconds
+                else:
+                    backend.latency += self.latency_smoothing * (seconds - backend.latency)
+
+    def _call(self, backend: Backend, method: str, call: Callable[[Any], Any]) -> Tuple[bool, Any]:
+        """ Call the backend, returns (True, result) or (False, exception)
+        """
+        start = time.perf_counter()
+        try:
+            result = call(backend.interface)
+        except KeyError as e:
+            if isinstance(backend.interface, MockInterface):
+                # MockInterface does not have the tx
+                self._record(backend, method, time.perf_counter() - start, error=False)
+                return (True, None)
+            self._record(backend, method, time.perf_counter() - start, error=True)
+            print(f"Blockchain backend {backend.name} {method} failed, {e!r}")
+            return (False, e)
+        except Exception as e:
+            self._record(backend, method, time.perf_counter() - start, error=True)
+            print(f"Blockchain backend {backend.name} {method} failed, {e!r}")
+            return (False, e)
+        self._record(backend, method, time.perf_counter() - start, error=False)
+        return (True, result)
+
+    def _route(self, method: str, call: Callable[[Any], Any], found: Callable[[Any], bool] = lambda _: True) -> Any:
+        """ Call each backend in turn until one succeeds with a result that is found,
+            raises the last exception if every backend failed
+        """
+        error: None | Exception = None
+        succeeded = False
+        result = None
+        for (i, backend) in enumerate(self._ordered()):
+            if i > 0:
+                metrics.increment("blockchain_router.failovers")
+            (ok, value) = self._call(backend, method, call)
+            if not ok:
+                error = value
+                continue
+            (succeeded, result) = (True, value)
+            if found(result):
+                break
+        if not succeeded and error is not None:
+            raise error
+        return result
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") or name == "backends":
+            raise AttributeError(name)
+        if name in ROUTED_METHODS:
+            return lambda *args, **kwargs: self._route(name, lambda interface: getattr(interface, name)(*args, **kwargs))
+        if len(self.backends) == 0:
+            raise AttributeError(name)
+        return getattr(self.backends[0].interface, name)
+
+    def get_raw_transaction(self, txid: str) -> None | str:
+        """ Return the tx as a hex string, asking the next backend if one has not seen it
+        """
+        return self._route(
+            "get_raw_transaction", lambda interface: get_raw_transaction_uncached(interface, txid),
+            found=lambda result: result is not None)
+
+    def get_spent_outpoints(self, outpoints: List[str]) -> Dict[str, None | bool]:
+        """ Return whether each txid:index outpoint has been spent, from the first backend that can check them all
+        """
+        return self._route(
+            "get_spent_outpoints", lambda interface: bsv_outpoints_spent(interface, outpoints),
+            found=lambda result: None not in result.values())
+
+    def _broadcast(self, backend: Backend, tx_as_hexstr: str) -> Tuple[BroadcastResult, Any]:
+        start = time.perf_counter()
+        try:
+            result = backend.interface.broadcast_tx(tx_as_hexstr)
+        except Exception as e:
+            self._record(backend, "broadcast_tx", time.perf_counter() - start, error=True)
+            print(f"Blockchain backend {backend.name} broadcast_tx failed, {e!r}")
+            return (BroadcastResult.Transient, None)
+        (classification, _) = classify_broadcast_result(result)
+        # A rejected tx is not an error of the backend
+        self._record(backend, "broadcast_tx", time.perf_counter() - start, error=classification == BroadcastResult.Transient)
+        return (classification, result)
+
+    def broadcast_tx(self, tx_as_hexstr: str) -> Any:
+        """ Broadcast the tx, failing over while the result is transient.
+            Returns the result of the backend that accepted or rejected the tx.
+        """
+        if self.hedge_broadcasts:
+            return self._hedged_broadcast(tx_as_hexstr)
+        result = None
+        for (i, backend) in enumerate(self._ordered()):
+            if i > 0:
+                metrics.increment("blockchain_router.failovers")
+            (classification, result) = self._broadcast(backend, tx_as_hexstr)
+            if classification != BroadcastResult.Transient:
+                break
+        return result
+
+    def _hedged_broadcast(self, tx_as_hexstr: str) -> Any:
+        """ Broadcast to every healthy backend at once, returning the first accepted result.
+            The other broadcasts complete in the background.
+        """
+        now = time.monotonic()
+        backends = [b for b in self._ordered() if b.is_healthy(now)] or self._ordered()
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(thread_name_prefix="hedged_broadcast")
+            executor = self.executor
+        metrics.increment("blockchain_router.hedged")
+        pending = {executor.submit(self._broadcast, backend, tx_as_hexstr) for backend in backends}
+        results: List[Tuple[BroadcastResult, Any]] = []
+        while pending:
+            (done, pending) = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                (classification, result) = future.result()
+                if classification == BroadcastResult.Accepted:
+                    return result
+                results.append((classification, result))
+        # Prefer a rejection, which explains why, to a transient failure
+        results.sort(key=lambda r: r[0] != BroadcastResult.Rejected)
+        return results[0][1] if results else None
@@ -0,0 +1,220 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+import requests
+from tx_engine.interface import woc
+from tx_engine.interface.woc_interface import WoCInterface
+
+from config import ConfigType
+from service.metrics import metrics
+from service.spent_watcher import bsv_outpoints_spent, woc_outpoints_spent
+from service.util import get_raw_transaction_uncached
+
+# Blockchain interface methods that call the backend, other attributes are passed through
+SCHEDULED_METHODS = (
+    "get_addr_history", "get_utxo", "get_balance", "get_block_count", "get_chain_height", "get_best_block_hash",
+    "get_merkle_proof", "get_transaction", "get_tx_out", "get_block", "get_block_header",
+)
+THROTTLED_STATUS_CODE = 429
+
+
+class TokenBucket:
+    """ Token bucket rate limiter, shared by threads and event loops.
+        A caller reserves a token and waits for the returned delay, so tokens can be
+        reserved ahead of time and callers are served in the order they reserve.
+    """
+    def __init__(self, rate: float, burst: int):
+        # Tokens per second, 0 for no limit
+        self.rate = rate
+        self.burst = burst
+        self.lock = threading.Lock()
+        self.tokens: float = burst
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """ Take a token, returns the number of seconds to wait before using it
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            if now > self.updated:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+            self.tokens -= 1
+            # updated is in the future while paused
+            delay = max(0.0, self.updated - now)
+            if self.tokens < 0:
+                delay += -self.tokens / self.rate
+            return delay
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def async_acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float):
+        """ Stop handing out tokens for this long, when the backend reports that we are throttled
+        """
+        if self.rate <= 0:
+            return
+        with self.lock:
+            self.updated = max(self.updated, time.monotonic() + seconds)
+            self.tokens = min(self.tokens, 1)
+
+
+class ScheduledInterface:
+    """ Wraps the BSV blockchain interface so that calls to the backend are rate limited
+        by a token bucket, at most max_concurrent are in progress at once, and identical
+        get_raw_transaction calls that are in progress are made once. Throttled calls are
+        retried after the backend's Retry-After. WhatsOnChain is called directly, so that
+        throttling is distinguished from not found and the bulk tx endpoint can be used.
+    """
+    def __init__(self, blockchain_interface: Any):
+        self.interface = blockchain_interface
+        # Requests per second, WhatsOnChain allows 3 without an API key
+        self.rate: float = 3.0
+        self.burst: int = 3
+        self.max_concurrent: int = 4
+        # txids in each request to the bulk endpoint
+        self.bulk_size: int = 20
+        self.max_throttled_retries: int = 3
+        # Seconds to pause when throttled without a Retry-After
+        self.throttled_delay: float = 1.0
+        self.timeout = (3.0, 30.0)
+
+        self.limiter = TokenBucket(self.rate, self.burst)
+        self.bulkhead = threading.BoundedSemaphore(self.max_concurrent)
+        self.lock = threading.Lock()
+        # txid -> result of the get_raw_transaction in progress
+        self.in_flight: Dict[str, Future] = {}
+        self.session = requests.Session()
+        self.woc_url: None | str = None
+        if isinstance(blockchain_interface, WoCInterface):
+            self.woc_url = woc.get_url(blockchain_interface.is_testnet())
+
+    def set_config(self, config: ConfigType):
+        scheduler_config = config.get("blockchain_scheduler", {})
+        self.rate = scheduler_config.get("rate", self.rate)
+        self.burst = scheduler_config.get("burst", self.burst)
+        self.max_concurrent = scheduler_config.get("max_concurrent", self.max_concurrent)
+        self.bulk_size = scheduler_config.get("bulk_size", self.bulk_size)
+        self.max_throttled_retries = scheduler_config.get("max_throttled_retries", self.max_throttled_retries)
+        self.throttled_delay = scheduler_config.get("throttled_delay", self.throttled_delay)
+        self.limiter = TokenBucket(self.rate, self.burst)
+        self.bulkhead = threading.BoundedSemaphore(self.max_concurrent)
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.interface, name)
+        if name in SCHEDULED_METHODS:
+            return lambda *args, **kwargs: self._schedule(attribute, *args, **kwargs)
+        return attribute
+
+    def throttled(self, retry_after: None | str):
+        """ Pause the rate limiter after the backend returned Too Many Requests
+        """
+        metrics.increment("blockchain_scheduler.throttled")
+        try:
+            delay = float(retry_after) if retry_after is not None else self.throttled_delay
+        except ValueError:
+            delay = self.throttled_delay
+        self.limiter.pause(delay)
+
+    def _schedule(self, method: Callable[..., Any], *args, **kwargs) -> Any:
+        """ Call the method when there is a free slot and a token, retrying if throttled
+        """
+        start = time.perf_counter()
+        with self.bulkhead:
+            for attempt in range(self.max_throttled_retries + 1):
+                self.limiter.acquire()
+                if attempt == 0:
+                    metrics.observe("blockchain_scheduler.wait", time.perf_counter() - start)
+                result = method(*args, **kwargs)
+                if getattr(result, "status_code", None) != THROTTLED_STATUS_CODE:
+                    break
+                self.throttled(result.headers.get("Retry-After"))
+        return result
+
+    def _get_raw_transaction(self, txid: str) -> None | str:
+        if self.woc_url is None:
+            return self._schedule(get_raw_transaction_uncached, self.interface, txid)
+        try:
+            response = self._schedule(self.session.get, f"{self.woc_url}/tx/{txid}/hex", timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"Unable to get tx {txid}, {e!r}")
+            return None
+        return response.text if response.status_code == 200 else None
+
+    def get_raw_transaction(self, txid: str) -> None | str:
+        """ Return the tx as a hex string. The result is not cached, so a tx that
+            is not found yet is looked up again on the next call.
+        """
+        with self.lock:
+            future = self.in_flight.get(txid)
+            leader = future is None
+            if future is None:
+                future = self.in_flight[txid] = Future()
+        if not leader:
+            metrics.increment("blockchain_scheduler.coalesced")
+            return future.result()
+        try:
+            result = self._get_raw_transaction(txid)
+            future.set_result(result)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[txid]
+        return result
+
+    def get_raw_transactions(self, txids: List[str]) -> Dict[str, None | str]:
+        """ Return the txs as hex strings by txid, None for those that are not found.
+            WhatsOnChain is asked for bulk_size txs in each request.
+        """
+        unique_txids = list(dict.fromkeys(txids))
+        if self.woc_url is None:
+            results: Dict[str, None | str] = {}
+            for txid in unique_txids:
+                try:
+                    results[txid] = self.get_raw_transaction(txid)
+                except KeyError:
+                    # MockInterface does not have the tx
+                    results[txid] = None
+            return results
+
+        results = dict.fromkeys(unique_txids)
+        for i in range(0, len(unique_txids), self.bulk_size):
+            chunk = unique_txids[i:i + self.bulk_size]
+            try:
+                response = self._schedule(self.session.post, f"{self.woc_url}/txs/hex", json={"txids": chunk}, timeout=self.timeout)
+            except requests.RequestException as e:
+                print(f"Unable to get txs, {e!r}")
+                continue
+            if response.status_code != 200:
+                print(f"Unable to get txs, {response.status_code} {response.text}")
+                continue
+            for item in response.json():
+                if item.get("txid") in results and item.get("hex"):
+                    results[item["txid"]] = item["hex"]
+        return results
+
+    def get_spent_outpoints(self, outpoints: List[str]) -> Dict[str, None | bool]:
+        """ Return whether each txid:index outpoint has been spent, None for those that could not be checked.
+            WhatsOnChain is asked about bulk_size outpoints in each request.
+        """
+        if self.woc_url is None:
+            return {outpoint: self._schedule(bsv_outpoints_spent, self.interface, [outpoint])[outpoint] for outpoint in outpoints}
+
+        return woc_outpoints_spent(lambda *args, **kwargs: self._schedule(self.session.post, *args, **kwargs), self.woc_url, outpoints, self.bulk_size, self.timeout)
+
+    def broadcast_tx(self, tx_as_hexstr: str) -> Any:
+        return self._schedule(self.interface.broadcast_tx, tx_as_hexstr)
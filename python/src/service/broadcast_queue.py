@@ -0,0 +1,255 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Callable, Dict, List, Tuple
+
+from config import ConfigType
+from service.metrics import metrics
+
+
+class BroadcastResult(str, Enum):
+    Accepted = "Accepted"
+    # Worth retrying, the broadcaster or the tx's inputs may not be available yet
+    Transient = "Transient"
+    Rejected = "Rejected"
+
+    def __repr__(self):
+        return self.value
+
+
+# Lower case fragments of broadcaster responses
+ALREADY_KNOWN = ("already in the mempool", "already known", "txn-already-known", "txn-already-in-mempool", "already in block chain")
+TRANSIENT_ERRORS = ("missing inputs", "too many requests", "timeout", "timed out", "service unavailable", "bad gateway", "mempool full")
+TRANSIENT_STATUS_CODES = (408, 425, 429, 500, 502, 503, 504)
+
+
+def classify_broadcast_result(result: Any) -> Tuple[BroadcastResult, str]:
+    """ Classify the result of a blockchain interface broadcast_tx, which is the txid for
+        the mock interface or the HTTP response for WhatsOnChain, returns the result and detail
+    """
+    if result is None:
+        return (BroadcastResult.Transient, "no response")
+    status_code = getattr(result, "status_code", None)
+    detail = str(getattr(result, "text", result)).strip()
+    if status_code is None and isinstance(result, str) and len(result) == 64 and all(c in "0123456789abcdef" for c in result):
+        # The txid
+        return (BroadcastResult.Accepted, detail)
+    return classify_broadcast_response(status_code, detail)
+
+
+def classify_broadcast_response(status_code: None | int, detail: str) -> Tuple[BroadcastResult, str]:
+    """ Classify the HTTP status and text of a broadcaster's response
+    """
+    if status_code == 200:
+        return (BroadcastResult.Accepted, detail)
+    lower_detail = detail.lower()
+    if any(fragment in lower_detail for fragment in ALREADY_KNOWN):
+        return (BroadcastResult.Accepted, detail)
+    if status_code in TRANSIENT_STATUS_CODES or any(fragment in lower_detail for fragment in TRANSIENT_ERRORS):
+        return (BroadcastResult.Transient, detail)
+    return (BroadcastResult.Rejected, detail)
+
+
+def broadcast_tx(blockchain_interface: Any, tx_as_hexstr: str) -> Tuple[BroadcastResult, str]:
+    """ Broadcast the tx and classify the result, failures to connect are transient
+    """
+    try:
+        result = blockchain_interface.broadcast_tx(tx_as_hexstr)
+    except Exception as e:
+        return (BroadcastResult.Transient, repr(e))
+    return classify_broadcast_result(result)
+
+
+# Called with the txid, result and detail when the broadcast is accepted or fails
+BroadcastCallback = Callable[[str, BroadcastResult, str], None]
+
+
+class BroadcastJob:
+    def __init__(self, txid: str, tx_as_hexstr: str, callback: None | BroadcastCallback):
+        self.txid = txid
+        self.tx_as_hexstr = tx_as_hexstr
+        self.callbacks: List[BroadcastCallback] = [] if callback is None else [callback]
+        self.attempts = 0
+        self.submitted = time.perf_counter()
+        self.queued = self.submitted
+
+
+class BroadcastQueue:
+    """ Broadcasts BSV txs from a bounded queue on worker threads.
+        Transient failures are retried with exponential backoff, and a tx that is
+        already queued is broadcast once. Each job's callbacks are called when the
+        broadcast is accepted, rejected or runs out of attempts.
+    """
+    def __init__(self):
+        self.enabled: bool = False
+        self.workers: int = 4
+        self.max_size: int = 1000
+        self.max_attempts: int = 5
+        # Seconds before the first retry, doubling for each retry
+        self.retry_delay: float = 0.5
+        self.max_retry_delay: float = 30.0
+        self.blockchain_interface: Any = None
+
+        self.queue: queue.Queue[None | BroadcastJob] = queue.Queue(self.max_size)
+        self.lock = threading.Condition()
+        # txid -> job, from submit until the callbacks are called
+        self.pending: Dict[str, BroadcastJob] = {}
+        # Recently accepted txids, so that a resubmitted tx is not broadcast again
+        self.accepted: OrderedDict[str, None] = OrderedDict()
+        self.max_accepted: int = 10000
+        # (due time, sequence, job) of the jobs waiting to be retried
+        self.retries: List[Tuple[float, int, BroadcastJob]] = []
+        self.sequence = itertools.count()
+        self.threads: List[threading.Thread] = []
+        self.stopped = threading.Event()
+
+    def set_config(self, config: ConfigType):
+        queue_config = config.get("broadcast_queue", {})
+        self.enabled = queue_config.get("enabled", False)
+        self.workers = queue_config.get("workers", self.workers)
+        self.max_size = queue_config.get("max_size", self.max_size)
+        self.max_attempts = queue_config.get("max_attempts", self.max_attempts)
+        self.retry_delay = queue_config.get("retry_delay", self.retry_delay)
+        self.max_retry_delay = queue_config.get("max_retry_delay", self.max_retry_delay)
+        self.queue = queue.Queue(self.max_size)
+
+    def set_blockchain_interface(self, blockchain_interface: Any):
+        self.blockchain_interface = blockchain_interface
+
+    def start(self):
+        if len(self.threads) == 0:
+            self.stopped.clear()
+            self.threads = [threading.Thread(target=self._run, name=f"broadcast_{i}", daemon=True) for i in range(self.workers)]
+            self.threads.append(threading.Thread(target=self._run_retries, name="broadcast_retries", daemon=True))
+            for thread in self.threads:
+                thread.start()
+
+    def stop(self):
+        """ Stop the threads, queued broadcasts that have not started are left pending
+        """
+        self.stopped.set()
+        with self.lock:
+            self.lock.notify_all()
+        for _ in range(self.workers):
+            try:
+                self.queue.put_nowait(None)
+            except queue.Full:
+                break
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def depth(self) -> int:
+        with self.lock:
+            return len(self.pending)
+
+    def submit(self, txid: str, tx_as_hexstr: str, callback: None | BroadcastCallback = None) -> bool:
+        """ Queue the tx for broadcast, returns False if the queue is full
+        """
+        with self.lock:
+            if txid in self.accepted:
+                already_accepted = True
+            elif txid in self.pending:
+                metrics.increment("broadcast_duplicates")
+                if callback is not None:
+                    self.pending[txid].callbacks.append(callback)
+                return True
+            else:
+                already_accepted = False
+                job = BroadcastJob(txid, tx_as_hexstr, callback)
+                try:
+                    self.queue.put_nowait(job)
+                except queue.Full:
+                    metrics.increment("broadcast_queue_full")
+                    return False
+                self.pending[txid] = job
+                metrics.set_gauge("broadcast_queue_depth", len(self.pending))
+        if already_accepted:
+            metrics.increment("broadcast_duplicates")
+            if callback is not None:
+                callback(txid, BroadcastResult.Accepted, "already accepted")
+        return True
+
+    def wait(self, timeout: None | float = None) -> bool:
+        """ Wait until there are no pending broadcasts, returns False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            while len(self.pending) > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.lock.wait(remaining)
+        return True
+
+    def process(self, job: BroadcastJob):
+        """ Make one broadcast attempt for the job
+        """
+        metrics.observe("broadcast_queue_wait", time.perf_counter() - job.queued)
+        job.attempts += 1
+        with metrics.timer("broadcast_tx"):
+            (result, detail) = broadcast_tx(self.blockchain_interface, job.tx_as_hexstr)
+        if result == BroadcastResult.Transient and job.attempts < self.max_attempts:
+            metrics.increment("broadcast_retries")
+            delay = min(self.retry_delay * 2 ** (job.attempts - 1), self.max_retry_delay)
+            with self.lock:
+                heapq.heappush(self.retries, (time.monotonic() + delay, next(self.sequence), job))
+                self.lock.notify_all()
+            return
+        self._finish(job, result, detail)
+
+    def _finish(self, job: BroadcastJob, result: BroadcastResult, detail: str):
+        metrics.increment(f"broadcast_{result.value.lower()}")
+        if result == BroadcastResult.Accepted:
+            metrics.observe("broadcast_latency", time.perf_counter() - job.submitted)
+        else:
+            print(f"Broadcast of {job.txid} failed after {job.attempts} attempts, {result.value} {detail}")
+        for callback in job.callbacks:
+            try:
+                callback(job.txid, result, detail)
+            except Exception as e:
+                print(f"Broadcast callback for {job.txid} failed, {e!r}")
+        with self.lock:
+            del self.pending[job.txid]
+            if result == BroadcastResult.Accepted:
+                self.accepted[job.txid] = None
+                if len(self.accepted) > self.max_accepted:
+                    self.accepted.popitem(last=False)
+            metrics.set_gauge("broadcast_queue_depth", len(self.pending))
+            self.lock.notify_all()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            job = self.queue.get()
+            if job is None:
+                break
+            try:
+                self.process(job)
+            except Exception as e:
+                print(f"Broadcast of {job.txid} failed, {e!r}")
+                self._finish(job, BroadcastResult.Rejected, repr(e))
+
+    def _run_retries(self):
+        """ Return jobs to the queue when their retry is due
+        """
+        with self.lock:
+            while not self.stopped.is_set():
+                if len(self.retries) == 0:
+                    self.lock.wait()
+                    continue
+                (due, _, job) = self.retries[0]
+                now = time.monotonic()
+                if due > now:
+                    self.lock.wait(due - now)
+                    continue
+                heapq.heappop(self.retries)
+                job.queued = time.perf_counter()
+                try:
+                    self.queue.put_nowait(job)
+                except queue.Full:
+                    # Try again once the workers have made some room
+                    heapq.heappush(self.retries, (now + self.retry_delay, next(self.sequence), job))
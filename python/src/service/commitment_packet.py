@@ -1,11 +1,15 @@
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, PrivateAttr, validator
 from enum import Enum
 import hashlib
 
 
-from typing import NewType, Tuple
+from typing import Any, List, NewType, Tuple
 Cpid = NewType("Cpid", str)
 
+# Fields that contribute to the CPID or the packet digest, changing any of these
+# invalidates the cached values
+HASHED_FIELDS = frozenset(['asset_id', 'data', 'previous_packet', 'signature_scheme', 'public_key', 'blockchain_outpoint', 'blockchain_id'])
+
 
 class CommitmentPacket(BaseModel):
     """ Store information about Commitment Packet
@@ -22,10 +26,48 @@ class CommitmentPacket(BaseModel):
     blockchain_outpoint: None | str
     blockchain_id: str
 
+    # Cached results of get_cpid() and packet_digest()
+    _cpid: None | Cpid = PrivateAttr(default=None)
+    _digest: None | bytes = PrivateAttr(default=None)
+
     @validator('previous_packet', 'signature', 'signature_scheme', 'public_key', 'blockchain_outpoint', pre=True)
     def replace_null_with_none(cls, v):
         return v if isinstance(v, str) else None
 
+    def __setattr__(self, name: str, value: Any):
+        if name in HASHED_FIELDS:
+            self._cpid = None
+            self._digest = None
+        super().__setattr__(name, value)
+
+    def __eq__(self, other: Any) -> bool:
+        # Compare the fields only, the cached hashes are derived from them
+        if isinstance(other, CommitmentPacket):
+            return self.__dict__ == other.__dict__
+        return NotImplemented
+
+    def _compute_hashes(self):
+        """ Encode each hashed field once and build both the digest and (where the
+            signature scheme is set) the CPID from the encoded fields
+        """
+        assert self.public_key is not None
+        assert self.blockchain_outpoint is not None
+        assert self.blockchain_id is not None
+
+        asset_id = bytes(self.asset_id, 'utf-8')
+        data = bytes(self.data, 'utf-8') if self.data is not None else bytes()
+        previous_packet = bytes(self.previous_packet, 'utf-8') if self.previous_packet is not None else bytes()
+        public_key = bytes(self.public_key, 'utf-8')
+        blockchain_outpoint = bytes(self.blockchain_outpoint, 'utf-8')
+        blockchain_id = bytes(self.blockchain_id, 'utf-8')
+
+        self._digest = asset_id + data + previous_packet + public_key + blockchain_outpoint + blockchain_id
+        if self.signature_scheme is not None:
+            # self.signature - Note signature is not part of the ID
+            signature_scheme = bytes(self.signature_scheme, 'utf-8')
+            input = asset_id + data + blockchain_id + signature_scheme + public_key + previous_packet + blockchain_outpoint
+            self._cpid = Cpid(hashlib.sha256(input).digest().hex())
+
     def is_match(self, asset_id: str, asset_data: str, network: str) -> bool:
         """ Quick check to see if two packets match
         """
@@ -35,35 +77,24 @@ class CommitmentPacket(BaseModel):
         """ Calculate the Commitment Packet hash to create CPID
             including previous_packet (where avalible)
             excluding the signature
+            The result is cached until one of the hashed fields changes
         """
         assert self.signature_scheme is not None
         assert self.public_key is not None
         assert self.blockchain_outpoint is not None
-        # self.signature - Note signature is not part of the ID
-        if self.previous_packet is not None:
-            input = bytes(self.asset_id + self.data + self.blockchain_id + self.signature_scheme + self.public_key + self.previous_packet + self.blockchain_outpoint, 'utf-8')
-        else:
-            input = bytes(self.asset_id + self.data + self.blockchain_id + self.signature_scheme + self.public_key + self.blockchain_outpoint, 'utf-8')
-        return Cpid(hashlib.sha256(input).digest().hex())
+        if self._cpid is None:
+            self._compute_hashes()
+        assert self._cpid is not None
+        return self._cpid
 
     def packet_digest(self) -> bytes:
         """ Return data to hash for signing
+            The result is cached until one of the hashed fields changes
         """
-        cp_digest: bytes = bytes()
-        cp_digest = bytes(self.asset_id, 'utf-8')
-        if self.data is not None:
-            cp_digest += bytes(self.data, 'utf-8')
-        if self.previous_packet is not None:
-            cp_digest += bytes(self.previous_packet, 'utf-8')
-
-        assert self.public_key is not None
-        assert self.blockchain_outpoint is not None
-        assert self.blockchain_id is not None
-
-        cp_digest += bytes(self.public_key, 'utf-8')
-        cp_digest += bytes(self.blockchain_outpoint, 'utf-8')
-        cp_digest += bytes(self.blockchain_id, 'utf-8')
-        return cp_digest
+        if self._digest is None:
+            self._compute_hashes()
+        assert self._digest is not None
+        return self._digest
 
     def get_blockchain_txid(self) -> None | str:
         """ Return the ownership txid
@@ -95,6 +126,8 @@ class CommitmentPacket(BaseModel):
 class CommitmentStatus (str, Enum):
     Created = "Created"
     Transferred = "Transferred"
+    # Transfer completed, waiting for the broadcast of the spending tx to be accepted
+    Transferring = "Transferring"
 
     def __repr__(self):
         return self.value
@@ -108,6 +141,17 @@ class CommitmentType (str, Enum):
         return self.value
 
 
+class AnchorProof(BaseModel):
+    """ Proof that the cpid is a leaf of the Merkle root anchored by an issuance batch
+    """
+    # The tx with an OP_RETURN of the root
+    txid: str
+    root: str
+    # Position of the cpid in the batch, and the sibling hashes from the cpid to the root
+    index: int
+    path: List[str]
+
+
 class CommitmentPacketMetadata(BaseModel):
     """ Store commitment packet metadata
     """
@@ -118,6 +162,8 @@ class CommitmentPacketMetadata(BaseModel):
     spending_tx: None | str
     commitment_packet_id: None | Cpid
     commitment_packet: CommitmentPacket
+    # Set for an issuance anchored in a batch
+    anchor: None | AnchorProof = None
 
     @validator('ownership_tx', 'spending_tx', 'commitment_packet_id', pre=True)
     def replace_null_with_none(cls, v):
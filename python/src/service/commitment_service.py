@@ -1,9 +1,15 @@
+import asyncio
+import functools
 import pprint
 import hashlib
+import math
+import multiprocessing
+import os
 import sys
 import ecdsa
 
-from typing import NewType, Tuple, Any, Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import NewType, Tuple, Any, Dict, List, Optional, Set
 pp = pprint.PrettyPrinter()
 from config import ConfigType
 
@@ -11,11 +17,22 @@ from tx_engine import interface_factory
 from tx_engine import Tx, TxIn, TxOut, Script
 
 
-from service.commitment_packet import CommitmentPacket, CommitmentPacketMetadata, CommitmentStatus, Cpid, CommitmentType
-from service.financing_service import FinancingService, FinancingServiceException
+from service.commitment_packet import AnchorProof, CommitmentPacket, CommitmentPacketMetadata, CommitmentStatus, Cpid, CommitmentType
+from service.financing_service import FinancingService, FinancingServiceException, AsyncFinancingService
+from service.blockchain_client import AsyncBlockchainClient
 from service.wallet import Wallet
-from service.token_wallet import TokenWallet, verify_signature
+from service.token_wallet import TokenWallet, VerificationCache, VerificationKey, verify_signature, get_verifying_key_cache_status, set_signature_backend, get_signature_backend, DEFAULT_SIGNATURE_BACKEND
 from service.commitment_store import CommitmentStore
+from service.store_verifier import SignatureJob, packet_signer, run_signature_jobs
+from service.utxo_pool import UtxoPool, UTXO_VALUE
+from service.status_monitor import StatusMonitor
+from service.broadcast_queue import BroadcastQueue, BroadcastResult, broadcast_tx
+from service.tx_cache import TxCache
+from service.blockchain_scheduler import ScheduledInterface
+from service.blockchain_router import BlockchainRouter
+from service.spent_watcher import SpentWatcher, Outpoint
+from service.merkle import merkle_root, merkle_proofs, verify_merkle_proof
+from service.issuance_batcher import IssuanceBatcher, IssuanceRequest
 from service.util import hexstr_to_tx, tx_to_hexstr, hexstr_to_txin, hexstr_to_txid
 from ethereum.ethereum_wallet import EthereumWallet
 from ethereum.ethereum_service import EthereumService
@@ -24,18 +41,54 @@ from service.token_description import token_store
 Txid = NewType("Txid", str)
 
 
-# <TODO> how / where do we call the ethereum txSpentStatus function?
 class CommitmentService:
     """ A  service for creating commitment tokens
     """
     def __init__(self):
         self.finance_service = FinancingService()
+        self.utxo_pool = UtxoPool(self.finance_service)
+        # The configured BSV backend, or the router or scheduler that wraps the backends
+        self.blockchain_interface: Any = None
+        # Async clients, for the async_ methods called by the REST API
+        self.blockchain_client = AsyncBlockchainClient()
+        self.async_finance_service = AsyncFinancingService(self.finance_service, self.blockchain_client)
         self.actors_wallets: Dict[str, Wallet] = {}
         self.actors_token_wallets: Dict[str, TokenWallet] = {}
+        # Token public key to actor, for resolving the owner of a packet
+        self.public_key_actors: Dict[str, str] = {}
         self.actors_eth_wallets: Dict[str, EthereumWallet] = {}
         self.networks: List[str] = []
         self.commitment_store: CommitmentStore = CommitmentStore()
         self.ethereum_service: EthereumService = EthereumService()
+        self.verification_cache: VerificationCache = VerificationCache()
+        # Batch verification, batches with more signatures than verify_chunk_size are spread over a process pool
+        self.verify_workers: int = os.cpu_count() or 1
+        self.verify_chunk_size: int = 256
+        self.verify_executor: None | ProcessPoolExecutor = None
+        # Issuances created together by /commitments/issuance/batch are signed on a thread pool
+        self.sign_workers: int = os.cpu_count() or 1
+        self.sign_executor: None | ThreadPoolExecutor = None
+        # Transfers completed by one BSV tx, with an OP_RETURN of each cpid or of their Merkle root
+        self.batch_max_size: int = 100
+        self.batch_merkle_root: bool = False
+        # BSV transfers completed by one tx that spends the previous outpoint to the new owner, paying this fee rate (satoshis per byte)
+        self.handover_transfers: bool = False
+        self.handover_fee_rate: float = 0.05
+        # Set when more than one BSV backend is configured
+        self.blockchain_router: None | BlockchainRouter = None
+        # Raw txs by txid, so that _get_tx rarely calls the blockchain interface
+        self.tx_cache = TxCache()
+        # Collects BSV issuances into batches anchored by one Merkle root, when enabled
+        self.issuance_batcher = IssuanceBatcher()
+        self.issuance_batcher.set_anchor_function(self._anchor_issuances)
+        # Spent status of the live ownership outpoints, checked in the background when enabled
+        self.spent_watcher = SpentWatcher()
+        # Broadcasts spending txs in the background when enabled
+        self.broadcast_queue = BroadcastQueue()
+        # Dependency status, refreshed in the background for get_status
+        self.status_monitor = StatusMonitor()
+        self.status_monitor.add_check("finance_get_balance", lambda: self.finance_service.get_balance())
+        self.status_monitor.add_check("ethereum_connected", lambda: self.ethereum_service.get_status())
 
     def set_actors(self, config: ConfigType):
         """ Read the actors from the configuration and validate their keys
@@ -69,6 +122,9 @@ class CommitmentService:
                 token_wallet = TokenWallet()
                 token_wallet.set_key(token_key, token_key_curve)
                 self.actors_token_wallets[name] = token_wallet
+                if token_wallet.public_key is not None:
+                    # The first actor configured with a key owns it
+                    self.public_key_actors.setdefault(token_wallet.public_key, name)
 
                 eth_wallet = EthereumWallet(self.ethereum_service.web3, eth_key)
                 self.actors_eth_wallets[name] = eth_wallet
@@ -86,22 +142,73 @@ class CommitmentService:
     def set_config(self, config: ConfigType):
         """ Given the configuration, configure this service
         """
+        # Token signing, the backend is selected once before any wallet or worker pool is created
+        set_signature_backend(config["commitment_service"].get("signature_backend", DEFAULT_SIGNATURE_BACKEND))
 
         # Financing service
         self.finance_service.set_config(config)
 
         # BSV
         self.blockchain_network = config["blockchain"]["network_type"]
-        self.blockchain_interface = interface_factory.set_config(config["blockchain"])
+        if self.blockchain_router is not None:
+            self.blockchain_router.shutdown()
+        if len(config["blockchain"].get("backend", [])) > 0:
+            # Route each call to the fastest healthy backend
+            self.blockchain_router = BlockchainRouter()
+            self.blockchain_router.set_config(config)
+            self.blockchain_interface = self.blockchain_router
+        else:
+            self.blockchain_router = None
+            self.blockchain_interface = interface_factory.set_config(config["blockchain"])
+        if config.get("blockchain_scheduler", {}).get("enabled", False):
+            # Rate limit the calls to the backend
+            self.blockchain_interface = ScheduledInterface(self.blockchain_interface)
+            self.blockchain_interface.set_config(config)
+        self.finance_service.set_blockchain_interface(self.blockchain_interface)
+        self.blockchain_client.set_interface(self.blockchain_interface)
+        self.broadcast_queue.set_config(config)
+        self.broadcast_queue.set_blockchain_interface(self.blockchain_interface)
+        if self.broadcast_queue.enabled:
+            self.broadcast_queue.start()
 
         # Ethereum
         self.ethereum_service.set_config(config)
         self.set_actors(config)
         self.networks = config["commitment_service"]["networks"]
+        self.verify_workers = config["commitment_service"].get("verify_workers", self.verify_workers)
+        self.verify_chunk_size = config["commitment_service"].get("verify_chunk_size", self.verify_chunk_size)
+        self.batch_max_size = config["commitment_service"].get("batch_max_size", self.batch_max_size)
+        self.batch_merkle_root = config["commitment_service"].get("batch_merkle_root", self.batch_merkle_root)
+        self.sign_workers = config["commitment_service"].get("sign_workers", self.sign_workers)
+        self.handover_transfers = config["commitment_service"].get("handover_transfers", self.handover_transfers)
+        self.handover_fee_rate = config["commitment_service"].get("handover_fee_rate", self.handover_fee_rate)
+
+        self.status_monitor.set_config(config)
+
+        # Pre-funded ownership UTXOs for each actor
+        self.utxo_pool.set_config(config)
+        if self.utxo_pool.enabled:
+            for (name, wallet) in self.actors_wallets.items():
+                self.utxo_pool.register(name, wallet.get_locking_script_as_hex())
+            self.utxo_pool.start()
         self.commitment_store.set_config(config)
         self.commitment_store.load()
+        self.spent_watcher.set_config(config)
+        self.spent_watcher.set_blockchain_interface(self.blockchain_interface)
+        self.spent_watcher.set_ethereum_service(self.ethereum_service)
+        self.spent_watcher.set_outpoints_source(self._live_outpoints)
+        if self.spent_watcher.enabled:
+            self.spent_watcher.start()
+        self.issuance_batcher.set_config(config)
+        if self.issuance_batcher.enabled:
+            self.issuance_batcher.start()
+        self.tx_cache.set_config(config)
+        self.tx_cache.add_all(
+            tx for cp_meta in self.commitment_store.commitments if cp_meta.commitment_packet.blockchain_id == "BSV"
+            for tx in (cp_meta.ownership_tx, cp_meta.spending_tx))
 
         token_store.set_config(config)
+        token_store.add_owned_view(self.commitment_store.owned_view)
         token_store.load()
 
     def test_financing_service(self) -> bool:
@@ -115,17 +222,42 @@ class CommitmentService:
         else:
             return True
 
+    async def aclose(self):
+        """ Close the async clients' connections and shut down the worker pools
+        """
+        await self.async_finance_service.close()
+        await self.blockchain_client.close()
+        await asyncio.to_thread(self.shutdown_executors)
+
+    def shutdown_executors(self):
+        """ Shut down the verify, sign and hedged broadcast pools, they are started again when next needed
+        """
+        (verify_executor, self.verify_executor) = (self.verify_executor, None)
+        if verify_executor is not None:
+            verify_executor.shutdown(cancel_futures=True)
+        (sign_executor, self.sign_executor) = (self.sign_executor, None)
+        if sign_executor is not None:
+            sign_executor.shutdown(cancel_futures=True)
+        if self.blockchain_router is not None:
+            self.blockchain_router.shutdown()
+
     def _broadcast_tx(self, tx: Tx) -> None | Txid:
-        """ Given a tx broadcast it and if successful return the Txid
+        """ Given a tx broadcast it and if it is accepted return the Txid
         """
-        print(f'_broadcast_tx -> {tx.serialize().hex()}')
-        result = self.blockchain_interface.broadcast_tx(tx.serialize().hex())
-        if result is None:
+        (result, detail) = broadcast_tx(self.blockchain_interface, tx.serialize().hex())
+        if result != BroadcastResult.Accepted:
+            print(f"Broadcast of {tx.id()} {result.value}, {detail}")
             return None
-        else:
-            # the result error code is not being checked. I'll leave this unhelpful
-            # comment here for now
-            return Txid(tx.id())
+        self.tx_cache.add(tx.serialize().hex())
+        return Txid(tx.id())
+
+    async def _async_broadcast_tx(self, tx: Tx) -> None | Txid:
+        """ As _broadcast_tx, without blocking the event loop
+        """
+        if await self.blockchain_client.broadcast_tx(tx.serialize().hex()) is None:
+            return None
+        self.tx_cache.add(tx.serialize().hex())
+        return Txid(tx.id())
 
     def get_funds(self, fee_estimate: int, locking_script: str) -> None | Tuple[TxIn, Tx]:
         """ Get a funding tx that can be spent by the provided locking_script
@@ -147,24 +279,95 @@ class CommitmentService:
     def _get_tx(self, txid: Txid) -> None | Tx:
         """ Given the txid return the transaction
         """
-        source_tx_hex = self.blockchain_interface.get_raw_transaction(txid)
+        source_tx_hex = self.tx_cache.get(txid)
         if source_tx_hex is None:
-            print(f"unable to find txid = {txid}")
-            return None
-        # Do some checks of the source tx
-        assert isinstance(source_tx_hex, str)
+            source_tx_hex = self.blockchain_interface.get_raw_transaction(txid)
+            if source_tx_hex is None:
+                print(f"unable to find txid = {txid}")
+                return None
+            # Do some checks of the source tx
+            assert isinstance(source_tx_hex, str)
+            if not self.tx_cache.add(source_tx_hex, txid):
+                return None
+        return hexstr_to_tx(source_tx_hex)
+
+    async def _async_get_tx(self, txid: Txid) -> None | Tx:
+        source_tx_hex = self.tx_cache.get(txid)
+        if source_tx_hex is None:
+            source_tx_hex = await self.blockchain_client.get_raw_transaction(txid)
+            if source_tx_hex is None:
+                print(f"unable to find txid = {txid}")
+                return None
+            if not self.tx_cache.add(source_tx_hex, txid):
+                return None
         return hexstr_to_tx(source_tx_hex)
 
+    def _get_txs(self, txids: List[str]) -> Dict[str, None | Tx]:
+        """ As _get_tx for each txid, the scheduler fetches the txs that are not cached in bulk requests
+        """
+        results: Dict[str, None | Tx] = {}
+        missing: List[str] = []
+        for txid in dict.fromkeys(txids):
+            source_tx_hex = self.tx_cache.get(txid)
+            if source_tx_hex is None:
+                missing.append(txid)
+            else:
+                results[txid] = hexstr_to_tx(source_tx_hex)
+        if len(missing) > 1 and isinstance(self.blockchain_interface, ScheduledInterface):
+            for (txid, source_tx_hex) in self.blockchain_interface.get_raw_transactions(missing).items():
+                if source_tx_hex is None or not self.tx_cache.add(source_tx_hex, txid):
+                    print(f"unable to find txid = {txid}")
+                    results[txid] = None
+                else:
+                    results[txid] = hexstr_to_tx(source_tx_hex)
+        else:
+            for txid in missing:
+                results[txid] = self._get_tx(Txid(txid))
+        return results
+
+    def _ownership_outpoint(self, cp_meta: CommitmentPacketMetadata) -> TxIn:
+        outpoint = cp_meta.commitment_packet.blockchain_outpoint
+        assert outpoint is not None
+        return hexstr_to_txin(outpoint)
+
+    def _ownership_txs(self, cp_metas: List[CommitmentPacketMetadata]) -> List[None | Tx]:
+        """ The tx of each BSV packet's ownership outpoint, those that are not in the store are fetched together
+        """
+        outpoints = [self._ownership_outpoint(cp_meta) for cp_meta in cp_metas]
+        fetched = self._get_txs([outpoint.prev_tx for (cp_meta, outpoint) in zip(cp_metas, outpoints) if cp_meta.ownership_tx is None])
+        return [
+            hexstr_to_tx(cp_meta.ownership_tx) if cp_meta.ownership_tx is not None else fetched[outpoint.prev_tx]
+            for (cp_meta, outpoint) in zip(cp_metas, outpoints)
+        ]
+
+    async def _async_ownership_txs(self, cp_metas: List[CommitmentPacketMetadata]) -> List[None | Tx]:
+        ownership_txs: List[None | Tx] = []
+        for cp_meta in cp_metas:
+            ownership_tx = hexstr_to_tx(cp_meta.ownership_tx)
+            if ownership_tx is None:
+                ownership_tx = await self._async_get_tx(Txid(self._ownership_outpoint(cp_meta).prev_tx))
+            ownership_txs.append(ownership_tx)
+        return ownership_txs
+
     def get_status(self) -> Dict[str, Any]:
-        """ Return the service status
+        """ Return the service status, the dependencies' status is the last result
+            of the status monitor, so this makes no outbound calls
         """
         # eth wallets are connected
         return {
             "status": "running",
-            "finance_get_balance": self.finance_service.get_balance(),
+            "finance_get_balance": self.status_monitor.get_value("finance_get_balance"),
             "actors": list(self.actors_wallets.keys()),
             "networks": self.networks,
-            "ethereum_connected": self.ethereum_service.get_status(),
+            "ethereum_connected": self.status_monitor.get_value("ethereum_connected"),
+            "dependencies": self.status_monitor.get_status(),
+            "spent_watcher": self.spent_watcher.get_status(),
+            "blockchain_backends": None if self.blockchain_router is None else self.blockchain_router.get_status(),
+            "signature_backend": get_signature_backend().name,
+            "signature_cache": {
+                "verification_results": self.verification_cache.get_status(),
+                "verifying_keys": get_verifying_key_cache_status(),
+            },
         }
 
     def is_known_actor(self, name: str) -> bool:
@@ -193,7 +396,7 @@ class CommitmentService:
         assert self.is_known_actor(actor)
         return self.commitment_store.get_commitments_by_actor(actor)
 
-    def get_transfers_by_actor(self, actor: str) -> List[Cpid]:
+    def get_transfers_by_actor(self, actor: str) -> List[Tuple[None | Cpid, CommitmentPacket]]:
         """ Get Commitment Transfers of this actor's Commitments
         """
         assert self.is_known_actor(actor)
@@ -208,18 +411,19 @@ class CommitmentService:
             return None
         assert isinstance(cp, CommitmentPacketMetadata)
         tx = hexstr_to_tx(cp.ownership_tx)
-        if tx is None:
+        if tx is not None:
+            txid = tx.id()
+        elif cp.commitment_packet.blockchain_id == "BSV" and cp.commitment_packet.blockchain_outpoint is not None:
+            # Anchored issuances and all but the first outpoint of a batch do not store their ownership tx
+            txid = cp.commitment_packet.get_blockchain_txid()
+        else:
             return None
 
-        assert isinstance(tx, Tx)
-        link = f"https://test.whatsonchain.com/tx/{tx.id()}"
+        link = f"https://test.whatsonchain.com/tx/{txid}"
         return link
 
     def public_key_to_owner(self, public_key: str) -> None | str:
-        for name, wallet in self.actors_token_wallets.items():
-            if wallet.get_token_public_key() == public_key:
-                return name
-        return None
+        return self.public_key_actors.get(public_key)
 
     def cp_meta_to_status(self, cpid: str, cp: CommitmentPacketMetadata) -> Dict[str, Any]:
         retval = cp.model_dump()
@@ -245,6 +449,9 @@ class CommitmentService:
             retval["commitment_packet"]["public_key_owner"] = owner
         del retval["commitment_packet"]["public_key"]
 
+        if cp.anchor is not None:
+            retval["anchor_valid"] = self.is_anchor_valid(cpid)
+
         # Check signature
         if retval["commitment_packet"]["signature"] is not None:
             retval["commitment_packet"]["signature_valid"] = self.is_signature_valid(cpid)
@@ -274,17 +481,10 @@ class CommitmentService:
         return self.commitment_store.is_commitment_unique(asset_id, asset_data, network)
 
     def commitment_packets_owned_by_actor(self, actor: str) -> None | List[Tuple[Cpid, CommitmentPacket]]:
-        # check the commitment store by actor for commitments
-        # the public key on the packet must match & it must not have a spending tx
-        # final check .. token store .. the id should be assigned to this actor & the CPID must match
-        return_list: List[Tuple[Cpid, CommitmentPacket]] = []
-        commitment_packets: List[Tuple[Cpid, CommitmentPacket]] = self.commitment_store.get_commitments_by_actor_without_spending_tx(actor)
-        tokens_by_actor = token_store.token_list_by_actor(actor)
-        for id, packet in commitment_packets:
-            packet_list = [(Cpid(obj.cpid), packet) for obj in tokens_by_actor if obj.cpid == id]
-            if len(packet_list) > 0:
-                return_list.extend(packet_list)
-        return return_list
+        """ Return the commitments without a spending tx whose token is assigned to this actor
+            with a matching CPID. This is a lookup in the store's pre-joined owned view.
+        """
+        return self.commitment_store.owned_view.owned_by_actor(actor)
 
     def get_commitment_tx_hash(self, cpid: str) -> Optional[str]:
         """Given a CPID, return the commitment tx hash (spending_tx)"""
@@ -319,8 +519,21 @@ class CommitmentService:
     def bsv_create_ownership_tx(self, locking_script_as_hex: str) -> None | Tuple[TxIn, Tx]:
         """ Given a locking script return a BSV UTXO
         """
-        UTXO_VALUE = 100
-        results = self.finance_service.get_funds(UTXO_VALUE, locking_script_as_hex)
+        utxo = self.utxo_pool.take(locking_script_as_hex)
+        if utxo is not None:
+            return utxo
+        # The pool is empty or disabled, so fund this one directly
+        return self._funds_to_utxo(self.finance_service.get_funds(UTXO_VALUE, locking_script_as_hex))
+
+    async def async_bsv_create_ownership_tx(self, locking_script_as_hex: str) -> None | Tuple[TxIn, Tx]:
+        utxo = self.utxo_pool.take(locking_script_as_hex)
+        if utxo is not None:
+            return utxo
+        return self._funds_to_utxo(await self.async_finance_service.get_funds(UTXO_VALUE, locking_script_as_hex))
+
+    def _funds_to_utxo(self, results: None | Dict[str, Any]) -> None | Tuple[TxIn, Tx]:
+        """ Return the first outpoint and the funding tx from the financing service results
+        """
         if results is None:
             print("unable to get funds")
             return None
@@ -332,6 +545,19 @@ class CommitmentService:
         assert isinstance(tx, Tx)
         return (outpoint, tx)
 
+    def _funds_to_utxos(self, results: None | Dict[str, Any]) -> List[Tuple[TxIn, Tx]]:
+        """ Return each outpoint of the funding tx from the financing service results
+        """
+        if results is None or results.get('status') != "Success":
+            print(f"unable to get funds, result = {results}")
+            return []
+        tx = hexstr_to_tx(results['tx'])
+        assert isinstance(tx, Tx)
+        return [
+            (TxIn(prev_tx=outpoint['hash'], prev_index=outpoint['index']), tx)
+            for outpoint in results['outpoints'] if outpoint['hash'] == tx.id()
+        ]
+
     def bsv_spend_ownership_tx(self, wallet: Wallet, outpoint: TxIn, ownership_tx: None | Tx, cpid: Cpid) -> None | Tx:
         """ Spend the previously created BSV UTXO
         """
@@ -342,14 +568,8 @@ class CommitmentService:
                 print("Unable to find utxo")
                 return None
 
-        op_return_script: Script = Script.parse_string("OP_0 OP_RETURN")
-        op_return_script.append_pushdata(bytes.fromhex(cpid))
-        tx_out = TxOut(amount=0, script_pubkey=op_return_script)
-        spending_tx = Tx(version=1, tx_ins=[outpoint], tx_outs=[tx_out])
-        # This transaction only has 1 input, hence the magic 0 for the index to sign
-        signed_spending_tx = wallet.sign_tx_with_input(0, ownership_tx, spending_tx)
+        signed_spending_tx = self._sign_spending_tx(wallet, outpoint, ownership_tx, cpid)
         if signed_spending_tx is None:
-            print("Sign spending tx failed")
             return None
         if self._broadcast_tx(signed_spending_tx) is not None:
             return signed_spending_tx
@@ -357,6 +577,58 @@ class CommitmentService:
             print("Unable to broadcast tx")
             return None
 
+    async def async_bsv_spend_ownership_tx(self, wallet: Wallet, outpoint: TxIn, ownership_tx: None | Tx, cpid: Cpid) -> None | Tx:
+        if ownership_tx is None:
+            ownership_tx = await self._async_get_tx(Txid(outpoint.prev_tx))
+            if ownership_tx is None:
+                print("Unable to find utxo")
+                return None
+
+        signed_spending_tx = await asyncio.to_thread(self._sign_spending_tx, wallet, outpoint, ownership_tx, cpid)
+        if signed_spending_tx is None:
+            return None
+        if await self._async_broadcast_tx(signed_spending_tx) is not None:
+            return signed_spending_tx
+        else:
+            print("Unable to broadcast tx")
+            return None
+
+    def _op_return_output(self, data: bytes) -> TxOut:
+        op_return_script: Script = Script.parse_string("OP_0 OP_RETURN")
+        op_return_script.append_pushdata(data)
+        return TxOut(amount=0, script_pubkey=op_return_script)
+
+    def _sign_spending_tx(self, wallet: Wallet, outpoint: TxIn, ownership_tx: Tx, cpid: Cpid) -> None | Tx:
+        """ Return the tx that spends the outpoint to an OP_RETURN of the cpid
+        """
+        return self._sign_op_return_tx(wallet, outpoint, ownership_tx, bytes.fromhex(cpid))
+
+    def _sign_op_return_tx(self, wallet: Wallet, outpoint: TxIn, ownership_tx: Tx, data: bytes) -> None | Tx:
+        tx_out = self._op_return_output(data)
+        spending_tx = Tx(version=1, tx_ins=[outpoint], tx_outs=[tx_out])
+        # This transaction only has 1 input, hence the magic 0 for the index to sign
+        signed_spending_tx = wallet.sign_tx_with_input(0, ownership_tx, spending_tx)
+        if signed_spending_tx is None:
+            print("Sign spending tx failed")
+        return signed_spending_tx
+
+    def _sign_batch_spending_tx(self, wallet: Wallet, outpoints: List[TxIn], ownership_txs: List[Tx], cpids: List[Cpid]) -> None | Tx:
+        """ Return the tx that spends all the outpoints, to an OP_RETURN of each cpid
+            or, with batch_merkle_root, to one OP_RETURN of the Merkle root of the cpids
+        """
+        if self.batch_merkle_root:
+            tx_outs = [self._op_return_output(merkle_root([bytes.fromhex(cpid) for cpid in cpids]))]
+        else:
+            tx_outs = [self._op_return_output(bytes.fromhex(cpid)) for cpid in cpids]
+        spending_tx = Tx(version=1, tx_ins=outpoints, tx_outs=tx_outs)
+        # Each signature covers all the outpoints and outputs, so the inputs can be signed in turn
+        for (i, ownership_tx) in enumerate(ownership_txs):
+            spending_tx = wallet.sign_tx_with_input(i, ownership_tx, spending_tx)
+            if spending_tx is None:
+                print(f"Sign spending tx input {i} failed")
+                return None
+        return spending_tx
+
     def create_ownership_tx(self, actor: str, network: str) -> None | Tuple[TxIn, Tx]:
         """ Create UTXO based on actor info and network
         """
@@ -373,16 +645,39 @@ class CommitmentService:
                 return tx_hash, tx_hash
             case _: raise NotImplementedError(f"Unknown network '{network}'")
 
+    async def async_create_ownership_tx(self, actor: str, network: str) -> None | Tuple[TxIn, Tx]:
+        """ As create_ownership_tx, the Ethereum service is called on a worker thread
+        """
+        match network:
+            case 'BSV':
+                actors_wallet = self.actors_wallets[actor]
+                return await self.async_bsv_create_ownership_tx(actors_wallet.get_locking_script_as_hex())
+            case 'ETH':
+                eth_actors_wallet = self.actors_eth_wallets[actor]
+                tx_hash = await asyncio.to_thread(self.ethereum_service.create_ownership_tx, eth_actors_wallet)
+                print(f"tx_hash = {tx_hash}")
+                return tx_hash, tx_hash
+            case _: raise NotImplementedError(f"Unknown network '{network}'")
+
     def spend_ownership_tx(self, actor: str, network: str, outpoint: TxIn, ownership_tx: None | Tx, cpid: Cpid) -> None | Tx:
         actors_wallet = self.actors_wallets[actor]
         return self.bsv_spend_ownership_tx(actors_wallet, outpoint, ownership_tx, cpid)
 
+    async def async_spend_ownership_tx(self, actor: str, network: str, outpoint: TxIn, ownership_tx: None | Tx, cpid: Cpid) -> None | Tx:
+        actors_wallet = self.actors_wallets[actor]
+        return await self.async_bsv_spend_ownership_tx(actors_wallet, outpoint, ownership_tx, cpid)
+
     def spend_ownership_tx_eth(self, actor: str, tx_hash: str, cpid: Cpid) -> None | str:
         actors_wallet = self.actors_eth_wallets[actor]
         assert actors_wallet is not None
         tx_hash = self.ethereum_service.spend_ownership_tx(tx_hash, actors_wallet, cpid)
         return tx_hash
 
+    async def async_spend_ownership_tx_eth(self, actor: str, tx_hash: str, cpid: Cpid) -> None | str:
+        actors_wallet = self.actors_eth_wallets[actor]
+        assert actors_wallet is not None
+        return await asyncio.to_thread(self.ethereum_service.spend_ownership_tx, tx_hash, actors_wallet, cpid)
+
     def sign_commitment_packet(self, actor: str, cp: CommitmentPacket) -> CommitmentPacket:
         assert self.is_known_actor(actor)
         token_wallet = self.actors_token_wallets[actor]
@@ -400,13 +695,185 @@ class CommitmentService:
 
         assert (token_store.check_token_id(asset_data))
 
+        if network == "BSV" and self.issuance_batcher.enabled:
+            # Issued with the rest of the actor's batch
+            return self.issuance_batcher.submit(actor, asset_id, asset_data).result()
+
         # Create utxo
         result = self.create_ownership_tx(actor, network)
         if result is None:
             # Return error
             return None
-        (vin, utxo_tx) = result
+        return self._create_issuance_commitment(actor, asset_id, asset_data, network, result)
+
+    async def async_create_issuance_commitment(self, actor: str, asset_id: str, asset_data: str, network: str) -> None | Tuple[Cpid, CommitmentPacket]:
+        """ As create_issuance_commitment, without blocking on the financing service
+        """
+        assert self.is_known_actor(actor)
+        assert self.is_known_network(network)
+        assert (token_store.check_token_id(asset_data))
+
+        if network == "BSV" and self.issuance_batcher.enabled:
+            return await asyncio.wrap_future(self.issuance_batcher.submit(actor, asset_id, asset_data))
+
+        result = await self.async_create_ownership_tx(actor, network)
+        if result is None:
+            return None
+        return await asyncio.to_thread(self._create_issuance_commitment, actor, asset_id, asset_data, network, result)
+
+    def _issuance_errors(self, issuances: List[IssuanceRequest], network: str) -> List[None | str]:
+        """ Check the whole batch before any funds are requested, returns the reason
+            each issuance can not be created or None
+        """
+        errors: List[None | str] = []
+        tokens: Set[str] = set()
+        unique = self.commitment_store.are_commitments_unique(issuances, network)
+        for ((_, asset_data), is_unique) in zip(issuances, unique):
+            if asset_data in tokens:
+                errors.append("The token is repeated in the batch")
+            elif not token_store.check_token_id(asset_data):
+                errors.append("The token is not available")
+            elif not is_unique:
+                errors.append("This UBA already exists")
+            else:
+                errors.append(None)
+            tokens.add(asset_data)
+        return errors
+
+    def _bsv_create_ownership_txs(self, actor: str, no_of_outpoints: int) -> List[Tuple[TxIn, None | Tx]]:
+        """ Fund the ownership outpoints of a batch with one financing service request
+        """
+        if no_of_outpoints == 0:
+            return []
+        locking_script_as_hex = self.actors_wallets[actor].get_locking_script_as_hex()
+        return self._shared_funding(self._funds_to_utxos(self.finance_service._get_funds(UTXO_VALUE, locking_script_as_hex, no_of_outpoints, False)))
+
+    async def _async_bsv_create_ownership_txs(self, actor: str, no_of_outpoints: int) -> List[Tuple[TxIn, None | Tx]]:
+        if no_of_outpoints == 0:
+            return []
+        locking_script_as_hex = self.actors_wallets[actor].get_locking_script_as_hex()
+        return self._shared_funding(self._funds_to_utxos(await self.async_finance_service._get_funds(UTXO_VALUE, locking_script_as_hex, no_of_outpoints, False)))
+
+    def _shared_funding(self, utxos: List[Tuple[TxIn, Tx]]) -> List[Tuple[TxIn, None | Tx]]:
+        """ The outpoints of a batch share one funding tx, it is stored with the first record only,
+            as storing it with each would make the store grow with the square of the batch size.
+            The tx cache is seeded with it here and from the store on startup.
+        """
+        if len(utxos) < 2:
+            return list(utxos)
+        self.tx_cache.add(utxos[0][1].serialize().hex())
+        return [utxos[0]] + [(vin, None) for (vin, _) in utxos[1:]]
+
+    def create_issuance_commitments(self, actor: str, issuances: List[IssuanceRequest], network: str) -> List[Dict[str, Any]]:
+        """ Create a batch of issuance commitment packets, the BSV ownership outpoints are funded
+            by one request. Returns a result for each issuance, with its cpid and packet or an error.
+        """
+        assert self.is_known_actor(actor)
+        assert self.is_known_network(network)
+        errors = self._issuance_errors(issuances, network)
+        no_of_outpoints = errors.count(None)
+        if network == "BSV":
+            utxos: List[None | Tuple[Any, Any]] = list(self._bsv_create_ownership_txs(actor, no_of_outpoints))
+        else:
+            utxos = [self.create_ownership_tx(actor, network) for _ in range(no_of_outpoints)]
+        return self._create_issuance_commitments(actor, issuances, network, errors, utxos)
+
+    async def async_create_issuance_commitments(self, actor: str, issuances: List[IssuanceRequest], network: str) -> List[Dict[str, Any]]:
+        """ As create_issuance_commitments, without blocking on the financing service
+        """
+        assert self.is_known_actor(actor)
+        assert self.is_known_network(network)
+        errors = self._issuance_errors(issuances, network)
+        no_of_outpoints = errors.count(None)
+        if network == "BSV":
+            utxos: List[None | Tuple[Any, Any]] = list(await self._async_bsv_create_ownership_txs(actor, no_of_outpoints))
+        else:
+            utxos = [await self.async_create_ownership_tx(actor, network) for _ in range(no_of_outpoints)]
+        return await asyncio.to_thread(self._create_issuance_commitments, actor, issuances, network, errors, utxos)
+
+    def _get_sign_executor(self, no_of_jobs: int) -> None | ThreadPoolExecutor:
+        """ Signing releases the GIL with the cryptography backend, so threads sign in parallel
+        """
+        if self.sign_workers == 0 or no_of_jobs <= 1:
+            return None
+        if self.sign_executor is None:
+            self.sign_executor = ThreadPoolExecutor(max_workers=self.sign_workers, thread_name_prefix="sign")
+        return self.sign_executor
+
+    def _sign_packets(self, actor: str, packets: List[CommitmentPacket]) -> List[CommitmentPacket]:
+        """ Sign each of the packets with the actor's token key, on the thread pool
+        """
+        executor = self._get_sign_executor(len(packets))
+        if executor is None:
+            return [self.sign_commitment_packet(actor, cp) for cp in packets]
+        return list(executor.map(functools.partial(self.sign_commitment_packet, actor), packets))
+
+    def _create_issuance_commitments(self, actor: str, issuances: List[IssuanceRequest], network: str, errors: List[None | str], utxos: List[None | Tuple[Any, Any]]) -> List[Dict[str, Any]]:
+        """ Sign the issuances that passed the checks and were funded, then assign their tokens
+            and store them with one save of each store. The tokens are checked again when they are
+            assigned, under the store lock.
+        """
+        results: List[Dict[str, Any]] = [
+            {"asset_id": asset_id, "asset_data": asset_data, "cpid": None, "commitment": None, "error": error}
+            for ((asset_id, asset_data), error) in zip(issuances, errors)
+        ]
+        valid = [i for (i, error) in enumerate(errors) if error is None]
+        # The financing service may return fewer outpoints than requested
+        utxos = utxos + [None] * (len(valid) - len(utxos))
+        funded: List[Tuple[int, Tuple[Any, Any]]] = []
+        for (i, utxo) in zip(valid, utxos):
+            if utxo is None:
+                results[i]["error"] = "Unable to fund the ownership tx"
+            else:
+                funded.append((i, utxo))
+        if len(funded) == 0:
+            return results
+
+        def sign(item: Tuple[int, Tuple[Any, Any]]) -> CommitmentPacket:
+            (asset_id, asset_data) = issuances[item[0]]
+            return self._issuance_packet(actor, asset_id, asset_data, network, item[1][0])
+
+        executor = self._get_sign_executor(len(funded))
+        packets = list(executor.map(sign, funded)) if executor is not None else [sign(item) for item in funded]
+
+        assignments = [(issuances[i][1], cp.get_cpid()) for ((i, _), cp) in zip(funded, packets)]
+        cp_metas = [self._issuance_record(actor, cp, network, utxo[1]) for ((_, utxo), cp) in zip(funded, packets)]
+        with self.commitment_store.lock:
+            # A token issued by another request while this batch was funded is no longer available
+            assigned = token_store.assign_tokens_to_actor(actor, assignments)
+            self.commitment_store.add_commitments([cp_meta for (cp_meta, is_assigned) in zip(cp_metas, assigned) if is_assigned])
+        for ((i, _), cp, is_assigned) in zip(funded, packets, assigned):
+            if not is_assigned:
+                print(f'Problem with assert ID -> {issuances[i][1]} in the token store')
+                results[i]["error"] = "The token is not available"
+                continue
+            results[i]["cpid"] = cp.get_cpid()
+            results[i]["commitment"] = cp
+        return results
+
+    def _create_issuance_commitment(self, actor: str, asset_id: str, asset_data: str, network: str, utxo: Tuple[Any, Any]) -> Tuple[Cpid, CommitmentPacket]:
+        """ Create, sign and store the issuance commitment packet for the ownership utxo
+        """
+        with self.commitment_store.lock:
+            cp_meta = self._issuance_metadata(actor, asset_id, asset_data, network, utxo)
+            self.commitment_store.add_commitment(cp_meta)
+
+        # Return commitment packet
+        return (cp_meta.commitment_packet.get_cpid(), cp_meta.commitment_packet)
 
+    def _issuance_metadata(self, actor: str, asset_id: str, asset_data: str, network: str, utxo: Tuple[Any, Any]) -> CommitmentPacketMetadata:
+        """ Create and sign the issuance commitment packet for the ownership utxo, and assign the token to the actor
+        """
+        (vin, utxo_tx) = utxo
+        cp = self._issuance_packet(actor, asset_id, asset_data, network, vin)
+        # assign token to actor
+        if not token_store.assign_to_actor(actor, asset_data, cp.get_cpid()):
+            print(f'Problem with assert ID -> {asset_data} in the token store')
+        return self._issuance_record(actor, cp, network, utxo_tx)
+
+    def _issuance_packet(self, actor: str, asset_id: str, asset_data: str, network: str, vin: Any) -> CommitmentPacket:
+        """ Create and sign the issuance commitment packet for the ownership outpoint
+        """
         match network:
             case 'BSV':
                 # Create commitment packet
@@ -440,16 +907,14 @@ class CommitmentService:
         cp.signature_scheme = token_wallet.get_signature_scheme()
         cp.public_key = token_wallet.get_token_public_key()
         # Sign commitment packet
-        cp = self.sign_commitment_packet(actor, cp)
-        # Store commitment packet
-        cpid = cp.get_cpid()
-        # assign token to actor
-        if not token_store.assign_to_actor(actor, asset_data, cpid):
-            print(f'Problem with assert ID -> {asset_data} in the token store')
+        return self.sign_commitment_packet(actor, cp)
 
+    def _issuance_record(self, actor: str, cp: CommitmentPacket, network: str, utxo_tx: Any) -> CommitmentPacketMetadata:
+        """ The store record of a signed issuance commitment packet
+        """
+        cpid = cp.get_cpid()
         match network:
             case 'BSV':
-
                 cp_meta = CommitmentPacketMetadata(
                     owner=actor,
                     type=CommitmentType.Issuance,
@@ -469,11 +934,87 @@ class CommitmentService:
                     commitment_packet_id=cpid,
                     commitment_packet=cp
                 )
+        return cp_meta
 
-        self.commitment_store.add_commitment(cp_meta)
-
-        # Return commitment packet
-        return (cpid, cp)
+    def _fund_split_tx(self, wallet: Wallet, outputs: int) -> None | Tx:
+        """ Return a signed tx with `outputs` ownership outputs, and one more to fund the anchor tx,
+            from one request to the financing service
+        """
+        locking_script = wallet.get_locking_script()
+        # A P2PKH input and the outputs
+        fee = math.ceil((10 + 148 + 34 * (outputs + 1)) * self.issuance_batcher.fee_rate)
+        value = (outputs + 1) * UTXO_VALUE
+        funds = self._funds_to_utxo(self.finance_service.get_funds(value + fee, wallet.get_locking_script_as_hex()))
+        if funds is None:
+            return None
+        (outpoint, funding_tx) = funds
+        if funding_tx.tx_outs[outpoint.prev_index].amount < value + fee:
+            print(f"The funding outpoint has less than the {value + fee} satoshis requested")
+            return None
+        split_tx = Tx(version=1, tx_ins=[outpoint], tx_outs=[TxOut(amount=UTXO_VALUE, script_pubkey=locking_script) for _ in range(outputs + 1)])
+        signed_split_tx = wallet.sign_tx_with_input(0, funding_tx, split_tx)
+        if signed_split_tx is None:
+            print("Sign split tx failed")
+        return signed_split_tx
+
+    def _anchor_issuances(self, actor: str, requests: List[IssuanceRequest]) -> List[None | Tuple[Cpid, CommitmentPacket]]:
+        """ Issue a batch of BSV commitments. A split tx creates the ownership outputs and an
+            anchor tx spends its last output to an OP_RETURN of the Merkle root of the cpids.
+            Each issuance stores its proof of inclusion in the root.
+        """
+        results: List[None | Tuple[Cpid, CommitmentPacket]] = [None] * len(requests)
+        # Each token can only be issued once
+        issued: List[int] = []
+        for (i, (_, asset_data)) in enumerate(requests):
+            if token_store.check_token_id(asset_data) and all(requests[j][1] != asset_data for j in issued):
+                issued.append(i)
+        if len(issued) == 0:
+            return results
+        wallet = self.actors_wallets[actor]
+        split_tx = self._fund_split_tx(wallet, len(issued))
+        if split_tx is None:
+            return results
+        if self._broadcast_tx(split_tx) is None:
+            print("Unable to broadcast the split tx")
+            return results
+
+        packets = [
+            self._issuance_packet(actor, requests[i][0], requests[i][1], "BSV", TxIn(prev_tx=split_tx.id(), prev_index=output))
+            for (output, i) in enumerate(issued)
+        ]
+        # The split tx is in the tx cache rather than in each record
+        cp_metas = [self._issuance_record(actor, cp, "BSV", None) for cp in packets]
+        (root, paths) = merkle_proofs([bytes.fromhex(cp_meta.commitment_packet.get_cpid()) for cp_meta in cp_metas])
+        anchor_tx = self._sign_op_return_tx(wallet, TxIn(prev_tx=split_tx.id(), prev_index=len(issued)), split_tx, root)
+        if anchor_tx is not None and self._broadcast_tx(anchor_tx) is not None:
+            for (index, cp_meta) in enumerate(cp_metas):
+                cp_meta.anchor = AnchorProof(txid=anchor_tx.id(), root=root.hex(), index=index, path=[sibling.hex() for sibling in paths[index]])
+        else:
+            print(f"Unable to anchor the root of {len(cp_metas)} issuances, they are stored without proofs")
+        with self.commitment_store.lock:
+            token_store.assign_tokens_to_actor(actor, [(requests[i][1], cp.get_cpid()) for (i, cp) in zip(issued, packets)])
+            self.commitment_store.add_commitments(cp_metas)
+        for (i, cp_meta) in zip(issued, cp_metas):
+            results[i] = (cp_meta.commitment_packet.get_cpid(), cp_meta.commitment_packet)
+        return results
+
+    def is_anchor_valid(self, cpid: str) -> None | bool:
+        """ Check the inclusion proof of an anchored issuance without calling the chain,
+            and where the anchor tx is cached that it has an OP_RETURN of the root.
+            Returns None if the issuance was not anchored.
+        """
+        cp_meta = self.commitment_store.get_metadata_by_cpid(cpid)
+        if cp_meta is None or cp_meta.anchor is None:
+            return None
+        anchor = cp_meta.anchor
+        root = bytes.fromhex(anchor.root)
+        if not verify_merkle_proof(bytes.fromhex(cpid), anchor.index, [bytes.fromhex(sibling) for sibling in anchor.path], root):
+            return False
+        anchor_tx = self.tx_cache.get(anchor.txid)
+        if anchor_tx is None:
+            return True
+        root_script = self._op_return_output(root).script_pubkey.raw_serialize()
+        return any(tx_out.script_pubkey.raw_serialize() == root_script for tx_out in Tx.parse_hexstr(anchor_tx).tx_outs)
 
     def is_signature_valid(self, cpid: str) -> bool:
         cp_meta = self.commitment_store.get_metadata_by_cpid(cpid)
@@ -482,38 +1023,193 @@ class CommitmentService:
         cp = self.commitment_store.get_commitment_by_cpid(cpid)
         if cp is None:
             return False
-        prev_cp = self.commitment_store.get_commitment_by_cpid(cp.previous_packet)
-        pubkey_to_use: Optional[str] = None
-        if prev_cp is None:
-            pubkey_to_use = cp.public_key
-        else:
-            pubkey_to_use = prev_cp.public_key
+        prev_cp = self.commitment_store.get_commitment_by_cpid(cp.previous_packet) if cp.previous_packet is not None else None
+        # The previous owner's key and curve, as verify_commitments uses
+        signer = packet_signer(cp, prev_cp)
+        if signer is None or cp.signature is None:
+            return False
+        (pubkey_to_use, signature_scheme) = signer
 
-        assert pubkey_to_use is not None
+        # A signature over a packet never changes validity, so check the cache first
+        cache_key = (cp.get_cpid(), cp.signature, pubkey_to_use, signature_scheme)
+        cached = self.verification_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
         message: bytes = cp.packet_digest()
-        c: ecdsa.curves.Curve = ecdsa.curves.curve_by_name(cp.signature_scheme)
-        if not verify_signature(message, pubkey_to_use, bytes.fromhex(cp.signature), c, hashlib.sha256):
+        c: ecdsa.curves.Curve = ecdsa.curves.curve_by_name(signature_scheme)
+        is_valid = verify_signature(message, pubkey_to_use, bytes.fromhex(cp.signature), c, hashlib.sha256)
+        self.verification_cache.put(cache_key, is_valid)
+        if not is_valid:
             print(f'Failing to verify signature? for cpid -> {cpid}')
-            return False
+        return is_valid
 
-        return True
+    def _get_verify_executor(self, no_of_jobs: int) -> None | ProcessPoolExecutor:
+        """ The process pool is only worth starting for batches of more than one chunk.
+            Its workers are spawned, as forking a process with the service's threads running
+            can copy a lock that another thread holds.
+        """
+        if self.verify_workers == 0 or no_of_jobs <= self.verify_chunk_size:
+            return None
+        if self.verify_executor is None:
+            self.verify_executor = ProcessPoolExecutor(max_workers=self.verify_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.verify_executor
+
+    def verify_commitments(self, cpids: List[str], packets: List[CommitmentPacket]) -> List[Dict[str, Any]]:
+        """ Verify the signature and chain of each commitment, given by cpid or as a packet, in one pass.
+            Each packet in a chain is verified against the previous owner's key, and a chain is valid
+            when every packet back to the issuance is signed, verifies and matches its asset.
+        """
+        by_cpid: Dict[str, CommitmentPacket] = {
+            str(cp_meta.commitment_packet_id): cp_meta.commitment_packet for cp_meta in self.commitment_store.commitments
+        }
+        results: List[Dict[str, Any]] = []
+        chains: List[List[Tuple[str, CommitmentPacket]]] = []
+        for (cpid, packet) in [(cpid, None) for cpid in cpids] + [(None, packet) for packet in packets]:
+            result: Dict[str, Any] = {"cpid": cpid, "known": False, "signature_valid": False, "chain_valid": False, "errors": []}
+            results.append(result)
+            chain: List[Tuple[str, CommitmentPacket]] = []
+            chains.append(chain)
+            cp: None | CommitmentPacket = packet
+            if packet is not None:
+                try:
+                    cpid = packet.get_cpid()
+                except AssertionError:
+                    result["errors"].append("packet is missing fields required to calculate the CPID")
+                    continue
+                result["cpid"] = cpid
+            else:
+                cp = by_cpid.get(cpid) if cpid is not None else None
+                if cp is None:
+                    result["errors"].append("unknown cpid")
+                    continue
+            result["known"] = cpid in by_cpid
+            assert cp is not None and cpid is not None
+            # Walk back to the issuance
+            while cp is not None:
+                chain.append((cpid, cp))
+                if cp.previous_packet is None:
+                    break
+                previous = by_cpid.get(cp.previous_packet)
+                if previous is None:
+                    result["errors"].append(f"previous packet {cp.previous_packet} is unknown")
+                elif cp.previous_packet in [c for (c, _) in chain]:
+                    result["errors"].append(f"previous packet {cp.previous_packet} forms a cycle")
+                    break
+                elif (previous.asset_id, previous.data) != (cp.asset_id, cp.data):
+                    result["errors"].append(f"asset_id or data of {cpid} differs from the previous packet")
+                (cpid, cp) = (cp.previous_packet, previous)
+
+        # Collect the signatures that are not already cached, each is verified once per batch
+        is_valid: Dict[VerificationKey, bool] = {}
+        pending: Dict[VerificationKey, SignatureJob] = {}
+        for chain in chains:
+            for (cpid, cp) in chain:
+                signer = packet_signer(cp, by_cpid.get(cp.previous_packet) if cp.previous_packet is not None else None)
+                if cp.signature is None or signer is None:
+                    continue
+                cache_key = (cpid, cp.signature, *signer)
+                if cache_key in is_valid or cache_key in pending:
+                    continue
+                cached = self.verification_cache.get(cache_key)
+                if cached is not None:
+                    is_valid[cache_key] = cached
+                else:
+                    pending[cache_key] = (cp.model_dump(), signer)
+
+        jobs = list(pending.values())
+        verified = run_signature_jobs(jobs, get_signature_backend().name, self._get_verify_executor(len(jobs)), self.verify_chunk_size)
+        for (cache_key, valid) in zip(pending.keys(), verified):
+            self.verification_cache.put(cache_key, valid)
+            is_valid[cache_key] = valid
+
+        for (result, chain) in zip(results, chains):
+            chain_valid = len(chain) > 0 and len(result["errors"]) == 0
+            for (i, (cpid, cp)) in enumerate(chain):
+                signer = packet_signer(cp, by_cpid.get(cp.previous_packet) if cp.previous_packet is not None else None)
+                if cp.signature is None:
+                    error = "packet is not signed"
+                elif signer is None:
+                    error = "no public key to verify the signature with"
+                elif not is_valid[(cpid, cp.signature, *signer)]:
+                    error = "signature does not verify"
+                else:
+                    if i == 0:
+                        result["signature_valid"] = True
+                    continue
+                chain_valid = False
+                result["errors"].append(error if i == 0 else f"{error} for previous packet {cpid}")
+            result["chain_valid"] = chain_valid
+        return results
+
+    def _live_outpoints(self) -> List[Outpoint]:
+        """ The ownership outpoints of the commitments that have not been transferred
+        """
+        return [
+            (cp_meta.commitment_packet.blockchain_id, cp_meta.commitment_packet.blockchain_outpoint)
+            for cp_meta in self.commitment_store.commitments
+            if cp_meta.state == CommitmentStatus.Created and cp_meta.spending_tx is None and cp_meta.commitment_packet.blockchain_outpoint is not None
+        ]
+
+    def _is_outpoint_spent(self, cpid: str) -> bool:
+        """ Return True if the spent watcher has seen the packet's ownership outpoint spent on chain
+        """
+        cp = self.commitment_store.get_commitment_by_cpid(cpid)
+        if cp is None or cp.blockchain_outpoint is None:
+            return False
+        if self.spent_watcher.is_spent(cp.blockchain_id, cp.blockchain_outpoint):
+            print(f"The ownership outpoint of {cpid} has been spent on {cp.blockchain_id}")
+            return True
+        return False
 
     def can_transfer(self, cpid: str, actor: str, is_owner: bool) -> bool:
         if self.commitment_store.can_transfer(cpid, actor, is_owner):
-
+            if self._is_outpoint_spent(cpid):
+                return False
             return self.is_signature_valid(cpid)
         return False
 
     def create_transfer_template(self, cpid: str, actor: str, network: str) -> None | Tuple[Cpid, CommitmentPacket]:
         """ Create Commitment Packet Template
         """
+        orignal_cp_meta = self._template_source(cpid, actor, network)
+        if orignal_cp_meta is None:
+            return None
+        # Create transfer template
+        # Create utxo, unless the previous outpoint is handed over to the actor on completion
+        result: None | Tuple[Any, Any]
+        if self._can_hand_over(orignal_cp_meta, network):
+            result = (self._ownership_outpoint(orignal_cp_meta), None)
+        else:
+            result = self.create_ownership_tx(actor, network)
+        if result is None:
+            # Return error
+            return None
+        return self._create_transfer_template(orignal_cp_meta, actor, network, result)
+
+    async def async_create_transfer_template(self, cpid: str, actor: str, network: str) -> None | Tuple[Cpid, CommitmentPacket]:
+        """ As create_transfer_template, without blocking on the financing service.
+            The checks and the store write run on a worker thread.
+        """
+        orignal_cp_meta = await asyncio.to_thread(self._template_source, cpid, actor, network)
+        if orignal_cp_meta is None:
+            return None
+        result: None | Tuple[Any, Any]
+        if await self._async_can_hand_over(orignal_cp_meta, network):
+            result = (self._ownership_outpoint(orignal_cp_meta), None)
+        else:
+            result = await self.async_create_ownership_tx(actor, network)
+        if result is None:
+            return None
+        return await asyncio.to_thread(self._create_transfer_template, orignal_cp_meta, actor, network, result)
+
+    def _template_source(self, cpid: str, actor: str, network: str) -> None | CommitmentPacketMetadata:
+        """ Check that the actor can create a transfer template of the packet, returns the packet's metadata
+        """
         assert self.is_known_cpid(cpid)
         assert self.is_known_actor(actor)
         assert self.is_known_network(network)
 
-        # <TODO> - we need to check directly on the blockchain if the outpoint has been spent
-        # for ethereum, use ethereum_service.txSpentStatus()
         # Get the previous Commitment Packet & metadata
         orignal_cp_meta = self.commitment_store.get_metadata_by_cpid(cpid)
         if orignal_cp_meta is None:
@@ -525,13 +1221,22 @@ class CommitmentService:
         # check the owner of the original cp also has ownership in the token store
         if not token_store.check_token_id_actor(orignal_cp_meta.owner, orignal_cp_meta.commitment_packet.data):
             print('Issue with orignal ownersip {orignal_cp_meta.owner} on token_id {orignal_cp_meta.commitment_packet.data}')
-        # Create transfer template
-        # Create utxo
-        result = self.create_ownership_tx(actor, network)
-        if result is None:
-            # Return error
-            return None
-        (vin, utxo_tx) = result
+        return orignal_cp_meta
+
+    def _create_transfer_template(self, orignal_cp_meta: CommitmentPacketMetadata, actor: str, network: str, utxo: Tuple[Any, Any]) -> Tuple[Cpid, CommitmentPacket]:
+        """ Create and store the unsigned transfer commitment packet for the ownership utxo
+        """
+        cp_meta = self._transfer_template_metadata(orignal_cp_meta, actor, network, utxo)
+        self.commitment_store.add_commitment(cp_meta)
+
+        # move the token id to the new owner in the token_store
+        # Return commitment packet
+        return (cp_meta.commitment_packet.get_cpid(), cp_meta.commitment_packet)
+
+    def _transfer_template_metadata(self, orignal_cp_meta: CommitmentPacketMetadata, actor: str, network: str, utxo: Tuple[Any, Any]) -> CommitmentPacketMetadata:
+        """ Create the unsigned transfer commitment packet for the ownership utxo
+        """
+        (vin, utxo_tx) = utxo
 
         # Create commitment packet
 
@@ -587,39 +1292,130 @@ class CommitmentService:
                     commitment_packet_id=cpid,
                     commitment_packet=cp,
                 )
+        return cp_meta
 
-        self.commitment_store.add_commitment(cp_meta)
+    def _handover_value(self, cp_meta: CommitmentPacketMetadata, ownership_tx: Tx) -> int:
+        """ The satoshis of the packet's ownership output left for the new owner after the handover fee
+        """
+        # A P2PKH input, the new owner's P2PKH output and an OP_RETURN of a cpid
+        fee = math.ceil((10 + 148 + 34 + 44) * self.handover_fee_rate)
+        return ownership_tx.tx_outs[self._ownership_outpoint(cp_meta).prev_index].amount - fee
 
-        # move the token id to the new owner in the token_store
-        # Return commitment packet
-        return (cpid, cp)
+    def _can_hand_over(self, cp_meta: CommitmentPacketMetadata, network: str) -> bool:
+        """ Return True if a transfer of this BSV packet can be completed by handing over its ownership
+            outpoint, the ownership output must be able to pay the handover fee
+        """
+        if not self.handover_transfers or network != "BSV" or cp_meta.commitment_packet.blockchain_id != "BSV":
+            return False
+        ownership_tx = self._ownership_txs([cp_meta])[0]
+        return ownership_tx is not None and self._handover_value(cp_meta, ownership_tx) > 0
 
-    def can_complete_transfer(self, cpid: str, actor: str) -> bool:
-        return self.commitment_store.can_complete_transfer(cpid, actor)
+    async def _async_can_hand_over(self, cp_meta: CommitmentPacketMetadata, network: str) -> bool:
+        if not self.handover_transfers or network != "BSV" or cp_meta.commitment_packet.blockchain_id != "BSV":
+            return False
+        ownership_tx = (await self._async_ownership_txs([cp_meta]))[0]
+        return ownership_tx is not None and self._handover_value(cp_meta, ownership_tx) > 0
 
-    def complete_transfer(self, cpid: str, actor: str) -> None | Tuple[Cpid, CommitmentPacket]:
-        """ Complete Commitment Packet Template
+    def _is_handover(self, transfer_cp_meta: CommitmentPacketMetadata, previous_cp_meta: CommitmentPacketMetadata) -> bool:
+        """ A handover template has the previous packet's outpoint, and no ownership tx, until it is completed
         """
-        assert self.is_known_cpid(cpid)
-        assert self.is_known_actor(actor)
-        assert self.can_complete_transfer(cpid, actor)
+        return transfer_cp_meta.ownership_tx is None and \
+            transfer_cp_meta.commitment_packet.blockchain_outpoint == previous_cp_meta.commitment_packet.blockchain_outpoint
 
-        # Check the signature on the template is correct
-        # Owner to complete template
-        transfer_cp_meta = self.commitment_store.get_metadata_by_cpid(cpid)
-        if transfer_cp_meta is None:
-            print(f"Unable to find cpid {cpid}")
+    def _sign_handover_tx(self, actor: str, transfer_cp_meta: CommitmentPacketMetadata, previous_cp_meta: CommitmentPacketMetadata,
+                          ownership_tx: None | Tx) -> None | Tx:
+        """ Return the tx that spends the previous packet's outpoint to the new owner's ownership output,
+            with an OP_RETURN of the previous cpid
+        """
+        if ownership_tx is None:
+            print("Unable to find utxo")
             return None
-        # TODO: what fields need to be updated?
-
-        # Update the orignal commitment to show that it is now transferred
-        previous_cp_meta = self.commitment_store.get_metadata_by_cpid(transfer_cp_meta.commitment_packet.previous_packet)
-        if previous_cp_meta is None:
-            print(f"Unable to find cpid {cpid} of previous packet")
+        value = self._handover_value(previous_cp_meta, ownership_tx)
+        if value <= 0:
+            print(f"The ownership output of {previous_cp_meta.commitment_packet_id} cannot pay the handover fee")
             return None
-        if previous_cp_meta.state != CommitmentStatus.Created:
-            print(f"Previous CP in state {previous_cp_meta.state} ")
+        tx_outs = [
+            TxOut(amount=value, script_pubkey=self.actors_wallets[transfer_cp_meta.owner].get_locking_script()),
+            self._op_return_output(bytes.fromhex(previous_cp_meta.commitment_packet.get_cpid())),
+        ]
+        handover_tx = Tx(version=1, tx_ins=[self._ownership_outpoint(previous_cp_meta)], tx_outs=tx_outs)
+        signed_handover_tx = self.actors_wallets[actor].sign_tx_with_input(0, ownership_tx, handover_tx)
+        if signed_handover_tx is None:
+            print("Sign handover tx failed")
+        return signed_handover_tx
+
+    def _start_handover(self, actor: str, transfer_cp_meta: CommitmentPacketMetadata, previous_cp_meta: CommitmentPacketMetadata,
+                        ownership_tx: None | Tx) -> None | Tx:
+        """ Sign the handover tx and store the transfer as Transferring, returns the tx to broadcast
+        """
+        handover_tx = self._sign_handover_tx(actor, transfer_cp_meta, previous_cp_meta, ownership_tx)
+        if handover_tx is None or self._record_handover(actor, transfer_cp_meta, previous_cp_meta, handover_tx) is None:
             return None
+        return handover_tx
+
+    def _record_handover(self, actor: str, transfer_cp_meta: CommitmentPacketMetadata, previous_cp_meta: CommitmentPacketMetadata,
+                         handover_tx: Tx) -> None | Tuple[Cpid, CommitmentPacket]:
+        """ Give the transfer packet the first output of the signed handover tx as its ownership outpoint,
+            which fixes its cpid, then sign it and store the transfer as Transferring before the tx is broadcast
+        """
+        with self.commitment_store.lock:
+            if previous_cp_meta.state != CommitmentStatus.Created:
+                print(f"Previous CP in state {previous_cp_meta.state} ")
+                return None
+            template_cpid = transfer_cp_meta.commitment_packet_id
+            assert template_cpid is not None
+            transfer_cp_meta.commitment_packet.blockchain_outpoint = f"{handover_tx.id()}:0"
+            cpid = transfer_cp_meta.commitment_packet.get_cpid()
+            self.commitment_store.change_cpid(transfer_cp_meta, cpid)
+            transfer_cp_meta.ownership_tx = tx_to_hexstr(handover_tx)
+            result = None
+            try:
+                result = self._complete_transfer(cpid, actor, transfer_cp_meta, previous_cp_meta, handover_tx, CommitmentStatus.Transferring)
+            finally:
+                if result is None:
+                    self._revert_handover(transfer_cp_meta, previous_cp_meta, template_cpid)
+            return result
+
+    def _handover_broadcast(self, template_cpid: Cpid, transfer_cp_meta: CommitmentPacketMetadata, previous_cp_meta: CommitmentPacketMetadata,
+                            accepted: bool) -> None | Tuple[Cpid, CommitmentPacket]:
+        """ Record the handover as Transferred when its tx was accepted, otherwise revert it
+        """
+        with self.commitment_store.lock:
+            if not accepted:
+                print(f"Unable to broadcast the handover tx of {template_cpid}")
+                self._revert_handover(transfer_cp_meta, previous_cp_meta, template_cpid)
+                return None
+            previous_cp_meta.state = CommitmentStatus.Transferred
+            self.commitment_store.update_commitment(previous_cp_meta)
+        return (transfer_cp_meta.commitment_packet.get_cpid(), transfer_cp_meta.commitment_packet)
+
+    def _revert_handover(self, transfer_cp_meta: CommitmentPacketMetadata, previous_cp_meta: CommitmentPacketMetadata, template_cpid: Cpid):
+        """ Undo _record_handover, the template has the previous packet's outpoint and its own cpid again
+        """
+        with self.commitment_store.lock:
+            self.commitment_store.change_cpid(transfer_cp_meta, template_cpid)
+            transfer_cp_meta.commitment_packet.blockchain_outpoint = previous_cp_meta.commitment_packet.blockchain_outpoint
+            transfer_cp_meta.ownership_tx = None
+            if previous_cp_meta.spending_tx is not None:
+                # The packet was signed and the token moved
+                self._revert_transfer(transfer_cp_meta, previous_cp_meta)
+            else:
+                self.commitment_store.update_commitment(transfer_cp_meta)
+
+    def can_complete_transfer(self, cpid: str, actor: str) -> bool:
+        if not self.commitment_store.can_complete_transfer(cpid, actor):
+            return False
+        cp = self.commitment_store.get_commitment_by_cpid(cpid)
+        assert cp is not None and cp.previous_packet is not None
+        return not self._is_outpoint_spent(cp.previous_packet)
+
+    def complete_transfer(self, cpid: str, actor: str) -> None | Tuple[Cpid, CommitmentPacket]:
+        """ Complete Commitment Packet Template
+        """
+        packets = self._transfer_to_complete(cpid, actor)
+        if packets is None:
+            return None
+        (transfer_cp_meta, previous_cp_meta) = packets
 
         # Create a spending tx
         network = previous_cp_meta.commitment_packet.blockchain_id
@@ -629,33 +1425,386 @@ class CommitmentService:
         if network == "BSV":
             outpoint = hexstr_to_txin(outpoint)
             ownership_tx = hexstr_to_tx(previous_cp_meta.ownership_tx)
-            spending_tx = self.spend_ownership_tx(actor, network, outpoint, ownership_tx, transfer_cp_meta.commitment_packet_id)
-        elif network == "ETH":
-            spending_tx = self.spend_ownership_tx_eth(actor, outpoint, transfer_cp_meta.commitment_packet_id)
+            if self._is_handover(transfer_cp_meta, previous_cp_meta):
+                # The handover tx fixes the transfer's cpid, the transfer is stored with it before the broadcast
+                handover_tx = self._start_handover(actor, transfer_cp_meta, previous_cp_meta, self._ownership_txs([previous_cp_meta])[0])
+                if handover_tx is None:
+                    return None
+                return self._handover_broadcast(Cpid(cpid), transfer_cp_meta, previous_cp_meta, self._broadcast_tx(handover_tx) is not None)
+            if self.broadcast_queue.enabled:
+                if ownership_tx is None:
+                    ownership_tx = self._get_tx(Txid(outpoint.prev_tx))
+                return self._queue_transfer(cpid, actor, transfer_cp_meta, previous_cp_meta, outpoint, ownership_tx)
+            spending_tx = self.spend_ownership_tx(actor, network, outpoint, ownership_tx, Cpid(cpid))
         else:
-            print(f"Unknown network {network}")
+            spending_tx = self.spend_ownership_tx_eth(actor, outpoint, Cpid(cpid))
+        if spending_tx is None:
+            print(f"Unable to spend outpoint {outpoint} on {network}")
             return None
+        return self._complete_transfer(cpid, actor, transfer_cp_meta, previous_cp_meta, spending_tx)
+
+    async def async_complete_transfer(self, cpid: str, actor: str) -> None | Tuple[Cpid, CommitmentPacket]:
+        """ As complete_transfer, without blocking on the broadcast of the spending tx.
+            The checks, signing and store writes run on a worker thread.
+        """
+        packets = await asyncio.to_thread(self._transfer_to_complete, cpid, actor)
+        if packets is None:
+            return None
+        (transfer_cp_meta, previous_cp_meta) = packets
+
+        network = previous_cp_meta.commitment_packet.blockchain_id
+        outpoint = previous_cp_meta.commitment_packet.blockchain_outpoint
+        assert outpoint is not None
+
+        if network == "BSV":
+            ownership_tx = hexstr_to_tx(previous_cp_meta.ownership_tx)
+            if self._is_handover(transfer_cp_meta, previous_cp_meta):
+                ownership_txs = await self._async_ownership_txs([previous_cp_meta])
+                handover_tx = await asyncio.to_thread(self._start_handover, actor, transfer_cp_meta, previous_cp_meta, ownership_txs[0])
+                if handover_tx is None:
+                    return None
+                accepted = await self._async_broadcast_tx(handover_tx) is not None
+                return await asyncio.to_thread(self._handover_broadcast, Cpid(cpid), transfer_cp_meta, previous_cp_meta, accepted)
+            if self.broadcast_queue.enabled:
+                txin = hexstr_to_txin(outpoint)
+                if ownership_tx is None:
+                    ownership_tx = await self._async_get_tx(Txid(txin.prev_tx))
+                return await asyncio.to_thread(self._queue_transfer, cpid, actor, transfer_cp_meta, previous_cp_meta, txin, ownership_tx)
+            spending_tx = await self.async_spend_ownership_tx(actor, network, hexstr_to_txin(outpoint), ownership_tx, Cpid(cpid))
+        else:
+            spending_tx = await self.async_spend_ownership_tx_eth(actor, outpoint, Cpid(cpid))
         if spending_tx is None:
             print(f"Unable to spend outpoint {outpoint} on {network}")
             return None
+        return await asyncio.to_thread(self._complete_transfer, cpid, actor, transfer_cp_meta, previous_cp_meta, spending_tx)
+
+    def _transfer_to_complete(self, cpid: str, actor: str) -> None | Tuple[CommitmentPacketMetadata, CommitmentPacketMetadata]:
+        """ Check that the actor can complete the transfer, returns the transfer and previous packet metadata.
+            The checks are made under the store lock, and repeated there when the transfer is recorded.
+        """
+        with self.commitment_store.lock:
+            assert self.is_known_cpid(cpid)
+            assert self.is_known_actor(actor)
+            assert self.can_complete_transfer(cpid, actor)
+
+            # Check the signature on the template is correct
+            # Owner to complete template
+            transfer_cp_meta = self.commitment_store.get_metadata_by_cpid(cpid)
+            if transfer_cp_meta is None:
+                print(f"Unable to find cpid {cpid}")
+                return None
+            # TODO: what fields need to be updated?
+
+            # Update the orignal commitment to show that it is now transferred
+            previous_cp_meta = self.commitment_store.get_metadata_by_cpid(transfer_cp_meta.commitment_packet.previous_packet)
+            if previous_cp_meta is None:
+                print(f"Unable to find cpid {cpid} of previous packet")
+                return None
+            if previous_cp_meta.state != CommitmentStatus.Created:
+                print(f"Previous CP in state {previous_cp_meta.state} ")
+                return None
+            if previous_cp_meta.commitment_packet.blockchain_id not in ("BSV", "ETH"):
+                print(f"Unknown network {previous_cp_meta.commitment_packet.blockchain_id}")
+                return None
+            return (transfer_cp_meta, previous_cp_meta)
+
+    def _batch_transfers(self, cpids: List[str], actor: str) -> None | List[Tuple[CommitmentPacketMetadata, CommitmentPacketMetadata, TxIn]]:
+        """ Return the transfer and previous packet metadata and the outpoint to spend for each cpid,
+            None if any of the transfers cannot be completed in the batch
+        """
+        if len(cpids) == 0 or len(cpids) > self.batch_max_size:
+            print(f"A batch must have between 1 and {self.batch_max_size} transfers, not {len(cpids)}")
+            return None
+        if len(set(cpids)) != len(cpids):
+            print("The batch has duplicate transfers")
+            return None
+        with self.commitment_store.lock:
+            transfers = []
+            for cpid in cpids:
+                if not self.is_known_cpid(cpid) or not self.can_complete_transfer(cpid, actor):
+                    print(f"Unable to complete transfer {cpid}")
+                    return None
+                transfer_cp_meta = self.commitment_store.get_metadata_by_cpid(cpid)
+                assert transfer_cp_meta is not None
+                previous_cp_meta = self.commitment_store.get_metadata_by_cpid(transfer_cp_meta.commitment_packet.previous_packet)
+                if previous_cp_meta is None or previous_cp_meta.state != CommitmentStatus.Created:
+                    print(f"Unable to find the previous packet of {cpid} in state Created")
+                    return None
+                if previous_cp_meta.commitment_packet.blockchain_id != "BSV":
+                    print(f"Only BSV transfers can be completed in a batch, {cpid} is on {previous_cp_meta.commitment_packet.blockchain_id}")
+                    return None
+                if self._is_handover(transfer_cp_meta, previous_cp_meta):
+                    print(f"The handover transfer {cpid} must be completed on its own")
+                    return None
+                outpoint = previous_cp_meta.commitment_packet.blockchain_outpoint
+                assert outpoint is not None
+                transfers.append((transfer_cp_meta, previous_cp_meta, hexstr_to_txin(outpoint)))
+            return transfers
+
+    def complete_transfers(self, cpids: List[str], actor: str) -> None | List[Tuple[Cpid, CommitmentPacket]]:
+        """ Complete a batch of BSV transfers with one tx that spends each previous packet's outpoint.
+            Either all the transfers are completed or none are.
+        """
+        transfers = self._batch_transfers(cpids, actor)
+        if transfers is None:
+            return None
+        return self._complete_batch(actor, transfers, self._ownership_txs([previous_cp_meta for (_, previous_cp_meta, _) in transfers]))
+
+    async def async_complete_transfers(self, cpids: List[str], actor: str) -> None | List[Tuple[Cpid, CommitmentPacket]]:
+        """ As complete_transfers, without blocking on the broadcast of the spending tx
+        """
+        transfers = await asyncio.to_thread(self._batch_transfers, cpids, actor)
+        if transfers is None:
+            return None
+        ownership_txs = await self._async_ownership_txs([previous_cp_meta for (_, previous_cp_meta, _) in transfers])
+        return await self._async_complete_batch(actor, transfers, ownership_txs)
+
+    async def _async_complete_batch(self, actor: str, transfers: List[Tuple[CommitmentPacketMetadata, CommitmentPacketMetadata, TxIn]],
+                                    ownership_txs: List[None | Tx]) -> None | List[Tuple[Cpid, CommitmentPacket]]:
+        """ As _complete_batch, without blocking on the broadcast of the spending tx
+        """
+        if self.broadcast_queue.enabled:
+            return await asyncio.to_thread(self._complete_batch, actor, transfers, ownership_txs)
+        spending_tx = await asyncio.to_thread(self._sign_batch, actor, transfers, ownership_txs)
+        if spending_tx is None:
+            return None
+        if await self._async_broadcast_tx(spending_tx) is None:
+            print("Unable to broadcast the batch spending tx")
+            return None
+        return await asyncio.to_thread(self._apply_batch, actor, transfers, spending_tx, CommitmentStatus.Transferred)
+
+    def _bulk_transfers(self, cpids: List[str], from_actor: str, to_actor: str) -> None | List[CommitmentPacketMetadata]:
+        """ Return the metadata of each commitment to move, None if any of them cannot be moved.
+            _apply_batch checks again that they are not transferred meanwhile.
+        """
+        if len(cpids) == 0 or len(cpids) > self.batch_max_size:
+            print(f"A bulk transfer must have between 1 and {self.batch_max_size} commitments, not {len(cpids)}")
+            return None
+        if len(set(cpids)) != len(cpids):
+            print("The bulk transfer has duplicate commitments")
+            return None
+        with self.commitment_store.lock:
+            cp_metas = []
+            for cpid in cpids:
+                if not self.is_known_cpid(cpid) or not self.commitment_store.can_transfer(cpid, from_actor, is_owner=True) \
+                        or not self.can_transfer(cpid, to_actor, is_owner=False):
+                    print(f"Unable to transfer {cpid} from {from_actor} to {to_actor}")
+                    return None
+                cp_meta = self.commitment_store.get_metadata_by_cpid(cpid)
+                assert cp_meta is not None
+                if cp_meta.commitment_packet.blockchain_id != "BSV":
+                    print(f"Only BSV commitments can be transferred in bulk, {cpid} is on {cp_meta.commitment_packet.blockchain_id}")
+                    return None
+                cp_metas.append(cp_meta)
+            return cp_metas
+
+    def _bulk_templates(self, to_actor: str, cp_metas: List[CommitmentPacketMetadata],
+                        utxos: List[Tuple[TxIn, None | Tx]]) -> None | List[Tuple[CommitmentPacketMetadata, CommitmentPacketMetadata, TxIn]]:
+        """ Add a transfer template for each commitment to the store, without saving it,
+            and return the batch to complete
+        """
+        if len(utxos) < len(cp_metas):
+            print(f"Unable to fund the {len(cp_metas)} ownership outpoints of the bulk transfer")
+            return None
+        templates = [self._transfer_template_metadata(cp_meta, to_actor, "BSV", utxo) for (cp_meta, utxo) in zip(cp_metas, utxos)]
+        self.commitment_store.add_commitments(templates, save=False)
+        return [
+            (template, cp_meta, self._ownership_outpoint(cp_meta))
+            for (template, cp_meta) in zip(templates, cp_metas)
+        ]
+
+    def _keep_templates(self, result: None | List[Tuple[Cpid, CommitmentPacket]]) -> None | List[Tuple[Cpid, CommitmentPacket]]:
+        if result is None:
+            # Completing saves the store, otherwise the templates are saved to be completed later
+            print("Unable to complete the bulk transfer, its templates can be completed with /commitments/complete/batch")
+            self.commitment_store.save()
+        return result
+
+    def transfer_commitments(self, cpids: List[str], from_actor: str, to_actor: str) -> None | List[Tuple[Cpid, CommitmentPacket]]:
+        """ Move a batch of BSV commitments from one actor to another in one job. The new ownership
+            outpoints are funded by one request, then the templates are created and completed with one
+            spending tx, as /commitments/template and /commitments/complete/batch would.
+            Either all the commitments are moved or none are.
+        """
+        assert self.is_known_actor(from_actor)
+        assert self.is_known_actor(to_actor)
+        cp_metas = self._bulk_transfers(cpids, from_actor, to_actor)
+        if cp_metas is None:
+            return None
+        utxos = self._bsv_create_ownership_txs(to_actor, len(cp_metas))
+        ownership_txs = self._ownership_txs(cp_metas)
+        transfers = self._bulk_templates(to_actor, cp_metas, utxos)
+        if transfers is None:
+            return None
+        return self._keep_templates(self._complete_batch(from_actor, transfers, ownership_txs))
+
+    async def async_transfer_commitments(self, cpids: List[str], from_actor: str, to_actor: str) -> None | List[Tuple[Cpid, CommitmentPacket]]:
+        """ As transfer_commitments, without blocking on the financing service or the broadcast
+        """
+        assert self.is_known_actor(from_actor)
+        assert self.is_known_actor(to_actor)
+        cp_metas = await asyncio.to_thread(self._bulk_transfers, cpids, from_actor, to_actor)
+        if cp_metas is None:
+            return None
+        utxos = await self._async_bsv_create_ownership_txs(to_actor, len(cp_metas))
+        ownership_txs = await self._async_ownership_txs(cp_metas)
+        transfers = await asyncio.to_thread(self._bulk_templates, to_actor, cp_metas, utxos)
+        if transfers is None:
+            return None
+        result = await self._async_complete_batch(from_actor, transfers, ownership_txs)
+        return await asyncio.to_thread(self._keep_templates, result)
 
+    def _sign_batch(self, actor: str, transfers: List[Tuple[CommitmentPacketMetadata, CommitmentPacketMetadata, TxIn]],
+                    ownership_txs: List[None | Tx]) -> None | Tx:
+        if any(ownership_tx is None for ownership_tx in ownership_txs):
+            print("Unable to find utxo")
+            return None
+        return self._sign_batch_spending_tx(
+            self.actors_wallets[actor], [outpoint for (_, _, outpoint) in transfers],
+            [ownership_tx for ownership_tx in ownership_txs if ownership_tx is not None],
+            [transfer_cp_meta.commitment_packet.get_cpid() for (transfer_cp_meta, _, _) in transfers])
+
+    def _complete_batch(self, actor: str, transfers: List[Tuple[CommitmentPacketMetadata, CommitmentPacketMetadata, TxIn]],
+                        ownership_txs: List[None | Tx]) -> None | List[Tuple[Cpid, CommitmentPacket]]:
+        """ Sign and broadcast, or queue, the batch spending tx and record the transfers
+        """
+        spending_tx = self._sign_batch(actor, transfers, ownership_txs)
+        if spending_tx is None:
+            return None
+        if not self.broadcast_queue.enabled:
+            if self._broadcast_tx(spending_tx) is None:
+                print("Unable to broadcast the batch spending tx")
+                return None
+            return self._apply_batch(actor, transfers, spending_tx, CommitmentStatus.Transferred)
+
+        result = self._apply_batch(actor, transfers, spending_tx, CommitmentStatus.Transferring)
+        if result is None:
+            return None
+        cpids = [cpid for (cpid, _) in result]
+
+        def on_broadcast(txid: str, broadcast_result: BroadcastResult, detail: str):
+            for cpid in cpids:
+                self._on_transfer_broadcast(cpid, txid, broadcast_result, detail)
+
+        if not self.broadcast_queue.submit(spending_tx.id(), spending_tx.serialize().hex(), on_broadcast):
+            print(f"Unable to queue the broadcast of {spending_tx.id()}, the broadcast queue is full")
+            for (transfer_cp_meta, previous_cp_meta, _) in transfers:
+                self._revert_transfer(transfer_cp_meta, previous_cp_meta)
+            return None
+        return result
+
+    def _apply_batch(self, actor: str, transfers: List[Tuple[CommitmentPacketMetadata, CommitmentPacketMetadata, TxIn]],
+                     spending_tx: Tx, state: CommitmentStatus) -> None | List[Tuple[Cpid, CommitmentPacket]]:
+        """ Sign the transfer packets and record all the transfers of the batch as spent by
+            the spending tx, saving the token store and the commitment store once
+        """
+        # Copies are signed, the packets are only changed if the batch is recorded
+        packets = self._sign_packets(actor, [transfer_cp_meta.commitment_packet.model_copy() for (transfer_cp_meta, _, _) in transfers])
+        moves: List[Tuple[str, str, str, str]] = []
+        updated: List[CommitmentPacketMetadata] = []
+        with self.commitment_store.lock:
+            if any(previous_cp_meta.state != CommitmentStatus.Created for (_, previous_cp_meta, _) in transfers):
+                # Completed by another request while this one was signing or broadcasting
+                print("A transfer of the batch is no longer in state Created")
+                return None
+            for ((transfer_cp_meta, previous_cp_meta, _), cp) in zip(transfers, packets):
+                transfer_cp_meta.commitment_packet = cp
+                moves.append((previous_cp_meta.owner, transfer_cp_meta.owner, cp.data, cp.get_cpid()))
+                previous_cp_meta.state = state
+                previous_cp_meta.spending_tx = tx_to_hexstr(spending_tx)
+                updated += [transfer_cp_meta, previous_cp_meta]
+            for ((previous_owner, owner, token_id, cpid), moved) in zip(moves, token_store.assign_tokens_to_new_actors(moves)):
+                if not moved:
+                    print(f'Could not transfer token store ownership from {previous_owner} to {owner} with token_id -> {token_id} and CPID -> {cpid}')
+            self.commitment_store.update_commitments(updated)
+        return [(transfer_cp_meta.commitment_packet.get_cpid(), transfer_cp_meta.commitment_packet) for (transfer_cp_meta, _, _) in transfers]
+
+    def _queue_transfer(self, cpid: str, actor: str, transfer_cp_meta: CommitmentPacketMetadata, previous_cp_meta: CommitmentPacketMetadata,
+                        outpoint: TxIn, ownership_tx: None | Tx) -> None | Tuple[Cpid, CommitmentPacket]:
+        """ Record the transfer as Transferring and queue the broadcast of its spending tx,
+            the transfer is Transferred when the broadcast is accepted and reverted if it fails
+        """
+        if ownership_tx is None:
+            print("Unable to find utxo")
+            return None
+        spending_tx = self._sign_spending_tx(self.actors_wallets[actor], outpoint, ownership_tx, Cpid(cpid))
+        if spending_tx is None:
+            return None
+        result = self._complete_transfer(cpid, actor, transfer_cp_meta, previous_cp_meta, spending_tx, CommitmentStatus.Transferring)
+        if result is None:
+            return None
+        callback = functools.partial(self._on_transfer_broadcast, cpid)
+        if not self.broadcast_queue.submit(spending_tx.id(), spending_tx.serialize().hex(), callback):
+            print(f"Unable to queue the broadcast of {spending_tx.id()}, the broadcast queue is full")
+            self._revert_transfer(transfer_cp_meta, previous_cp_meta)
+            return None
+        return result
+
+    def _on_transfer_broadcast(self, cpid: str, txid: str, result: BroadcastResult, detail: str):
+        """ Called by the broadcast queue when the spending tx of the transfer is accepted or fails
+        """
+        with self.commitment_store.lock:
+            transfer_cp_meta = self.commitment_store.get_metadata_by_cpid(cpid)
+            if transfer_cp_meta is None:
+                return
+            previous_cp_meta = self.commitment_store.get_metadata_by_cpid(transfer_cp_meta.commitment_packet.previous_packet)
+            if previous_cp_meta is None or previous_cp_meta.state != CommitmentStatus.Transferring or hexstr_to_txid(previous_cp_meta.spending_tx) != txid:
+                # No longer waiting for this broadcast
+                return
+            if result == BroadcastResult.Accepted:
+                assert previous_cp_meta.spending_tx is not None
+                self.tx_cache.add(previous_cp_meta.spending_tx)
+                previous_cp_meta.state = CommitmentStatus.Transferred
+                self.commitment_store.update_commitment(previous_cp_meta)
+            else:
+                print(f"Reverting transfer {cpid}, the broadcast of {txid} was {result.value}, {detail}")
+                self._revert_transfer(transfer_cp_meta, previous_cp_meta)
+
+    def _revert_transfer(self, transfer_cp_meta: CommitmentPacketMetadata, previous_cp_meta: CommitmentPacketMetadata):
+        """ Undo _complete_transfer, so that the owner can complete the transfer again
+        """
+        with self.commitment_store.lock:
+            if not token_store.assign_to_new_actor(transfer_cp_meta.owner, previous_cp_meta.owner, transfer_cp_meta.commitment_packet.data, previous_cp_meta.commitment_packet.get_cpid()):
+                print(f'Could not return token store ownership from {transfer_cp_meta.owner} to {previous_cp_meta.owner} with token_id -> {transfer_cp_meta.commitment_packet.data}')
+            transfer_cp_meta.commitment_packet.signature = None
+            previous_cp_meta.state = CommitmentStatus.Created
+            previous_cp_meta.spending_tx = None
+            # One save, so that the transfer is never left half reverted
+            self.commitment_store.update_commitments([transfer_cp_meta, previous_cp_meta])
+
+    def _complete_transfer(self, cpid: str, actor: str, transfer_cp_meta: CommitmentPacketMetadata, previous_cp_meta: CommitmentPacketMetadata,
+                           spending_tx: Any, state: CommitmentStatus = CommitmentStatus.Transferred) -> None | Tuple[Cpid, CommitmentPacket]:
+        """ Sign the transfer packet and record the spend of the previous packet's outpoint
+        """
+        with self.commitment_store.lock:
+            if previous_cp_meta.state != CommitmentStatus.Created:
+                # Completed by another request while this one was signing or broadcasting
+                print(f"Previous CP in state {previous_cp_meta.state} ")
+                return None
+            if not self._apply_transfer(actor, transfer_cp_meta, previous_cp_meta, spending_tx, state):
+                return None
+            self.commitment_store.update_commitments([transfer_cp_meta, previous_cp_meta])
+        return (Cpid(cpid), transfer_cp_meta.commitment_packet)
+
+    def _apply_transfer(self, actor: str, transfer_cp_meta: CommitmentPacketMetadata, previous_cp_meta: CommitmentPacketMetadata,
+                        spending_tx: Any, state: CommitmentStatus) -> bool:
+        """ Sign the transfer packet and move the token, without saving the commitment store
+        """
+        network = previous_cp_meta.commitment_packet.blockchain_id
+        if network not in ("BSV", "ETH"):
+            print(f"Unknown network {network}")
+            return False
         # Sign commitment packet
         transfer_cp_meta.commitment_packet = self.sign_commitment_packet(actor, transfer_cp_meta.commitment_packet)
-        self.commitment_store.update_commitment(transfer_cp_meta)
         # Transfer token ownership
         if not token_store.assign_to_new_actor(previous_cp_meta.owner, transfer_cp_meta.owner, transfer_cp_meta.commitment_packet.data, transfer_cp_meta.commitment_packet.get_cpid()):
             print(f'Could not transfer token store ownership from {previous_cp_meta.owner} to {transfer_cp_meta.owner} with token_id -> {transfer_cp_meta.commitment_packet.data} and CPID -> {transfer_cp_meta.commitment_packet.get_cpid()}')
-        previous_cp_meta.state = CommitmentStatus.Transferred
-        if previous_cp_meta.commitment_packet.blockchain_id == "BSV":
+        previous_cp_meta.state = state
+        if network == "BSV":
             previous_cp_meta.spending_tx = tx_to_hexstr(spending_tx) if spending_tx is not None else None
-        elif previous_cp_meta.commitment_packet.blockchain_id == "ETH":
-            previous_cp_meta.spending_tx = spending_tx if spending_tx is not None else None
         else:
-            print(f"Unknown network { previous_cp_meta.commitment_packet.blockchain_id}")
-            return None
-        self.commitment_store.update_commitment(previous_cp_meta)
-
-        return (Cpid(cpid), transfer_cp_meta.commitment_packet)
+            previous_cp_meta.spending_tx = spending_tx if spending_tx is not None else None
+        return True
 
 
 commitment_service = CommitmentService()
@@ -5,11 +5,16 @@ if __name__ == '__main__':
     sys.path.insert(0, os.path.join(sys.path[0], ".."))
     from commitment_packet import CommitmentPacketMetadata, CommitmentPacket, CommitmentStatus, Cpid, CommitmentType
     from service.util import is_unit_test
+    from service.owned_commitment_view import OwnedCommitmentView
+    from service.packet_codec import DecodeError, encode_store, decode_store, is_encoded_store
 else:
     from service.commitment_packet import CommitmentPacketMetadata, CommitmentPacket, CommitmentStatus, Cpid, CommitmentType
     from service.util import is_unit_test
+    from service.owned_commitment_view import OwnedCommitmentView
+    from service.packet_codec import DecodeError, encode_store, decode_store, is_encoded_store
 
 import json
+import threading
 from typing import List, Tuple
 
 from config import ConfigType
@@ -18,25 +23,52 @@ from config import ConfigType
 class CommitmentStore:
     def __init__(self):
         self.filepath: str = ""
+        # "json" or "binary", the format the store is saved in, either is loaded
+        self.format: str = "json"
         self.commitments: List[CommitmentPacketMetadata] = []
+        # Per actor view of owned commitments, joined with the token store
+        self.owned_view = OwnedCommitmentView()
+        # Held by each write, and by the commitment service around a change of several records and the
+        # token store, as broadcast callbacks and the issuance batcher write from background threads
+        self.lock = threading.RLock()
+
+    def _rebuild_owned_view(self):
+        self.owned_view.reset_commitments()
+        for cp_meta in self.commitments:
+            self.owned_view.commitment_changed(cp_meta)
 
     def set_config(self, config: ConfigType):
         self.filepath = config["commitment_store"]["filepath"]
+        self.format = config["commitment_store"].get("format", "json")
+        if self.format not in ("json", "binary"):
+            raise ValueError(f"Unknown commitment store format '{self.format}', expected 'json' or 'binary'")
 
     def save(self) -> bool:
-        # Convert to something we can write out
-        serialisable_commitments = [c.model_dump() for c in self.commitments]
-        with open(self.filepath, 'w') as f:
-            json.dump(serialisable_commitments, f, indent=4)
+        with self.lock:
+            if self.format == "binary":
+                with open(self.filepath, 'wb') as f:
+                    f.write(encode_store(self.commitments))
+                return True
+            # Convert to something we can write out
+            serialisable_commitments = [c.model_dump() for c in self.commitments]
+            with open(self.filepath, 'w') as f:
+                json.dump(serialisable_commitments, f, indent=4)
         return True
 
     def load(self) -> bool:
         print("Loading commitments from", self.filepath)
+        # A record that fails validation is raised, so that the next save cannot overwrite the store without it
         try:
-            with open(self.filepath, 'r') as f:
-                serial_data = json.load(f)
-            self.commitments = [CommitmentPacketMetadata.model_validate(cp) for cp in serial_data]
-        except (FileNotFoundError, json.JSONDecodeError) as e:
+            with open(self.filepath, 'rb') as f:
+                contents = f.read()
+            # Load either format, so changing the format converts the store on the next save
+            if is_encoded_store(contents):
+                self.commitments = decode_store(contents)
+            else:
+                serial_data = json.loads(contents)
+                self.commitments = [CommitmentPacketMetadata.model_validate(cp) for cp in serial_data]
+            self._rebuild_owned_view()
+        except (FileNotFoundError, json.JSONDecodeError, DecodeError) as e:
             # Got fed up of this printing during unit tests
             if not is_unit_test():
                 print(e)
@@ -47,6 +79,7 @@ class CommitmentStore:
         """ Erase all stored info - for testing
         """
         self.commitments = []
+        self.owned_view.reset_commitments()
 
     def get_metadata_by_cpid(self, cpid: str) -> None | CommitmentPacketMetadata:
         for cp_meta in self.commitments:
@@ -77,30 +110,72 @@ class CommitmentStore:
         assert meta is not None
         return meta.owner == actor
 
-    def get_transfers_by_actor(self, actor: str) -> List[Cpid]:
+    def get_transfers_by_actor(self, actor: str) -> List[Tuple[None | Cpid, CommitmentPacket]]:
         """ Get Commitment Transfers of this actor's Commitments
         """
         # Find all transfer packets that have not been completed
         # Check to see if actor held previous packet
         # If so record transfer packet
         return [
-            [c.commitment_packet_id, c.commitment_packet] for c in self.commitments
+            (c.commitment_packet_id, c.commitment_packet) for c in self.commitments
             if c.owner != actor and c.type == CommitmentType.Transfer and c.state == CommitmentStatus.Created and c.commitment_packet.signature is None and self._is_owner(actor, c.commitment_packet.previous_packet)
         ]
 
     def add_commitment(self, cp_meta: CommitmentPacketMetadata):
-        self.commitments.append(cp_meta)
-        self.save()
+        with self.lock:
+            self.commitments.append(cp_meta)
+            self.owned_view.commitment_changed(cp_meta)
+            self.save()
+
+    def add_commitments(self, cp_metas: List[CommitmentPacketMetadata], save: bool = True):
+        """ Add each of the commitments and save the store once, or leave the
+            save to the caller's next update
+        """
+        with self.lock:
+            for cp_meta in cp_metas:
+                self.commitments.append(cp_meta)
+                self.owned_view.commitment_changed(cp_meta)
+            if save:
+                self.save()
 
     def update_commitment(self, cp_meta: CommitmentPacketMetadata):
-        i = self.get_index_by_cpid(cp_meta.commitment_packet_id)
-        assert i is not None
-        self.commitments[i] = cp_meta
-        self.save()
+        with self.lock:
+            i = self.get_index_by_cpid(cp_meta.commitment_packet_id)
+            assert i is not None
+            self.commitments[i] = cp_meta
+            self.owned_view.commitment_changed(cp_meta)
+            self.save()
+
+    def change_cpid(self, cp_meta: CommitmentPacketMetadata, cpid: Cpid):
+        """ Give a commitment in the store a new cpid, the caller saves it with its next update
+        """
+        with self.lock:
+            self.owned_view.commitment_removed(cp_meta.commitment_packet_id)
+            cp_meta.commitment_packet_id = cpid
+
+    def update_commitments(self, cp_metas: List[CommitmentPacketMetadata]):
+        """ Update each of the commitments and save the store once
+        """
+        with self.lock:
+            indexes = {cp_meta.commitment_packet_id: i for (i, cp_meta) in enumerate(self.commitments)}
+            for cp_meta in cp_metas:
+                i = indexes[cp_meta.commitment_packet_id]
+                self.commitments[i] = cp_meta
+                self.owned_view.commitment_changed(cp_meta)
+            self.save()
 
     def is_commitment_unique(self, asset_id: str, asset_data: str, network: str) -> bool:
         return not any(map(lambda x: x.is_match(asset_id, asset_data, network, CommitmentStatus.Created), self.commitments))
 
+    def are_commitments_unique(self, issuances: List[Tuple[str, str]], network: str) -> List[bool]:
+        """ is_commitment_unique for each (asset_id, asset_data), in one pass over the store
+        """
+        existing = set(
+            (cp_meta.commitment_packet.asset_id, cp_meta.commitment_packet.data) for cp_meta in self.commitments
+            if cp_meta.commitment_packet.blockchain_id == network and cp_meta.state == CommitmentStatus.Created
+        )
+        return [issuance not in existing for issuance in issuances]
+
     def is_known_cpid(self, cpid: str) -> bool:
         return any(map(lambda x: x.commitment_packet_id == cpid, self.commitments))
 
@@ -111,6 +186,10 @@ class CommitmentStore:
                 # Cannot transfer transferred packet - that is a packet in transferred state
                 if cp_meta.state != CommitmentStatus.Created:
                     return False
+                # Cannot transfer until the broadcast that transferred it to this owner is accepted
+                previous = self.get_metadata_by_cpid(cp_meta.commitment_packet.previous_packet) if cp_meta.commitment_packet.previous_packet is not None else None
+                if previous is not None and previous.state == CommitmentStatus.Transferring:
+                    return False
                 # Cannot transfer to self
                 if cp_meta.owner == actor:
                     return is_owner
@@ -1,9 +1,17 @@
+import asyncio
 import requests
 import logging
 import time
+import aiohttp
 from packaging import version
-from typing import Any, Dict
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, Tuple
+from urllib3.util.retry import Retry
 from config import ConfigType
+from service.async_http import AsyncHttpSession
+from service.blockchain_client import AsyncBlockchainClient
+from service.metrics import metrics
+from service.util import hexstr_to_txid, get_raw_transaction_uncached
 
 LOGGER = logging.getLogger(__name__)
 
@@ -18,11 +26,112 @@ class FinancingService:
     def __init__(self):
         self.service_url: str
         self.client_id: str
+        # Timeouts (seconds) for each request, /status is expected to respond quickly
+        self.connect_timeout: float = 3.0
+        self.read_timeout: float = 30.0
+        self.status_read_timeout: float = 1.0
+        # Retries of idempotent (GET) requests, with exponential backoff
+        self.retries: int = 3
+        self.retry_backoff: float = 0.1
+        self.pool_size: int = 10
+        self.session = self._create_session()
+        # Used to check that funding txs are visible before they are spent
+        self.blockchain_interface: Any = None
+        # Return funding txs without waiting for them to be visible
+        self.accept_unconfirmed: bool = False
+        # Exponential backoff (seconds) while waiting for a funding tx to be visible, the first
+        # delay keeps the polls of a rate limited backend, such as WhatsOnChain, to a few per funding
+        self.visibility_initial_delay: float = 0.15
+        self.visibility_max_delay: float = 1.0
+        self.visibility_timeout: float = 2.0
 
     def set_config(self, config: ConfigType):
         """ Given the configuration, configure this service"""
         self.service_url = config["finance_service"]["url"]
         self.client_id = config["finance_service"]["client_id"]
+        self.accept_unconfirmed = config["finance_service"].get("accept_unconfirmed", self.accept_unconfirmed)
+        self.visibility_timeout = config["finance_service"].get("visibility_timeout", self.visibility_timeout)
+        self.connect_timeout = config["finance_service"].get("connect_timeout", self.connect_timeout)
+        self.read_timeout = config["finance_service"].get("read_timeout", self.read_timeout)
+        self.status_read_timeout = config["finance_service"].get("status_read_timeout", self.status_read_timeout)
+        self.retries = config["finance_service"].get("retries", self.retries)
+        self.retry_backoff = config["finance_service"].get("retry_backoff", self.retry_backoff)
+        self.pool_size = config["finance_service"].get("pool_size", self.pool_size)
+        self.session.close()
+        self.session = self._create_session()
+
+    def _create_session(self) -> requests.Session:
+        """ Return a session that keeps connections to the financing service alive.
+            GET requests are retried on connection errors and 502/503/504 responses,
+            POST /fund requests are only retried if the connection was never made.
+        """
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.retry_backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _request(self, method: str, endpoint: str, path: str, read_timeout: None | float = None) -> requests.Response:
+        """ Make a request to the financing service, recording the latency of the endpoint
+        """
+        timeout = (self.connect_timeout, read_timeout or self.read_timeout)
+        with metrics.timer(f"finance_service.{endpoint}"):
+            try:
+                return self.session.request(method, self.service_url + path, timeout=timeout)
+            except requests.RequestException:
+                metrics.increment(f"finance_service.{endpoint}.errors")
+                raise FinancingServiceException("ConnectionError connecting to finance service. Check that the finance service is running.")
+
+    def set_blockchain_interface(self, blockchain_interface: Any):
+        self.blockchain_interface = blockchain_interface
+
+    def _is_tx_visible(self, txid: str) -> bool:
+        try:
+            return get_raw_transaction_uncached(self.blockchain_interface, txid) is not None
+        except Exception:
+            # Not found, or the interface is unavailable, either way keep waiting
+            return False
+
+    def _visibility_skipped(self, txid: str) -> bool:
+        """ Record that the wait for a funding tx was skipped, as there is no blockchain interface
+        """
+        metrics.increment("funding_tx_visibility_skipped")
+        LOGGER.warning(f"funding tx {txid} is not checked for visibility, there is no blockchain interface")
+        return False
+
+    def is_tx_visible(self, txid: str) -> bool:
+        """ Check once, without waiting, that the funding tx is visible through the blockchain interface
+        """
+        if self.blockchain_interface is None:
+            self._visibility_skipped(txid)
+            return True
+        return self._is_tx_visible(txid)
+
+    def wait_for_tx(self, txid: str) -> bool:
+        """ Wait, with exponential backoff, until the tx is visible through the blockchain interface.
+            Returns False if it is still not visible after the timeout.
+        """
+        if self.blockchain_interface is None:
+            return self._visibility_skipped(txid)
+        start = time.perf_counter()
+        delay = self.visibility_initial_delay
+        while not self._is_tx_visible(txid):
+            remaining = self.visibility_timeout - (time.perf_counter() - start)
+            if remaining <= 0:
+                metrics.increment("funding_tx_visibility_timeouts")
+                LOGGER.warning(f"funding tx {txid} is not visible after {self.visibility_timeout}s")
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.visibility_max_delay)
+        metrics.observe("funding_tx_visibility_wait", time.perf_counter() - start)
+        return True
 
     def _check_version(self, data: Dict[str, Any]):
         """ Throw exception if Financing service is version is below MIN_VERSION
@@ -42,17 +151,13 @@ class FinancingService:
         """ Return the status of the funding service
         """
         data = None
-        try:
-            response = requests.get(self.service_url + "/status", timeout=1.0)
-        except:
-            raise FinancingServiceException("ConnectionError connecting to finance service. Check that the finance service is running.")
+        response = self._request("GET", "status", "/status", self.status_read_timeout)
+        if response.status_code == 200:
+            data = response.json()
+            LOGGER.debug(f"data = {data}")
+            self._check_version(data)
         else:
-            if response.status_code == 200:
-                data = response.json()
-                LOGGER.debug(f"data = {data}")
-                self._check_version(data)
-            else:
-                LOGGER.debug(f"response = {response}")
+            LOGGER.debug(f"response = {response}")
         return data
 
     def get_balance(self) -> None | Dict[str, Any]:
@@ -60,37 +165,133 @@ class FinancingService:
         """
         data = None
         id = self.client_id
-        try:
-            response = requests.get(self.service_url + f"/balance/{id}")
-        except:
-            raise FinancingServiceException("ConnectionError connecting to finance service. Check that the finance service is running.")
+        response = self._request("GET", "balance", f"/balance/{id}")
+        if response.status_code == 200:
+            data = response.json()
+            LOGGER.debug(f"data = {data}")
         else:
-            if response.status_code == 200:
-                data = response.json()
-                LOGGER.debug(f"data = {data}")
-            else:
-                LOGGER.debug(f"response = {response}")
+            LOGGER.debug(f"response = {response}")
         return data
 
-    def get_funds(self, fee_estimate: int, locking_script: str) -> None | Dict[str, Any]:
+    def get_funds(self, fee_estimate: int, locking_script: str, accept_unconfirmed: None | bool = None) -> None | Dict[str, Any]:
         """ Get the funds for one tx
         """
-        return self._get_funds(fee_estimate, locking_script, 1, False)
+        return self._get_funds(fee_estimate, locking_script, 1, False, accept_unconfirmed)
 
-    def _get_funds(self, fee_estimate: int, locking_script: str, no_of_outpoints: int, multiple_tx: bool) -> None | Dict[str, Any]:
-        """ Underlying get_funds call
+    def _get_funds(self, fee_estimate: int, locking_script: str, no_of_outpoints: int, multiple_tx: bool, accept_unconfirmed: None | bool = None) -> None | Dict[str, Any]:
+        """ Underlying get_funds call. Unless unconfirmed inputs are accepted, this waits
+            for the funding tx to be visible so that it can be spent straight away.
         """
-        # Convert to lower case string for url
-        mult_tx = "true" if multiple_tx else "false"
-        id = self.client_id
-        url = self.service_url + f"/fund/{id}/{fee_estimate}/{no_of_outpoints}/{mult_tx}/{locking_script}"
-        response = requests.post(url)
+        response = self._request("POST", "fund", self._fund_path(fee_estimate, locking_script, no_of_outpoints, multiple_tx))
         data = None
         if response.status_code == 200:
             data = response.json()
             LOGGER.debug(f"data = {data}")
-            # Delay so that we can see the transaction
-            time.sleep(0.5)
+            txid = self._tx_to_wait_for(data, accept_unconfirmed)
+            if txid is not None:
+                self.wait_for_tx(txid)
         else:
             LOGGER.debug(f"response = {response}")
         return data
+
+    def _fund_path(self, fee_estimate: int, locking_script: str, no_of_outpoints: int, multiple_tx: bool) -> str:
+        # Convert to lower case string for url
+        mult_tx = "true" if multiple_tx else "false"
+        id = self.client_id
+        return f"/fund/{id}/{fee_estimate}/{no_of_outpoints}/{mult_tx}/{locking_script}"
+
+    def _tx_to_wait_for(self, data: Dict[str, Any], accept_unconfirmed: None | bool) -> None | str:
+        """ Return the txid of the funding tx, unless the caller accepts unconfirmed inputs
+        """
+        if accept_unconfirmed is None:
+            accept_unconfirmed = self.accept_unconfirmed
+        if accept_unconfirmed or data.get('status') != "Success":
+            return None
+        return hexstr_to_txid(data.get('tx'))
+
+
+class AsyncFinancingService:
+    """ Async interface to the Financing Service, which shares the configuration of
+        the FinancingService and checks funding txs through the AsyncBlockchainClient
+    """
+    def __init__(self, finance_service: FinancingService, blockchain_client: AsyncBlockchainClient):
+        self.finance_service = finance_service
+        self.blockchain_client = blockchain_client
+        self.http = AsyncHttpSession(finance_service.pool_size)
+
+    async def _request(self, method: str, endpoint: str, path: str, read_timeout: None | float = None) -> Tuple[int, Any]:
+        """ Make a request to the financing service, returns the status and the json data.
+            Requests are retried as the FinancingService session retries them.
+        """
+        config = self.finance_service
+        timeout = aiohttp.ClientTimeout(sock_connect=config.connect_timeout, sock_read=read_timeout or config.read_timeout)
+        session = await self.http.get()
+        attempt = 0
+        with metrics.timer(f"finance_service.{endpoint}"):
+            while True:
+                try:
+                    async with session.request(method, config.service_url + path, timeout=timeout) as response:
+                        if method != "GET" or response.status not in (502, 503, 504) or attempt >= config.retries:
+                            data = await response.json(content_type=None) if response.status == 200 else None
+                            return (response.status, data)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    # Only retry requests that are idempotent or were never sent
+                    if attempt >= config.retries or not (method == "GET" or isinstance(e, aiohttp.ClientConnectorError)):
+                        metrics.increment(f"finance_service.{endpoint}.errors")
+                        raise FinancingServiceException("ConnectionError connecting to finance service. Check that the finance service is running.")
+                attempt += 1
+                await asyncio.sleep(config.retry_backoff * 2 ** (attempt - 1))
+
+    async def get_status(self) -> None | Dict[str, Any]:
+        """ Return the status of the funding service
+        """
+        (status, data) = await self._request("GET", "status", "/status", self.finance_service.status_read_timeout)
+        if status == 200:
+            self.finance_service._check_version(data)
+        return data
+
+    async def get_balance(self) -> None | Dict[str, Any]:
+        """ Return the balance for our client_id
+        """
+        (_, data) = await self._request("GET", "balance", f"/balance/{self.finance_service.client_id}")
+        return data
+
+    async def get_funds(self, fee_estimate: int, locking_script: str, accept_unconfirmed: None | bool = None) -> None | Dict[str, Any]:
+        """ Get the funds for one tx
+        """
+        return await self._get_funds(fee_estimate, locking_script, 1, False, accept_unconfirmed)
+
+    async def _get_funds(self, fee_estimate: int, locking_script: str, no_of_outpoints: int, multiple_tx: bool, accept_unconfirmed: None | bool = None) -> None | Dict[str, Any]:
+        """ Underlying get_funds call, as FinancingService._get_funds
+        """
+        path = self.finance_service._fund_path(fee_estimate, locking_script, no_of_outpoints, multiple_tx)
+        (status, data) = await self._request("POST", "fund", path)
+        if status == 200:
+            LOGGER.debug(f"data = {data}")
+            txid = self.finance_service._tx_to_wait_for(data, accept_unconfirmed)
+            if txid is not None:
+                await self.wait_for_tx(txid)
+        return data
+
+    async def wait_for_tx(self, txid: str) -> bool:
+        """ Wait, with exponential backoff, until the tx is visible through the blockchain client.
+            Returns False if it is still not visible after the timeout.
+        """
+        config = self.finance_service
+        if self.blockchain_client.blockchain_interface is None:
+            return config._visibility_skipped(txid)
+        start = time.perf_counter()
+        delay = config.visibility_initial_delay
+        while await self.blockchain_client.get_raw_transaction(txid) is None:
+            remaining = config.visibility_timeout - (time.perf_counter() - start)
+            if remaining <= 0:
+                metrics.increment("funding_tx_visibility_timeouts")
+                LOGGER.warning(f"funding tx {txid} is not visible after {config.visibility_timeout}s")
+                return False
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, config.visibility_max_delay)
+        metrics.observe("funding_tx_visibility_wait", time.perf_counter() - start)
+        return True
+
+    async def close(self):
+        await self.http.close()
@@ -0,0 +1,133 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+from config import ConfigType
+from service.metrics import metrics
+
+# (asset_id, asset_data) of an issuance waiting for its batch
+IssuanceRequest = Tuple[str, str]
+# Anchors an actor's batch, returns the result of each request
+AnchorFunction = Callable[[str, List[IssuanceRequest]], List[Any]]
+
+
+class PendingBatch:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests: List[IssuanceRequest] = []
+        self.futures: List[Future] = []
+
+
+class IssuanceBatcher:
+    """ Collects each actor's BSV issuances over a time window and anchors them together
+        on a background thread. A batch is anchored `window` seconds after its first
+        issuance, or as soon as it has max_size issuances.
+    """
+    def __init__(self):
+        self.enabled: bool = False
+        # Seconds from the first issuance of a batch until it is anchored
+        self.window: float = 1.0
+        self.max_size: int = 1000
+        # Satoshis per byte for the tx that splits a batch's funding into ownership outputs
+        self.fee_rate: float = 0.5
+        self.anchor_function: None | AnchorFunction = None
+        self.lock = threading.Condition()
+        # actor -> batch collecting issuances
+        self.pending: Dict[str, PendingBatch] = {}
+        # Full batches waiting to be anchored
+        self.ready: List[Tuple[str, PendingBatch]] = []
+        self.stopped = threading.Event()
+        self.thread: None | threading.Thread = None
+
+    def set_config(self, config: ConfigType):
+        batch_config = config.get("issuance_batch", {})
+        self.enabled = batch_config.get("enabled", False)
+        self.window = batch_config.get("window", self.window)
+        self.max_size = batch_config.get("max_size", self.max_size)
+        self.fee_rate = batch_config.get("fee_rate", self.fee_rate)
+        if self.max_size < 1:
+            raise ValueError(f"issuance_batch max_size must be at least 1, not {self.max_size}")
+
+    def set_anchor_function(self, anchor_function: AnchorFunction):
+        self.anchor_function = anchor_function
+
+    def start(self):
+        if self.thread is None:
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._run, name="issuance_batcher", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """ Stop the thread, anchoring the batches that are waiting
+        """
+        self.stopped.set()
+        with self.lock:
+            self.lock.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+    def depth(self) -> int:
+        with self.lock:
+            batches = list(self.pending.values()) + [batch for (_, batch) in self.ready]
+            return sum(len(batch.requests) for batch in batches)
+
+    def submit(self, actor: str, asset_id: str, asset_data: str) -> Future:
+        """ Add the issuance to the actor's batch, the future is set to its result once the batch is anchored
+        """
+        future: Future = Future()
+        with self.lock:
+            batch = self.pending.setdefault(actor, PendingBatch())
+            batch.requests.append((asset_id, asset_data))
+            batch.futures.append(future)
+            if len(batch.requests) >= self.max_size:
+                # Later issuances start a new batch
+                self.ready.append((actor, self.pending.pop(actor)))
+                self.lock.notify_all()
+            elif len(batch.requests) == 1:
+                self.lock.notify_all()
+        return future
+
+    def flush(self):
+        """ Anchor every waiting batch now
+        """
+        with self.lock:
+            batches = self.ready + list(self.pending.items())
+            (self.ready, self.pending) = ([], {})
+        for (actor, batch) in batches:
+            self._anchor(actor, batch)
+
+    def _take_due(self, now: float) -> List[Tuple[str, PendingBatch]]:
+        due = [(actor, batch) for (actor, batch) in self.pending.items() if now >= batch.started + self.window]
+        for (actor, _) in due:
+            del self.pending[actor]
+        (due, self.ready) = (self.ready + due, [])
+        return due
+
+    def _anchor(self, actor: str, batch: PendingBatch):
+        assert self.anchor_function is not None
+        metrics.increment("issuance_batcher.batches")
+        metrics.increment("issuance_batcher.issuances", len(batch.requests))
+        try:
+            with metrics.timer("issuance_batcher.anchor"):
+                results = self.anchor_function(actor, batch.requests)
+        except Exception as e:
+            print(f"Unable to anchor the batch of {len(batch.requests)} issuances for {actor}, {e!r}")
+            results = [None] * len(batch.requests)
+        for (future, result) in zip(batch.futures, results):
+            future.set_result(result)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            with self.lock:
+                due = self._take_due(time.monotonic())
+                if len(due) == 0:
+                    # Wait for the next batch to be due, or for an issuance to start or fill a batch
+                    deadlines = [batch.started + self.window for batch in self.pending.values()]
+                    timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                    self.lock.wait(timeout)
+                    continue
+            for (actor, batch) in due:
+                self._anchor(actor, batch)
@@ -0,0 +1,52 @@
+import hashlib
+from typing import List, Tuple
+
+
+def sha256d(data: bytes) -> bytes:
+    """ Double SHA256, as used for Bitcoin Merkle trees
+    """
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def merkle_root(leaves: List[bytes]) -> bytes:
+    """ Return the Merkle root of the leaves, each level pairs adjacent nodes and
+        an odd node is paired with itself, as in a Bitcoin block
+    """
+    if len(leaves) == 0:
+        raise ValueError("Unable to create a Merkle root of no leaves")
+    level = [sha256d(leaf) for leaf in leaves]
+    while len(level) > 1:
+        if len(level) % 2 == 1:
+            level.append(level[-1])
+        level = [sha256d(level[i] + level[i + 1]) for i in range(0, len(level), 2)]
+    return level[0]
+
+
+def merkle_proofs(leaves: List[bytes]) -> Tuple[bytes, List[List[bytes]]]:
+    """ Return the Merkle root and, for each leaf, the sibling hashes from the leaf to the root.
+        The tree is built once, so proving every leaf is O(n log n).
+    """
+    if len(leaves) == 0:
+        raise ValueError("Unable to create a Merkle root of no leaves")
+    level = [sha256d(leaf) for leaf in leaves]
+    paths: List[List[bytes]] = [[] for _ in leaves]
+    # Index of each leaf's node in the current level
+    positions = list(range(len(leaves)))
+    while len(level) > 1:
+        if len(level) % 2 == 1:
+            level.append(level[-1])
+        for (leaf, position) in enumerate(positions):
+            paths[leaf].append(level[position ^ 1])
+            positions[leaf] = position // 2
+        level = [sha256d(level[i] + level[i + 1]) for i in range(0, len(level), 2)]
+    return (level[0], paths)
+
+
+def verify_merkle_proof(leaf: bytes, index: int, path: List[bytes], root: bytes) -> bool:
+    """ Return True if the sibling hashes lead from the leaf at index to the root
+    """
+    node = sha256d(leaf)
+    for sibling in path:
+        node = sha256d(sibling + node) if index & 1 else sha256d(node + sibling)
+        index >>= 1
+    return index == 0 and node == root
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator
+from contextlib import contextmanager
+
+# Number of recent observations kept for the latency percentiles
+LATENCY_WINDOW = 1024
+
+
+class LatencyMetric:
+    """ Count, total and recent percentiles of a duration in seconds
+    """
+    def __init__(self):
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.recent: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def get_status(self) -> Dict[str, Any]:
+        recent = sorted(self.recent)
+
+        def percentile(p: float) -> None | float:
+            return recent[min(len(recent) - 1, int(p * len(recent)))] if len(recent) > 0 else None
+
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count > 0 else None,
+            "max": self.max,
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+        }
+
+
+class Metrics:
+    """ Process wide counters, gauges and latencies, reported by the /metrics endpoint
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.latencies: Dict[str, LatencyMetric] = {}
+
+    def increment(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value: float):
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        with self.lock:
+            if name not in self.latencies:
+                self.latencies[name] = LatencyMetric()
+            self.latencies[name].observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """ Observe the duration of the with block
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def reset(self):
+        """ Erase all metrics - for testing
+        """
+        with self.lock:
+            self.counters = {}
+            self.gauges = {}
+            self.latencies = {}
+
+    def get_status(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "latencies": {name: latency.get_status() for (name, latency) in self.latencies.items()},
+            }
+
+
+metrics = Metrics()
@@ -0,0 +1,80 @@
+from typing import Dict, List, Tuple
+
+from service.commitment_packet import CommitmentPacket, CommitmentPacketMetadata, Cpid
+
+
+class OwnedCommitmentView:
+    """ Pre-joined, incrementally maintained view of the commitments owned by each actor.
+        A commitment is in the view when it has no spending tx and the token store
+        has its token assigned to the same actor with a matching cpid.
+    """
+    def __init__(self):
+        # cpid -> (owner, packet) for commitments without a spending tx
+        self.live: Dict[str, Tuple[str, CommitmentPacket]] = {}
+        # cpid -> actor the token store has assigned the token (with this cpid) to
+        self.token_holders: Dict[str, str] = {}
+        # actor -> cpid -> packet, the joined view
+        self.owned: Dict[str, Dict[Cpid, CommitmentPacket]] = {}
+        # cpid -> actor, where the cpid currently sits in self.owned
+        self.owned_by: Dict[str, str] = {}
+
+    def _rejoin(self, cpid: str):
+        """ Recompute the view entry for this cpid
+        """
+        previous_actor = self.owned_by.pop(cpid, None)
+        if previous_actor is not None:
+            del self.owned[previous_actor][Cpid(cpid)]
+
+        if cpid in self.live:
+            (owner, packet) = self.live[cpid]
+            if self.token_holders.get(cpid) == owner:
+                self.owned.setdefault(owner, {})[Cpid(cpid)] = packet
+                self.owned_by[cpid] = owner
+
+    def reset_commitments(self):
+        """ Drop all commitment side entries, keeping the token assignments
+        """
+        self.live = {}
+        self.owned = {}
+        self.owned_by = {}
+
+    def commitment_changed(self, cp_meta: CommitmentPacketMetadata):
+        """ Called by the commitment store when a commitment is added or updated
+        """
+        cpid = cp_meta.commitment_packet_id
+        if cpid is None:
+            return
+        if cp_meta.spending_tx is None:
+            self.live[cpid] = (cp_meta.owner, cp_meta.commitment_packet)
+        else:
+            self.live.pop(cpid, None)
+        self._rejoin(cpid)
+
+    def commitment_removed(self, cpid: None | str):
+        """ Called by the commitment store when a commitment no longer has this cpid
+        """
+        if cpid is None:
+            return
+        self.live.pop(cpid, None)
+        self._rejoin(cpid)
+
+    def token_assigned(self, actor: str, cpid: None | str):
+        """ Called by the token store when a token with this cpid is assigned to an actor
+        """
+        if not cpid:
+            return
+        self.token_holders[cpid] = actor
+        self._rejoin(cpid)
+
+    def token_unassigned(self, cpid: None | str):
+        """ Called by the token store when a token with this cpid leaves an actor
+        """
+        if not cpid:
+            return
+        self.token_holders.pop(cpid, None)
+        self._rejoin(cpid)
+
+    def owned_by_actor(self, actor: str) -> List[Tuple[Cpid, CommitmentPacket]]:
+        """ Return the live commitments whose token is assigned to this actor
+        """
+        return list(self.owned.get(actor, {}).items())
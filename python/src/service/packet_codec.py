@@ -0,0 +1,342 @@
+""" Compact, versioned binary encoding of CommitmentPacket and CommitmentPacketMetadata.
+
+    All lengths and integers are unsigned LEB128 varints. Each optional string field is a
+    tag byte followed by its payload, so hex strings (keys, signatures, cpids, transactions)
+    are stored as raw bytes rather than text and every value round-trips exactly:
+
+        TAG_NONE      no payload
+        TAG_UTF8      varint length, utf-8 bytes
+        TAG_HEX       varint length, bytes (the field was lowercase hex)
+        TAG_OUTPOINT  32 byte txid, varint index (the field was "<txid>:<index>")
+
+    packet   = version u8, asset_id, data, previous_packet, signature, signature_scheme,
+               public_key, blockchain_outpoint, blockchain_id
+    metadata = version u8, owner, type u8, state u8, ownership_tx, spending_tx,
+               commitment_packet_id, varint length, packet, anchor
+    anchor   = u8 0 for none, or u8 1, txid, root, varint index, varint count, each path hash
+    store    = MAGIC, version u8, then a varint length and metadata for each record
+    list     = LIST_MAGIC, version u8, then a cpid and a varint length and packet for each item
+
+    Metadata is written as METADATA_VERSION, version 1 metadata has no anchor and is still read.
+"""
+from typing import Any, Dict, List, Sequence, Tuple
+
+from service.commitment_packet import AnchorProof, CommitmentPacket, CommitmentPacketMetadata, CommitmentStatus, CommitmentType
+
+CODEC_VERSION = 1
+# Version 2 adds the anchor
+METADATA_VERSION = 2
+# Identifies a binary commitment store file, a JSON store starts with '['
+MAGIC = b"UBAC"
+# Identifies an encoded list of (cpid, packet), as returned by the API
+LIST_MAGIC = b"UBAL"
+
+TAG_NONE = 0
+TAG_UTF8 = 1
+TAG_HEX = 2
+TAG_OUTPOINT = 3
+
+
+class DecodeError(ValueError):
+    """ The data is not a valid encoding
+    """
+
+
+COMMITMENT_TYPES: List[CommitmentType] = list(CommitmentType)
+COMMITMENT_STATUSES: List[CommitmentStatus] = list(CommitmentStatus)
+
+
+def _write_varint(out: bytearray, value: int):
+    assert value >= 0
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _from_hex(value: str) -> None | bytes:
+    """ The bytes of a lowercase hex string, or None if bytes.hex() would not give back the same string
+    """
+    try:
+        raw = bytes.fromhex(value)
+    except ValueError:
+        return None
+    return raw if raw.hex() == value else None
+
+
+def _write_field(out: bytearray, value: None | str):
+    if value is None:
+        out.append(TAG_NONE)
+        return
+    raw = _from_hex(value)
+    if raw is not None:
+        out.append(TAG_HEX)
+        _write_varint(out, len(raw))
+        out += raw
+        return
+    (txid, separator, index) = value.partition(':')
+    if separator and len(txid) == 64 and index.isascii() and index.isdigit() and str(int(index)) == index:
+        raw = _from_hex(txid)
+        if raw is not None:
+            out.append(TAG_OUTPOINT)
+            out += raw
+            _write_varint(out, int(index))
+            return
+    encoded = value.encode('utf-8')
+    out.append(TAG_UTF8)
+    _write_varint(out, len(encoded))
+    out += encoded
+
+
+def _write_str(out: bytearray, value: str):
+    encoded = value.encode('utf-8')
+    _write_varint(out, len(encoded))
+    out += encoded
+
+
+class _Reader:
+    """ Read the encoded values from a buffer
+    """
+    def __init__(self, data: bytes, offset: int = 0):
+        self.data = data
+        self.offset = offset
+
+    def at_end(self) -> bool:
+        return self.offset >= len(self.data)
+
+    def take(self, length: int) -> bytes:
+        start = self.offset
+        self.offset = start + length
+        value = self.data[start:self.offset]
+        if len(value) != length:
+            raise DecodeError(f"Truncated data, expected {length} bytes at offset {start}")
+        return value
+
+    def u8(self) -> int:
+        # Reading past the end raises IndexError, reported as truncated data by the decode functions
+        value = self.data[self.offset]
+        self.offset += 1
+        return value
+
+    def varint(self) -> int:
+        data = self.data
+        byte = data[self.offset]
+        self.offset += 1
+        # Most lengths fit in a single byte
+        if byte < 0x80:
+            return byte
+        value = byte & 0x7F
+        shift = 7
+        while True:
+            byte = data[self.offset]
+            self.offset += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def text(self) -> str:
+        return self.take(self.varint()).decode('utf-8')
+
+    def field(self) -> None | str:
+        tag = self.data[self.offset]
+        self.offset += 1
+        if tag == TAG_HEX:
+            return self.take(self.varint()).hex()
+        if tag == TAG_NONE:
+            return None
+        if tag == TAG_OUTPOINT:
+            txid = self.take(32).hex()
+            return f"{txid}:{self.varint()}"
+        if tag == TAG_UTF8:
+            return self.text()
+        raise DecodeError(f"Unknown field tag {tag} at offset {self.offset - 1}")
+
+    def record(self, read_fn) -> Dict[str, Any]:
+        """ Read a length prefixed record in place
+        """
+        length = self.varint()
+        end = self.offset + length
+        value = read_fn(self)
+        if self.offset != end:
+            raise DecodeError(f"Record length {length} does not match its contents")
+        return value
+
+    def version(self, supported: Tuple[int, ...] = (CODEC_VERSION,)) -> int:
+        version = self.u8()
+        if version not in supported:
+            raise DecodeError(f"Unsupported encoding version {version}, expected one of {supported}")
+        return version
+
+
+def _write_packet(out: bytearray, cp: CommitmentPacket):
+    out.append(CODEC_VERSION)
+    _write_str(out, cp.asset_id)
+    _write_str(out, cp.data)
+    _write_field(out, cp.previous_packet)
+    _write_field(out, cp.signature)
+    _write_field(out, cp.signature_scheme)
+    _write_field(out, cp.public_key)
+    _write_field(out, cp.blockchain_outpoint)
+    _write_str(out, cp.blockchain_id)
+
+
+def _read_packet(reader: _Reader) -> Dict[str, Any]:
+    reader.version()
+    return {
+        "asset_id": reader.text(),
+        "data": reader.text(),
+        "previous_packet": reader.field(),
+        "signature": reader.field(),
+        "signature_scheme": reader.field(),
+        "public_key": reader.field(),
+        "blockchain_outpoint": reader.field(),
+        "blockchain_id": reader.text(),
+    }
+
+
+def _write_anchor(out: bytearray, anchor: None | AnchorProof):
+    if anchor is None:
+        out.append(0)
+        return
+    out.append(1)
+    _write_field(out, anchor.txid)
+    _write_field(out, anchor.root)
+    _write_varint(out, anchor.index)
+    _write_varint(out, len(anchor.path))
+    for sibling in anchor.path:
+        _write_field(out, sibling)
+
+
+def _read_anchor(reader: _Reader) -> None | Dict[str, Any]:
+    if reader.u8() == 0:
+        return None
+    return {
+        "txid": reader.field(),
+        "root": reader.field(),
+        "index": reader.varint(),
+        "path": [reader.field() for _ in range(reader.varint())],
+    }
+
+
+def _write_metadata(out: bytearray, cp_meta: CommitmentPacketMetadata):
+    out.append(METADATA_VERSION)
+    _write_str(out, cp_meta.owner)
+    out.append(COMMITMENT_TYPES.index(cp_meta.type))
+    out.append(COMMITMENT_STATUSES.index(cp_meta.state))
+    _write_field(out, cp_meta.ownership_tx)
+    _write_field(out, cp_meta.spending_tx)
+    _write_field(out, cp_meta.commitment_packet_id)
+    packet = encode_packet(cp_meta.commitment_packet)
+    _write_varint(out, len(packet))
+    out += packet
+    _write_anchor(out, cp_meta.anchor)
+
+
+def _read_metadata(reader: _Reader) -> Dict[str, Any]:
+    version = reader.version((CODEC_VERSION, METADATA_VERSION))
+    owner = reader.text()
+    (cp_type, state) = (reader.u8(), reader.u8())
+    if cp_type >= len(COMMITMENT_TYPES) or state >= len(COMMITMENT_STATUSES):
+        raise DecodeError(f"Unknown commitment type {cp_type} or state {state}")
+    return {
+        "owner": owner,
+        "type": COMMITMENT_TYPES[cp_type],
+        "state": COMMITMENT_STATUSES[state],
+        "ownership_tx": reader.field(),
+        "spending_tx": reader.field(),
+        "commitment_packet_id": reader.field(),
+        "commitment_packet": reader.record(_read_packet),
+        "anchor": _read_anchor(reader) if version >= METADATA_VERSION else None,
+    }
+
+
+def _decode(data: bytes, read_fn, offset: int = 0) -> Any:
+    reader = _Reader(data, offset)
+    try:
+        value = read_fn(reader)
+    except IndexError:
+        raise DecodeError(f"Truncated data at offset {reader.offset}")
+    except UnicodeDecodeError as e:
+        raise DecodeError(f"Invalid utf-8 text, {e}")
+    if not reader.at_end():
+        raise DecodeError(f"Unexpected data at offset {reader.offset}")
+    return value
+
+
+def encode_packet(cp: CommitmentPacket) -> bytes:
+    out = bytearray()
+    _write_packet(out, cp)
+    return bytes(out)
+
+
+def decode_packet(data: bytes) -> CommitmentPacket:
+    return CommitmentPacket.model_validate(_decode(data, _read_packet))
+
+
+def encode_metadata(cp_meta: CommitmentPacketMetadata) -> bytes:
+    out = bytearray()
+    _write_metadata(out, cp_meta)
+    return bytes(out)
+
+
+def decode_metadata(data: bytes) -> CommitmentPacketMetadata:
+    return CommitmentPacketMetadata.model_validate(_decode(data, _read_metadata))
+
+
+def encode_store(commitments: List[CommitmentPacketMetadata]) -> bytes:
+    """ Encode the records of a commitment store, each is length prefixed so a reader can skip them
+    """
+    out = bytearray(MAGIC)
+    out.append(CODEC_VERSION)
+    for cp_meta in commitments:
+        record = encode_metadata(cp_meta)
+        _write_varint(out, len(record))
+        out += record
+    return bytes(out)
+
+
+def is_encoded_store(data: bytes) -> bool:
+    return data[:len(MAGIC)] == MAGIC
+
+
+def _read_store(reader: _Reader) -> List[Dict[str, Any]]:
+    reader.version()
+    records: List[Dict[str, Any]] = []
+    while not reader.at_end():
+        records.append(reader.record(_read_metadata))
+    return records
+
+
+def decode_store(data: bytes) -> List[CommitmentPacketMetadata]:
+    if not is_encoded_store(data):
+        raise DecodeError("Not an encoded commitment store")
+    return [CommitmentPacketMetadata.model_validate(record) for record in _decode(data, _read_store, len(MAGIC))]
+
+
+def encode_packet_list(packets: Sequence[Tuple[None | str, CommitmentPacket]]) -> bytes:
+    """ Encode a list of (cpid, packet)
+    """
+    out = bytearray(LIST_MAGIC)
+    out.append(CODEC_VERSION)
+    for (cpid, cp) in packets:
+        _write_field(out, cpid)
+        packet = encode_packet(cp)
+        _write_varint(out, len(packet))
+        out += packet
+    return bytes(out)
+
+
+def _read_packet_list(reader: _Reader) -> List[Tuple[None | str, Dict[str, Any]]]:
+    reader.version()
+    packets: List[Tuple[None | str, Dict[str, Any]]] = []
+    while not reader.at_end():
+        cpid = reader.field()
+        packets.append((cpid, reader.record(_read_packet)))
+    return packets
+
+
+def decode_packet_list(data: bytes) -> List[Tuple[None | str, CommitmentPacket]]:
+    if data[:len(LIST_MAGIC)] != LIST_MAGIC:
+        raise DecodeError("Not an encoded packet list")
+    return [(cpid, CommitmentPacket.model_validate(packet)) for (cpid, packet) in _decode(data, _read_packet_list, len(LIST_MAGIC))]
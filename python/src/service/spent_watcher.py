@@ -0,0 +1,202 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import requests
+from tx_engine import Tx, MockInterface
+from tx_engine.interface import woc
+from tx_engine.interface.rpc_interface import RPCInterface
+from tx_engine.interface.woc_interface import WoCInterface
+
+from config import ConfigType
+from service.metrics import metrics
+
+# (network, outpoint), the outpoint is txid:index on BSV and the ownership tx hash on ETH
+Outpoint = Tuple[str, str]
+# Outpoints in each WhatsOnChain /utxos/spent request
+WOC_BULK_SIZE = 20
+WOC_TIMEOUT = (3.0, 30.0)
+
+
+def woc_outpoints_spent(post: Callable[..., Any], woc_url: str, outpoints: List[str], bulk_size: int = WOC_BULK_SIZE, timeout: Any = WOC_TIMEOUT) -> Dict[str, None | bool]:
+    """ Return whether each txid:index outpoint has been spent, None for those that could not be checked.
+        WhatsOnChain is asked about bulk_size outpoints in each request, made with post(url, json=, timeout=).
+    """
+    results: Dict[str, None | bool] = dict.fromkeys(outpoints)
+    for i in range(0, len(outpoints), bulk_size):
+        chunk = outpoints[i:i + bulk_size]
+        utxos = [{"txid": outpoint.split(":")[0], "vout": int(outpoint.split(":")[1])} for outpoint in chunk]
+        try:
+            response = post(f"{woc_url}/utxos/spent", json={"utxos": utxos}, timeout=timeout)
+        except requests.RequestException as e:
+            print(f"Unable to check outpoints, {e!r}")
+            continue
+        if response.status_code != 200:
+            print(f"Unable to check outpoints, {response.status_code} {response.text}")
+            continue
+        for item in response.json():
+            utxo = item.get("utxo", {})
+            outpoint = f"{utxo.get('txid')}:{utxo.get('vout')}"
+            if outpoint not in results:
+                continue
+            if item.get("spentIn"):
+                results[outpoint] = True
+            elif not item.get("error"):
+                results[outpoint] = False
+    return results
+
+
+def bsv_outpoint_spent(blockchain_interface: Any, outpoint: str) -> None | bool:
+    """ Return True if the txid:index outpoint has been spent, None if it could not be checked
+    """
+    (txid, index) = outpoint.split(":")
+    if isinstance(blockchain_interface, MockInterface):
+        for tx_as_hexstr in blockchain_interface.get_broadcast_txs().values():
+            if any(tx_in.prev_tx == txid and tx_in.prev_index == int(index) for tx_in in Tx.parse_hexstr(tx_as_hexstr).tx_ins):
+                return True
+        return False
+    if isinstance(blockchain_interface, RPCInterface):
+        # gettxout returns nothing for a spent output
+        return blockchain_interface.get_tx_out(txid, int(index)) is None
+    if isinstance(blockchain_interface, WoCInterface):
+        return woc_outpoints_spent(requests.post, woc.get_url(blockchain_interface.is_testnet()), [outpoint])[outpoint]
+    return None
+
+
+def bsv_outpoints_spent(blockchain_interface: Any, outpoints: List[str]) -> Dict[str, None | bool]:
+    """ Return the spent status of each outpoint, using the interface's bulk check if it has one
+        and the WhatsOnChain bulk call for a WoCInterface
+    """
+    get_spent_outpoints = getattr(blockchain_interface, "get_spent_outpoints", None)
+    if get_spent_outpoints is not None:
+        return get_spent_outpoints(outpoints)
+    if isinstance(blockchain_interface, WoCInterface):
+        return woc_outpoints_spent(requests.post, woc.get_url(blockchain_interface.is_testnet()), outpoints)
+    results: Dict[str, None | bool] = {}
+    for outpoint in outpoints:
+        try:
+            results[outpoint] = bsv_outpoint_spent(blockchain_interface, outpoint)
+        except Exception as e:
+            print(f"Unable to check outpoint {outpoint}, {e!r}")
+            results[outpoint] = None
+    return results
+
+
+class SpentWatcher:
+    """ Tracks the spent status of the live ownership outpoints in a background thread,
+        so that transfers are checked against the chain without calling it inline.
+        BSV outpoints are checked in bulk where the backend supports it, ETH UTXOs are
+        checked against the same block, and only when there is a new block.
+    """
+    def __init__(self):
+        self.enabled: bool = False
+        # Seconds between checks
+        self.interval: float = 30.0
+        self.blockchain_interface: Any = None
+        self.ethereum_service: Any = None
+        # Returns the outpoints to watch
+        self.outpoints_source: Callable[[], List[Outpoint]] = list
+        self.lock = threading.Lock()
+        self.spent: Dict[Outpoint, bool] = {}
+        self.checked_at: None | float = None
+        # Block of the last ETH check
+        self.eth_block: None | int = None
+        self.stopped = threading.Event()
+        self.thread: None | threading.Thread = None
+
+    def set_config(self, config: ConfigType):
+        watcher_config = config.get("spent_watcher", {})
+        self.enabled = watcher_config.get("enabled", False)
+        self.interval = watcher_config.get("interval", self.interval)
+
+    def set_blockchain_interface(self, blockchain_interface: Any):
+        self.blockchain_interface = blockchain_interface
+
+    def set_ethereum_service(self, ethereum_service: Any):
+        self.ethereum_service = ethereum_service
+
+    def set_outpoints_source(self, outpoints_source: Callable[[], List[Outpoint]]):
+        self.outpoints_source = outpoints_source
+
+    def start(self):
+        if self.thread is None:
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._run, name="spent_watcher", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def is_spent(self, network: str, outpoint: str) -> None | bool:
+        """ Return the last known spent status, None if the outpoint has not been checked
+        """
+        with self.lock:
+            return self.spent.get((network, outpoint))
+
+    def get_status(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "watched": len(self.spent),
+                "spent": sum(self.spent.values()),
+                "checked_at": self.checked_at,
+                "eth_block": self.eth_block,
+            }
+
+    def refresh(self):
+        """ Check the outpoints that are not known to be spent
+        """
+        # In source order, without duplicates
+        outpoints = list(dict.fromkeys(self.outpoints_source()))
+        live = set(outpoints)
+        with self.lock:
+            # Stop tracking outpoints that are no longer live
+            self.spent = {outpoint: spent for (outpoint, spent) in self.spent.items() if outpoint in live}
+            unspent = [outpoint for outpoint in outpoints if not self.spent.get(outpoint, False)]
+            unchecked = {outpoint for outpoint in outpoints if outpoint not in self.spent}
+
+        results: Dict[Outpoint, None | bool] = {}
+        bsv_outpoints = [txid_index for (network, txid_index) in unspent if network == "BSV"]
+        if len(bsv_outpoints) > 0 and self.blockchain_interface is not None:
+            with metrics.timer("spent_watcher.bsv"):
+                for (bsv_outpoint, spent) in bsv_outpoints_spent(self.blockchain_interface, bsv_outpoints).items():
+                    results[("BSV", bsv_outpoint)] = spent
+
+        eth_outpoints = [outpoint for outpoint in unspent if outpoint[0] == "ETH"]
+        if len(eth_outpoints) > 0 and self.ethereum_service is not None:
+            try:
+                block = self.ethereum_service.get_block_number()
+            except Exception as e:
+                print(f"Unable to get the ETH block number, {e!r}")
+                block = None
+            if block is not None:
+                # Nothing can have been spent without a new block
+                if block != self.eth_block:
+                    to_check = eth_outpoints
+                else:
+                    to_check = [outpoint for outpoint in eth_outpoints if outpoint in unchecked]
+                with metrics.timer("spent_watcher.eth"):
+                    statuses = self.ethereum_service.get_spent_statuses([tx_hash for (_, tx_hash) in to_check], block)
+                for (tx_hash, spent) in statuses.items():
+                    results[("ETH", tx_hash)] = spent
+                self.eth_block = block
+
+        with self.lock:
+            for (outpoint, spent) in results.items():
+                if spent is None:
+                    continue
+                if spent and not self.spent.get(outpoint, False):
+                    metrics.increment("spent_watcher.spent")
+                    print(f"Ownership outpoint {outpoint[1]} on {outpoint[0]} has been spent")
+                self.spent[outpoint] = spent
+            self.checked_at = time.time()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Spent watcher refresh failed, {e!r}")
+            self.stopped.wait(self.interval)
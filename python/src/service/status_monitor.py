@@ -0,0 +1,80 @@
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from config import ConfigType
+from service.metrics import metrics
+
+
+class StatusMonitor:
+    """ Refreshes the status of the service's dependencies in a background thread,
+        so that /status serves the last result of each check without calling them.
+    """
+    def __init__(self):
+        # Seconds between refreshes
+        self.refresh_interval: float = 10.0
+        self.checks: Dict[str, Callable[[], Any]] = {}
+        self.lock = threading.Lock()
+        # check name -> value, error and timestamps of the last refresh
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.stopped = threading.Event()
+        self.thread: None | threading.Thread = None
+
+    def set_config(self, config: ConfigType):
+        monitor_config = config.get("status_monitor", {})
+        self.refresh_interval = monitor_config.get("refresh_interval", self.refresh_interval)
+
+    def add_check(self, name: str, check: Callable[[], Any]):
+        """ Add a check, its result is None until the first refresh
+        """
+        self.checks[name] = check
+        with self.lock:
+            self.results[name] = {"value": None, "error": None, "updated_at": None, "last_success_at": None}
+
+    def start(self):
+        if self.thread is None:
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._run, name="status_monitor", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def refresh(self):
+        """ Run every check and record the results
+        """
+        for (name, check) in self.checks.items():
+            start = time.perf_counter()
+            try:
+                (value, error) = (check(), None)
+            except Exception as e:
+                (value, error) = (None, repr(e))
+            metrics.observe(f"status_check.{name}", time.perf_counter() - start)
+            now = time.time()
+            with self.lock:
+                result = self.results[name]
+                result.update(value=value, error=error, updated_at=now)
+                if error is None:
+                    result["last_success_at"] = now
+
+    def get_value(self, name: str) -> Any:
+        with self.lock:
+            return self.results[name]["value"]
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """ Return the last result of each check, with its age in seconds
+        """
+        now = time.time()
+        with self.lock:
+            return {
+                name: dict(result, age=None if result["updated_at"] is None else now - result["updated_at"])
+                for (name, result) in self.results.items()
+            }
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.refresh()
+            self.stopped.wait(self.refresh_interval)
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import time
+import ecdsa
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from service.commitment_packet import CommitmentPacket, CommitmentPacketMetadata, CommitmentStatus, CommitmentType
+from service.token_wallet import SignatureBackend, verify_signature, make_signature_backend
+
+CHECKPOINT_VERSION = 1
+REPORT_VERSION = 1
+
+VerifyError = Dict[str, str]
+# The public key and signature scheme a packet should be signed with
+Signer = Tuple[str, str]
+# (metadata as a dict, signer)
+VerifyJob = Tuple[Dict[str, Any], None | Signer]
+# (packet as a dict, signer)
+SignatureJob = Tuple[Dict[str, Any], Signer]
+
+
+def _error(cpid: None | str, check: str, message: str) -> VerifyError:
+    return {"cpid": str(cpid), "check": check, "message": message}
+
+
+def verify_packet_signature(cp: CommitmentPacket, signer: Signer, backend: None | SignatureBackend = None) -> bool:
+    """ Verify a signed packet against the signer's public key and curve,
+        with the selected backend if none is given
+    """
+    assert cp.signature is not None
+    (public_key, signature_scheme) = signer
+    curve = ecdsa.curves.curve_by_name(signature_scheme)
+    return verify_signature(cp.packet_digest(), public_key, bytes.fromhex(cp.signature), curve, hashlib.sha256, backend)
+
+
+def check_record(cp_meta: CommitmentPacketMetadata, signer: None | Signer, backend: None | SignatureBackend = None) -> List[VerifyError]:
+    """ The checks that only need this record and the key it should be signed with,
+        that the commitment_packet_id is the packet's CPID and that the signature verifies
+    """
+    errors: List[VerifyError] = []
+    cpid = cp_meta.commitment_packet_id
+    cp = cp_meta.commitment_packet
+    try:
+        computed_cpid = cp.get_cpid()
+    except AssertionError:
+        errors.append(_error(cpid, "cpid", "packet is missing fields required to calculate the CPID"))
+    else:
+        if computed_cpid != cpid:
+            errors.append(_error(cpid, "cpid", f"commitment_packet_id does not match get_cpid() {computed_cpid}"))
+
+    # Unsigned packets and missing signers are reported by the chain checks
+    if cp.signature is not None and signer is not None:
+        try:
+            is_valid = verify_packet_signature(cp, signer, backend)
+        except Exception as e:
+            errors.append(_error(cpid, "signature", f"unable to verify signature {e!r}"))
+        else:
+            if not is_valid:
+                errors.append(_error(cpid, "signature", "signature does not verify against the previous owner's public key"))
+    return errors
+
+
+def _verify_jobs(jobs: List[VerifyJob], backend_name: str) -> List[Tuple[str, List[VerifyError]]]:
+    """ Process pool entry point, verify a chunk of records
+    """
+    backend = make_signature_backend(backend_name)
+    results: List[Tuple[str, List[VerifyError]]] = []
+    for (meta, signer) in jobs:
+        cp_meta = CommitmentPacketMetadata.model_validate(meta)
+        results.append((str(cp_meta.commitment_packet_id), check_record(cp_meta, signer, backend)))
+    return results
+
+
+def _verify_signature_jobs(jobs: List[SignatureJob], backend_name: str) -> List[bool]:
+    """ Process pool entry point, verify a chunk of packet signatures
+    """
+    backend = make_signature_backend(backend_name)
+    results: List[bool] = []
+    for (packet, signer) in jobs:
+        try:
+            results.append(verify_packet_signature(CommitmentPacket.model_validate(packet), signer, backend))
+        except Exception:
+            results.append(False)
+    return results
+
+
+def run_signature_jobs(jobs: List[SignatureJob], backend_name: str, executor: None | Executor = None, chunk_size: int = 256) -> List[bool]:
+    """ Verify the packet signatures in order, in chunks on the executor if one is provided
+        and there is more than one chunk of work
+    """
+    if executor is None or len(jobs) <= chunk_size:
+        return _verify_signature_jobs(jobs, backend_name)
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    results: List[bool] = []
+    for chunk_results in executor.map(_verify_signature_jobs, chunks, [backend_name] * len(chunks)):
+        results.extend(chunk_results)
+    return results
+
+
+def check_chains(commitments: List[CommitmentPacketMetadata]) -> Tuple[List[VerifyError], int]:
+    """ Walk every commitment chain from its issuance and check the lineage and state transitions.
+        Returns the errors and the number of chains.
+    """
+    errors: List[VerifyError] = []
+    by_cpid: Dict[str, CommitmentPacketMetadata] = {}
+    children: Dict[str, List[CommitmentPacketMetadata]] = {}
+    for cp_meta in commitments:
+        cpid = cp_meta.commitment_packet_id
+        if cpid is None:
+            errors.append(_error(cpid, "lineage", "record has no commitment_packet_id"))
+            continue
+        if cpid in by_cpid:
+            errors.append(_error(cpid, "lineage", "commitment_packet_id is not unique in the store"))
+            continue
+        by_cpid[cpid] = cp_meta
+        previous = cp_meta.commitment_packet.previous_packet
+        if previous is not None:
+            children.setdefault(previous, []).append(cp_meta)
+
+    roots = [cp_meta for cp_meta in by_cpid.values() if cp_meta.commitment_packet.previous_packet is None]
+    reached = set()
+    for root in roots:
+        stack = [root]
+        while len(stack) > 0:
+            cp_meta = stack.pop()
+            visiting = str(cp_meta.commitment_packet_id)
+            if visiting in reached:
+                continue
+            reached.add(visiting)
+            errors.extend(_check_transitions(cp_meta, by_cpid, children.get(visiting, [])))
+            stack.extend(children.get(visiting, []))
+
+    for (known, cp_meta) in by_cpid.items():
+        if known not in reached:
+            errors.append(_error(known, "lineage", f"not reachable from an issuance, previous_packet {cp_meta.commitment_packet.previous_packet} is missing or cyclic"))
+    return (errors, len(roots))
+
+
+def _check_transitions(cp_meta: CommitmentPacketMetadata, by_cpid: Dict[str, CommitmentPacketMetadata], children: List[CommitmentPacketMetadata]) -> List[VerifyError]:
+    """ Check this record against its previous packet and its successors
+    """
+    errors: List[VerifyError] = []
+    cpid = cp_meta.commitment_packet_id
+    cp = cp_meta.commitment_packet
+    if cp.previous_packet is None:
+        if cp_meta.type != CommitmentType.Issuance:
+            errors.append(_error(cpid, "state", f"{cp_meta.type.value} packet has no previous packet"))
+        if cp.signature is None:
+            errors.append(_error(cpid, "signature", "issuance packet is not signed"))
+    else:
+        previous = by_cpid[cp.previous_packet]
+        if cp_meta.type != CommitmentType.Transfer:
+            errors.append(_error(cpid, "state", f"{cp_meta.type.value} packet has a previous packet"))
+        if (cp.asset_id, cp.data) != (previous.commitment_packet.asset_id, previous.commitment_packet.data):
+            errors.append(_error(cpid, "lineage", "asset_id or data differs from the previous packet"))
+        if cp.signature is None and cp_meta.state != CommitmentStatus.Created:
+            errors.append(_error(cpid, "state", f"unsigned transfer template in state {cp_meta.state.value}"))
+
+    completed = [child for child in children if child.commitment_packet.signature is not None]
+    if len(completed) > 1:
+        errors.append(_error(cpid, "state", f"spent by {len(completed)} completed transfers {[c.commitment_packet_id for c in completed]}"))
+    match cp_meta.state:
+        case CommitmentStatus.Created:
+            if len(completed) > 0:
+                errors.append(_error(cpid, "state", "has a completed transfer but is still in state Created"))
+            if cp_meta.spending_tx is not None:
+                errors.append(_error(cpid, "state", "has a spending tx but is still in state Created"))
+        case CommitmentStatus.Transferred | CommitmentStatus.Transferring:
+            if len(completed) == 0:
+                errors.append(_error(cpid, "state", f"in state {cp_meta.state.value} without a completed transfer"))
+            if cp_meta.spending_tx is None:
+                errors.append(_error(cpid, "state", f"in state {cp_meta.state.value} without a spending tx"))
+    return errors
+
+
+def packet_signer(cp: CommitmentPacket, previous: None | CommitmentPacket) -> None | Signer:
+    """ The key the packet should be signed with, the previous owner's for a transfer
+        and the packet's own for an issuance
+    """
+    signer_packet = cp if cp.previous_packet is None else previous
+    if signer_packet is None or signer_packet.public_key is None or signer_packet.signature_scheme is None:
+        return None
+    return (signer_packet.public_key, signer_packet.signature_scheme)
+
+
+def get_signer(cp_meta: CommitmentPacketMetadata, by_cpid: Dict[str, CommitmentPacketMetadata]) -> None | Signer:
+    previous = cp_meta.commitment_packet.previous_packet
+    previous_meta = by_cpid.get(previous) if previous is not None else None
+    return packet_signer(cp_meta.commitment_packet, previous_meta.commitment_packet if previous_meta is not None else None)
+
+
+def record_fingerprint(cp_meta: CommitmentPacketMetadata, signer: None | Signer) -> str:
+    """ Identify the content of a record, a record is only re-verified when this changes
+    """
+    return hashlib.sha256(bytes(cp_meta.model_dump_json() + str(signer), 'utf-8')).hexdigest()
+
+
+def load_checkpoint(filepath: str) -> Dict[str, Any]:
+    """ Load the checkpoint of a previous pass, or an empty one
+    """
+    try:
+        with open(filepath, 'r') as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("version") == CHECKPOINT_VERSION:
+            return checkpoint
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return {"version": CHECKPOINT_VERSION, "records": {}}
+
+
+def save_checkpoint(filepath: str, checkpoint: Dict[str, Any]):
+    # Write and rename so an interrupted save does not lose the previous checkpoint
+    tmp_filepath = filepath + ".tmp"
+    with open(tmp_filepath, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_filepath, filepath)
+
+
+class StoreVerifier:
+    """ Verify every record in a commitment store: the CPIDs, the signatures against the
+        previous owner's key, and the lineage and state transitions of each chain.
+        Record checks are spread over a process pool and only records that are new or
+        changed since the checkpoint are verified again.
+    """
+    def __init__(self, workers: int = 0, chunk_size: int = 256, backend_name: str = "ecdsa"):
+        # workers == 0 verifies in this process
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.backend_name = backend_name
+
+    def _run_jobs(self, jobs: List[VerifyJob]) -> List[Tuple[str, List[VerifyError]]]:
+        if self.workers == 0 or len(jobs) <= self.chunk_size:
+            return _verify_jobs(jobs, self.backend_name)
+        chunks = [jobs[i:i + self.chunk_size] for i in range(0, len(jobs), self.chunk_size)]
+        results: List[Tuple[str, List[VerifyError]]] = []
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for chunk_results in executor.map(_verify_jobs, chunks, [self.backend_name] * len(chunks)):
+                results.extend(chunk_results)
+        return results
+
+    def verify(self, commitments: List[CommitmentPacketMetadata], checkpoint: None | Dict[str, Any] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """ Verify the commitments, returning the report and the updated checkpoint
+        """
+        started = time.time()
+        previous_records: Dict[str, Any] = checkpoint["records"] if checkpoint is not None else {}
+        by_cpid = {str(c.commitment_packet_id): c for c in commitments if c.commitment_packet_id is not None}
+
+        records: Dict[str, Any] = {}
+        jobs: List[VerifyJob] = []
+        fingerprints: Dict[str, str] = {}
+        for (cpid, cp_meta) in by_cpid.items():
+            signer = get_signer(cp_meta, by_cpid)
+            fingerprint = record_fingerprint(cp_meta, signer)
+            previous = previous_records.get(cpid)
+            if previous is not None and previous["fingerprint"] == fingerprint:
+                records[cpid] = previous
+            else:
+                fingerprints[cpid] = fingerprint
+                jobs.append((cp_meta.model_dump(), signer))
+
+        for (cpid, record_errors) in self._run_jobs(jobs):
+            records[cpid] = {"fingerprint": fingerprints[cpid], "errors": record_errors}
+
+        (chain_errors, no_of_chains) = check_chains(commitments)
+        errors: List[VerifyError] = [e for record in records.values() for e in record["errors"]] + chain_errors
+        report = {
+            "version": REPORT_VERSION,
+            "started": started,
+            "duration": time.time() - started,
+            "records": len(commitments),
+            "chains": no_of_chains,
+            "verified": len(jobs),
+            "from_checkpoint": len(by_cpid) - len(jobs),
+            "valid": len(errors) == 0,
+            "errors": errors,
+        }
+        return (report, {"version": CHECKPOINT_VERSION, "records": records})
@@ -1,10 +1,11 @@
 from pydantic import BaseModel, validator
-from typing import Dict, List
+from typing import Dict, List, Sequence, Tuple
 from config import ConfigType
 import json
 import os
 
 from service.util import is_unit_test
+from service.owned_commitment_view import OwnedCommitmentView
 
 
 class token_descriptor(BaseModel):
@@ -30,6 +31,26 @@ class TokenStore:
         self.tokens: Dict = {}
         self.assigned_tokens: Dict = {}
         self.filepath: str = ""
+        # Views that are joined against the token assignments
+        self.owned_views: List[OwnedCommitmentView] = []
+
+    def add_owned_view(self, view: OwnedCommitmentView):
+        """ Register a view to be kept up to date with the token assignments
+        """
+        if view in self.owned_views:
+            return
+        self.owned_views.append(view)
+        for actor, tokens in self.assigned_tokens.items():
+            for token in tokens:
+                view.token_assigned(actor, token.cpid)
+
+    def _token_assigned(self, actor: str, cpid: None | str):
+        for view in self.owned_views:
+            view.token_assigned(actor, cpid)
+
+    def _token_unassigned(self, cpid: None | str):
+        for view in self.owned_views:
+            view.token_unassigned(cpid)
 
     def set_config(self, config: ConfigType):
         self.filepath = config["token_info"]["token_file_store"]
@@ -57,7 +78,11 @@ class TokenStore:
                             tokens_per_actor.append(token_descriptor(ipfs_cid=items["ipfs_cid"], description=items["description"], cpid=items["cpid"]))
                             if items["ipfs_cid"] in self.tokens:
                                 self.tokens.pop(items["ipfs_cid"])
+                        for token in self.assigned_tokens.get(key, []):
+                            self._token_unassigned(token.cpid)
                         self.assigned_tokens[key] = tokens_per_actor
+                        for token in tokens_per_actor:
+                            self._token_assigned(key, token.cpid)
 
         except FileNotFoundError as e:
             if not is_unit_test():
@@ -77,6 +102,22 @@ class TokenStore:
         return token_list
 
     def assign_to_actor(self, actor: str, token_id: str, cpid: str) -> bool:
+        if not self._assign(actor, token_id, cpid):
+            return False
+
+        # save the file
+        self.save()
+        return True
+
+    def assign_tokens_to_actor(self, actor: str, assignments: Sequence[Tuple[str, str]]) -> List[bool]:
+        """ Assign each (token_id, cpid) to the actor and save the file once
+        """
+        results = [self._assign(actor, token_id, cpid) for (token_id, cpid) in assignments]
+        if any(results):
+            self.save()
+        return results
+
+    def _assign(self, actor: str, token_id: str, cpid: str) -> bool:
         if token_id not in self.tokens:
             print(f'{token_id} not listed')
             return False
@@ -91,12 +132,26 @@ class TokenStore:
         else:
             actor_token_list: List = [token_to_assign]
             self.assigned_tokens[actor] = actor_token_list
+        self._token_assigned(actor, cpid)
+        return True
+
+    def assign_to_new_actor(self, prev_actor: str, new_actor: str, token_id: str, cpid: str) -> bool:
+        if not self._move(prev_actor, new_actor, token_id, cpid):
+            return False
 
         # save the file
         self.save()
         return True
 
-    def assign_to_new_actor(self, prev_actor: str, new_actor: str, token_id: str, cpid: str) -> bool:
+    def assign_tokens_to_new_actors(self, moves: Sequence[Tuple[str, str, str, str]]) -> List[bool]:
+        """ Move each (prev_actor, new_actor, token_id, cpid) and save the file once
+        """
+        results = [self._move(prev_actor, new_actor, token_id, cpid) for (prev_actor, new_actor, token_id, cpid) in moves]
+        if any(results):
+            self.save()
+        return results
+
+    def _move(self, prev_actor: str, new_actor: str, token_id: str, cpid: str) -> bool:
         if prev_actor not in self.assigned_tokens:
             print(f'("error":"actor {prev_actor} does not have any tokens")')
             return False
@@ -108,6 +163,7 @@ class TokenStore:
         token_to_move: token_descriptor = [obj for obj in self.assigned_tokens[prev_actor] if obj.ipfs_cid == token_id].pop()
         # remove from the list
         self.assigned_tokens[prev_actor].remove(token_to_move)
+        self._token_unassigned(token_to_move.cpid)
         token_to_move.cpid = cpid
 
         if new_actor in self.assigned_tokens:
@@ -115,9 +171,7 @@ class TokenStore:
         else:
             token_list: List = [token_to_move]
             self.assigned_tokens[new_actor] = token_list
-
-        # save the file
-        self.save()
+        self._token_assigned(new_actor, cpid)
         return True
 
     def return_to_pool(self, actor: str, token_id: str) -> bool:
@@ -133,6 +187,7 @@ class TokenStore:
         token_to_return: token_descriptor = [obj for obj in self.assigned_tokens[actor] if obj.ipfs_cid == token_id].pop()
         # remove from the list
         self.assigned_tokens[actor].remove(token_to_return)
+        self._token_unassigned(token_to_return.cpid)
         self.tokens[token_to_return.ipfs_cid] = token_to_return
 
         # save the file
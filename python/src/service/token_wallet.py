@@ -1,7 +1,197 @@
 import ecdsa
+import hashlib
+import functools
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+from ecdsa.ellipticcurve import PointJacobi
 from config import ConfigType
 from tx_engine import wif_to_bytes
 
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.hazmat.primitives.asymmetric.utils import Prehashed, decode_dss_signature, encode_dss_signature
+    HAS_CRYPTOGRAPHY = True
+except ImportError:
+    HAS_CRYPTOGRAPHY = False
+
+VERIFYING_KEY_CACHE_SIZE = 1024
+VERIFICATION_CACHE_SIZE = 65536
+
+# (cpid, signature, public key, signature scheme)
+VerificationKey = Tuple[str, str, str, str]
+
+
+def precompute_verifying_key(vk: ecdsa.VerifyingKey, curve: ecdsa.curves.Curve) -> ecdsa.VerifyingKey:
+    """ Precompute the multiplication tables of the verifying key, this costs a few
+        verifications up front and halves the cost of every later verification
+    """
+    # VerifyingKey.precompute() fails for keys created by from_string() as their point
+    # does not carry the curve order, so rebuild the point with the order
+    point = vk.pubkey.point
+    vk.pubkey.point = PointJacobi(curve.curve, point.x(), point.y(), 1, curve.order, generator=True)
+    vk.pubkey.point * 2
+    return vk
+
+
+class SignatureBackend(ABC):
+    """ Interface to the ECDSA implementation used to sign and verify commitment packets.
+        Signatures are the raw r || s encoding produced by the ecdsa package, and
+        a hashfunction of None means the ecdsa default of sha1.
+    """
+    name: str = ""
+
+    @abstractmethod
+    def load_signing_key(self, secret_exponent: int, curve: ecdsa.curves.Curve) -> Any:
+        pass
+
+    @abstractmethod
+    def sign(self, signing_key: Any, message: bytes, hashfunction=None) -> bytes:
+        pass
+
+    @abstractmethod
+    def load_verifying_key(self, curve: ecdsa.curves.Curve, public_key: bytes) -> Any:
+        pass
+
+    @abstractmethod
+    def verify(self, verifying_key: Any, sig: bytes, message: bytes, hashfunction=None) -> bool:
+        pass
+
+
+class EcdsaBackend(SignatureBackend):
+    """ The pure Python ecdsa package, this is the default backend
+    """
+    name = "ecdsa"
+
+    def load_signing_key(self, secret_exponent: int, curve: ecdsa.curves.Curve) -> ecdsa.SigningKey:
+        return ecdsa.SigningKey.from_secret_exponent(secret_exponent, curve=curve)
+
+    def sign(self, signing_key: ecdsa.SigningKey, message: bytes, hashfunction=None) -> bytes:
+        return signing_key.sign(message, hashfunc=hashfunction)
+
+    def load_verifying_key(self, curve: ecdsa.curves.Curve, public_key: bytes) -> ecdsa.VerifyingKey:
+        vk: ecdsa.VerifyingKey = ecdsa.VerifyingKey.from_string(public_key, curve=curve)
+        return precompute_verifying_key(vk, curve)
+
+    def verify(self, verifying_key: ecdsa.VerifyingKey, sig: bytes, message: bytes, hashfunction=None) -> bool:
+        try:
+            if verifying_key.verify(sig, message, hashfunc=hashfunction):
+                return True
+            return False
+        except ecdsa.BadSignatureError:
+            return False
+
+
+class CryptographyBackend(SignatureBackend):
+    """ The OpenSSL backed cryptography package, for the curves it supports.
+        Other curves are handled by the ecdsa backend.
+    """
+    name = "cryptography"
+
+    def __init__(self):
+        assert HAS_CRYPTOGRAPHY, "the cryptography package is not installed"
+        self.fallback = EcdsaBackend()
+        self.curves: Dict[str, Any] = {
+            "NIST192p": ec.SECP192R1,
+            "NIST224p": ec.SECP224R1,
+            "NIST256p": ec.SECP256R1,
+            "NIST384p": ec.SECP384R1,
+            "NIST521p": ec.SECP521R1,
+            "SECP256k1": ec.SECP256K1,
+        }
+        self.hashes: Dict[str, Any] = {
+            "sha1": hashes.SHA1,
+            "sha224": hashes.SHA224,
+            "sha256": hashes.SHA256,
+            "sha384": hashes.SHA384,
+            "sha512": hashes.SHA512,
+        }
+
+    def _prehash(self, message: bytes, hashfunction) -> Tuple[bytes, Any]:
+        """ Hash the message the way ecdsa does and return it with the matching algorithm
+        """
+        hasher = (hashfunction or hashlib.sha1)(message)
+        return (hasher.digest(), ec.ECDSA(Prehashed(self.hashes[hasher.name]())))
+
+    def load_signing_key(self, secret_exponent: int, curve: ecdsa.curves.Curve) -> Any:
+        if curve.name not in self.curves:
+            return self.fallback.load_signing_key(secret_exponent, curve)
+        return (curve, ec.derive_private_key(secret_exponent, self.curves[curve.name]()))
+
+    def sign(self, signing_key: Any, message: bytes, hashfunction=None) -> bytes:
+        if isinstance(signing_key, ecdsa.SigningKey):
+            return self.fallback.sign(signing_key, message, hashfunction)
+        (curve, private_key) = signing_key
+        (digest, algorithm) = self._prehash(message, hashfunction)
+        (r, s) = decode_dss_signature(private_key.sign(digest, algorithm))
+        return r.to_bytes(curve.baselen, 'big') + s.to_bytes(curve.baselen, 'big')
+
+    def load_verifying_key(self, curve: ecdsa.curves.Curve, public_key: bytes) -> Any:
+        if curve.name not in self.curves:
+            return self.fallback.load_verifying_key(curve, public_key)
+        if len(public_key) == 2 * curve.baselen:
+            # Raw x || y encoding as produced by ecdsa to_string()
+            public_key = b'\x04' + public_key
+        return (curve, ec.EllipticCurvePublicKey.from_encoded_point(self.curves[curve.name](), public_key))
+
+    def verify(self, verifying_key: Any, sig: bytes, message: bytes, hashfunction=None) -> bool:
+        if isinstance(verifying_key, ecdsa.VerifyingKey):
+            return self.fallback.verify(verifying_key, sig, message, hashfunction)
+        (curve, public_key) = verifying_key
+        if len(sig) != 2 * curve.baselen:
+            return False
+        r = int.from_bytes(sig[:curve.baselen], 'big')
+        s = int.from_bytes(sig[curve.baselen:], 'big')
+        (digest, algorithm) = self._prehash(message, hashfunction)
+        try:
+            public_key.verify(encode_dss_signature(r, s), digest, algorithm)
+            return True
+        except InvalidSignature:
+            return False
+
+
+SIGNATURE_BACKENDS: Dict[str, type] = {"ecdsa": EcdsaBackend}
+if HAS_CRYPTOGRAPHY:
+    SIGNATURE_BACKENDS["cryptography"] = CryptographyBackend
+DEFAULT_SIGNATURE_BACKEND = "ecdsa"
+
+# The process wide backend, selected once before any wallet or worker pool is created
+signature_backend: None | SignatureBackend = None
+signature_backend_lock = threading.Lock()
+
+
+def make_signature_backend(name: str) -> SignatureBackend:
+    """ Return a new backend of the given name, without selecting it
+    """
+    if name not in SIGNATURE_BACKENDS:
+        raise ValueError(f"Signature backend '{name}' is not available, expected one of {list(SIGNATURE_BACKENDS.keys())}")
+    return SIGNATURE_BACKENDS[name]()
+
+
+def set_signature_backend(name: str):
+    """ Select the backend used by TokenWallets and by verify_signature. The backend is
+        selected once, selecting it again with the same name does nothing and with
+        another name is an error, as wallets would have keys loaded by the old backend.
+    """
+    global signature_backend
+    with signature_backend_lock:
+        if signature_backend is None:
+            signature_backend = make_signature_backend(name)
+        elif signature_backend.name != name:
+            raise ValueError(f"Signature backend '{signature_backend.name}' is already selected, unable to select '{name}'")
+
+
+def get_signature_backend() -> SignatureBackend:
+    """ Return the selected backend, selecting the default if none has been
+    """
+    if signature_backend is None:
+        set_signature_backend(DEFAULT_SIGNATURE_BACKEND)
+    assert signature_backend is not None
+    return signature_backend
+
 
 class TokenWallet:
     """ This class represents the Wallet functionality for token signing
@@ -9,37 +199,53 @@ class TokenWallet:
     def __init__(self):
         self.private_key: ecdsa.SigningKey
         self.curve: ecdsa.Curve
+        # The backend and its key used for signing
+        self.backend: SignatureBackend
+        self.signing_key: Any
+        # Encoded public keys, cached when the key is set
+        self.public_key: None | str = None
+        self.public_key_bytes: None | bytes = None
 
     def set_config(self, config: ConfigType):
         """ Given the wallet configuration, set up the wallet
         """
         # Keys and addresses
-        wif_key_str = config["token_key"]
-        secret_exponent = int.from_bytes(wif_to_bytes(wif_key_str), byteorder='big')
-        token_curve_str: str = config["token_key_curve"]
-        self.signature_scheme = config["token_key_curve"]
-
-        self.curve = ecdsa.curves.curve_by_name(token_curve_str)
-        self.private_key = ecdsa.SigningKey.from_secret_exponent(secret_exponent, curve=self.curve)
+        self.set_key(config["token_key"], config["token_key_curve"])
 
-    def set_key(self, token_key: str, token_key_curve: str):
+    def set_key(self, token_key: str, token_key_curve: str, backend: None | SignatureBackend = None):
         self.signature_scheme = token_key_curve
         self.curve = ecdsa.curves.curve_by_name(token_key_curve)
         secret_exponent = int.from_bytes(wif_to_bytes(token_key), byteorder='big')
         self.private_key = ecdsa.SigningKey.from_secret_exponent(secret_exponent, curve=self.curve)
+        self.backend = backend if backend is not None else get_signature_backend()
+        self.signing_key = self.backend.load_signing_key(secret_exponent, self.curve)
+        self._precompute()
+
+    def _precompute(self):
+        """ Do the one off work when the wallet loads rather than on the first request
+        """
+        # The generator tables used for signing are built on first use, so build them now
+        self.curve.generator * 2
+        verifying_key = self.private_key.get_verifying_key()
+        self.public_key = verifying_key.to_string(encoding="compressed").hex()
+        self.public_key_bytes = verifying_key.to_string()
+        # Build the verifying key tables used to check this wallet's signatures
+        _get_verifying_key(self.backend.name, self.curve.name, self.public_key)
 
     def sign_commitment_packet_digest(self, digest_to_sign: bytes, hashfunction=None) -> bytes:
-        signature = self.private_key.sign(digest_to_sign, hashfunc=hashfunction)
+        signature = self.backend.sign(self.signing_key, digest_to_sign, hashfunction)
         return signature
 
     def get_token_public_key_bytes(self) -> bytes:
-        return self.private_key.get_verifying_key().to_string()
+        assert self.public_key_bytes is not None
+        return self.public_key_bytes
 
     def get_token_public_key_pem(self) -> str:
         return self.private_key.get_verifying_key().to_pem().hex()
 
     def get_token_public_key(self) -> str:
-        return self.private_key.get_verifying_key().to_string(encoding="compressed").hex()
+        assert self.public_key is not None
+        return self.public_key
 
     def get_signature_scheme(self) -> str:
         return self.curve.name
@@ -58,12 +264,92 @@ def verify_signature_pem(message: bytes, publickey: str, sig: bytes, hashfunctio
         return False
 
 
-def verify_signature(message: bytes, publickey: str, sig: bytes, selected_curve: ecdsa.curves.Curve = ecdsa.curves.NIST256p, hashfunction=None) -> bool:
+@functools.lru_cache(maxsize=VERIFYING_KEY_CACHE_SIZE)
+def _get_verifying_key(backend_name: str, curve_name: str, publickey: str) -> Any:
+    if signature_backend is not None and signature_backend.name == backend_name:
+        backend = signature_backend
+    else:
+        backend = make_signature_backend(backend_name)
+    curve = ecdsa.curves.curve_by_name(curve_name)
+    return backend.load_verifying_key(curve, bytes.fromhex(publickey))
 
-    vk: ecdsa.VerifyingKey = ecdsa.VerifyingKey.from_string(bytes.fromhex(publickey), curve=selected_curve)
-    try:
-        if vk.verify(sig, message, hashfunc=hashfunction):
-            return True
-        return False
-    except ecdsa.BadSignatureError:
-        return False
+
+def get_verifying_key(curve_name: str, publickey: str) -> Any:
+    """ Return the current backend's parsed and precomputed verifying key,
+        cached by (backend, curve, public key)
+    """
+    return _get_verifying_key(get_signature_backend().name, curve_name, publickey)
+
+
+def clear_verifying_key_cache():
+    _get_verifying_key.cache_clear()
+
+
+def get_verifying_key_cache_status() -> Dict[str, Any]:
+    """ Return the verifying key cache statistics
+    """
+    info = _get_verifying_key.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "size": info.currsize,
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": info.hits / lookups if lookups > 0 else 0.0,
+    }
+
+
+def verify_signature(message: bytes, publickey: str, sig: bytes, selected_curve: ecdsa.curves.Curve = ecdsa.curves.NIST256p, hashfunction=None, backend: None | SignatureBackend = None) -> bool:
+    backend = backend if backend is not None else get_signature_backend()
+    vk = _get_verifying_key(backend.name, selected_curve.name, publickey)
+    return backend.verify(vk, sig, message, hashfunction)
+
+
+class VerificationCache:
+    """ Bounded LRU of signature verification results keyed by (cpid, signature, public key, signature scheme).
+        The CPID covers every signed field, so the result for a key never changes.
+    """
+    def __init__(self, maxsize: int = VERIFICATION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.results: OrderedDict[VerificationKey, bool] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: VerificationKey) -> None | bool:
+        """ Return the cached result or None if not known
+        """
+        with self.lock:
+            result = self.results.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.results.move_to_end(key)
+            return result
+
+    def put(self, key: VerificationKey, result: bool):
+        with self.lock:
+            self.results[key] = result
+            self.results.move_to_end(key)
+            while len(self.results) > self.maxsize:
+                self.results.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def get_status(self) -> Dict[str, Any]:
+        """ Return the cache statistics
+        """
+        return {
+            "size": len(self.results),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+        }
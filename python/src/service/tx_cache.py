@@ -0,0 +1,100 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterable
+
+from config import ConfigType
+from service.metrics import metrics
+from service.util import hexstr_to_txid
+
+TXID_RE = re.compile("^[0-9a-f]{64}$")
+
+
+class TxCache:
+    """ Read-through cache of raw transactions by txid. A tx never changes once it has
+        a txid, so entries are not expired. Recently used txs are held in a bounded LRU
+        in memory, in front of a directory of one file per tx.
+    """
+    def __init__(self):
+        self.memory_size: int = 1000
+        # None to cache in memory only
+        self.directory: None | str = None
+        self.lock = threading.Lock()
+        # txid -> tx as a hex string, least recently used first
+        self.memory: OrderedDict[str, str] = OrderedDict()
+
+    def set_config(self, config: ConfigType):
+        cache_config = config.get("tx_cache", {})
+        self.memory_size = cache_config.get("memory_size", self.memory_size)
+        self.directory = cache_config.get("directory", self.directory)
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def reset(self):
+        """ Erase the cached txs held in memory - for testing
+        """
+        with self.lock:
+            self.memory.clear()
+
+    def _path(self, txid: str) -> str:
+        assert self.directory is not None
+        return os.path.join(self.directory, txid)
+
+    def _remember(self, txid: str, tx_as_hexstr: str):
+        with self.lock:
+            self.memory[txid] = tx_as_hexstr
+            self.memory.move_to_end(txid)
+            if len(self.memory) > self.memory_size:
+                self.memory.popitem(last=False)
+
+    def get(self, txid: str) -> None | str:
+        """ Return the tx as a hex string, or None if it is not cached
+        """
+        with self.lock:
+            tx_as_hexstr = self.memory.get(txid)
+            if tx_as_hexstr is not None:
+                self.memory.move_to_end(txid)
+        if tx_as_hexstr is not None:
+            metrics.increment("tx_cache.memory_hits")
+            return tx_as_hexstr
+        if self.directory is not None and TXID_RE.match(txid):
+            try:
+                with open(self._path(txid), 'rb') as f:
+                    tx_as_hexstr = f.read().hex()
+            except FileNotFoundError:
+                pass
+            else:
+                metrics.increment("tx_cache.disk_hits")
+                self._remember(txid, tx_as_hexstr)
+                return tx_as_hexstr
+        metrics.increment("tx_cache.misses")
+        return None
+
+    def add(self, tx_as_hexstr: str, txid: None | str = None) -> bool:
+        """ Cache the tx, if the txid is provided it is checked against the tx.
+            Returns False if the tx does not match the txid.
+        """
+        actual_txid = hexstr_to_txid(tx_as_hexstr)
+        assert actual_txid is not None
+        if txid is not None and txid != actual_txid:
+            print(f"Not caching tx, its txid is {actual_txid} not {txid}")
+            return False
+        self._remember(actual_txid, tx_as_hexstr)
+        if self.directory is not None:
+            path = self._path(actual_txid)
+            if not os.path.exists(path):
+                # Write then rename, so a partial file is never read
+                temp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(temp_path, 'wb') as f:
+                    f.write(bytes.fromhex(tx_as_hexstr))
+                os.replace(temp_path, path)
+        return True
+
+    def add_all(self, txs_as_hexstr: Iterable[None | str]):
+        """ Cache txs that are already held, such as those in the commitment store,
+            the later txs are the ones held in memory
+        """
+        for tx_as_hexstr in txs_as_hexstr:
+            if tx_as_hexstr is not None:
+                self.add(tx_as_hexstr)
@@ -1,4 +1,5 @@
 import sys
+from typing import Any
 from tx_engine import Tx, TxIn
 
 
@@ -37,3 +38,14 @@ def tx_to_hexstr(tx: Tx | None) -> str | None:
 def hexstr_to_txin(txin_as_hexstr: str) -> TxIn:
     input = txin_as_hexstr.split(':')
     return TxIn(prev_tx=input[0], prev_index=int(input[1]))
+
+
+def get_raw_transaction_uncached(blockchain_interface: Any, txid: str) -> None | str:
+    """ WoCInterface caches get_raw_transaction, including txs that were not found,
+        so call the underlying method when polling for a tx to become visible
+    """
+    get_raw_transaction = blockchain_interface.get_raw_transaction
+    uncached = getattr(get_raw_transaction, "__wrapped__", None)
+    if uncached is not None:
+        return uncached(blockchain_interface, txid)
+    return get_raw_transaction(txid)
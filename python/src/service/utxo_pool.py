@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Tuple
+
+from tx_engine import Tx, TxIn
+
+from config import ConfigType
+from service.financing_service import FinancingService, FinancingServiceException
+from service.metrics import metrics
+from service.util import hexstr_to_tx
+
+# Value of each ownership UTXO, as requested for a single issuance
+UTXO_VALUE = 100
+
+
+class UtxoPool:
+    """ Pool of pre-funded ownership UTXOs for each actor's locking script.
+        Outpoints are requested from the financing service in batches by a background
+        thread, which keeps each pool above the low water mark, so an issuance takes
+        an outpoint without waiting on the financing service.
+        A batch is held back until its funding tx is visible, which the thread checks
+        on each pass rather than waiting for it.
+    """
+    def __init__(self, finance_service: FinancingService):
+        self.finance_service = finance_service
+        self.enabled: bool = False
+        # Outpoints requested in each call to the financing service
+        self.batch_size: int = 10
+        # Refill when a pool has fewer outpoints than this
+        self.low_water: int = 3
+        # Check the pools at least this often (seconds), so failed refills are retried
+        self.refill_interval: float = 5.0
+
+        self.lock = threading.Lock()
+        # locking script -> available (outpoint, funding tx)
+        self.pools: Dict[str, Deque[Tuple[TxIn, Tx]]] = {}
+        # locking script -> actor, for reporting
+        self.actors: Dict[str, str] = {}
+        # Batches whose funding tx is not yet visible: (locking script, outpoints, time requested)
+        self.pending: List[Tuple[str, List[Tuple[TxIn, Tx]], float]] = []
+        self.refill_needed = threading.Event()
+        self.stopped = threading.Event()
+        self.thread: None | threading.Thread = None
+
+    def set_config(self, config: ConfigType):
+        pool_config = config.get("utxo_pool", {})
+        self.enabled = pool_config.get("enabled", False)
+        self.batch_size = pool_config.get("batch_size", self.batch_size)
+        self.low_water = pool_config.get("low_water", self.low_water)
+        self.refill_interval = pool_config.get("refill_interval", self.refill_interval)
+
+    def register(self, actor: str, locking_script: str):
+        """ Keep a pool of outpoints for this locking script
+        """
+        with self.lock:
+            self.pools.setdefault(locking_script, deque())
+            self.actors[locking_script] = actor
+        self.refill_needed.set()
+
+    def start(self):
+        if self.thread is None:
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._run, name="utxo_pool", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.refill_needed.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def depth(self, locking_script: str) -> int:
+        with self.lock:
+            return len(self.pools.get(locking_script, []))
+
+    def take(self, locking_script: str) -> None | Tuple[TxIn, Tx]:
+        """ Return a funded outpoint for this locking script, or None if the pool is empty
+        """
+        with self.lock:
+            pool = self.pools.get(locking_script)
+            if pool is None:
+                return None
+            utxo = pool.popleft() if len(pool) > 0 else None
+            depth = len(pool)
+        self._update_depth(locking_script, depth)
+        if utxo is None:
+            metrics.increment("utxo_pool_misses")
+        else:
+            metrics.increment("utxo_pool_hits")
+        if depth < self.low_water:
+            self.refill_needed.set()
+        return utxo
+
+    def _update_depth(self, locking_script: str, depth: int):
+        metrics.set_gauge(f"utxo_pool_depth.{self.actors.get(locking_script, locking_script)}", depth)
+
+    def _request_outpoints(self, locking_script: str) -> List[Tuple[TxIn, Tx]]:
+        """ Request a batch of outpoints from the financing service
+        """
+        with metrics.timer("utxo_pool_refill"):
+            result: None | Dict[str, Any] = self.finance_service._get_funds(UTXO_VALUE, locking_script, self.batch_size, False, accept_unconfirmed=True)
+        if result is None or result.get('status') != "Success":
+            print(f"Unable to refill UTXO pool, result = {result}")
+            metrics.increment("utxo_pool_refill_failures")
+            return []
+        tx = hexstr_to_tx(result['tx'])
+        assert isinstance(tx, Tx)
+        # All the outpoints are outputs of the one funding tx
+        return [
+            (TxIn(prev_tx=outpoint['hash'], prev_index=outpoint['index']), tx)
+            for outpoint in result['outpoints'] if outpoint['hash'] == tx.id()
+        ]
+
+    def refill(self):
+        """ Top up every pool that is below the low water mark
+        """
+        with self.lock:
+            # Outpoints that are waiting for their funding tx count towards the low water mark
+            pending: Counter[str] = Counter()
+            for (locking_script, utxos, _) in self.pending:
+                pending[locking_script] += len(utxos)
+            to_refill = [locking_script for (locking_script, pool) in self.pools.items() if len(pool) + pending[locking_script] < self.low_water]
+        for locking_script in to_refill:
+            try:
+                utxos = self._request_outpoints(locking_script)
+            except FinancingServiceException as e:
+                print(f"Unable to refill UTXO pool, {e}")
+                metrics.increment("utxo_pool_refill_failures")
+                continue
+            if len(utxos) > 0:
+                with self.lock:
+                    self.pending.append((locking_script, utxos, time.monotonic()))
+        self._release_visible()
+
+    def _release_visible(self):
+        """ Move each batch whose funding tx is visible into its pool. A batch still not visible
+            after the financing service's visibility timeout is released anyway, as get_funds would.
+        """
+        with self.lock:
+            pending = list(self.pending)
+        released = []
+        for batch in pending:
+            (_, utxos, requested) = batch
+            txid = utxos[0][1].id()
+            if self.finance_service.accept_unconfirmed or self.finance_service.is_tx_visible(txid):
+                released.append(batch)
+            elif time.monotonic() - requested >= self.finance_service.visibility_timeout:
+                metrics.increment("funding_tx_visibility_timeouts")
+                print(f"UTXO pool funding tx {txid} is not visible after {self.finance_service.visibility_timeout}s")
+                released.append(batch)
+        for batch in released:
+            (locking_script, utxos, _) = batch
+            with self.lock:
+                self.pending.remove(batch)
+                self.pools[locking_script].extend(utxos)
+                depth = len(self.pools[locking_script])
+            self._update_depth(locking_script, depth)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            # Check the pending funding txs again soon
+            self.refill_needed.wait(self.finance_service.visibility_max_delay if len(self.pending) > 0 else self.refill_interval)
+            self.refill_needed.clear()
+            if self.stopped.is_set():
+                break
+            try:
+                self.refill()
+            except Exception as e:
+                # Keep the pool running, the next refill will retry
+                print(f"UTXO pool refill failed, {e!r}")
+                metrics.increment("utxo_pool_refill_failures")
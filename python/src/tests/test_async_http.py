@@ -0,0 +1,49 @@
+#!/usr/bin/python3
+import asyncio
+import threading
+import unittest
+import sys
+
+sys.path.append("..")
+
+from service.async_http import AsyncHttpSession
+
+
+class AsyncHttpSessionTest(unittest.TestCase):
+    def test_session_of_another_loop_is_closed(self):
+        http = AsyncHttpSession()
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever)
+        thread.start()
+        try:
+            session = asyncio.run_coroutine_threadsafe(http.get(), other_loop).result(5.0)
+
+            async def replace():
+                replaced = await http.get()
+                await http.close()
+                return replaced
+
+            self.assertIsNot(asyncio.run(replace()), session)
+            # The close of the old session was scheduled on its own loop
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other_loop).result(5.0)
+            self.assertTrue(session.closed)
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join()
+            other_loop.close()
+
+    def test_close_in_the_same_loop(self):
+        http = AsyncHttpSession()
+
+        async def get_and_close():
+            session = await http.get()
+            self.assertIs(await http.get(), session)
+            await http.close()
+            return session
+
+        self.assertTrue(asyncio.run(get_and_close()).closed)
+        self.assertIsNone(http.session)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+import unittest
+import sys
+import functools
+from types import SimpleNamespace
+from typing import List
+
+sys.path.append("..")
+
+from aiohttp import web
+from tx_engine import Tx, TxIn, TxOut, Script, MockInterface
+
+from service.blockchain_client import AsyncBlockchainClient, get_raw_transaction_uncached
+
+
+def make_tx() -> Tx:
+    return Tx(
+        version=1,
+        tx_ins=[TxIn(prev_tx="00" * 32, prev_index=0)],
+        tx_outs=[TxOut(amount=100, script_pubkey=Script.parse_string("OP_1"))],
+        locktime=0)
+
+
+class CachingInterface:
+    """ Caches get_raw_transaction, as the WoCInterface does
+    """
+    def __init__(self):
+        self.transactions: dict = {}
+
+    @functools.lru_cache
+    def get_raw_transaction(self, txid: str) -> None | str:
+        return self.transactions.get(txid)
+
+
+class RejectingInterface:
+    """ Returns a broadcaster's rejection rather than raising, as the RPC interface does
+    """
+    def broadcast_tx(self, tx_as_hexstr: str):
+        return SimpleNamespace(status_code=16, text="mandatory-script-verify-flag-failed")
+
+
+class UncachedTest(unittest.TestCase):
+    def test_get_raw_transaction_uncached(self):
+        interface = CachingInterface()
+        self.assertIsNone(interface.get_raw_transaction("txid"))
+        interface.transactions["txid"] = "00"
+        # The not found result is cached
+        self.assertIsNone(interface.get_raw_transaction("txid"))
+        self.assertEqual(get_raw_transaction_uncached(interface, "txid"), "00")
+
+        bsv_client = MockInterface()
+        bsv_client.set_transactions({"txid": "00"})
+        self.assertEqual(get_raw_transaction_uncached(bsv_client, "txid"), "00")
+
+
+class AsyncBlockchainClientMockTest(unittest.IsolatedAsyncioTestCase):
+    """ Exercise the async client with an interface that is called on a worker thread
+    """
+    async def asyncSetUp(self):
+        self.bsv_client = MockInterface()
+        self.client = AsyncBlockchainClient()
+        self.client.set_interface(self.bsv_client)
+
+    async def test_broadcast_and_get(self):
+        tx = make_tx()
+        self.assertIsNone(self.client.woc_url)
+        self.assertIsNone(await self.client.get_raw_transaction(tx.id()))
+        self.assertEqual(await self.client.broadcast_tx(tx.serialize().hex()), tx.id())
+        self.assertEqual(await self.client.get_raw_transaction(tx.id()), tx.serialize().hex())
+
+    async def test_rejected(self):
+        self.client.set_interface(RejectingInterface())
+        self.assertIsNone(await self.client.broadcast_tx(make_tx().serialize().hex()))
+
+
+class AsyncBlockchainClientWoCTest(unittest.IsolatedAsyncioTestCase):
+    """ Exercise the async client against a stand-in WhatsOnChain
+    """
+    async def asyncSetUp(self):
+        self.transactions: dict = {}
+        self.broadcasts: List[str] = []
+        self.rejected: List[str] = []
+        app = web.Application()
+        app.router.add_get("/tx/{txid}/hex", self.get_raw_transaction)
+        app.router.add_post("/tx/raw", self.broadcast)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+
+        self.client = AsyncBlockchainClient()
+        self.client.woc_url = f"http://127.0.0.1:{port}"
+        self.client.blockchain_interface = "woc"
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def get_raw_transaction(self, request: web.Request) -> web.Response:
+        txid = request.match_info["txid"]
+        if txid not in self.transactions:
+            return web.Response(status=404, text="Not Found")
+        return web.Response(text=self.transactions[txid])
+
+    async def broadcast(self, request: web.Request) -> web.Response:
+        tx_hex = (await request.json())["txhex"]
+        if tx_hex in self.rejected:
+            return web.Response(status=400, text="mandatory-script-verify-flag-failed")
+        if tx_hex in self.broadcasts:
+            return web.Response(status=400, text="Transaction already in the mempool")
+        self.broadcasts.append(tx_hex)
+        tx = Tx.parse_hexstr(tx_hex)
+        self.transactions[tx.id()] = tx_hex
+        return web.json_response(tx.id())
+
+    async def test_broadcast_and_get(self):
+        tx = make_tx()
+        self.assertIsNone(await self.client.get_raw_transaction(tx.id()))
+        self.assertEqual(await self.client.broadcast_tx(tx.serialize().hex()), tx.id())
+        self.assertEqual(await self.client.get_raw_transaction(tx.id()), tx.serialize().hex())
+        # Already in the mempool
+        self.assertEqual(await self.client.broadcast_tx(tx.serialize().hex()), tx.id())
+
+    async def test_rejected(self):
+        tx = make_tx()
+        self.rejected.append(tx.serialize().hex())
+        self.assertIsNone(await self.client.broadcast_tx(tx.serialize().hex()))
+        self.assertIsNone(await self.client.get_raw_transaction(tx.id()))
+
+    async def test_unavailable(self):
+        await self.runner.cleanup()
+        self.assertIsNone(await self.client.get_raw_transaction("00" * 32))
+        self.assertIsNone(await self.client.broadcast_tx(make_tx().serialize().hex()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+#!/usr/bin/python3
+import unittest
+import sys
+import time
+import threading
+
+sys.path.append("..")
+
+from tx_engine import Tx, TxIn, TxOut, Script, MockInterface
+
+from service.blockchain_router import BlockchainRouter
+from service.metrics import metrics
+
+
+def make_tx(i: int) -> Tx:
+    return Tx(
+        version=1,
+        tx_ins=[TxIn(prev_tx=f"{i:064x}", prev_index=0)],
+        tx_outs=[TxOut(amount=100, script_pubkey=Script.parse_string("OP_1"))],
+        locktime=0)
+
+
+class StandInBackend(MockInterface):
+    """ MockInterface that takes `delay` seconds per call, and can be made unavailable
+        or return a broadcast error
+    """
+    def __init__(self, delay: float = 0.0):
+        super().__init__()
+        self.delay = delay
+        self.unavailable = False
+        self.broadcast_error: None | str = None
+        self.calls = 0
+        self.broadcasts = threading.Event()
+
+    def _call(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.unavailable:
+            raise ConnectionError("unavailable")
+
+    def get_raw_transaction(self, txid: str):
+        self._call()
+        return super().get_raw_transaction(txid)
+
+    def get_block_count(self):
+        self._call()
+        return 100
+
+    def broadcast_tx(self, transaction: str):
+        self._call()
+        self.broadcasts.set()
+        if self.broadcast_error is not None:
+            return self.broadcast_error
+        return super().broadcast_tx(transaction)
+
+
+class MissingKeyBackend:
+    """ A backend that is not a MockInterface and fails with a KeyError
+    """
+    def get_raw_transaction(self, txid: str):
+        raise KeyError("result")
+
+
+class BlockchainRouterTest(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.fast = StandInBackend()
+        self.slow = StandInBackend(delay=0.02)
+        self.router = BlockchainRouter()
+        self.router.max_errors = 2
+        self.router.add_backend("slow", self.slow)
+        self.router.add_backend("fast", self.fast)
+        self.tx = make_tx(0)
+        for backend in (self.fast, self.slow):
+            backend.set_transactions({self.tx.id(): self.tx.serialize().hex()})
+
+    def test_set_config(self):
+        router = BlockchainRouter()
+        router.set_config({"blockchain": {
+            "network_type": "testnet",
+            "interface_type": "mock",
+            "hedge_broadcasts": True,
+            "backend": [{"interface_type": "mock", "name": "local"}, {"interface_type": "mock"}],
+        }})
+        self.assertTrue(router.hedge_broadcasts)
+        self.assertEqual([b.name for b in router.backends], ["local", "mock_1"])
+        self.assertIsInstance(router.backends[0].interface, MockInterface)
+        with self.assertRaises(ValueError):
+            router.add_backend("local", MockInterface())
+
+    def test_routes_to_fastest(self):
+        for _ in range(10):
+            self.assertEqual(self.router.get_raw_transaction(self.tx.id()), self.tx.serialize().hex())
+        # Each is tried once, then the faster is used
+        self.assertEqual(self.slow.calls, 1)
+        self.assertEqual(self.fast.calls, 9)
+        status = self.router.get_status()
+        assert status["fast"]["latency"] is not None and status["slow"]["latency"] is not None
+        self.assertLess(status["fast"]["latency"], status["slow"]["latency"])
+        self.assertEqual(status["slow"]["error_rate"], 0)
+
+    def test_failover(self):
+        self.router.get_block_count()
+        self.router.get_block_count()
+        self.fast.unavailable = True
+        self.assertEqual(self.router.get_block_count(), 100)
+        self.assertEqual(self.router.get_block_count(), 100)
+        self.assertEqual(metrics.get_status()["counters"]["blockchain_router.failovers"], 2)
+        self.assertFalse(self.router.get_status()["fast"]["healthy"])
+        # An unhealthy backend is not called
+        calls = self.fast.calls
+        self.router.get_block_count()
+        self.assertEqual(self.fast.calls, calls)
+
+        # Until it is retried
+        self.router.backends[1].unhealthy_until = 0.0
+        self.fast.unavailable = False
+        self.router.get_block_count()
+        self.assertTrue(self.router.get_status()["fast"]["healthy"])
+
+    def test_all_unavailable(self):
+        self.fast.unavailable = True
+        self.slow.unavailable = True
+        with self.assertRaises(ConnectionError):
+            self.router.get_block_count()
+
+    def test_not_found_on_one_backend(self):
+        tx = make_tx(1)
+        self.slow.set_transactions({tx.id(): tx.serialize().hex()})
+        self.router.get_block_count()
+        self.router.get_block_count()
+        self.assertEqual(self.router.get_raw_transaction(tx.id()), tx.serialize().hex())
+        self.assertIsNone(self.router.get_raw_transaction(make_tx(2).id()))
+        # Not found is not an error
+        self.assertTrue(self.router.get_status()["fast"]["healthy"])
+
+    def test_key_error_is_a_failure(self):
+        # Only a MockInterface raises KeyError for a tx it does not have
+        router = BlockchainRouter()
+        router.add_backend("broken", MissingKeyBackend())
+        router.add_backend("fast", self.fast)
+        self.assertEqual(router.get_raw_transaction(self.tx.id()), self.tx.serialize().hex())
+        self.assertEqual(router.get_status()["broken"]["errors"], 1)
+        self.assertEqual(router.get_status()["fast"]["errors"], 0)
+
+    def test_broadcast_failover(self):
+        self.router.get_block_count()
+        self.router.get_block_count()
+        self.fast.broadcast_error = "Service Unavailable"
+        self.assertEqual(self.router.broadcast_tx(self.tx.serialize().hex()), self.tx.id())
+        self.assertIn(self.tx.id(), self.slow.get_broadcast_txs())
+
+        # A rejected tx is not sent to the other backends
+        tx = make_tx(1)
+        self.fast.broadcast_error = None
+        self.slow.broadcast_error = "bad-txns-inputs-missingorspent"
+        self.router.backends[0].latency = 0.0
+        self.assertEqual(self.router.broadcast_tx(tx.serialize().hex()), "bad-txns-inputs-missingorspent")
+        self.assertNotIn(tx.id(), self.fast.get_broadcast_txs())
+
+    def test_hedged_broadcast(self):
+        self.router.hedge_broadcasts = True
+        self.slow.delay = 0.5
+        start = time.perf_counter()
+        self.assertEqual(self.router.broadcast_tx(self.tx.serialize().hex()), self.tx.id())
+        self.assertLess(time.perf_counter() - start, 0.4)
+        # The slower broadcast is also made
+        self.assertTrue(self.slow.broadcasts.wait(1.0))
+        self.assertEqual(metrics.get_status()["counters"]["blockchain_router.hedged"], 1)
+
+        self.fast.broadcast_error = "bad-txns-inputs-missingorspent"
+        self.slow.broadcast_error = "Service Unavailable"
+        self.slow.delay = 0.0
+        self.assertEqual(self.router.broadcast_tx(make_tx(1).serialize().hex()), "bad-txns-inputs-missingorspent")
+
+        executor = self.router.executor
+        assert executor is not None
+        self.router.shutdown()
+        self.assertIsNone(self.router.executor)
+        with self.assertRaises(RuntimeError):
+            executor.submit(time.sleep, 0)
+
+    def test_passthrough(self):
+        self.assertIs(self.router.get_broadcast_txs(), self.slow.get_broadcast_txs())
+        with self.assertRaises(AttributeError):
+            self.router.not_a_method()
+
+
+if __name__ == "__main__":
+    unittest.main()
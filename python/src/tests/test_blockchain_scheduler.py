@@ -0,0 +1,268 @@
+#!/usr/bin/python3
+import unittest
+import sys
+import asyncio
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Set
+
+sys.path.append("..")
+
+import requests
+from tx_engine import Tx, TxIn, TxOut, Script, MockInterface
+
+from service.blockchain_scheduler import ScheduledInterface, TokenBucket
+from service.blockchain_client import AsyncBlockchainClient
+from service.metrics import metrics
+
+
+def make_tx(i: int) -> Tx:
+    return Tx(
+        version=1,
+        tx_ins=[TxIn(prev_tx=f"{i:064x}", prev_index=0)],
+        tx_outs=[TxOut(amount=100, script_pubkey=Script.parse_string("OP_1"))],
+        locktime=0)
+
+
+class StandInWoC(ThreadingHTTPServer):
+    """ WhatsOnChain stand-in that allows `limit` requests in each `window` seconds,
+        and returns Too Many Requests for the others
+    """
+    daemon_threads = True
+
+    def __init__(self, limit: int, window: float):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.limit = limit
+        self.window = window
+        # Seconds taken by each request
+        self.delay = 0.0
+        self.transactions: Dict[str, str] = {}
+        # Spent txid:vout outpoints
+        self.spent: Set[str] = set()
+        self.lock = threading.Lock()
+        self.accepted: Deque[float] = deque()
+        self.requests: List[str] = []
+        self.throttled = 0
+        self.active = 0
+        self.max_active = 0
+        self.thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+        self.thread.start()
+
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def admit(self, path: str) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            while self.accepted and self.accepted[0] <= now - self.window:
+                self.accepted.popleft()
+            if len(self.accepted) >= self.limit:
+                self.throttled += 1
+                return False
+            self.accepted.append(now)
+            self.requests.append(path)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            return True
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+        self.thread.join()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    server: StandInWoC
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status: int, body: str, headers: Dict[str, str] = {}):
+        data = body.encode()
+        self.send_response(status)
+        for (name, value) in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_request(self, body: bytes):
+        if not self.server.admit(self.path):
+            self.reply(429, "Too Many Requests", {"Retry-After": str(self.server.window)})
+            return
+        try:
+            time.sleep(self.server.delay)
+            if self.path.startswith("/tx/") and self.path.endswith("/hex"):
+                txid = self.path.split("/")[2]
+                if txid in self.server.transactions:
+                    self.reply(200, self.server.transactions[txid])
+                else:
+                    self.reply(404, "Not Found")
+            elif self.path == "/txs/hex":
+                txids = json.loads(body)["txids"]
+                items = [
+                    {"txid": txid, "hex": self.server.transactions[txid]} if txid in self.server.transactions else {"txid": txid, "error": "unknown"}
+                    for txid in txids
+                ]
+                self.reply(200, json.dumps(items))
+            elif self.path == "/utxos/spent":
+                items = []
+                for utxo in json.loads(body)["utxos"]:
+                    if f"{utxo['txid']}:{utxo['vout']}" in self.server.spent:
+                        items.append({"utxo": utxo, "spentIn": {"txid": "cc" * 32, "vin": 0}, "error": ""})
+                    else:
+                        items.append({"utxo": utxo, "error": ""})
+                self.reply(200, json.dumps(items))
+            elif self.path == "/tx/raw":
+                tx = Tx.parse_hexstr(json.loads(body)["txhex"])
+                self.server.transactions[tx.id()] = tx.serialize().hex()
+                self.reply(200, json.dumps(tx.id()))
+            else:
+                self.reply(404, "Not Found")
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+    def do_GET(self):
+        self.handle_request(b"")
+
+    def do_POST(self):
+        self.handle_request(self.rfile.read(int(self.headers["Content-Length"])))
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=10.0, burst=2)
+        delays = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(delays[:2], [0.0, 0.0])
+        self.assertAlmostEqual(delays[2], 0.1, places=2)
+        self.assertAlmostEqual(delays[3], 0.2, places=2)
+
+    def test_unlimited(self):
+        bucket = TokenBucket(rate=0, burst=1)
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+
+    def test_pause(self):
+        bucket = TokenBucket(rate=10.0, burst=2)
+        bucket.pause(0.5)
+        self.assertAlmostEqual(bucket.reserve(), 0.5, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.6, places=2)
+
+
+class ScheduledInterfaceTest(unittest.TestCase):
+    """ Exercise the scheduler against a stand-in WhatsOnChain that enforces a rate limit
+    """
+    def setUp(self):
+        metrics.reset()
+        self.server = StandInWoC(limit=5, window=0.1)
+        self.txs = [make_tx(i) for i in range(45)]
+        self.server.transactions = {tx.id(): tx.serialize().hex() for tx in self.txs}
+        self.interface = self.make_interface(rate=25.0, burst=2)
+
+    def tearDown(self):
+        self.server.close()
+
+    def make_interface(self, **config) -> ScheduledInterface:
+        interface = ScheduledInterface(MockInterface())
+        interface.set_config({"blockchain_scheduler": config})
+        interface.woc_url = self.server.url()
+        return interface
+
+    def get_in_parallel(self, get, txids: List[str]) -> List:
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            return list(executor.map(get, txids))
+
+    def test_unscheduled_calls_throttled(self):
+        """ The problem, parallel calls are throttled by the stand-in
+        """
+        txids = [tx.id() for tx in self.txs[:20]]
+        results = self.get_in_parallel(lambda txid: requests.get(f"{self.server.url()}/tx/{txid}/hex").status_code, txids)
+        self.assertIn(429, results)
+        self.assertGreater(self.server.throttled, 0)
+
+    def test_rate_limited(self):
+        txids = [tx.id() for tx in self.txs[:20]]
+        results = self.get_in_parallel(self.interface.get_raw_transaction, txids)
+        self.assertEqual(results, [tx.serialize().hex() for tx in self.txs[:20]])
+        self.assertEqual(self.server.throttled, 0)
+        self.assertEqual(len(self.server.requests), 20)
+        self.assertIsNone(self.interface.get_raw_transaction("00" * 32))
+
+    def test_throttled_retried(self):
+        interface = self.make_interface(rate=100.0, burst=10, max_concurrent=10)
+        txids = [tx.id() for tx in self.txs[:20]]
+        results = self.get_in_parallel(interface.get_raw_transaction, txids)
+        self.assertEqual(results, [tx.serialize().hex() for tx in self.txs[:20]])
+        self.assertGreater(self.server.throttled, 0)
+        self.assertGreater(metrics.get_status()["counters"]["blockchain_scheduler.throttled"], 0)
+
+    def test_coalesced(self):
+        self.server.delay = 0.1
+        txid = self.txs[0].id()
+        results = self.get_in_parallel(self.interface.get_raw_transaction, [txid] * 10)
+        self.assertEqual(results, [self.txs[0].serialize().hex()] * 10)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(metrics.get_status()["counters"]["blockchain_scheduler.coalesced"], 9)
+
+    def test_bulkhead(self):
+        interface = self.make_interface(rate=0, max_concurrent=2)
+        self.server.limit = 100
+        self.server.delay = 0.02
+        self.get_in_parallel(interface.get_raw_transaction, [tx.id() for tx in self.txs[:8]])
+        self.assertEqual(len(self.server.requests), 8)
+        self.assertLessEqual(self.server.max_active, 2)
+
+    def test_bulk(self):
+        txids = [tx.id() for tx in self.txs] + ["00" * 32, self.txs[0].id()]
+        results = self.interface.get_raw_transactions(txids)
+        self.assertEqual(len(results), 46)
+        self.assertIsNone(results["00" * 32])
+        self.assertEqual(results[self.txs[44].id()], self.txs[44].serialize().hex())
+        self.assertEqual(self.server.requests, ["/txs/hex"] * 3)
+
+    def test_spent_outpoints(self):
+        outpoints = [f"{tx.id()}:0" for tx in self.txs[:25]]
+        self.server.spent = {outpoints[3], outpoints[21]}
+        results = self.interface.get_spent_outpoints(outpoints)
+        self.assertEqual([outpoint for (outpoint, spent) in results.items() if spent], [outpoints[3], outpoints[21]])
+        self.assertEqual(sum(1 for spent in results.values() if spent is False), 23)
+        self.assertEqual(self.server.requests, ["/utxos/spent"] * 2)
+
+    def test_mock_interface(self):
+        interface = ScheduledInterface(MockInterface())
+        interface.set_config({"blockchain_scheduler": {"rate": 0}})
+        interface.set_transactions({self.txs[0].id(): self.txs[0].serialize().hex()})
+        self.assertEqual(interface.get_raw_transaction(self.txs[0].id()), self.txs[0].serialize().hex())
+        with self.assertRaises(KeyError):
+            interface.get_raw_transaction(self.txs[1].id())
+        self.assertEqual(interface.get_raw_transactions([self.txs[0].id(), self.txs[1].id()]), {
+            self.txs[0].id(): self.txs[0].serialize().hex(),
+            self.txs[1].id(): None,
+        })
+        txid = interface.broadcast_tx(self.txs[1].serialize().hex())
+        self.assertIn(txid, interface.get_broadcast_txs())
+
+    def test_async_client(self):
+        interface = self.make_interface(rate=100.0, burst=10, max_concurrent=10)
+        client = AsyncBlockchainClient()
+        client.set_interface(interface)
+        self.assertIs(client.scheduler, interface)
+        client.woc_url = self.server.url()
+
+        async def get_all():
+            try:
+                return await asyncio.gather(*[client.get_raw_transaction(tx.id()) for tx in self.txs[:20]])
+            finally:
+                await client.close()
+
+        results = asyncio.run(get_all())
+        self.assertEqual(results, [tx.serialize().hex() for tx in self.txs[:20]])
+        self.assertGreater(self.server.throttled, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
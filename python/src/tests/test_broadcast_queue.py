@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+import unittest
+import sys
+import threading
+from typing import List, Tuple
+
+sys.path.append("..")
+
+from service.broadcast_queue import BroadcastQueue, BroadcastResult, classify_broadcast_result
+from service.metrics import metrics
+
+TXID = "ab" * 32
+
+
+class Response:
+    """ The parts of a requests.Response that are classified
+    """
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+
+
+class Broadcaster:
+    """ Returns the queued results in turn, then accepts
+    """
+    def __init__(self, results: None | List[str] = None):
+        self.results = results or []
+        self.calls: List[str] = []
+        self.lock = threading.Lock()
+
+    def broadcast_tx(self, tx_as_hexstr: str) -> str:
+        with self.lock:
+            self.calls.append(tx_as_hexstr)
+            if self.results:
+                result = self.results.pop(0)
+                if result == "raise":
+                    raise ConnectionError("unavailable")
+                return result
+        return TXID
+
+
+class ClassifyTest(unittest.TestCase):
+    def test_classify(self):
+        self.assertEqual(classify_broadcast_result(TXID)[0], BroadcastResult.Accepted)
+        self.assertEqual(classify_broadcast_result(Response(200, TXID))[0], BroadcastResult.Accepted)
+        self.assertEqual(classify_broadcast_result(Response(400, "Transaction already in the mempool"))[0], BroadcastResult.Accepted)
+        self.assertEqual(classify_broadcast_result(Response(503, "Service Unavailable"))[0], BroadcastResult.Transient)
+        self.assertEqual(classify_broadcast_result(Response(400, "Missing inputs"))[0], BroadcastResult.Transient)
+        self.assertEqual(classify_broadcast_result(None)[0], BroadcastResult.Transient)
+        self.assertEqual(classify_broadcast_result(Response(400, "bad-txns-inputs-missingorspent")), (BroadcastResult.Rejected, "bad-txns-inputs-missingorspent"))
+        self.assertEqual(classify_broadcast_result("unexpected")[0], BroadcastResult.Rejected)
+
+
+class BroadcastQueueTest(unittest.TestCase):
+    """ Exercise the queue, with the broadcasts processed on worker threads
+    """
+    def setUp(self):
+        metrics.reset()
+        self.results: List[Tuple[str, BroadcastResult, str]] = []
+        self.queue = BroadcastQueue()
+        self.queue.set_config({"broadcast_queue": {"workers": 2, "max_size": 4, "max_attempts": 3, "retry_delay": 0.01}})
+
+    def tearDown(self):
+        self.queue.stop()
+
+    def callback(self, txid: str, result: BroadcastResult, detail: str):
+        self.results.append((txid, result, detail))
+
+    def run_queue(self, broadcaster: Broadcaster):
+        self.queue.set_blockchain_interface(broadcaster)
+        self.queue.start()
+        self.assertTrue(self.queue.wait(5.0))
+
+    def test_set_config_defaults(self):
+        queue = BroadcastQueue()
+        queue.set_config({})
+        self.assertFalse(queue.enabled)
+        self.assertEqual(queue.workers, 4)
+        self.assertEqual(queue.max_attempts, 5)
+
+    def test_accepted(self):
+        broadcaster = Broadcaster()
+        self.assertTrue(self.queue.submit(TXID, "00", self.callback))
+        self.run_queue(broadcaster)
+        self.assertEqual(self.results, [(TXID, BroadcastResult.Accepted, TXID)])
+        self.assertEqual(self.queue.depth(), 0)
+        status = metrics.get_status()
+        self.assertEqual(status["counters"]["broadcast_accepted"], 1)
+        self.assertEqual(status["latencies"]["broadcast_latency"]["count"], 1)
+        self.assertEqual(status["latencies"]["broadcast_queue_wait"]["count"], 1)
+
+    def test_transient_retried(self):
+        broadcaster = Broadcaster(["raise", "Service Unavailable"])
+        self.queue.submit(TXID, "00", self.callback)
+        self.run_queue(broadcaster)
+        self.assertEqual(len(broadcaster.calls), 3)
+        self.assertEqual(self.results[0][1], BroadcastResult.Accepted)
+        self.assertEqual(metrics.get_status()["counters"]["broadcast_retries"], 2)
+
+    def test_out_of_attempts(self):
+        broadcaster = Broadcaster(["Service Unavailable"] * 3)
+        self.queue.submit(TXID, "00", self.callback)
+        self.run_queue(broadcaster)
+        self.assertEqual(len(broadcaster.calls), 3)
+        self.assertEqual(self.results, [(TXID, BroadcastResult.Transient, "Service Unavailable")])
+
+    def test_rejected(self):
+        broadcaster = Broadcaster(["bad-txns-inputs-missingorspent"])
+        self.queue.submit(TXID, "00", self.callback)
+        self.run_queue(broadcaster)
+        self.assertEqual(len(broadcaster.calls), 1)
+        self.assertEqual(self.results[0][1], BroadcastResult.Rejected)
+
+    def test_duplicates(self):
+        broadcaster = Broadcaster()
+        self.queue.submit(TXID, "00", self.callback)
+        self.queue.submit(TXID, "00", self.callback)
+        self.run_queue(broadcaster)
+        # Accepted txids are not broadcast again
+        self.queue.submit(TXID, "00", self.callback)
+        self.assertEqual(len(broadcaster.calls), 1)
+        self.assertEqual([r[1] for r in self.results], [BroadcastResult.Accepted] * 3)
+        self.assertEqual(metrics.get_status()["counters"]["broadcast_duplicates"], 2)
+
+    def test_full(self):
+        for i in range(4):
+            self.assertTrue(self.queue.submit(f"{i:064x}", "00"))
+        self.assertFalse(self.queue.submit(TXID, "00", self.callback))
+        self.assertEqual(self.queue.depth(), 4)
+        self.run_queue(Broadcaster())
+        self.assertEqual(self.results, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
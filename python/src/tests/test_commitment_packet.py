@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+import unittest
+import sys
+import hashlib
+
+sys.path.append("..")
+
+from service.commitment_packet import CommitmentPacket
+
+
+def make_packet(previous_packet: None | str = None) -> CommitmentPacket:
+    return CommitmentPacket(
+        asset_id="Murphys Asset",
+        data="Murphys_Asset_data",
+        previous_packet=previous_packet,
+        blockchain_outpoint="6e59cf55510fb810ae51e2948ae27055559e6795f56c85a2c8c7171eac98ed48:1",
+        blockchain_id="BSV",
+        signature=None,
+        signature_scheme="NIST256p",
+        public_key="02b4632d08485ff1df2db55b9dafd23347d1c47a457072a1e87be26896549a8737",
+    )  # type: ignore[call-arg]
+
+
+def expected_cpid(cp: CommitmentPacket) -> str:
+    assert cp.signature_scheme is not None and cp.public_key is not None and cp.blockchain_outpoint is not None
+    previous_packet = cp.previous_packet if cp.previous_packet is not None else ""
+    input = bytes(cp.asset_id + cp.data + cp.blockchain_id + cp.signature_scheme + cp.public_key + previous_packet + cp.blockchain_outpoint, 'utf-8')
+    return hashlib.sha256(input).digest().hex()
+
+
+def expected_digest(cp: CommitmentPacket) -> bytes:
+    assert cp.public_key is not None and cp.blockchain_outpoint is not None
+    previous_packet = cp.previous_packet if cp.previous_packet is not None else ""
+    return bytes(cp.asset_id + cp.data + previous_packet + cp.public_key + cp.blockchain_outpoint + cp.blockchain_id, 'utf-8')
+
+
+class CommitmentPacketTest(unittest.TestCase):
+    """ Exercise the CommitmentPacket CPID and digest calculation
+    """
+    def test_cpid_and_digest(self):
+        for previous_packet in [None, "6957ca6359234cf5f7705edda20fa21039a6c1124d216cbc4ab6b5b298eeaacd"]:
+            cp = make_packet(previous_packet)
+            self.assertEqual(cp.get_cpid(), expected_cpid(cp))
+            self.assertEqual(cp.packet_digest(), expected_digest(cp))
+
+    def test_cached(self):
+        cp = make_packet()
+        cpid = cp.get_cpid()
+        self.assertIs(cp.get_cpid(), cpid)
+        self.assertIs(cp.packet_digest(), cp.packet_digest())
+
+    def test_invalidated_on_hashed_field_change(self):
+        cp = make_packet()
+        cpid = cp.get_cpid()
+        digest = cp.packet_digest()
+
+        cp.blockchain_outpoint = "c09e7e87c5d18c93e8e74e7c3baf34799ecf3e720b2b7b473edae4d009a9e322:1"
+        self.assertNotEqual(cp.get_cpid(), cpid)
+        self.assertNotEqual(cp.packet_digest(), digest)
+        self.assertEqual(cp.get_cpid(), expected_cpid(cp))
+        self.assertEqual(cp.packet_digest(), expected_digest(cp))
+
+        cpid = cp.get_cpid()
+        cp.signature_scheme = "SECP256k1"
+        self.assertNotEqual(cp.get_cpid(), cpid)
+        self.assertEqual(cp.get_cpid(), expected_cpid(cp))
+
+    def test_signature_does_not_invalidate(self):
+        cp = make_packet()
+        cpid = cp.get_cpid()
+        cp.signature = "3045"
+        self.assertIs(cp.get_cpid(), cpid)
+
+    def test_digest_without_signature_scheme(self):
+        cp = make_packet()
+        cp.signature_scheme = None
+        self.assertEqual(cp.packet_digest(), expected_digest(cp))
+        cp.signature_scheme = "NIST256p"
+        self.assertEqual(cp.get_cpid(), expected_cpid(cp))
+
+    def test_equality_ignores_cache(self):
+        cp1 = make_packet()
+        cp2 = make_packet()
+        cp1.get_cpid()
+        self.assertEqual(cp1, cp2)
+
+
+if __name__ == "__main__":
+    unittest.main()
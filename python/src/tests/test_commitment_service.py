@@ -1,14 +1,22 @@
 #!/usr/bin/python3
 import unittest
-from unittest.mock import patch, call, mock_open
+from unittest.mock import patch, call, mock_open, AsyncMock, MagicMock
+import asyncio
 import sys
+import hashlib
+import threading
+import time
+from typing import Any, List
 
 sys.path.append("..")
 
 from service.commitment_service import CommitmentService, FinancingService, \
     CommitmentPacket, EthereumService, \
-    CommitmentStore, Tx
+    CommitmentStore, Tx, TxIn, TxOut, Script
+from service.commitment_packet import CommitmentPacketMetadata, CommitmentStatus, CommitmentType, Cpid
+from service.merkle import merkle_root
 from service.token_description import token_store, TokenStore, token_descriptor
+from service.token_wallet import TokenWallet
 from tx_engine import MockInterface
 
 COMMITMENT_STORE_FILE = './fakepath/test-commitments.json'
@@ -235,6 +243,75 @@ class TestCommitmentService(unittest.TestCase):
         ]
         self.mock_ethereum_wallet.assert_has_calls(expected_calls, any_order=True)
 
+    def test_status_from_monitor(self):
+        finance_service = self.service.finance_service
+        finance_service.get_balance.return_value = {"confirmed": 1000}  # type: ignore[attr-defined]
+        self.mock_ethereum_service_instance.get_status.return_value = {"status": "connected"}
+
+        status = self.service.get_status()
+        self.assertIsNone(status["finance_get_balance"])
+        self.assertIsNone(status["dependencies"]["ethereum_connected"]["updated_at"])
+        self.assertEqual(status["actors"], ["Alice", "Bob", "Ted"])
+        finance_service.get_balance.assert_not_called()  # type: ignore[attr-defined]
+
+        self.service.status_monitor.refresh()
+        status = self.service.get_status()
+        self.assertEqual(status["finance_get_balance"], {"confirmed": 1000})
+        self.assertEqual(status["ethereum_connected"], {"status": "connected"})
+        self.service.get_status()
+        finance_service.get_balance.assert_called_once()  # type: ignore[attr-defined]
+
+    def test_get_tx_cached(self):
+        tx = Tx.parse_hexstr(self.mock_financing_service.get_funds.return_value['tx'])
+        self.service.tx_cache.reset()
+        self.service.blockchain_interface.set_transactions({tx.id(): tx.serialize().hex()})
+        with patch.object(self.service.blockchain_interface, 'get_raw_transaction', wraps=self.service.blockchain_interface.get_raw_transaction) as get_raw_transaction:
+            for _ in range(3):
+                result = self.service._get_tx(tx.id())
+                assert result is not None
+                self.assertEqual(result.id(), tx.id())
+            self.assertEqual(asyncio.run(self.service._async_get_tx(tx.id())).id(), tx.id())  # type: ignore[union-attr]
+        get_raw_transaction.assert_called_once_with(tx.id())
+
+    def test_ownership_tx_from_utxo_pool(self):
+        tx = Tx.parse_hexstr(self.mock_financing_service.get_funds.return_value['tx'])
+        vin = TxIn(prev_tx=tx.id(), prev_index=1)
+        self.service.utxo_pool.register("Alice", "mock_locking_script")
+        self.service.utxo_pool.pools["mock_locking_script"].append((vin, tx))
+        self.service.finance_service = self.mock_financing_service
+        self.mock_financing_service.get_funds.reset_mock()
+
+        self.assertEqual(self.service.bsv_create_ownership_tx("mock_locking_script"), (vin, tx))
+        self.mock_financing_service.get_funds.assert_not_called()
+
+        # Falls back to the financing service when the pool is empty
+        result = self.service.bsv_create_ownership_tx("mock_locking_script")
+        assert result is not None
+        self.assertEqual(result[0].as_outpoint(), "c09e7e87c5d18c93e8e74e7c3baf34799ecf3e720b2b7b473edae4d009a9e322:1")
+        self.mock_financing_service.get_funds.assert_called_once()
+
+    @patch('service.commitment_service.Wallet.set_wif', return_value=None)
+    @patch('service.commitment_service.EthereumWallet', autospec=True)
+    @patch('service.commitment_service.EthereumService')
+    def test_public_key_to_owner(self, MockEthereumService, mock_ethereum_wallet, mock_set_wif):
+        # These are documented test keys, do not use in production
+        token_keys = [
+            ("Alice", "92fnTSWFiLbDvDtXNfvHByUhabdmXiv6xfy9a2zEbwqHHNbWY4z", "NIST256p"),
+            ("Bob", "cU4nzixA5cDSXjGX5hcvZ8QjqZBMLGqwNoWCRZ5fwCt2NLJMyyy3", "SECP256k1"),
+        ]
+        config = {
+            'actor': [
+                {'name': name, 'token_key': key, 'token_key_curve': curve, 'bitcoin_key': 'bitcoin_key', 'eth_key': 'eth_key'}
+                for (name, key, curve) in token_keys
+            ]
+        }
+        service = CommitmentService()
+        service.set_actors(config)
+        for (name, _, _) in token_keys:
+            public_key = service.actors_token_wallets[name].get_token_public_key()
+            self.assertEqual(service.public_key_to_owner(public_key), name)
+        self.assertIsNone(service.public_key_to_owner('unknown_public_key'))
+
     @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
     @patch("os.path.exists", return_value=True)
     @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
@@ -270,6 +347,29 @@ class TestCommitmentService(unittest.TestCase):
         self.assertFalse(self.service.can_complete_transfer(cpid, "Alice"))
         self.assertFalse(self.service.can_complete_transfer(cpid, "Bob"))
 
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key', return_value='mock_token_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    @patch('service.commitment_service.verify_signature', return_value=True)
+    def test_signature_verification_cached(self, ver_sig, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script, mock_exists, mock_open):
+        """ Test that repeated signature checks of a packet are served from the cache
+        """
+        self.service.finance_service = self.mock_financing_service
+
+        result = self.service.create_issuance_commitment("Alice", "asset_id", "asset_data", "BSV")
+        assert result is not None
+        (cpid, cp) = result
+
+        self.assertTrue(self.service.is_signature_valid(cpid))
+        self.assertTrue(self.service.can_transfer(cpid, "Bob", is_owner=False))
+        self.assertTrue(self.service.can_transfer(cpid, "Ted", is_owner=False))
+        ver_sig.assert_called_once()
+        self.assertEqual(self.service.verification_cache.hits, 2)
+        self.assertEqual(self.service.verification_cache.misses, 1)
+
     @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
     @patch("os.path.exists", return_value=True)
     @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
@@ -418,6 +518,666 @@ class TestCommitmentService(unittest.TestCase):
         self.assertTrue(self.service.can_transfer(cpid3, "Alice", is_owner=False))
         self.assertTrue(self.service.can_transfer(cpid3, "Ted", is_owner=False))
 
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest')
+    @patch('service.commitment_service.verify_signature', return_value=True)
+    @patch('service.commitment_service.Wallet.sign_tx_with_input')
+    def test_async_issuance_and_transfer(self, mock_sign_tx, ver_sig, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script, mock_exists, mock_open):
+        """ The async methods called by the REST API use the async financing service
+            and broadcast through the async blockchain client
+        """
+        mock_pub_key.side_effect = ['mock_public_key_1', 'mock_public_key_2']
+        mock_sig.side_effect = [b'0x123456', b'0x654321']
+        funds = self.mock_financing_service.get_funds.return_value
+        spending_tx = Tx.parse_hexstr(funds['tx'])
+        mock_sign_tx.return_value = spending_tx
+        self.service.async_finance_service = AsyncMock()
+        self.service.async_finance_service.get_funds.return_value = funds
+
+        async def issue_and_transfer():
+            try:
+                result = await self.service.async_create_issuance_commitment("Alice", "asset_id", "asset_data", "BSV")
+                assert result is not None
+                (cpid, cp) = result
+                result = await self.service.async_create_transfer_template(cpid, "Bob", "BSV")
+                assert result is not None
+                (cpid2, cp2) = result
+                self.assertEqual(cp2.previous_packet, cpid)
+                return await self.service.async_complete_transfer(cpid2, "Alice")
+            finally:
+                await self.service.aclose()
+
+        result = asyncio.run(issue_and_transfer())
+        assert result is not None
+        (cpid2, cp2) = result
+        self.assertIsNotNone(cp2.signature)
+        self.assertEqual(self.service.async_finance_service.get_funds.await_count, 2)
+        self.service.finance_service.get_funds.assert_not_called()  # type: ignore[attr-defined]
+
+        # The spending tx was broadcast through the blockchain interface
+        self.assertIn(spending_tx.id(), self.service.blockchain_interface.get_broadcast_txs())
+        previous_cp_meta = self.service.commitment_store.get_metadata_by_cpid(cp2.previous_packet)
+        assert previous_cp_meta is not None
+        self.assertEqual(previous_cp_meta.state, CommitmentStatus.Transferred)
+        self.assertEqual(previous_cp_meta.spending_tx, spending_tx.serialize().hex())
+
+    def _issue_and_template(self) -> str:
+        """ Issue to Alice and create the template of the transfer to Bob, returns the template cpid
+        """
+        self.service.finance_service = self.mock_financing_service
+        with patch('service.commitment_service.CommitmentService._broadcast_tx', return_value=Tx):
+            result = self.service.create_issuance_commitment("Alice", "asset_id", "asset_data", "BSV")
+            assert result is not None
+            result = self.service.create_transfer_template(result[0], "Bob", "BSV")
+            assert result is not None
+        return result[0]
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    @patch('service.commitment_service.verify_signature', return_value=True)
+    @patch('service.commitment_service.Wallet.sign_tx_with_input')
+    def test_complete_transfer_completed_meanwhile(self, mock_sign_tx, ver_sig, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script, mock_exists, mock_open):
+        """ The previous packet's state is checked again before the transfer is recorded
+        """
+        mock_pub_key.side_effect = ['mock_public_key_1', 'mock_public_key_2']
+        spending_tx = Tx.parse_hexstr(self.mock_financing_service.get_funds.return_value['tx'])
+        mock_sign_tx.return_value = spending_tx
+        cpid2 = self._issue_and_template()
+        transfer_cp_meta = self.service.commitment_store.get_metadata_by_cpid(cpid2)
+        assert transfer_cp_meta is not None
+        previous_cp_meta = self.service.commitment_store.get_metadata_by_cpid(transfer_cp_meta.commitment_packet.previous_packet)
+        assert previous_cp_meta is not None
+
+        def broadcast_tx(tx: Tx) -> str:
+            # Another request completes the transfer during the broadcast
+            previous_cp_meta.state = CommitmentStatus.Transferred
+            return tx.id()
+
+        with patch('service.commitment_service.CommitmentService._broadcast_tx', side_effect=broadcast_tx):
+            self.assertIsNone(self.service.complete_transfer(cpid2, "Alice"))
+        self.assertIsNone(transfer_cp_meta.commitment_packet.signature)
+        self.assertIsNone(previous_cp_meta.spending_tx)
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    @patch('service.commitment_service.verify_signature', return_value=True)
+    @patch('service.commitment_service.Wallet.sign_tx_with_input')
+    def test_complete_transfers_completed_meanwhile(self, mock_sign_tx, ver_sig, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script, mock_exists, mock_open):
+        """ The batch is not recorded if one of its transfers was completed during the broadcast
+        """
+        mock_pub_key.side_effect = ['mock_public_key_1', 'mock_public_key_2']
+        mock_sign_tx.side_effect = lambda index, input_tx, tx: tx
+        cpid2 = self._issue_and_template()
+        transfer_cp_meta = self.service.commitment_store.get_metadata_by_cpid(cpid2)
+        assert transfer_cp_meta is not None
+        previous_cp_meta = self.service.commitment_store.get_metadata_by_cpid(transfer_cp_meta.commitment_packet.previous_packet)
+        assert previous_cp_meta is not None
+
+        def broadcast_tx(tx: Tx) -> str:
+            previous_cp_meta.state = CommitmentStatus.Transferred
+            return tx.id()
+
+        with patch('service.commitment_service.CommitmentService._broadcast_tx', side_effect=broadcast_tx):
+            self.assertIsNone(self.service.complete_transfers([cpid2], "Alice"))
+        self.assertIsNone(transfer_cp_meta.commitment_packet.signature)
+        self.assertIsNone(previous_cp_meta.spending_tx)
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    @patch('service.commitment_service.verify_signature', return_value=True)
+    @patch('service.commitment_service.Wallet.sign_tx_with_input')
+    def test_concurrent_complete_transfer(self, mock_sign_tx, ver_sig, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script, mock_exists, mock_open):
+        """ Of two requests that complete the same transfer at once, only one records it
+        """
+        mock_pub_key.side_effect = ['mock_public_key_1', 'mock_public_key_2']
+        spending_tx = Tx.parse_hexstr(self.mock_financing_service.get_funds.return_value['tx'])
+        mock_sign_tx.return_value = spending_tx
+        cpid2 = self._issue_and_template()
+        barrier = threading.Barrier(2)
+
+        def broadcast_tx(tx: Tx) -> str:
+            # Both requests have passed the checks
+            barrier.wait(5.0)
+            return tx.id()
+
+        results: List[Any] = []
+        with patch('service.commitment_service.CommitmentService._broadcast_tx', side_effect=broadcast_tx):
+            threads = [threading.Thread(target=lambda: results.append(self.service.complete_transfer(cpid2, "Alice"))) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len([result for result in results if result is not None]), 1)
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    @patch('service.commitment_service.verify_signature', return_value=True)
+    @patch('service.commitment_service.Wallet.sign_tx_with_input')
+    def test_queued_transfer(self, mock_sign_tx, ver_sig, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script, mock_exists, mock_open):
+        """ With the broadcast queue enabled the transfer is Transferring until the broadcast is accepted
+        """
+        mock_pub_key.side_effect = ['mock_public_key_1', 'mock_public_key_2']
+        spending_tx = Tx.parse_hexstr(self.mock_financing_service.get_funds.return_value['tx'])
+        mock_sign_tx.return_value = spending_tx
+        cpid2 = self._issue_and_template()
+        broadcast_queue = self.service.broadcast_queue
+        broadcast_queue.enabled = True
+
+        result = self.service.complete_transfer(cpid2, "Alice")
+        assert result is not None
+        (_, cp2) = result
+        self.assertIsNotNone(cp2.signature)
+        assert cp2.previous_packet is not None
+        previous_cp_meta = self.service.commitment_store.get_metadata_by_cpid(cp2.previous_packet)
+        assert previous_cp_meta is not None
+        self.assertEqual(previous_cp_meta.state, CommitmentStatus.Transferring)
+        self.assertEqual(broadcast_queue.depth(), 1)
+        # Bob cannot pass it on until the broadcast is accepted
+        self.assertFalse(self.service.can_transfer(cpid2, "Bob", is_owner=True))
+        self.assertFalse(self.service.can_complete_transfer(cpid2, "Alice"))
+
+        broadcast_queue.start()
+        try:
+            self.assertTrue(broadcast_queue.wait(5.0))
+        finally:
+            broadcast_queue.stop()
+        self.assertEqual(previous_cp_meta.state, CommitmentStatus.Transferred)
+        self.assertIn(spending_tx.id(), self.service.blockchain_interface.get_broadcast_txs())
+        self.assertTrue(self.service.can_transfer(cpid2, "Bob", is_owner=True))
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key', return_value='mock_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    @patch('service.commitment_service.verify_signature', return_value=True)
+    @patch('service.commitment_service.Wallet.sign_tx_with_input')
+    def test_complete_transfers(self, mock_sign_tx, ver_sig, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script, mock_exists, mock_open):
+        """ A batch of transfers is completed by one tx that spends each of the ownership outpoints
+        """
+        mock_sign_tx.side_effect = lambda index, input_tx, tx: tx
+        funds = self.mock_financing_service.get_funds.return_value
+        # Each issuance is funded by a different output of the funding tx
+        self.mock_financing_service.get_funds.side_effect = [
+            {**funds, 'outpoints': [{'hash': funds['outpoints'][0]['hash'], 'index': i}]} for i in (1, 0, 0, 1)
+        ]
+        token_store.tokens['asset_data_2'] = token_descriptor(ipfs_cid='asset_data_2', description='asset description', cpid='')
+        self.service.finance_service = self.mock_financing_service
+        templates: List[str] = []
+        with patch('service.commitment_service.CommitmentService._broadcast_tx', return_value=Tx):
+            for asset_data in ('asset_data', 'asset_data_2'):
+                result = self.service.create_issuance_commitment("Alice", "asset_id", asset_data, "BSV")
+                assert result is not None
+                result = self.service.create_transfer_template(result[0], "Bob", "BSV")
+                assert result is not None
+                templates.append(result[0])
+
+        self.assertIsNone(self.service.complete_transfers([templates[0], templates[0]], "Alice"))
+        self.assertIsNone(self.service.complete_transfers(templates, "Bob"))
+        self.service.batch_max_size = 1
+        self.assertIsNone(self.service.complete_transfers(templates, "Alice"))
+        self.service.batch_max_size = 100
+
+        with patch.object(self.service.commitment_store, 'save', return_value=True) as save:
+            results = self.service.complete_transfers(templates, "Alice")
+        assert results is not None
+        self.assertEqual([cpid for (cpid, _) in results], templates)
+        self.assertTrue(all(cp.signature is not None for (_, cp) in results))
+        # The store is saved once for the batch
+        save.assert_called_once()
+
+        previous = [self.service.commitment_store.get_metadata_by_cpid(str(cp.previous_packet)) for (_, cp) in results]
+        self.assertTrue(all(cp_meta is not None and cp_meta.state == CommitmentStatus.Transferred for cp_meta in previous))
+        spending_tx = Tx.parse_hexstr(previous[0].spending_tx)  # type: ignore[union-attr]
+        self.assertEqual(previous[1].spending_tx, previous[0].spending_tx)  # type: ignore[union-attr]
+        self.assertEqual([tx_in.prev_index for tx_in in spending_tx.tx_ins], [1, 0])
+        self.assertEqual(len(spending_tx.tx_outs), 2)
+        self.assertEqual(mock_sign_tx.call_count, 2)
+        self.assertIn(spending_tx.id(), self.service.blockchain_interface.get_broadcast_txs())
+        # Completed transfers cannot be completed again
+        self.assertIsNone(self.service.complete_transfers(templates, "Alice"))
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key', return_value='mock_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    @patch('service.commitment_service.verify_signature', return_value=True)
+    @patch('service.commitment_service.Wallet.sign_tx_with_input')
+    def test_transfer_commitments(self, mock_sign_tx, ver_sig, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script, mock_exists, mock_open):
+        """ A bulk transfer funds the new outpoints once, then creates and completes every template
+        """
+        mock_sign_tx.side_effect = lambda index, input_tx, tx: tx
+        funds = self.mock_financing_service.get_funds.return_value
+        self.mock_financing_service.get_funds.side_effect = [
+            {**funds, 'outpoints': [{'hash': funds['outpoints'][0]['hash'], 'index': i}]} for i in (1, 0)
+        ]
+        token_store.tokens['asset_data_2'] = token_descriptor(ipfs_cid='asset_data_2', description='asset description', cpid='')
+        self.service.finance_service = self.mock_financing_service
+        self.service.sign_workers = 2
+        cpids: List[str] = []
+        for asset_data in ('asset_data', 'asset_data_2'):
+            result = self.service.create_issuance_commitment("Alice", "asset_id", asset_data, "BSV")
+            assert result is not None
+            cpids.append(result[0])
+
+        self.assertIsNone(self.service.transfer_commitments([cpids[0], cpids[0]], "Alice", "Bob"))
+        self.assertIsNone(self.service.transfer_commitments(cpids, "Bob", "Ted"))
+        self.assertIsNone(self.service.transfer_commitments(cpids, "Alice", "Alice"))
+        self.mock_financing_service._get_funds.assert_not_called()
+
+        # The financing service returns one outpoint for the two transfers
+        funding_tx = Tx(version=1, tx_ins=[TxIn(prev_tx="ab" * 32, prev_index=0)], tx_outs=[TxOut(amount=100, script_pubkey=Script.parse_string("OP_1")) for _ in range(2)])
+        self.mock_financing_service._get_funds.return_value = {
+            'status': 'Success', 'outpoints': [{'hash': funding_tx.id(), 'index': 0}], 'tx': funding_tx.serialize().hex()
+        }
+        self.assertIsNone(self.service.transfer_commitments(cpids, "Alice", "Bob"))
+        self.assertEqual(len(self.service.commitment_store.commitments), 2)
+
+        self.mock_financing_service._get_funds.reset_mock()
+        self.mock_financing_service._get_funds.return_value['outpoints'] = [{'hash': funding_tx.id(), 'index': i} for i in range(2)]
+        with patch.object(self.service.commitment_store, 'save', return_value=True) as save, \
+                patch.object(token_store, 'save', return_value=True) as token_save:
+            results = self.service.transfer_commitments(cpids, "Alice", "Bob")
+        assert results is not None
+        save.assert_called_once()
+        token_save.assert_called_once()
+        self.mock_financing_service._get_funds.assert_called_once_with(100, 'mock_locking_script', 2, False)
+
+        self.assertEqual([cp.previous_packet for (_, cp) in results], cpids)
+        self.assertEqual([cp.blockchain_outpoint for (_, cp) in results], [f"{funding_tx.id()}:{i}" for i in range(2)])
+        self.assertTrue(all(cp.signature is not None for (_, cp) in results))
+        previous = [self.service.commitment_store.get_metadata_by_cpid(cpid) for cpid in cpids]
+        self.assertTrue(all(cp_meta is not None and cp_meta.state == CommitmentStatus.Transferred for cp_meta in previous))
+        spending_tx = Tx.parse_hexstr(previous[0].spending_tx)  # type: ignore[union-attr]
+        self.assertEqual([tx_in.prev_index for tx_in in spending_tx.tx_ins], [1, 0])
+        self.assertIn(spending_tx.id(), self.service.blockchain_interface.get_broadcast_txs())
+        self.assertEqual(sorted(cpid for (cpid, _) in self.service.commitment_packets_owned_by_actor("Bob") or []), sorted(cpid for (cpid, _) in results))
+        self.assertTrue(all(self.service.can_transfer(cpid, "Bob", is_owner=True) for (cpid, _) in results))
+        # Each transfer's ownership tx is the shared funding tx, stored with the first template
+        self.assertEqual([self.service.get_commitment_tx_by_cpid(cpid) for (cpid, _) in results], [f"https://test.whatsonchain.com/tx/{funding_tx.id()}"] * 2)
+        templates = [self.service.commitment_store.get_metadata_by_cpid(cpid) for (cpid, _) in results]
+        self.assertEqual([cp_meta.ownership_tx for cp_meta in templates if cp_meta is not None], [funding_tx.serialize().hex(), None])
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script', return_value=Script.parse_string("OP_1"))
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key', return_value='mock_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    @patch('service.commitment_service.verify_signature', return_value=True)
+    @patch('service.commitment_service.Wallet.sign_tx_with_input')
+    def test_handover_transfer(self, mock_sign_tx, ver_sig, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script_hex, mock_get_locking_script, mock_exists, mock_open):
+        """ A handover transfer is completed by one tx that spends the previous outpoint to the new owner
+        """
+        mock_sign_tx.side_effect = lambda index, input_tx, tx: tx
+        self.service.finance_service = self.mock_financing_service
+        self.service.handover_transfers = True
+        result = self.service.create_issuance_commitment("Alice", "asset_id", "asset_data", "BSV")
+        assert result is not None
+        (cpid, cp) = result
+
+        self.mock_financing_service.get_funds.reset_mock()
+        result = self.service.create_transfer_template(cpid, "Bob", "BSV")
+        assert result is not None
+        (template_cpid, template) = result
+        self.mock_financing_service.get_funds.assert_not_called()
+        self.assertEqual(template.blockchain_outpoint, cp.blockchain_outpoint)
+        # Handover templates are not completed in a batch
+        self.assertIsNone(self.service.complete_transfers([template_cpid], "Alice"))
+
+        result = self.service.complete_transfer(template_cpid, "Alice")
+        assert result is not None
+        (cpid2, cp2) = result
+        self.assertNotEqual(cpid2, template_cpid)
+        self.assertFalse(self.service.is_known_cpid(template_cpid))
+        previous_cp_meta = self.service.commitment_store.get_metadata_by_cpid(cpid)
+        assert previous_cp_meta is not None and previous_cp_meta.spending_tx is not None
+        self.assertEqual(previous_cp_meta.state, CommitmentStatus.Transferred)
+        handover_tx = Tx.parse_hexstr(previous_cp_meta.spending_tx)
+        self.assertEqual(cp2.blockchain_outpoint, f"{handover_tx.id()}:0")
+        self.assertEqual(handover_tx.tx_ins[0].prev_index, 1)
+        # The ownership output of 100 satoshis less the fee, and an OP_RETURN of the previous cpid
+        self.assertEqual(handover_tx.tx_outs[0].amount, 88)
+        self.assertIn(bytes.fromhex(cpid), handover_tx.tx_outs[1].script_pubkey.raw_serialize())
+        self.assertIn(handover_tx.id(), self.service.blockchain_interface.get_broadcast_txs())
+        self.assertEqual([c for (c, _) in self.service.commitment_packets_owned_by_actor("Bob") or []], [cpid2])
+        self.assertTrue(self.service.can_transfer(cpid2, "Bob", is_owner=True))
+
+        # An ownership output that cannot pay the handover fee is transferred with a funded outpoint
+        self.service.handover_fee_rate = 1.0
+        result = self.service.create_transfer_template(cpid2, "Ted", "BSV")
+        assert result is not None
+        self.mock_financing_service.get_funds.assert_called_once()
+        self.assertNotEqual(result[1].blockchain_outpoint, cp2.blockchain_outpoint)
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script', return_value=Script.parse_string("OP_1"))
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key', return_value='mock_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    @patch('service.commitment_service.verify_signature', return_value=True)
+    @patch('service.commitment_service.Wallet.sign_tx_with_input')
+    def test_handover_transfer_failed(self, mock_sign_tx, ver_sig, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script_hex, mock_get_locking_script, mock_exists, mock_open):
+        """ The handover is stored as Transferring before its tx is broadcast, and reverted to the template if it fails
+        """
+        mock_sign_tx.side_effect = lambda index, input_tx, tx: tx
+        self.service.finance_service = self.mock_financing_service
+        self.service.handover_transfers = True
+        result = self.service.create_issuance_commitment("Alice", "asset_id", "asset_data", "BSV")
+        assert result is not None
+        (cpid, cp) = result
+        result = self.service.create_transfer_template(cpid, "Bob", "BSV")
+        assert result is not None
+        template_cpid = result[0]
+
+        def reject(tx: str) -> str:
+            previous_cp_meta = self.service.commitment_store.get_metadata_by_cpid(cpid)
+            assert previous_cp_meta is not None
+            self.assertEqual(previous_cp_meta.state, CommitmentStatus.Transferring)
+            self.assertFalse(self.service.is_known_cpid(template_cpid))
+            self.assertEqual(save.call_count, 1)
+            return "bad-txns-inputs-missingorspent"
+
+        with patch.object(self.service.blockchain_interface, 'broadcast_tx', side_effect=reject), \
+                patch.object(self.service.commitment_store, 'save', return_value=True) as save:
+            self.assertIsNone(self.service.complete_transfer(template_cpid, "Alice"))
+        self.assertEqual(save.call_count, 2)
+
+        with patch.object(CommitmentService, '_apply_transfer', return_value=False), \
+                patch.object(self.service.blockchain_interface, 'broadcast_tx') as broadcast:
+            self.assertIsNone(self.service.complete_transfer(template_cpid, "Alice"))
+        broadcast.assert_not_called()
+
+        # The template is back, with the previous outpoint, and the token is still Alice's
+        transfer_cp_meta = self.service.commitment_store.get_metadata_by_cpid(template_cpid)
+        assert transfer_cp_meta is not None
+        self.assertEqual(transfer_cp_meta.commitment_packet.get_cpid(), template_cpid)
+        self.assertEqual(transfer_cp_meta.commitment_packet.blockchain_outpoint, cp.blockchain_outpoint)
+        self.assertIsNone(transfer_cp_meta.ownership_tx)
+        self.assertIsNone(transfer_cp_meta.commitment_packet.signature)
+        previous_cp_meta = self.service.commitment_store.get_metadata_by_cpid(cpid)
+        assert previous_cp_meta is not None
+        self.assertEqual(previous_cp_meta.state, CommitmentStatus.Created)
+        self.assertIsNone(previous_cp_meta.spending_tx)
+        self.assertEqual([c for (c, _) in self.service.commitment_packets_owned_by_actor("Alice") or []], [cpid])
+        self.assertEqual(self.service.commitment_packets_owned_by_actor("Bob") or [], [])
+        self.assertEqual(len(self.service.commitment_store.commitments), 2)
+
+        # It can be completed again
+        result = self.service.complete_transfer(template_cpid, "Alice")
+        assert result is not None
+        self.assertEqual([c for (c, _) in self.service.commitment_packets_owned_by_actor("Bob") or []], [result[0]])
+
+    def _funding(self, amount: int) -> dict:
+        """ get_funds results with an outpoint of amount satoshis
+        """
+        funding_tx = Tx(version=1, tx_ins=[TxIn(prev_tx="ab" * 32, prev_index=0)], tx_outs=[TxOut(amount=amount, script_pubkey=Script.parse_string("OP_1"))])
+        return {'status': 'Success', 'outpoints': [{'hash': funding_tx.id(), 'index': 0}], 'tx': funding_tx.serialize().hex()}
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key', return_value='mock_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    def test_create_issuance_commitments(self, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script_hex, mock_exists, mock_open):
+        """ A batch of issuances is funded by one request, signed on the pool and stored with one save
+        """
+        funding_tx = Tx(version=1, tx_ins=[TxIn(prev_tx="ab" * 32, prev_index=0)], tx_outs=[TxOut(amount=100, script_pubkey=Script.parse_string("OP_1")) for _ in range(2)])
+        self.mock_financing_service._get_funds.return_value = {
+            'status': 'Success',
+            'outpoints': [{'hash': funding_tx.id(), 'index': i} for i in range(2)],
+            'tx': funding_tx.serialize().hex(),
+        }
+        self.service.finance_service = self.mock_financing_service
+        self.service.sign_workers = 2
+        for token_id in ['asset_data_2', 'asset_data_3']:
+            token_store.tokens[token_id] = token_descriptor(ipfs_cid=token_id, description='asset description', cpid='')
+        issuances = [("asset_id", "asset_data"), ("asset_id", "asset_data_2"), ("asset_id", "asset_data"), ("asset_id", "not_a_token"), ("asset_id", "asset_data_3")]
+
+        with patch.object(self.service.commitment_store, 'save', return_value=True) as save, \
+                patch.object(token_store, 'save', return_value=True) as token_save:
+            results = self.service.create_issuance_commitments("Alice", issuances, "BSV")
+        save.assert_called_once()
+        token_save.assert_called_once()
+        # One request for the three issuances that passed the checks, the financing service returned two outpoints
+        self.mock_financing_service._get_funds.assert_called_once_with(100, 'mock_locking_script', 3, False)
+        self.assertIsNotNone(self.service.sign_executor)
+        self.assertEqual([result["error"] for result in results], [
+            None, None, "The token is repeated in the batch", "The token is not available", "Unable to fund the ownership tx"])
+        for (i, result) in enumerate(results[:2]):
+            cp_meta = self.service.commitment_store.get_metadata_by_cpid(result["cpid"])
+            assert cp_meta is not None
+            self.assertEqual(cp_meta.commitment_packet, result["commitment"])
+            self.assertEqual(cp_meta.commitment_packet.blockchain_outpoint, f"{funding_tx.id()}:{i}")
+            # The shared funding tx is stored with the first record only
+            self.assertEqual(cp_meta.ownership_tx, funding_tx.serialize().hex() if i == 0 else None)
+            self.assertEqual(cp_meta.commitment_packet.signature, b'0x123456'.hex())
+            self.assertEqual(self.service.get_commitment_tx_by_cpid(result["cpid"]), f"https://test.whatsonchain.com/tx/{funding_tx.id()}")
+        self.assertEqual(self.service.tx_cache.get(funding_tx.id()), funding_tx.serialize().hex())
+        # The unfunded token is still available
+        self.assertIsNotNone(token_store.tokens.pop("asset_data_3", None))
+        self.assertEqual(len(self.service.commitment_packets_owned_by_actor("Alice") or []), 2)
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key', return_value='mock_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    def test_create_issuance_commitments_token_issued_meanwhile(self, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script_hex, mock_exists, mock_open):
+        """ A token issued by another request while the batch is funded is not issued again
+        """
+        funding_tx = Tx(version=1, tx_ins=[TxIn(prev_tx="ab" * 32, prev_index=0)], tx_outs=[TxOut(amount=100, script_pubkey=Script.parse_string("OP_1")) for _ in range(2)])
+        token_store.tokens['asset_data_2'] = token_descriptor(ipfs_cid='asset_data_2', description='asset description', cpid='')
+
+        def get_funds(*args) -> dict:
+            token_store.assign_to_actor("Bob", "asset_data_2", "cpid")
+            return {
+                'status': 'Success',
+                'outpoints': [{'hash': funding_tx.id(), 'index': i} for i in range(2)],
+                'tx': funding_tx.serialize().hex(),
+            }
+
+        self.mock_financing_service._get_funds.side_effect = get_funds
+        self.service.finance_service = self.mock_financing_service
+        with patch.object(self.service.commitment_store, 'save', return_value=True), patch.object(token_store, 'save', return_value=True):
+            results = self.service.create_issuance_commitments("Alice", [("asset_id", "asset_data"), ("asset_id", "asset_data_2")], "BSV")
+        self.assertEqual([result["error"] for result in results], [None, "The token is not available"])
+        self.assertIsNone(results[1]["cpid"])
+        self.assertEqual(len(self.service.commitment_packets_owned_by_actor("Alice") or []), 1)
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script', return_value=Script.parse_string("OP_1"))
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key', return_value='mock_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    @patch('service.commitment_service.Wallet.sign_tx_with_input')
+    def test_anchored_issuance(self, mock_sign_tx, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script_hex, mock_get_locking_script, mock_exists, mock_open):
+        """ A batch of issuances is funded once and anchored by the Merkle root of their cpids
+        """
+        mock_sign_tx.side_effect = lambda index, input_tx, tx: tx
+        self.mock_financing_service.get_funds.reset_mock()
+        self.mock_financing_service.get_funds.return_value = self._funding(10000)
+        self.service.finance_service = self.mock_financing_service
+        token_store.tokens['asset_data_2'] = token_descriptor(ipfs_cid='asset_data_2', description='asset description', cpid='')
+        requests = [("asset_id", "asset_data"), ("asset_id", "asset_data_2"), ("asset_id", "asset_data"), ("asset_id", "not_a_token")]
+
+        with patch.object(self.service.commitment_store, 'save', return_value=True) as save:
+            results = self.service._anchor_issuances("Alice", requests)
+        save.assert_called_once()
+        self.mock_financing_service.get_funds.assert_called_once()
+        # The repeated and unknown tokens are not issued
+        self.assertIsNone(results[2])
+        self.assertIsNone(results[3])
+        cpids = [result[0] for result in results[:2] if result is not None]
+        self.assertEqual(len(cpids), 2)
+
+        cp_metas = [self.service.commitment_store.get_metadata_by_cpid(cpid) for cpid in cpids]
+        assert cp_metas[0] is not None and cp_metas[1] is not None
+        assert cp_metas[0].anchor is not None
+        self.assertEqual([cp_meta.commitment_packet.blockchain_outpoint.split(":")[1] for cp_meta in cp_metas], ["0", "1"])  # type: ignore[union-attr]
+        self.assertIsNone(cp_metas[0].ownership_tx)
+        self.assertEqual(cp_metas[0].anchor.root, merkle_root([bytes.fromhex(cpid) for cpid in cpids]).hex())
+        # The split tx and anchor tx are broadcast, and cached
+        broadcast_txs = self.service.blockchain_interface.get_broadcast_txs()
+        self.assertIn(cp_metas[0].anchor.txid, broadcast_txs)
+        self.assertIn(cp_metas[0].commitment_packet.get_blockchain_txid(), broadcast_txs)
+        self.assertTrue(all(self.service.is_anchor_valid(cpid) for cpid in cpids))
+        self.assertIsNotNone(self.service.get_commitment_tx_by_cpid(cpids[0]))
+
+        # A proof that does not lead to the root
+        cp_metas[0].anchor.index = 1
+        self.assertFalse(self.service.is_anchor_valid(cpids[0]))
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script', return_value=Script.parse_string("OP_1"))
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key', return_value='mock_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    @patch('service.commitment_service.Wallet.sign_tx_with_input')
+    @patch('service.commitment_service.verify_signature', return_value=True)
+    def test_issuance_batcher(self, mock_verify, mock_sign_tx, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script_hex, mock_get_locking_script, mock_exists, mock_open):
+        """ With the issuance batcher enabled create_issuance_commitment returns once its batch is anchored
+        """
+        mock_sign_tx.side_effect = lambda index, input_tx, tx: tx
+        self.service.finance_service = self.mock_financing_service
+        batcher = self.service.issuance_batcher
+        batcher.enabled = True
+        batcher.window = 0.01
+        batcher.start()
+        try:
+            # Too little to fund the batch
+            self.mock_financing_service.get_funds.return_value = self._funding(150)
+            self.assertIsNone(self.service.create_issuance_commitment("Alice", "asset_id", "asset_data", "BSV"))
+            self.mock_financing_service.get_funds.return_value = self._funding(10000)
+            result = self.service.create_issuance_commitment("Alice", "asset_id", "asset_data", "BSV")
+        finally:
+            batcher.stop()
+        assert result is not None
+        self.assertTrue(self.service.is_anchor_valid(result[0]))
+        status = self.service.get_commitment_status(result[0])
+        assert status is not None
+        self.assertTrue(status[0]["anchor_valid"])
+
+    def test_batch_merkle_root(self):
+        """ With batch_merkle_root the batch spending tx has one OP_RETURN, of the Merkle root of the cpids
+        """
+        wallet = MagicMock()
+        wallet.sign_tx_with_input.side_effect = lambda index, input_tx, tx: tx
+        cpids = [Cpid(hashlib.sha256(bytes([i])).hexdigest()) for i in range(3)]
+        outpoints = [TxIn(prev_tx="ab" * 32, prev_index=i) for i in range(3)]
+        ownership_tx = Tx.parse_hexstr(self.mock_financing_service.get_funds.return_value['tx'])
+        self.service.batch_merkle_root = True
+        spending_tx = self.service._sign_batch_spending_tx(wallet, outpoints, [ownership_tx] * 3, cpids)
+        assert spending_tx is not None
+        self.assertEqual(len(spending_tx.tx_ins), 3)
+        self.assertEqual(len(spending_tx.tx_outs), 1)
+        root = merkle_root([bytes.fromhex(cpid) for cpid in cpids])
+        self.assertIn(root, spending_tx.tx_outs[0].script_pubkey.raw_serialize())
+        self.assertEqual([c.args[0] for c in wallet.sign_tx_with_input.call_args_list], [0, 1, 2])
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    @patch('service.commitment_service.verify_signature', return_value=True)
+    def test_spent_outpoint_not_transferable(self, ver_sig, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script, mock_exists, mock_open):
+        """ A commitment whose ownership outpoint the spent watcher has seen spent cannot be transferred
+        """
+        mock_pub_key.side_effect = ['mock_public_key_1', 'mock_public_key_2']
+        cpid2 = self._issue_and_template()
+        cp2 = self.service.commitment_store.get_commitment_by_cpid(cpid2)
+        assert cp2 is not None and cp2.previous_packet is not None
+        cp = self.service.commitment_store.get_commitment_by_cpid(cp2.previous_packet)
+        assert cp is not None and cp.blockchain_outpoint is not None
+        # Both are live until the transfer is completed
+        outpoint = ("BSV", cp.blockchain_outpoint)
+        self.assertIn(outpoint, self.service._live_outpoints())
+        self.assertIn(("BSV", cp2.blockchain_outpoint), self.service._live_outpoints())
+
+        self.service.spent_watcher.spent[outpoint] = False
+        self.assertTrue(self.service.can_complete_transfer(cpid2, "Alice"))
+        self.service.spent_watcher.spent[outpoint] = True
+        self.assertFalse(self.service.can_complete_transfer(cpid2, "Alice"))
+        self.assertFalse(self.service.can_transfer(cp2.previous_packet, "Ted", is_owner=False))
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
+    @patch("os.path.exists", return_value=True)
+    @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
+    @patch('service.commitment_service.TokenWallet.get_signature_scheme', return_value='NIST256p')
+    @patch('service.commitment_service.TokenWallet.get_token_public_key')
+    @patch('service.commitment_service.TokenWallet.sign_commitment_packet_digest', return_value=b'0x123456')
+    @patch('service.commitment_service.verify_signature', return_value=True)
+    @patch('service.commitment_service.Wallet.sign_tx_with_input')
+    def test_queued_transfer_rejected(self, mock_sign_tx, ver_sig, mock_sig, mock_pub_key, mock_sig_scheme, mock_get_locking_script, mock_exists, mock_open):
+        """ A rejected broadcast reverts the transfer, so that it can be completed again
+        """
+        mock_pub_key.side_effect = ['mock_public_key_1', 'mock_public_key_2']
+        spending_tx = Tx.parse_hexstr(self.mock_financing_service.get_funds.return_value['tx'])
+        mock_sign_tx.return_value = spending_tx
+        cpid2 = self._issue_and_template()
+        broadcast_queue = self.service.broadcast_queue
+        broadcast_queue.enabled = True
+
+        with patch.object(self.service.blockchain_interface, 'broadcast_tx', return_value="bad-txns-inputs-missingorspent"), \
+                patch.object(self.service.commitment_store, 'save', return_value=True) as save:
+            broadcast_queue.start()
+            try:
+                # The revert on the broadcast thread waits for the store lock
+                with self.service.commitment_store.lock:
+                    result = self.service.complete_transfer(cpid2, "Alice")
+                    assert result is not None
+                    time.sleep(0.1)
+                    transfer_cp_meta = self.service.commitment_store.get_metadata_by_cpid(cpid2)
+                    assert transfer_cp_meta is not None
+                    self.assertIsNotNone(transfer_cp_meta.commitment_packet.signature)
+                    save.reset_mock()
+                self.assertTrue(broadcast_queue.wait(5.0))
+            finally:
+                broadcast_queue.stop()
+        # The transfer and the previous packet are reverted with one save
+        save.assert_called_once()
+
+        self.assertIsNone(transfer_cp_meta.commitment_packet.signature)
+        previous_cp_meta = self.service.commitment_store.get_metadata_by_cpid(transfer_cp_meta.commitment_packet.previous_packet)
+        assert previous_cp_meta is not None
+        self.assertEqual(previous_cp_meta.state, CommitmentStatus.Created)
+        self.assertIsNone(previous_cp_meta.spending_tx)
+        self.assertTrue(self.service.can_complete_transfer(cpid2, "Alice"))
+
     @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value"}')
     @patch("os.path.exists", return_value=True)
     @patch('service.commitment_service.Wallet.get_locking_script_as_hex', return_value='mock_locking_script')
@@ -524,5 +1284,99 @@ class TestCommitmentService(unittest.TestCase):
         self.assertTrue(self.service.can_transfer(cpid5, "Bob", is_owner=False))
 
 
+def make_signed_packet(previous: None | CommitmentPacket, owner: TokenWallet, signer: TokenWallet, outpoint: str) -> CommitmentPacket:
+    cp = CommitmentPacket(
+        asset_id="asset_id", data="asset_data", previous_packet=previous.get_cpid() if previous is not None else None,
+        blockchain_outpoint=hashlib.sha256(bytes(outpoint, 'utf-8')).hexdigest() + ":1", blockchain_id="BSV",
+        signature=None, signature_scheme=owner.get_signature_scheme(), public_key=owner.get_token_public_key(),
+    )  # type: ignore[call-arg]
+    cp.signature = signer.sign_commitment_packet_digest(cp.packet_digest(), hashlib.sha256).hex()
+    return cp
+
+
+class TestVerifyCommitments(unittest.TestCase):
+    """ Batch verification of commitments by cpid and as packets
+    """
+    def setUp(self):
+        # These are documented test keys, do not use in production
+        self.alice = TokenWallet()
+        self.alice.set_key("92fnTSWFiLbDvDtXNfvHByUhabdmXiv6xfy9a2zEbwqHHNbWY4z", "NIST256p")
+        self.bob = TokenWallet()
+        self.bob.set_key("cU4nzixA5cDSXjGX5hcvZ8QjqZBMLGqwNoWCRZ5fwCt2NLJMyyy3", "SECP256k1")
+
+        self.issuance = make_signed_packet(None, self.alice, self.alice, "issuance")
+        # Alice transfers to Bob
+        self.transfer = make_signed_packet(self.issuance, self.bob, self.alice, "transfer")
+        self.service = CommitmentService()
+        self.service.verify_workers = 0
+        self.service.commitment_store.commitments = [
+            CommitmentPacketMetadata(
+                owner=owner, type=cp_type, state=state, ownership_tx=None, spending_tx=None,
+                commitment_packet_id=cp.get_cpid(), commitment_packet=cp)
+            for (owner, cp_type, state, cp) in [
+                ("Alice", CommitmentType.Issuance, CommitmentStatus.Transferred, self.issuance),
+                ("Bob", CommitmentType.Transfer, CommitmentStatus.Created, self.transfer),
+            ]
+        ]
+
+    def test_verify_by_cpid_and_packet(self):
+        # Bob transfers on, the new packet is not in the store
+        packet = make_signed_packet(self.transfer, self.alice, self.bob, "transfer2")
+        results = self.service.verify_commitments([self.issuance.get_cpid(), self.transfer.get_cpid(), "unknown"], [packet])
+        self.assertEqual([r["cpid"] for r in results], [self.issuance.get_cpid(), self.transfer.get_cpid(), "unknown", packet.get_cpid()])
+        self.assertEqual([r["known"] for r in results], [True, True, False, False])
+        self.assertEqual([r["signature_valid"] for r in results], [True, True, False, True])
+        self.assertEqual([r["chain_valid"] for r in results], [True, True, False, True])
+        self.assertEqual(results[2]["errors"], ["unknown cpid"])
+
+    def test_invalid_previous_signature(self):
+        self.issuance.signature = self.bob.sign_commitment_packet_digest(self.issuance.packet_digest(), hashlib.sha256).hex()
+        results = self.service.verify_commitments([self.transfer.get_cpid()], [])
+        self.assertTrue(results[0]["signature_valid"])
+        self.assertFalse(results[0]["chain_valid"])
+        self.assertEqual(results[0]["errors"], [f"signature does not verify for previous packet {self.issuance.get_cpid()}"])
+
+    def test_signed_by_new_owner(self):
+        packet = make_signed_packet(self.transfer, self.alice, self.alice, "transfer2")
+        results = self.service.verify_commitments([], [packet])
+        self.assertFalse(results[0]["signature_valid"])
+        self.assertFalse(results[0]["chain_valid"])
+
+    def test_unknown_previous(self):
+        packet = make_signed_packet(None, self.alice, self.alice, "issuance2")
+        packet.previous_packet = "00" * 32
+        results = self.service.verify_commitments([], [packet])
+        self.assertFalse(results[0]["chain_valid"])
+        self.assertIn(f"previous packet {'00' * 32} is unknown", results[0]["errors"])
+
+    def test_results_cached(self):
+        cpids: List[str] = [self.issuance.get_cpid(), self.transfer.get_cpid()]
+        first = self.service.verify_commitments(cpids, [])
+        self.assertEqual(self.service.verification_cache.misses, 2)
+        self.assertEqual(self.service.verify_commitments(cpids, []), first)
+        self.assertEqual(self.service.verification_cache.misses, 2)
+        self.assertEqual(self.service.verification_cache.hits, 2)
+
+    def test_is_signature_valid_uses_previous_curve(self):
+        """ The transfer is signed by Alice's NIST256p key, the packet's own scheme is Bob's SECP256k1
+        """
+        self.assertTrue(self.service.is_signature_valid(self.transfer.get_cpid()))
+        results = self.service.verify_commitments([self.transfer.get_cpid()], [])
+        self.assertTrue(results[0]["signature_valid"])
+        # Both paths use the same cache key
+        self.assertEqual(self.service.verification_cache.hits, 1)
+
+    def test_process_pool(self):
+        self.service.verify_workers = 2
+        self.service.verify_chunk_size = 1
+        self.issuance.signature = self.bob.sign_commitment_packet_digest(self.issuance.packet_digest(), hashlib.sha256).hex()
+        results = self.service.verify_commitments([self.issuance.get_cpid(), self.transfer.get_cpid()], [])
+        self.assertIsNotNone(self.service.verify_executor)
+        self.service.shutdown_executors()
+        self.assertIsNone(self.service.verify_executor)
+        self.assertEqual([r["signature_valid"] for r in results], [False, True])
+        self.assertEqual([r["chain_valid"] for r in results], [False, False])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -3,6 +3,8 @@ import unittest
 from unittest.mock import patch, mock_open
 import os
 import sys
+import tempfile
+from pydantic import ValidationError
 sys.path.append("..")
 
 from service.commitment_store import CommitmentStore
@@ -117,6 +119,52 @@ class CommitmentStoreTests(unittest.TestCase):
         )
         self.assertEqual(self.cs.commitments, [CP_META])
 
+    def test_binary_format(self):
+        cp = CommitmentPacket(
+            asset_id="person", data="Murphy", previous_packet=None,
+            blockchain_outpoint="6e59cf55510fb810ae51e2948ae27055559e6795f56c85a2c8c7171eac98ed48:1", blockchain_id="BSV",
+            signature="3045", signature_scheme="NIST256p", public_key="02b4632d08485ff1df2db55b9dafd23347d1c47a457072a1e87be26896549a8737"
+        )  # type: ignore[call-arg]
+        cp_meta = CommitmentPacketMetadata(
+            owner="Alice", type=CommitmentType.Issuance, state=CommitmentStatus.Created, ownership_tx="0100",
+            spending_tx=None, commitment_packet_id=cp.get_cpid(), commitment_packet=cp
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            config = {"commitment_store": {"filepath": os.path.join(directory, "commitments.bin"), "format": "binary"}}
+            self.cs.set_config(config)
+            self.cs.add_commitment(cp_meta)
+            with open(self.cs.filepath, 'rb') as f:
+                self.assertEqual(f.read(4), b"UBAC")
+
+            cs = CommitmentStore()
+            cs.set_config(config)
+            self.assertTrue(cs.load())
+            self.assertEqual(cs.commitments, [cp_meta])
+
+            # A JSON store is still loaded and converted on the next save
+            cs.format = "json"
+            cs.save()
+            self.assertTrue(self.cs.load())
+            self.assertEqual(self.cs.commitments, [cp_meta])
+
+        with self.assertRaises(ValueError):
+            self.cs.set_config({"commitment_store": {"filepath": COMMITMENT_STORE_FILE, "format": "xml"}})
+
+    def test_load_invalid_store(self):
+        """ A store that is not a valid encoding is not loaded, a record that fails validation is raised
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            cs = CommitmentStore()
+            cs.filepath = os.path.join(directory, "commitments.json")
+            for contents in (b"[{", b"UBAC\x01\x05"):
+                with open(cs.filepath, 'wb') as f:
+                    f.write(contents)
+                self.assertFalse(cs.load())
+            with open(cs.filepath, 'w') as f:
+                f.write('[{"owner": "Alice"}]')
+            with self.assertRaises(ValidationError):
+                cs.load()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,303 @@
+#!/usr/bin/python3
+import unittest
+import sys
+import functools
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from unittest.mock import patch, MagicMock
+
+sys.path.append("..")
+
+from tx_engine import Tx, TxIn, TxOut, Script, MockInterface
+
+from service.financing_service import FinancingService, FinancingServiceException, AsyncFinancingService
+from service.blockchain_client import AsyncBlockchainClient
+from service.metrics import metrics
+
+CONFIG = {
+    "finance_service": {
+        "url": "http://financing_service:8070",
+        "client_id": "uba",
+        "visibility_timeout": 0.2,
+    }
+}
+
+
+class CachingInterface(MockInterface):
+    """ Caches get_raw_transaction, including not found results, as the WoCInterface does
+    """
+    @functools.lru_cache
+    def get_raw_transaction(self, txid: str) -> None | str:
+        return self.transactions.get(txid)
+
+
+BALANCE = {"client_id": "uba", "confirmed": 1000, "unconfirmed": 0}
+
+
+def make_funding_tx() -> Tx:
+    return Tx(
+        version=1,
+        tx_ins=[TxIn(prev_tx="00" * 32, prev_index=0)],
+        tx_outs=[TxOut(amount=100, script_pubkey=Script.parse_string("OP_1"))],
+        locktime=0)
+
+
+class FinancingServiceWaitTest(unittest.TestCase):
+    """ Exercise waiting for the funding tx to be visible
+    """
+    def setUp(self):
+        metrics.reset()
+        self.tx = make_funding_tx()
+        self.bsv_client = MockInterface()
+        self.service = FinancingService()
+        self.service.set_config(CONFIG)
+        self.service.set_blockchain_interface(self.bsv_client)
+
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = {
+            'status': 'Success',
+            'outpoints': [{'hash': self.tx.id(), 'index': 0}],
+            'tx': self.tx.serialize().hex(),
+        }
+        patcher = patch.object(self.service.session, "request", return_value=response)
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_set_config_defaults(self):
+        service = FinancingService()
+        service.set_config({"finance_service": {"url": "", "client_id": ""}})
+        self.assertFalse(service.accept_unconfirmed)
+        self.assertEqual(service.visibility_timeout, 2.0)
+
+    def test_tx_already_visible(self):
+        self.bsv_client.broadcast_tx(self.tx.serialize().hex())
+        result = self.service.get_funds(100, "51")
+        assert result is not None
+        self.assertEqual(result['status'], 'Success')
+        latency = metrics.get_status()["latencies"]["funding_tx_visibility_wait"]
+        self.assertEqual(latency["count"], 1)
+        self.assertLess(latency["max"], 0.01)
+
+    def test_tx_becomes_visible(self):
+        timer = threading.Timer(0.05, self.bsv_client.broadcast_tx, args=[self.tx.serialize().hex()])
+        timer.start()
+        try:
+            self.assertTrue(self.service.wait_for_tx(self.tx.id()))
+        finally:
+            timer.join()
+        latency = metrics.get_status()["latencies"]["funding_tx_visibility_wait"]
+        self.assertGreaterEqual(latency["max"], 0.05)
+        self.assertLess(latency["max"], self.service.visibility_timeout)
+
+    def test_tx_becomes_visible_through_cache(self):
+        bsv_client = CachingInterface()
+        self.service.set_blockchain_interface(bsv_client)
+        self.assertFalse(self.service.is_tx_visible(self.tx.id()))
+        bsv_client.transactions[self.tx.id()] = self.tx.serialize().hex()
+        # The cached not found result is bypassed
+        self.assertTrue(self.service.is_tx_visible(self.tx.id()))
+
+    def test_tx_never_visible(self):
+        result = self.service.get_funds(100, "51")
+        # The funds are still returned, the spend may be rejected
+        self.assertIsNotNone(result)
+        self.assertEqual(metrics.get_status()["counters"]["funding_tx_visibility_timeouts"], 1)
+        self.assertFalse(self.service.wait_for_tx(self.tx.id()))
+
+    def test_accept_unconfirmed(self):
+        with patch.object(self.service, "wait_for_tx") as wait_for_tx:
+            self.service.get_funds(100, "51", accept_unconfirmed=True)
+            wait_for_tx.assert_not_called()
+
+            self.service.accept_unconfirmed = True
+            self.service.get_funds(100, "51")
+            wait_for_tx.assert_not_called()
+
+            self.service.get_funds(100, "51", accept_unconfirmed=False)
+            wait_for_tx.assert_called_once_with(self.tx.id())
+
+    def test_no_blockchain_interface(self):
+        self.service.set_blockchain_interface(None)
+        self.assertIsNotNone(self.service.get_funds(100, "51"))
+        self.assertNotIn("funding_tx_visibility_wait", metrics.get_status()["latencies"])
+        self.assertEqual(metrics.get_status()["counters"]["funding_tx_visibility_skipped"], 1)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """ Stand-in financing service, which serves each connection with keep-alive
+    """
+    protocol_version = "HTTP/1.1"
+    server: "StandInServer"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, body: Dict[str, Any]):
+        self.server.requests.append((self.command, self.path))
+        time.sleep(self.server.delay)
+        if self.server.unavailable > 0:
+            self.server.unavailable -= 1
+            (status, content) = (503, b"")
+        else:
+            (status, content) = (200, json.dumps(body).encode())
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        if self.path == "/status":
+            self.reply({"version": "0.2.0"})
+        else:
+            self.reply(BALANCE)
+
+    def do_POST(self):
+        self.reply({"status": "Failure"})
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.connections = 0
+        self.requests: List[Any] = []
+        # Respond with 503 to this many requests
+        self.unavailable = 0
+        self.delay = 0.0
+
+    def handle_error(self, request, client_address):
+        # Clients that time out close the connection before the reply
+        pass
+
+
+class FinancingServiceHttpTest(unittest.TestCase):
+    """ Exercise the pooled session against a stand-in financing service
+    """
+    def setUp(self):
+        metrics.reset()
+        self.server = StandInServer()
+        thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        port = self.server.server_address[1]
+        self.service = FinancingService()
+        self.service.set_config({"finance_service": {
+            "url": f"http://127.0.0.1:{port}", "client_id": "uba", "read_timeout": 0.5, "retry_backoff": 0.01}})
+        self.addCleanup(self.service.session.close)
+
+    def test_connection_reused(self):
+        self.assertEqual(self.service.get_status(), {"version": "0.2.0"})
+        for _ in range(5):
+            self.assertEqual(self.service.get_balance(), BALANCE)
+        self.assertEqual(self.service.get_funds(100, "51"), {"status": "Failure"})
+        self.assertEqual(len(self.server.requests), 7)
+        self.assertEqual(self.server.connections, 1)
+
+        latencies = metrics.get_status()["latencies"]
+        self.assertEqual(latencies["finance_service.status"]["count"], 1)
+        self.assertEqual(latencies["finance_service.balance"]["count"], 5)
+        self.assertEqual(latencies["finance_service.fund"]["count"], 1)
+
+    def test_get_retried(self):
+        self.server.unavailable = 2
+        self.assertEqual(self.service.get_balance(), BALANCE)
+        self.assertEqual(len(self.server.requests), 3)
+
+        self.server.unavailable = 10
+        self.assertIsNone(self.service.get_balance())
+        self.assertEqual(len(self.server.requests), 3 + 1 + self.service.retries)
+
+    def test_post_not_retried(self):
+        self.server.unavailable = 1
+        self.assertIsNone(self.service.get_funds(100, "51"))
+        self.assertEqual(self.server.requests, [("POST", "/fund/uba/100/1/false/51")])
+
+    def test_read_timeout(self):
+        self.service.set_config({"finance_service": {
+            "url": self.service.service_url, "client_id": "uba", "read_timeout": 0.05, "retries": 0}})
+        self.server.delay = 0.2
+        with self.assertRaises(FinancingServiceException):
+            self.service.get_funds(100, "51")
+        self.assertEqual(metrics.get_status()["counters"]["finance_service.fund.errors"], 1)
+
+    def test_connection_refused(self):
+        self.server.shutdown()
+        self.server.server_close()
+        with self.assertRaises(FinancingServiceException):
+            self.service.get_status()
+
+
+class AsyncFinancingServiceTest(unittest.IsolatedAsyncioTestCase):
+    """ Exercise the async financing service against the stand-in financing service
+    """
+    async def asyncSetUp(self):
+        metrics.reset()
+        self.server = StandInServer()
+        thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+        thread.start()
+
+        port = self.server.server_address[1]
+        finance_service = FinancingService()
+        finance_service.set_config({"finance_service": {
+            "url": f"http://127.0.0.1:{port}", "client_id": "uba", "read_timeout": 0.5, "retry_backoff": 0.01, "visibility_timeout": 0.2}})
+        self.bsv_client = MockInterface()
+        self.blockchain_client = AsyncBlockchainClient()
+        self.blockchain_client.set_interface(self.bsv_client)
+        self.service = AsyncFinancingService(finance_service, self.blockchain_client)
+
+    async def asyncTearDown(self):
+        await self.service.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    async def test_connection_reused(self):
+        self.assertEqual(await self.service.get_status(), {"version": "0.2.0"})
+        for _ in range(5):
+            self.assertEqual(await self.service.get_balance(), BALANCE)
+        self.assertEqual(await self.service.get_funds(100, "51"), {"status": "Failure"})
+        self.assertEqual(len(self.server.requests), 7)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(metrics.get_status()["latencies"]["finance_service.balance"]["count"], 5)
+
+    async def test_get_retried(self):
+        self.server.unavailable = 2
+        self.assertEqual(await self.service.get_balance(), BALANCE)
+        self.assertEqual(len(self.server.requests), 3)
+
+    async def test_post_not_retried(self):
+        self.server.unavailable = 1
+        self.assertIsNone(await self.service.get_funds(100, "51"))
+        self.assertEqual(self.server.requests, [("POST", "/fund/uba/100/1/false/51")])
+
+    async def test_read_timeout(self):
+        self.server.delay = 1.0
+        with self.assertRaises(FinancingServiceException):
+            await self.service.get_funds(100, "51")
+        self.assertEqual(metrics.get_status()["counters"]["finance_service.fund.errors"], 1)
+
+    async def test_wait_for_tx(self):
+        tx = make_funding_tx()
+        timer = threading.Timer(0.05, self.bsv_client.broadcast_tx, args=[tx.serialize().hex()])
+        timer.start()
+        try:
+            self.assertTrue(await self.service.wait_for_tx(tx.id()))
+        finally:
+            timer.join()
+        self.assertFalse(await self.service.wait_for_tx("00" * 32))
+        self.assertEqual(metrics.get_status()["counters"]["funding_tx_visibility_timeouts"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+import unittest
+import sys
+import threading
+from typing import List, Tuple
+
+sys.path.append("..")
+
+from service.issuance_batcher import IssuanceBatcher, IssuanceRequest
+from service.metrics import metrics
+
+
+class IssuanceBatcherTest(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.batches: List[Tuple[str, List[IssuanceRequest]]] = []
+        self.batcher = IssuanceBatcher()
+        self.batcher.set_config({"issuance_batch": {"window": 0.05, "max_size": 3}})
+        self.batcher.set_anchor_function(self.anchor)
+
+    def tearDown(self):
+        self.batcher.stop()
+
+    def anchor(self, actor: str, requests: List[IssuanceRequest]) -> List[str]:
+        self.batches.append((actor, list(requests)))
+        return [f"{actor}:{asset_data}" for (_, asset_data) in requests]
+
+    def test_set_config(self):
+        batcher = IssuanceBatcher()
+        batcher.set_config({})
+        self.assertFalse(batcher.enabled)
+        self.assertEqual(batcher.window, 1.0)
+        with self.assertRaises(ValueError):
+            batcher.set_config({"issuance_batch": {"max_size": 0}})
+
+    def test_window(self):
+        self.batcher.start()
+        futures = [self.batcher.submit("Alice", "asset_id", f"data_{i}") for i in range(2)]
+        futures.append(self.batcher.submit("Bob", "asset_id", "data_2"))
+        self.assertEqual([f.result(timeout=5.0) for f in futures], ["Alice:data_0", "Alice:data_1", "Bob:data_2"])
+        # A batch for each actor
+        self.assertEqual(sorted(actor for (actor, _) in self.batches), ["Alice", "Bob"])
+        self.assertEqual(metrics.get_status()["counters"]["issuance_batcher.issuances"], 3)
+
+    def test_max_size(self):
+        self.batcher.window = 60.0
+        self.batcher.start()
+        futures = [self.batcher.submit("Alice", "asset_id", f"data_{i}") for i in range(4)]
+        # The first three are anchored without waiting for the window
+        self.assertEqual(futures[2].result(timeout=5.0), "Alice:data_2")
+        self.assertEqual(len(self.batches[0][1]), 3)
+        self.assertFalse(futures[3].done())
+        self.assertEqual(self.batcher.depth(), 1)
+        # The rest are anchored on stop
+        self.batcher.stop()
+        self.assertEqual(futures[3].result(timeout=0), "Alice:data_3")
+
+    def test_anchor_failed(self):
+        def fail(actor: str, requests: List[IssuanceRequest]) -> List[str]:
+            raise ConnectionError("financing service unavailable")
+        self.batcher.set_anchor_function(fail)
+        future = self.batcher.submit("Alice", "asset_id", "data")
+        self.batcher.flush()
+        self.assertIsNone(future.result(timeout=0))
+
+    def test_concurrent_submit(self):
+        self.batcher.max_size = 1000
+        self.batcher.start()
+        results: List[str] = []
+
+        def issue(i: int):
+            results.append(self.batcher.submit("Alice", "asset_id", f"data_{i}").result(timeout=5.0))
+
+        threads = [threading.Thread(target=issue, args=(i,)) for i in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results), sorted(f"Alice:data_{i}" for i in range(50)))
+        self.assertLess(len(self.batches), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
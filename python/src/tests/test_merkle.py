@@ -0,0 +1,28 @@
+#!/usr/bin/python3
+import unittest
+import sys
+
+sys.path.append("..")
+
+from service.merkle import merkle_root, sha256d
+
+
+class MerkleTest(unittest.TestCase):
+    def setUp(self):
+        self.leaves = [bytes([i]) * 32 for i in range(3)]
+
+    def test_merkle_root(self):
+        [a, b, c] = [sha256d(leaf) for leaf in self.leaves]
+        self.assertEqual(merkle_root(self.leaves[:1]), a)
+        self.assertEqual(merkle_root(self.leaves[:2]), sha256d(a + b))
+        # An odd node is paired with itself
+        self.assertEqual(merkle_root(self.leaves), sha256d(sha256d(a + b) + sha256d(c + c)))
+        self.assertNotEqual(merkle_root(self.leaves), merkle_root(list(reversed(self.leaves))))
+
+    def test_no_leaves(self):
+        with self.assertRaises(ValueError):
+            merkle_root([])
+
+
+if __name__ == "__main__":
+    unittest.main()
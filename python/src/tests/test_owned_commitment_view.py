@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+import unittest
+from unittest.mock import patch
+import sys
+
+sys.path.append("..")
+
+from service.commitment_store import CommitmentStore
+from service.token_description import TokenStore, token_descriptor
+from service.commitment_packet import CommitmentPacket, CommitmentPacketMetadata, CommitmentStatus, CommitmentType, Cpid
+
+
+def make_meta(actor: str, cpid: str, asset_data: str, spending_tx: None | str = None) -> CommitmentPacketMetadata:
+    cp = CommitmentPacket(
+        asset_id="asset_id",
+        data=asset_data,
+        previous_packet=None,
+        blockchain_outpoint=f"{cpid}:1",
+        blockchain_id="BSV",
+        signature=None,
+        signature_scheme="NIST256p",
+        public_key="public_key",
+    )  # type: ignore[call-arg]
+    return CommitmentPacketMetadata(
+        owner=actor,
+        type=CommitmentType.Issuance,
+        state=CommitmentStatus.Created,
+        ownership_tx=None,
+        spending_tx=spending_tx,
+        commitment_packet_id=Cpid(cpid),
+        commitment_packet=cp,
+    )
+
+
+@patch('service.commitment_store.CommitmentStore.save', return_value=True)
+@patch('service.token_description.TokenStore.save', return_value=True)
+class OwnedCommitmentViewTests(unittest.TestCase):
+    """ Exercise the owned commitment view joined across the commitment and token stores
+    """
+    def setUp(self):
+        self.cs = CommitmentStore()
+        self.ts = TokenStore()
+        for token_id in ["token_1", "token_2", "token_3"]:
+            self.ts.tokens[token_id] = token_descriptor(ipfs_cid=token_id, description=token_id, cpid="")
+        self.ts.add_owned_view(self.cs.owned_view)
+        self.view = self.cs.owned_view
+
+    def test_requires_token_and_live_commitment(self, mock_ts_save, mock_cs_save):
+        self.cs.add_commitment(make_meta("Alice", "cpid_1", "token_1"))
+        # No token assigned yet
+        self.assertEqual(self.view.owned_by_actor("Alice"), [])
+
+        self.ts.assign_to_actor("Alice", "token_1", "cpid_1")
+        owned = self.view.owned_by_actor("Alice")
+        self.assertEqual([cpid for (cpid, _) in owned], ["cpid_1"])
+        self.assertEqual(owned[0][1].data, "token_1")
+
+    def test_token_cpid_must_match(self, mock_ts_save, mock_cs_save):
+        self.cs.add_commitment(make_meta("Alice", "cpid_1", "token_1"))
+        self.ts.assign_to_actor("Alice", "token_1", "other_cpid")
+        self.assertEqual(self.view.owned_by_actor("Alice"), [])
+
+    def test_token_owner_must_match(self, mock_ts_save, mock_cs_save):
+        self.cs.add_commitment(make_meta("Alice", "cpid_1", "token_1"))
+        self.ts.assign_to_actor("Bob", "token_1", "cpid_1")
+        self.assertEqual(self.view.owned_by_actor("Alice"), [])
+        self.assertEqual(self.view.owned_by_actor("Bob"), [])
+
+    def test_spent_commitment_leaves_view(self, mock_ts_save, mock_cs_save):
+        cp_meta = make_meta("Alice", "cpid_1", "token_1")
+        self.cs.add_commitment(cp_meta)
+        self.ts.assign_to_actor("Alice", "token_1", "cpid_1")
+        self.assertEqual(len(self.view.owned_by_actor("Alice")), 1)
+
+        cp_meta.spending_tx = "spending_tx"
+        cp_meta.state = CommitmentStatus.Transferred
+        self.cs.update_commitment(cp_meta)
+        self.assertEqual(self.view.owned_by_actor("Alice"), [])
+
+    def test_transfer_moves_between_actors(self, mock_ts_save, mock_cs_save):
+        first = make_meta("Alice", "cpid_1", "token_1")
+        self.cs.add_commitment(first)
+        self.ts.assign_to_actor("Alice", "token_1", "cpid_1")
+
+        # Transfer to Bob
+        self.cs.add_commitment(make_meta("Bob", "cpid_2", "token_1"))
+        first.spending_tx = "spending_tx"
+        self.cs.update_commitment(first)
+        self.ts.assign_to_new_actor("Alice", "Bob", "token_1", "cpid_2")
+
+        self.assertEqual(self.view.owned_by_actor("Alice"), [])
+        self.assertEqual([cpid for (cpid, _) in self.view.owned_by_actor("Bob")], ["cpid_2"])
+
+    def test_return_to_pool_leaves_view(self, mock_ts_save, mock_cs_save):
+        self.cs.add_commitment(make_meta("Alice", "cpid_1", "token_1"))
+        self.ts.assign_to_actor("Alice", "token_1", "cpid_1")
+        self.ts.return_to_pool("Alice", "token_1")
+        self.assertEqual(self.view.owned_by_actor("Alice"), [])
+
+    def test_reset(self, mock_ts_save, mock_cs_save):
+        self.cs.add_commitment(make_meta("Alice", "cpid_1", "token_1"))
+        self.ts.assign_to_actor("Alice", "token_1", "cpid_1")
+        self.cs.reset()
+        self.assertEqual(self.view.owned_by_actor("Alice"), [])
+        # Token assignment survives the reset, so re-adding the commitment restores the view
+        self.cs.add_commitment(make_meta("Alice", "cpid_1", "token_1"))
+        self.assertEqual(len(self.view.owned_by_actor("Alice")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
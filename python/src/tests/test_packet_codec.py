@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+import unittest
+import sys
+from typing import Dict, List
+
+sys.path.append("..")
+
+from service.packet_codec import encode_packet, decode_packet, encode_metadata, decode_metadata, encode_store, decode_store, is_encoded_store, \
+    encode_packet_list, decode_packet_list
+from service.commitment_packet import AnchorProof, CommitmentPacket, CommitmentPacketMetadata, CommitmentStatus, CommitmentType, Cpid
+
+TXID = "6e59cf55510fb810ae51e2948ae27055559e6795f56c85a2c8c7171eac98ed48"
+
+
+def make_packet(**fields) -> CommitmentPacket:
+    values = dict(
+        asset_id="Murphys Asset",
+        data="QmYwAPJzv5CZsnAzt8auVZRn1pfejtpbWk5NdUHKcpUQxA",
+        previous_packet="6957ca6359234cf5f7705edda20fa21039a6c1124d216cbc4ab6b5b298eeaacd",
+        blockchain_outpoint=f"{TXID}:1",
+        blockchain_id="BSV",
+        signature="3045022100c8d2",
+        signature_scheme="NIST256p",
+        public_key="02b4632d08485ff1df2db55b9dafd23347d1c47a457072a1e87be26896549a8737",
+    )
+    values.update(fields)
+    return CommitmentPacket(**values)  # type: ignore[arg-type]
+
+
+def make_metadata(cp: CommitmentPacket) -> CommitmentPacketMetadata:
+    return CommitmentPacketMetadata(
+        owner="Alice", type=CommitmentType.Transfer, state=CommitmentStatus.Transferred,
+        ownership_tx="0100000000", spending_tx=None, commitment_packet_id=cp.get_cpid(), commitment_packet=cp)
+
+
+class PacketCodecTest(unittest.TestCase):
+    """ Exercise the binary encoding of commitment packets
+    """
+    def assertRoundTrip(self, cp: CommitmentPacket):
+        decoded = decode_packet(encode_packet(cp))
+        self.assertEqual(decoded, cp)
+        self.assertEqual(decoded.model_dump(), cp.model_dump())
+
+    def test_packet_round_trip(self):
+        cp = make_packet()
+        self.assertRoundTrip(cp)
+        self.assertEqual(decode_packet(encode_packet(cp)).get_cpid(), cp.get_cpid())
+
+    def test_fields_that_are_not_lowercase_hex(self):
+        cases: List[Dict[str, None | str]] = [
+            {"previous_packet": None, "signature": None, "signature_scheme": None},
+            {"public_key": "", "signature": ""},
+            {"public_key": "02B4632D", "signature": "abc"},
+            {"asset_id": "", "data": "ünïcødé ✓"},
+            {"blockchain_outpoint": f"{TXID}:0"},
+            {"blockchain_outpoint": f"{TXID}:01"},
+            {"blockchain_outpoint": f"{TXID}:4294967295"},
+            {"blockchain_outpoint": f"{TXID.upper()}:1"},
+            {"blockchain_outpoint": "0x1234"},
+            {"blockchain_outpoint": f"{TXID}:1:2"},
+            # Unicode digits that are not ASCII are kept as text
+            {"blockchain_outpoint": f"{TXID}:²"},
+            {"blockchain_outpoint": f"{TXID}:١"},
+        ]
+        for fields in cases:
+            with self.subTest(fields=fields):
+                self.assertRoundTrip(make_packet(**fields))
+
+    def test_smaller_than_json(self):
+        cp = make_packet()
+        self.assertLess(len(encode_packet(cp)), len(cp.model_dump_json()) * 2 / 3)
+
+    def test_metadata_round_trip(self):
+        cp_meta = make_metadata(make_packet())
+        decoded = decode_metadata(encode_metadata(cp_meta))
+        self.assertEqual(decoded, cp_meta)
+        self.assertEqual(decoded.model_dump(), cp_meta.model_dump())
+
+        cp_meta.commitment_packet_id = None
+        cp_meta.type = CommitmentType.Issuance
+        cp_meta.state = CommitmentStatus.Created
+        self.assertEqual(decode_metadata(encode_metadata(cp_meta)), cp_meta)
+
+    def test_anchor_round_trip(self):
+        cp_meta = make_metadata(make_packet())
+        cp_meta.anchor = AnchorProof(txid=TXID, root="ab" * 32, index=5, path=["cd" * 32, "ef" * 32])
+        decoded = decode_metadata(encode_metadata(cp_meta))
+        self.assertEqual(decoded.anchor, cp_meta.anchor)
+        cp_meta.anchor.path = []
+        self.assertEqual(decode_metadata(encode_metadata(cp_meta)), cp_meta)
+
+    def test_version_1_metadata(self):
+        """ Metadata written before the anchor was added is still read
+        """
+        cp_meta = make_metadata(make_packet())
+        encoded = encode_metadata(cp_meta)
+        # Version 1 had no anchor, the last byte is the anchor's absent flag
+        self.assertEqual(decode_metadata(bytes([1]) + encoded[1:-1]), cp_meta)
+        with self.assertRaises(ValueError):
+            decode_metadata(bytes([1]) + encoded[1:])
+
+    def test_store_round_trip(self):
+        commitments = [make_metadata(make_packet(data=f"asset_{i}")) for i in range(3)]
+        encoded = encode_store(commitments)
+        self.assertTrue(is_encoded_store(encoded))
+        self.assertFalse(is_encoded_store(b"[]"))
+        self.assertEqual(decode_store(encoded), commitments)
+        self.assertEqual(decode_store(encode_store([])), [])
+
+    def test_packet_list_round_trip(self):
+        packets = [(make_packet(data=f"asset_{i}").get_cpid(), make_packet(data=f"asset_{i}")) for i in range(3)]
+        self.assertEqual(decode_packet_list(encode_packet_list(packets)), packets)
+        self.assertEqual(decode_packet_list(encode_packet_list([])), [])
+        with self.assertRaises(ValueError):
+            decode_packet_list(encode_store([]))
+
+    def test_invalid_data(self):
+        encoded = encode_metadata(make_metadata(make_packet()))
+        with self.assertRaises(ValueError):
+            decode_metadata(encoded[:-1])
+        with self.assertRaises(ValueError):
+            decode_metadata(bytes([3]) + encoded[1:])
+        with self.assertRaises(ValueError):
+            decode_store(b"[]")
+        self.assertIsInstance(decode_metadata(encoded).commitment_packet_id, str)
+        self.assertEqual(decode_metadata(encoded).commitment_packet_id, Cpid(make_packet().get_cpid()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+import unittest
+import asyncio
+import sys
+
+sys.path.append("..")
+
+from rest_api import FastJSONResponse, accepts_packets, packet_list_response, PACKETS_MEDIA_TYPE, \
+    create_issuance_commitment, IssuanceParameters, get_health, complete_transfers, CompleteTransfersParameters, \
+    create_issuance_commitments, IssuancesParameters, IssuanceItem, transfer_commitments, BulkTransferParameters, \
+    get_commitment_transaction
+from service.commitment_service import commitment_service
+from service.commitment_packet import CommitmentPacket, CommitmentPacketMetadata, CommitmentType, CommitmentStatus
+from service.packet_codec import decode_packet_list
+from fastapi.responses import JSONResponse
+
+
+def make_packet(data: str) -> CommitmentPacket:
+    return CommitmentPacket(
+        asset_id="Murphys Asset", data=data, previous_packet=None,
+        blockchain_outpoint="6e59cf55510fb810ae51e2948ae27055559e6795f56c85a2c8c7171eac98ed48:1", blockchain_id="BSV",
+        signature=None, signature_scheme="NIST256p", public_key="02b4632d08485ff1df2db55b9dafd23347d1c47a457072a1e87be26896549a8737",
+    )  # type: ignore[call-arg]
+
+
+class RestApiResponseTest(unittest.TestCase):
+    """ Exercise the response encodings
+    """
+    def setUp(self):
+        self.packets = [(make_packet(f"asset_{i}").get_cpid(), make_packet(f"asset_{i}")) for i in range(3)]
+
+    def test_accepts_packets(self):
+        self.assertFalse(accepts_packets(None))
+        self.assertFalse(accepts_packets("application/json"))
+        self.assertFalse(accepts_packets("*/*"))
+        self.assertTrue(accepts_packets(PACKETS_MEDIA_TYPE))
+        self.assertTrue(accepts_packets(f"application/json;q=0.5, {PACKETS_MEDIA_TYPE};q=1.0"))
+
+    def test_json_matches_model_dump(self):
+        response = packet_list_response(self.packets, None)
+        expected = JSONResponse(content={"message": [{cpid: cp.model_dump()} for (cpid, cp) in self.packets]})
+        self.assertIsInstance(response, FastJSONResponse)
+        self.assertEqual(response.body, expected.body)
+
+    def test_packets_media_type(self):
+        response = packet_list_response(self.packets, PACKETS_MEDIA_TYPE)
+        self.assertEqual(response.media_type, PACKETS_MEDIA_TYPE)
+        self.assertEqual(decode_packet_list(bytes(response.body)), self.packets)
+
+    def test_async_write_endpoint(self):
+        params = IssuanceParameters(actor="Nobody", asset_id="asset_id", asset_data="asset_data", network="BSV")
+        response = asyncio.run(create_issuance_commitment(params))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.body, b'{"message":"Unknown actor Nobody"}')
+
+    def test_batch_complete_validated(self):
+        params = CompleteTransfersParameters(cpids=["00" * 32], actor="Nobody")
+        response = asyncio.run(complete_transfers(params))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.body, b'{"message":"Unknown actor Nobody"}')
+
+    def test_batch_issuance_validated(self):
+        params = IssuancesParameters(actor="Nobody", network="BSV", issuances=[IssuanceItem(asset_id="asset_id", asset_data="asset_data")])
+        response = asyncio.run(create_issuance_commitments(params))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.body, b'{"message":"Unknown actor Nobody"}')
+
+    def test_bulk_transfer_validated(self):
+        params = BulkTransferParameters(cpids=["00" * 32], from_actor="Nobody", to_actor="Bob")
+        response = asyncio.run(transfer_commitments(params))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.body, b'{"message":"Unknown actor Nobody"}')
+
+    def test_commitment_tx_of_batch_records(self):
+        """ Batch issued and bulk transferred records store their shared funding tx with the first
+            record only, /commitment/tx links the txid of the ownership outpoint of the others
+        """
+        issuance = make_packet("batch_issued")
+        transfer = make_packet("bulk_transferred")
+        transfer.previous_packet = issuance.get_cpid()
+        records = [
+            CommitmentPacketMetadata(
+                owner="Alice", type=cp_type, state=CommitmentStatus.Created, ownership_tx=None, spending_tx=None,
+                commitment_packet_id=cp.get_cpid(), commitment_packet=cp)
+            for (cp_type, cp) in [(CommitmentType.Issuance, issuance), (CommitmentType.Transfer, transfer)]
+        ]
+        commitments = commitment_service.commitment_store.commitments
+        commitment_service.commitment_store.commitments = records
+        try:
+            for cp_meta in records:
+                response = get_commitment_transaction(cp_meta.commitment_packet.get_cpid())
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.body, b'{"message":"https://test.whatsonchain.com/tx/6e59cf55510fb810ae51e2948ae27055559e6795f56c85a2c8c7171eac98ed48"}')
+        finally:
+            commitment_service.commitment_store.commitments = commitments
+
+    def test_healthz(self):
+        self.assertEqual(asyncio.run(get_health()), {"status": "ok"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/python3
+import unittest
+import sys
+from typing import Dict, List
+from unittest.mock import MagicMock, patch
+
+sys.path.append("..")
+
+from tx_engine import Tx, TxIn, TxOut, Script, MockInterface
+from tx_engine.interface.woc_interface import WoCInterface
+
+from ethereum.ethereum_service import EthereumService
+from service.spent_watcher import SpentWatcher, Outpoint, bsv_outpoints_spent
+from service.metrics import metrics
+
+
+def make_tx(prev_tx: str) -> Tx:
+    return Tx(
+        version=1,
+        tx_ins=[TxIn(prev_tx=prev_tx, prev_index=0)],
+        tx_outs=[TxOut(amount=100, script_pubkey=Script.parse_string("OP_1"))],
+        locktime=0)
+
+
+class StandInEthereumService:
+    """ The spent status calls of the EthereumService, with the UTXOs spent in each block
+    """
+    def __init__(self):
+        self.block = 1
+        self.spent: Dict[str, int] = {}
+        self.checked: List[List[str]] = []
+
+    def get_block_number(self) -> int:
+        return self.block
+
+    def get_spent_statuses(self, tx_hashes: List[str], block_number: int) -> Dict[str, None | bool]:
+        self.checked.append(tx_hashes)
+        return {tx_hash: tx_hash in self.spent and self.spent[tx_hash] <= block_number for tx_hash in tx_hashes}
+
+
+class SpentWatcherTest(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.bsv_client = MockInterface()
+        self.ethereum_service = StandInEthereumService()
+        self.outpoints: List[Outpoint] = [("BSV", f"{'aa' * 32}:0"), ("BSV", f"{'bb' * 32}:0"), ("ETH", "0x01"), ("ETH", "0x02")]
+        self.watcher = SpentWatcher()
+        self.watcher.set_config({"spent_watcher": {"interval": 0.01}})
+        self.watcher.set_blockchain_interface(self.bsv_client)
+        self.watcher.set_ethereum_service(self.ethereum_service)
+        self.watcher.set_outpoints_source(lambda: self.outpoints)
+
+    def test_set_config_defaults(self):
+        watcher = SpentWatcher()
+        watcher.set_config({})
+        self.assertFalse(watcher.enabled)
+        self.assertEqual(watcher.interval, 30.0)
+
+    def test_bsv(self):
+        self.assertIsNone(self.watcher.is_spent("BSV", f"{'aa' * 32}:0"))
+        self.watcher.refresh()
+        self.assertFalse(self.watcher.is_spent("BSV", f"{'aa' * 32}:0"))
+
+        # Spent out of band
+        self.bsv_client.broadcast_tx(make_tx("aa" * 32).serialize().hex())
+        self.watcher.refresh()
+        self.assertTrue(self.watcher.is_spent("BSV", f"{'aa' * 32}:0"))
+        self.assertFalse(self.watcher.is_spent("BSV", f"{'bb' * 32}:0"))
+        self.assertEqual(metrics.get_status()["counters"]["spent_watcher.spent"], 1)
+        self.assertEqual(self.watcher.get_status()["spent"], 1)
+
+        # No longer live
+        self.outpoints = self.outpoints[1:]
+        self.watcher.refresh()
+        self.assertIsNone(self.watcher.is_spent("BSV", f"{'aa' * 32}:0"))
+
+    def test_eth_checked_per_block(self):
+        self.watcher.refresh()
+        self.assertEqual(self.ethereum_service.checked, [["0x01", "0x02"]])
+        self.assertFalse(self.watcher.is_spent("ETH", "0x01"))
+
+        # Same block, only new outpoints are checked
+        self.outpoints.append(("ETH", "0x03"))
+        self.watcher.refresh()
+        self.watcher.refresh()
+        self.assertEqual(self.ethereum_service.checked[1:], [["0x03"], []])
+
+        # New block, the outpoints not known to be spent are checked against it
+        self.ethereum_service.block = 2
+        self.ethereum_service.spent["0x02"] = 2
+        self.watcher.refresh()
+        self.assertEqual(sorted(self.ethereum_service.checked[3]), ["0x01", "0x02", "0x03"])
+        self.assertTrue(self.watcher.is_spent("ETH", "0x02"))
+        self.assertEqual(self.watcher.get_status()["eth_block"], 2)
+
+        self.ethereum_service.block = 3
+        self.watcher.refresh()
+        self.assertEqual(sorted(self.ethereum_service.checked[4]), ["0x01", "0x03"])
+
+    def test_bulk_check_used(self):
+        interface = MagicMock()
+        interface.get_spent_outpoints.return_value = {"aa:0": True}
+        self.assertEqual(bsv_outpoints_spent(interface, ["aa:0"]), {"aa:0": True})
+        interface.get_spent_outpoints.assert_called_once_with(["aa:0"])
+
+    @patch('service.spent_watcher.requests.post')
+    def test_woc_bulk_check(self, post):
+        # A WoCInterface without the scheduler asks /utxos/spent about 20 outpoints at a time
+        interface = WoCInterface()
+        interface.set_config({"network_type": "testnet"})
+        outpoints = [f"{i:064x}:0" for i in range(25)]
+        post.return_value.status_code = 200
+        first = [{"utxo": {"txid": f"{i:064x}", "vout": 0}, "error": ""} for i in range(20)]
+        first[3]["spentIn"] = {"txid": "cc" * 32, "vin": 0}
+        post.return_value.json.side_effect = [
+            first,
+            [{"utxo": {"txid": f"{i:064x}", "vout": 0}, "error": "unknown"} for i in range(20, 25)],
+        ]
+        results = bsv_outpoints_spent(interface, outpoints)
+        self.assertEqual(post.call_count, 2)
+        self.assertTrue(post.call_args_list[0].args[0].endswith("/utxos/spent"))
+        self.assertTrue(results[outpoints[3]])
+        self.assertEqual(sum(1 for spent in results.values() if spent is False), 19)
+        self.assertIsNone(results[outpoints[21]])
+
+    def test_background(self):
+        self.watcher.start()
+        try:
+            for _ in range(100):
+                if self.watcher.get_status()["checked_at"] is not None:
+                    break
+                self.watcher.stopped.wait(0.01)
+        finally:
+            self.watcher.stop()
+        self.assertIsNotNone(self.watcher.get_status()["checked_at"])
+        self.assertIsNone(self.watcher.thread)
+
+
+class EthereumSpentStatusTest(unittest.TestCase):
+    def test_get_spent_statuses(self):
+        service = EthereumService()
+        service.eth_interface = MagicMock()
+        service.eth_interface.get_utxo_id.side_effect = lambda tx_hash: b"utxo" + tx_hash.encode()
+        service.eth_interface.is_utxo_spent.side_effect = lambda utxo, block: utxo == b"utxo0x01"
+
+        self.assertEqual(service.get_spent_statuses(["0x01", "0x02"], 7), {"0x01": True, "0x02": False})
+        service.eth_interface.is_utxo_spent.assert_called_with(b"utxo0x02", 7)
+        # The UTXO ids are looked up once
+        self.assertTrue(service.is_ownership_tx_spent("0x01"))
+        self.assertEqual(service.eth_interface.get_utxo_id.call_count, 2)
+
+        service.eth_interface.get_utxo_id.side_effect = Exception("No logs found")
+        self.assertIsNone(service.is_ownership_tx_spent("0x03"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+import unittest
+import sys
+
+sys.path.append("..")
+
+from service.status_monitor import StatusMonitor
+from service.metrics import metrics
+
+
+class Dependency:
+    """ Counts the calls to its status check
+    """
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def get_status(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("unavailable")
+        return {"calls": self.calls}
+
+
+class StatusMonitorTest(unittest.TestCase):
+    """ Exercise the background dependency status checks
+    """
+    def setUp(self):
+        metrics.reset()
+        self.dependency = Dependency()
+        self.monitor = StatusMonitor()
+        self.monitor.set_config({"status_monitor": {"refresh_interval": 0.01}})
+        self.monitor.add_check("dependency", self.dependency.get_status)
+
+    def test_set_config_defaults(self):
+        monitor = StatusMonitor()
+        monitor.set_config({})
+        self.assertEqual(monitor.refresh_interval, 10.0)
+
+    def test_not_refreshed(self):
+        self.assertIsNone(self.monitor.get_value("dependency"))
+        status = self.monitor.get_status()["dependency"]
+        self.assertIsNone(status["updated_at"])
+        self.assertIsNone(status["age"])
+        self.assertEqual(self.dependency.calls, 0)
+
+    def test_refresh(self):
+        self.monitor.refresh()
+        self.assertEqual(self.monitor.get_value("dependency"), {"calls": 1})
+        # Reading the status does not call the dependency
+        for _ in range(3):
+            self.monitor.get_status()
+        self.assertEqual(self.dependency.calls, 1)
+
+        status = self.monitor.get_status()["dependency"]
+        self.assertIsNone(status["error"])
+        self.assertEqual(status["updated_at"], status["last_success_at"])
+        self.assertGreaterEqual(status["age"], 0)
+        self.assertEqual(metrics.get_status()["latencies"]["status_check.dependency"]["count"], 1)
+
+    def test_refresh_failure(self):
+        self.monitor.refresh()
+        self.dependency.fail = True
+        self.monitor.refresh()
+        status = self.monitor.get_status()["dependency"]
+        self.assertIsNone(status["value"])
+        self.assertEqual(status["error"], "ConnectionError('unavailable')")
+        self.assertLess(status["last_success_at"], status["updated_at"])
+
+    def test_background_refresh(self):
+        self.monitor.start()
+        try:
+            for _ in range(100):
+                if self.dependency.calls >= 2:
+                    break
+                self.monitor.stopped.wait(0.01)
+        finally:
+            self.monitor.stop()
+        self.assertGreaterEqual(self.dependency.calls, 2)
+        self.assertIsNone(self.monitor.thread)
+
+
+if __name__ == "__main__":
+    unittest.main()
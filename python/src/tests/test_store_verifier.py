@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+import unittest
+import hashlib
+import os
+import sys
+import tempfile
+from typing import List
+
+sys.path.append("..")
+
+from service.store_verifier import StoreVerifier, load_checkpoint, save_checkpoint
+from service.token_wallet import TokenWallet
+from service.commitment_packet import CommitmentPacket, CommitmentPacketMetadata, CommitmentStatus, CommitmentType
+
+# These are documented test keys, do not use in production
+ALICE_KEY = ("92fnTSWFiLbDvDtXNfvHByUhabdmXiv6xfy9a2zEbwqHHNbWY4z", "NIST256p")
+BOB_KEY = ("cU4nzixA5cDSXjGX5hcvZ8QjqZBMLGqwNoWCRZ5fwCt2NLJMyyy3", "SECP256k1")
+
+
+def make_wallet(key) -> TokenWallet:
+    tw = TokenWallet()
+    tw.set_key(*key)
+    return tw
+
+
+def make_chain(alice: TokenWallet, bob: TokenWallet, asset_data: str = "asset_data") -> List[CommitmentPacketMetadata]:
+    """ Issuance by Alice, transferred to Bob
+    """
+    issuance = CommitmentPacket(
+        asset_id="asset_id", data=asset_data, previous_packet=None,
+        blockchain_outpoint=hashlib.sha256(bytes(asset_data, 'utf-8')).hexdigest() + ":1", blockchain_id="BSV",
+        signature=None, signature_scheme=alice.get_signature_scheme(), public_key=alice.get_token_public_key(),
+    )  # type: ignore[call-arg]
+    issuance.signature = alice.sign_commitment_packet_digest(issuance.packet_digest(), hashlib.sha256).hex()
+    transfer = CommitmentPacket(
+        asset_id="asset_id", data=asset_data, previous_packet=issuance.get_cpid(),
+        blockchain_outpoint=hashlib.sha256(bytes(asset_data + "transfer", 'utf-8')).hexdigest() + ":1", blockchain_id="BSV",
+        signature=None, signature_scheme=bob.get_signature_scheme(), public_key=bob.get_token_public_key(),
+    )  # type: ignore[call-arg]
+    # The previous owner signs the transfer
+    transfer.signature = alice.sign_commitment_packet_digest(transfer.packet_digest(), hashlib.sha256).hex()
+    return [
+        CommitmentPacketMetadata(
+            owner="Alice", type=CommitmentType.Issuance, state=CommitmentStatus.Transferred, ownership_tx=None,
+            spending_tx="spending_tx", commitment_packet_id=issuance.get_cpid(), commitment_packet=issuance),
+        CommitmentPacketMetadata(
+            owner="Bob", type=CommitmentType.Transfer, state=CommitmentStatus.Created, ownership_tx=None,
+            spending_tx=None, commitment_packet_id=transfer.get_cpid(), commitment_packet=transfer),
+    ]
+
+
+class StoreVerifierTests(unittest.TestCase):
+    """ Exercise the whole store verification engine
+    """
+    alice: TokenWallet
+    bob: TokenWallet
+
+    @classmethod
+    def setUpClass(cls):
+        cls.alice = make_wallet(ALICE_KEY)
+        cls.bob = make_wallet(BOB_KEY)
+
+    def setUp(self):
+        self.commitments = make_chain(self.alice, self.bob)
+        self.verifier = StoreVerifier()
+
+    def checks_failed(self, report) -> List[str]:
+        return sorted(e["check"] for e in report["errors"])
+
+    def test_valid_store(self):
+        (report, checkpoint) = self.verifier.verify(self.commitments)
+        self.assertTrue(report["valid"], report["errors"])
+        self.assertEqual(report["records"], 2)
+        self.assertEqual(report["chains"], 1)
+        self.assertEqual(report["verified"], 2)
+        self.assertEqual(len(checkpoint["records"]), 2)
+
+    def test_cpid_mismatch(self):
+        # Make the stored id of the transfer differ from its packet
+        self.commitments[1].commitment_packet.blockchain_outpoint = "00" * 32 + ":1"
+        (report, _) = self.verifier.verify(self.commitments)
+        self.assertFalse(report["valid"])
+        # The digest changed too, so the signature no longer verifies
+        self.assertEqual(self.checks_failed(report), ["cpid", "signature"])
+
+    def test_signed_by_wrong_key(self):
+        transfer = self.commitments[1].commitment_packet
+        # Bob cannot sign his own transfer
+        transfer.signature = self.bob.sign_commitment_packet_digest(transfer.packet_digest(), hashlib.sha256).hex()
+        (report, _) = self.verifier.verify(self.commitments)
+        self.assertEqual(self.checks_failed(report), ["signature"])
+
+    def test_inconsistent_state(self):
+        self.commitments[0].state = CommitmentStatus.Created
+        (report, _) = self.verifier.verify(self.commitments)
+        self.assertEqual(self.checks_failed(report), ["state", "state"])
+
+    def test_missing_previous(self):
+        (report, _) = self.verifier.verify(self.commitments[1:])
+        self.assertEqual(self.checks_failed(report), ["lineage"])
+
+    def test_unsigned_template_is_valid(self):
+        self.commitments[0].state = CommitmentStatus.Created
+        self.commitments[0].spending_tx = None
+        self.commitments[1].commitment_packet.signature = None
+        (report, _) = self.verifier.verify(self.commitments)
+        self.assertTrue(report["valid"], report["errors"])
+
+    def test_checkpoint_only_verifies_new_records(self):
+        (_, checkpoint) = self.verifier.verify(self.commitments)
+        more = make_chain(self.alice, self.bob, "more_asset_data")
+        (report, checkpoint) = self.verifier.verify(self.commitments + more, checkpoint)
+        self.assertTrue(report["valid"], report["errors"])
+        self.assertEqual(report["verified"], 2)
+        self.assertEqual(report["from_checkpoint"], 2)
+
+        # A changed record is verified again
+        self.commitments[1].commitment_packet.signature = self.commitments[0].commitment_packet.signature
+        (report, _) = self.verifier.verify(self.commitments + more, checkpoint)
+        self.assertEqual(report["verified"], 1)
+        self.assertEqual(self.checks_failed(report), ["signature"])
+
+    def test_checkpoint_file(self):
+        (_, checkpoint) = self.verifier.verify(self.commitments)
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "checkpoint.json")
+            self.assertEqual(load_checkpoint(filepath)["records"], {})
+            save_checkpoint(filepath, checkpoint)
+            self.assertEqual(load_checkpoint(filepath), checkpoint)
+
+    def test_process_pool(self):
+        commitments = self.commitments + make_chain(self.alice, self.bob, "more_asset_data")
+        commitments[1].commitment_packet.signature = commitments[0].commitment_packet.signature
+        verifier = StoreVerifier(workers=2, chunk_size=1)
+        (report, _) = verifier.verify(commitments)
+        self.assertEqual(report["verified"], 4)
+        self.assertEqual(self.checks_failed(report), ["signature"])
+
+
+if __name__ == "__main__":
+    unittest.main()
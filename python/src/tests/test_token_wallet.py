@@ -3,10 +3,11 @@ import unittest
 import sys
 import hashlib
 import ecdsa
+from unittest.mock import patch
 
 sys.path.append("..")
 
-from service.token_wallet import TokenWallet, verify_signature
+from service.token_wallet import TokenWallet, VerificationCache, SignatureBackend, EcdsaBackend, CryptographyBackend, HAS_CRYPTOGRAPHY, verify_signature, get_verifying_key, set_signature_backend, get_signature_backend
 from service.commitment_packet import CommitmentPacket
 
 
@@ -83,6 +84,125 @@ class TokenWalletTest(unittest.TestCase):
         c: ecdsa.curves.Curve = self.tw_nist256.get_signature_curve()
         self.assertTrue(verify_signature(hashed_message, cp.public_key, sig, c))
 
+    def test_public_key_cached_on_load(self):
+        vk = self.tw_nist256.private_key.get_verifying_key()
+        self.assertEqual(self.tw_nist256.get_token_public_key(), vk.to_string(encoding="compressed").hex())
+        self.assertEqual(self.tw_nist256.get_token_public_key_bytes(), vk.to_string())
+        # set_config loads the same key as set_key
+        tw = TokenWallet()
+        tw.set_config({"token_key": "92fnTSWFiLbDvDtXNfvHByUhabdmXiv6xfy9a2zEbwqHHNbWY4z", "token_key_curve": "NIST256p"})
+        self.assertEqual(tw.get_token_public_key(), self.tw_nist256.get_token_public_key())
+        self.assertEqual(tw.get_signature_scheme(), "NIST256p")
+
+    def test_verifying_key_cache(self):
+        public_key: str = self.tw_nist256.get_token_public_key()
+        vk = get_verifying_key("NIST256p", public_key)
+        self.assertIs(get_verifying_key("NIST256p", public_key), vk)
+        self.assertEqual(vk.to_string(encoding="compressed").hex(), public_key)
+        # The precomputed key still verifies and rejects as expected
+        message: bytes = 'Game over man, game over!'.encode()
+        sig: bytes = self.tw_nist256.sign_commitment_packet_digest(message, hashlib.sha256)
+        c: ecdsa.curves.Curve = self.tw_nist256.get_signature_curve()
+        self.assertTrue(verify_signature(message, public_key, sig, c, hashlib.sha256))
+        self.assertFalse(verify_signature(message + b'!', public_key, sig, c, hashlib.sha256))
+
+
+@unittest.skipUnless(HAS_CRYPTOGRAPHY, "cryptography package not installed")
+class SignatureBackendTest(unittest.TestCase):
+    """ Check that signatures are byte compatible between the signature backends
+    """
+    # These are documented test keys, do not use in production
+    KEYS = {
+        "NIST256p": "92fnTSWFiLbDvDtXNfvHByUhabdmXiv6xfy9a2zEbwqHHNbWY4z",
+        "SECP256k1": "cU4nzixA5cDSXjGX5hcvZ8QjqZBMLGqwNoWCRZ5fwCt2NLJMyyy3",
+    }
+
+    def setUp(self):
+        self.backends = [EcdsaBackend(), CryptographyBackend()]
+        self.cp: CommitmentPacket = CommitmentPacket(asset_id="Murphys Asset",
+                                                     data="Murphys_Asset_data",
+                                                     previous_packet="6957ca6359234cf5f7705edda20fa21039a6c1124d216cbc4ab6b5b298eeaacd",
+                                                     blockchain_outpoint="6e59cf55510fb810ae51e2948ae27055559e6795f56c85a2c8c7171eac98ed48:1",
+                                                     blockchain_id="BSV",
+                                                     signature=None,
+                                                     signature_scheme="",
+                                                     public_key=""
+                                                     )  # type: ignore[call-arg]
+
+    def test_cross_backend_sign_and_verify(self):
+        for (curve, key) in self.KEYS.items():
+            for signer in self.backends:
+                tw = TokenWallet()
+                tw.set_key(key, curve, signer)
+                self.cp.public_key = tw.get_token_public_key()
+                self.cp.signature_scheme = tw.get_signature_scheme()
+                message: bytes = self.cp.packet_digest()
+                for hashfunction in [hashlib.sha256, None]:
+                    sig: bytes = tw.sign_commitment_packet_digest(message, hashfunction)
+                    # Raw r || s encoding, as produced by ecdsa
+                    self.assertEqual(len(sig), 2 * tw.get_signature_curve().baselen)
+                    for verifier in self.backends:
+                        with self.subTest(curve=curve, signer=signer.name, verifier=verifier.name, hashfunction=hashfunction):
+                            self.assertTrue(verify_signature(message, tw.get_token_public_key(), sig, tw.get_signature_curve(), hashfunction, verifier))
+                            # Raw (uncompressed, no prefix) public keys are accepted too
+                            self.assertTrue(verify_signature(message, tw.get_token_public_key_bytes().hex(), sig, tw.get_signature_curve(), hashfunction, verifier))
+                            self.assertFalse(verify_signature(message + b'!', tw.get_token_public_key(), sig, tw.get_signature_curve(), hashfunction, verifier))
+                            self.assertFalse(verify_signature(message, tw.get_token_public_key(), sig[:-1], tw.get_signature_curve(), hashfunction, verifier))
+
+    def test_backend_is_abstract(self):
+        with self.assertRaises(TypeError):
+            SignatureBackend()  # type: ignore[abstract]
+
+    @patch('service.token_wallet.signature_backend', None)
+    def test_backend_selected_once(self):
+        set_signature_backend("cryptography")
+        # Selecting the same backend again is allowed, as set_config may be called again
+        set_signature_backend("cryptography")
+        with self.assertRaises(ValueError):
+            set_signature_backend("ecdsa")
+        self.assertEqual(get_signature_backend().name, "cryptography")
+
+    @patch('service.token_wallet.signature_backend', None)
+    def test_default_backend(self):
+        self.assertEqual(get_signature_backend().name, "ecdsa")
+        with self.assertRaises(ValueError):
+            set_signature_backend("cryptography")
+
+    def test_deterministic_signature_verifies(self):
+        # An ecdsa deterministic (RFC 6979) signature is accepted by every backend
+        for (curve, key) in self.KEYS.items():
+            tw = TokenWallet()
+            tw.set_key(key, curve, EcdsaBackend())
+            sig: bytes = tw.private_key.sign_deterministic(b"message", hashfunc=hashlib.sha256)
+            for verifier in self.backends:
+                self.assertTrue(verify_signature(b"message", tw.get_token_public_key(), sig, tw.get_signature_curve(), hashlib.sha256, verifier))
+
+
+class VerificationCacheTest(unittest.TestCase):
+    """ Exercise the VerificationCache
+    """
+    def test_hit_and_miss(self):
+        cache = VerificationCache()
+        self.assertIsNone(cache.get(("cpid", "sig", "pubkey", "NIST256p")))
+        cache.put(("cpid", "sig", "pubkey", "NIST256p"), True)
+        cache.put(("cpid", "bad_sig", "pubkey", "NIST256p"), False)
+        self.assertTrue(cache.get(("cpid", "sig", "pubkey", "NIST256p")))
+        self.assertFalse(cache.get(("cpid", "bad_sig", "pubkey", "NIST256p")))
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 1)
+        self.assertAlmostEqual(cache.hit_rate(), 2 / 3)
+
+    def test_eviction(self):
+        cache = VerificationCache(maxsize=2)
+        cache.put(("a", "sig", "pubkey", "NIST256p"), True)
+        cache.put(("b", "sig", "pubkey", "NIST256p"), True)
+        # Touch a so that b is the least recently used
+        cache.get(("a", "sig", "pubkey", "NIST256p"))
+        cache.put(("c", "sig", "pubkey", "NIST256p"), True)
+        self.assertIsNone(cache.get(("b", "sig", "pubkey", "NIST256p")))
+        self.assertTrue(cache.get(("a", "sig", "pubkey", "NIST256p")))
+        self.assertTrue(cache.get(("c", "sig", "pubkey", "NIST256p")))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+import unittest
+import sys
+import os
+import tempfile
+
+sys.path.append("..")
+
+from tx_engine import Tx, TxIn, TxOut, Script
+
+from service.tx_cache import TxCache
+from service.metrics import metrics
+
+
+def make_tx(i: int) -> Tx:
+    return Tx(
+        version=1,
+        tx_ins=[TxIn(prev_tx=f"{i:064x}", prev_index=0)],
+        tx_outs=[TxOut(amount=100, script_pubkey=Script.parse_string("OP_1"))],
+        locktime=0)
+
+
+class TxCacheTest(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.directory = tempfile.TemporaryDirectory()
+        self.txs_directory = os.path.join(self.directory.name, "txs")
+        self.config = {"tx_cache": {"memory_size": 2, "directory": self.txs_directory}}
+        self.cache = TxCache()
+        self.cache.set_config(self.config)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_set_config_defaults(self):
+        cache = TxCache()
+        cache.set_config({})
+        self.assertEqual(cache.memory_size, 1000)
+        self.assertIsNone(cache.directory)
+
+    def test_memory(self):
+        cache = TxCache()
+        cache.set_config({"tx_cache": {"memory_size": 2}})
+        txs = [make_tx(i) for i in range(3)]
+        self.assertIsNone(cache.get(txs[0].id()))
+        for tx in txs[:2]:
+            self.assertTrue(cache.add(tx.serialize().hex()))
+        # Use the first, so the second is evicted
+        self.assertEqual(cache.get(txs[0].id()), txs[0].serialize().hex())
+        cache.add(txs[2].serialize().hex())
+        self.assertIsNone(cache.get(txs[1].id()))
+        self.assertIsNotNone(cache.get(txs[0].id()))
+        counters = metrics.get_status()["counters"]
+        self.assertEqual(counters["tx_cache.memory_hits"], 2)
+        self.assertEqual(counters["tx_cache.misses"], 2)
+
+    def test_disk(self):
+        txs = [make_tx(i) for i in range(3)]
+        for tx in txs:
+            self.cache.add(tx.serialize().hex())
+        # The evicted tx is read from disk
+        self.assertEqual(self.cache.get(txs[0].id()), txs[0].serialize().hex())
+        self.assertEqual(metrics.get_status()["counters"]["tx_cache.disk_hits"], 1)
+
+        # Another cache, as after a restart
+        cache = TxCache()
+        cache.set_config(self.config)
+        for tx in txs:
+            self.assertEqual(cache.get(tx.id()), tx.serialize().hex())
+        self.assertEqual(sorted(os.listdir(self.txs_directory)), sorted(tx.id() for tx in txs))
+        self.assertIsNone(cache.get("../" + txs[0].id()))
+
+    def test_txid_mismatch(self):
+        tx = make_tx(0)
+        self.assertFalse(self.cache.add(tx.serialize().hex(), make_tx(1).id()))
+        self.assertIsNone(self.cache.get(make_tx(1).id()))
+        self.assertTrue(self.cache.add(tx.serialize().hex(), tx.id()))
+
+    def test_add_all(self):
+        txs = [make_tx(i) for i in range(3)]
+        self.cache.add_all([None] + [tx.serialize().hex() for tx in txs])
+        self.cache.reset()
+        for tx in txs:
+            self.assertEqual(self.cache.get(tx.id()), tx.serialize().hex())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+import unittest
+import sys
+from typing import Any, Dict, List
+
+sys.path.append("..")
+
+from tx_engine import Tx, TxIn, TxOut, Script
+
+from service.utxo_pool import UtxoPool, UTXO_VALUE
+from service.metrics import metrics
+from service.financing_service import FinancingServiceException
+
+LOCKING_SCRIPT = "76a914661657ba0a6b276bb5cb313257af5cc416450c0888ac"
+
+
+class BatchFinancingService:
+    """ Returns one funding tx with an output for each requested outpoint
+    """
+    def __init__(self):
+        self.calls: List[int] = []
+        self.fail = False
+        self.accept_unconfirmed = False
+        self.visibility_max_delay = 0.01
+        self.visibility_timeout = 5.0
+        self.visible = True
+
+    def _get_funds(self, fee_estimate: int, locking_script: str, no_of_outpoints: int, multiple_tx: bool, accept_unconfirmed: bool) -> None | Dict[str, Any]:
+        assert fee_estimate == UTXO_VALUE and not multiple_tx
+        # The pool checks the visibility of the funding tx itself
+        assert accept_unconfirmed
+        if self.fail:
+            raise FinancingServiceException("ConnectionError connecting to finance service.")
+        self.calls.append(no_of_outpoints)
+        tx_outs = [TxOut(amount=fee_estimate, script_pubkey=Script.parse_string("OP_1")) for _ in range(no_of_outpoints)]
+        tx = Tx(version=1, tx_ins=[TxIn(prev_tx="00" * 31 + f"{len(self.calls):02x}", prev_index=0)], tx_outs=tx_outs, locktime=0)
+        return {
+            'status': 'Success',
+            'outpoints': [{'hash': tx.id(), 'index': i} for i in range(no_of_outpoints)],
+            'tx': tx.serialize().hex(),
+        }
+
+    def is_tx_visible(self, txid: str) -> bool:
+        return self.visible
+
+
+class UtxoPoolTest(unittest.TestCase):
+    """ Exercise the pre-funded UTXO pool
+    """
+    def setUp(self):
+        metrics.reset()
+        self.finance_service = BatchFinancingService()
+        self.pool = UtxoPool(self.finance_service)  # type: ignore[arg-type]
+        self.pool.set_config({"utxo_pool": {"enabled": True, "batch_size": 4, "low_water": 2}})
+        self.pool.register("Alice", LOCKING_SCRIPT)
+
+    def test_set_config_defaults(self):
+        pool = UtxoPool(self.finance_service)  # type: ignore[arg-type]
+        pool.set_config({})
+        self.assertFalse(pool.enabled)
+        self.assertEqual(self.pool.batch_size, 4)
+
+    def test_take_from_batch(self):
+        self.pool.refill()
+        self.assertEqual(self.finance_service.calls, [4])
+        self.assertEqual(self.pool.depth(LOCKING_SCRIPT), 4)
+
+        utxos = [self.pool.take(LOCKING_SCRIPT) for _ in range(4)]
+        self.assertIsNone(self.pool.take(LOCKING_SCRIPT))
+        outpoints = set()
+        txids = set()
+        for utxo in utxos:
+            assert utxo is not None
+            (vin, tx) = utxo
+            self.assertEqual(vin.prev_tx, tx.id())
+            outpoints.add(vin.as_outpoint())
+            txids.add(tx.id())
+        self.assertEqual(len(outpoints), 4)
+        # One funding tx for the batch
+        self.assertEqual(len(txids), 1)
+
+        status = metrics.get_status()
+        self.assertEqual(status["counters"]["utxo_pool_hits"], 4)
+        self.assertEqual(status["counters"]["utxo_pool_misses"], 1)
+        self.assertEqual(status["gauges"]["utxo_pool_depth.Alice"], 0)
+        self.assertEqual(status["latencies"]["utxo_pool_refill"]["count"], 1)
+
+    def test_refill_only_below_low_water(self):
+        self.pool.refill()
+        self.pool.take(LOCKING_SCRIPT)
+        self.pool.refill()
+        self.assertEqual(self.finance_service.calls, [4])
+        self.pool.take(LOCKING_SCRIPT)
+        self.pool.take(LOCKING_SCRIPT)
+        self.pool.refill()
+        self.assertEqual(self.finance_service.calls, [4, 4])
+        self.assertEqual(self.pool.depth(LOCKING_SCRIPT), 5)
+
+    def test_unregistered_locking_script(self):
+        self.assertIsNone(self.pool.take("51"))
+        self.assertNotIn("utxo_pool_misses", metrics.get_status()["counters"])
+
+    def test_refill_failure(self):
+        self.finance_service.fail = True
+        self.pool.refill()
+        self.assertEqual(self.pool.depth(LOCKING_SCRIPT), 0)
+        self.assertEqual(metrics.get_status()["counters"]["utxo_pool_refill_failures"], 1)
+
+    def test_held_until_visible(self):
+        self.finance_service.visible = False
+        self.pool.refill()
+        self.assertEqual(self.pool.depth(LOCKING_SCRIPT), 0)
+        # The pending batch counts towards the low water mark
+        self.pool.refill()
+        self.assertEqual(self.finance_service.calls, [4])
+        self.finance_service.visible = True
+        self.pool.refill()
+        self.assertEqual(self.finance_service.calls, [4])
+        self.assertEqual(self.pool.depth(LOCKING_SCRIPT), 4)
+
+    def test_released_after_visibility_timeout(self):
+        self.finance_service.visible = False
+        self.finance_service.visibility_timeout = 0.0
+        self.pool.refill()
+        self.assertEqual(self.pool.depth(LOCKING_SCRIPT), 4)
+        self.assertEqual(metrics.get_status()["counters"]["funding_tx_visibility_timeouts"], 1)
+
+    def test_background_refill(self):
+        self.pool.start()
+        try:
+            for _ in range(100):
+                if self.pool.depth(LOCKING_SCRIPT) == 4:
+                    break
+                self.pool.stopped.wait(0.01)
+            self.assertIsNotNone(self.pool.take(LOCKING_SCRIPT))
+        finally:
+            self.pool.stop()
+        self.assertIsNone(self.pool.thread)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+""" Verify every commitment chain in the commitment store and write a JSON report.
+
+    python3 verify_store.py --workers 4 --report report.json
+
+    Only records added or changed since the last pass are verified again, unless --full is given.
+    Exits with 0 if the store is valid and 1 otherwise.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+from config import load_config
+from service.commitment_store import CommitmentStore
+from service.store_verifier import StoreVerifier, load_checkpoint, save_checkpoint
+
+CONFIG_FILE = "../data/uba-server.toml" if os.environ.get("APP_ENV") == "docker" else "../../data/uba-server.toml"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Verify the signatures and lineage of every commitment in the store")
+    parser.add_argument("--config", default=CONFIG_FILE, help="UBA server config file")
+    parser.add_argument("--store", help="commitment store file, defaults to the one in the config")
+    parser.add_argument("--checkpoint", help="checkpoint file, defaults to the store file with .verified.json appended")
+    parser.add_argument("--report", help="write the report to this file rather than stdout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="size of the process pool, 0 verifies in this process")
+    parser.add_argument("--chunk-size", type=int, default=256, help="records per process pool task")
+    parser.add_argument("--full", action="store_true", help="ignore the checkpoint and verify every record")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    store = CommitmentStore()
+    if args.store is not None:
+        store.filepath = args.store
+    else:
+        store.set_config(config)
+    # Keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        is_loaded = store.load()
+    if not is_loaded:
+        print(f"Unable to load commitment store {store.filepath}", file=sys.stderr)
+        return 1
+
+    backend_name = config.get("commitment_service", {}).get("signature_backend", "ecdsa")
+    checkpoint_file = args.checkpoint if args.checkpoint is not None else store.filepath + ".verified.json"
+    checkpoint = None if args.full else load_checkpoint(checkpoint_file)
+
+    verifier = StoreVerifier(workers=args.workers, chunk_size=args.chunk_size, backend_name=backend_name)
+    (report, new_checkpoint) = verifier.verify(store.commitments, checkpoint)
+    report["store"] = store.filepath
+    save_checkpoint(checkpoint_file, new_checkpoint)
+
+    if args.report is not None:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+    return 0 if report["valid"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
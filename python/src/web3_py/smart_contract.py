@@ -397,6 +397,15 @@ class SmartContract:
         # Call isUTXOSpent
         return self.contract.functions.isUTXOSpent(utxo).call()
 
+    # --------------------------------------------------------
+    def get_utxo_id(self, tx_hash):
+        return self._txhash_to_utxoid(tx_hash)
+
+    # --------------------------------------------------------
+    def is_utxo_spent(self, utxo, block_identifier="latest") -> bool:
+        # Call isUTXOSpent as of the given block
+        return self.contract.functions.isUTXOSpent(utxo).call(block_identifier=block_identifier)
+
     # --------------------------------------------------------
     def get_cpid(self, tx_hash):
         print(f"Getting CPID for tx_hash: {tx_hash}")